@@ -0,0 +1,70 @@
+"""add_barber_client_retention_table
+
+Revision ID: b7c2d4e6f801
+Revises: 84384b18be74
+Create Date: 2026-10-16 10:00:00.000000
+
+Per barber/client retention summary, updated when appointments complete.
+The table is backfilled from completed appointments so existing dashboards
+have data immediately after upgrade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c2d4e6f801'
+down_revision: Union[str, Sequence[str], None] = '84384b18be74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('barber_client_retention',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('barber_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('first_visit_at', sa.DateTime(), nullable=False),
+        sa.Column('last_visit_at', sa.DateTime(), nullable=False),
+        sa.Column('visit_count', sa.Integer(), nullable=False),
+        sa.Column('total_spent', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['barber_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_index(op.f('ix_barber_client_retention_id'), 'barber_client_retention', ['id'], unique=False)
+    op.create_index('idx_barber_client_retention_pair', 'barber_client_retention', ['barber_id', 'client_id'], unique=True)
+    op.create_index('idx_barber_client_retention_last_visit', 'barber_client_retention', ['barber_id', 'last_visit_at'], unique=False)
+
+    # Backfill from completed appointments (barber_id, falling back to user_id)
+    op.execute("""
+        INSERT INTO barber_client_retention
+            (barber_id, client_id, first_visit_at, last_visit_at, visit_count, total_spent, updated_at)
+        SELECT
+            COALESCE(barber_id, user_id),
+            client_id,
+            MIN(start_time),
+            MAX(start_time),
+            COUNT(*),
+            COALESCE(SUM(price), 0),
+            CURRENT_TIMESTAMP
+        FROM appointments
+        WHERE status = 'completed'
+          AND client_id IS NOT NULL
+          AND COALESCE(barber_id, user_id) IS NOT NULL
+          AND start_time IS NOT NULL
+        GROUP BY COALESCE(barber_id, user_id), client_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_barber_client_retention_last_visit', table_name='barber_client_retention')
+    op.drop_index('idx_barber_client_retention_pair', table_name='barber_client_retention')
+    op.drop_index(op.f('ix_barber_client_retention_id'), table_name='barber_client_retention')
+    op.drop_table('barber_client_retention')
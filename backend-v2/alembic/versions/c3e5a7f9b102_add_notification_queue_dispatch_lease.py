@@ -0,0 +1,36 @@
+"""add_notification_queue_dispatch_lease
+
+Revision ID: c3e5a7f9b102
+Revises: b7c2d4e6f801
+Create Date: 2026-10-16 12:00:00.000000
+
+Lease columns let several dispatch workers claim disjoint batches of the
+notification queue; the (status, scheduled_for) index serves the due query.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7f9b102'
+down_revision: Union[str, Sequence[str], None] = 'b7c2d4e6f801'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('notification_queue') as batch_op:
+        batch_op.add_column(sa.Column('lease_owner', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('idx_notification_queue_due', 'notification_queue', ['status', 'scheduled_for'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_notification_queue_due', table_name='notification_queue')
+    with op.batch_alter_table('notification_queue') as batch_op:
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('lease_owner')
@@ -0,0 +1,50 @@
+"""add_appointment_reminders
+
+Revision ID: d4f6b8a0c213
+Revises: c3e5a7f9b102
+Create Date: 2026-10-16 15:00:00.000000
+
+Reminder send times are materialized when an appointment is booked or
+rescheduled; the (status, due_at) index lets the worker pop only due rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6b8a0c213'
+down_revision: Union[str, Sequence[str], None] = 'c3e5a7f9b102'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'appointment_reminders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.Column('hours_before', sa.Integer(), nullable=False),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('queued_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_appointment_reminders_id'), 'appointment_reminders', ['id'], unique=False)
+    op.create_index('idx_appointment_reminders_due', 'appointment_reminders', ['status', 'due_at'], unique=False)
+    op.create_index(
+        'idx_appointment_reminders_slot', 'appointment_reminders',
+        ['appointment_id', 'hours_before', 'due_at'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_appointment_reminders_slot', table_name='appointment_reminders')
+    op.drop_index('idx_appointment_reminders_due', table_name='appointment_reminders')
+    op.drop_index(op.f('ix_appointment_reminders_id'), table_name='appointment_reminders')
+    op.drop_table('appointment_reminders')
@@ -0,0 +1,46 @@
+"""add_conflict_covering_indexes
+
+Revision ID: e2a4c6d8f015
+Revises: d4f6b8a0c213
+Create Date: 2026-10-16 18:00:00.000000
+
+Conflict detection (services/conflict_queries.py) filters appointments by
+barber_id, a half-open start_time range and status, and reads only id,
+start_time and duration_minutes.  The covering index answers that with an
+index-only range scan; blackout lookups get a (barber_id, blackout_date)
+index for their date-overlap filter.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a4c6d8f015'
+down_revision: Union[str, Sequence[str], None] = 'd4f6b8a0c213'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # duration_minutes is a key column so SQLite (no INCLUDE) covers the lookup too
+    op.create_index(
+        'idx_appointments_conflict_covering',
+        'appointments',
+        ['barber_id', 'start_time', 'status', 'duration_minutes'],
+        postgresql_include=['id']
+    )
+
+    op.create_index(
+        'idx_blackout_dates_barber_date',
+        'blackout_dates',
+        ['barber_id', 'blackout_date', 'end_date']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_blackout_dates_barber_date', table_name='blackout_dates')
+    op.drop_index('idx_appointments_conflict_covering', table_name='appointments')
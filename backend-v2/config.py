@@ -97,6 +97,10 @@ class Settings(BaseSettings):
     cache_max_memory_mb: int = 100  # Maximum memory usage for cache
     cache_warmup_on_startup: bool = True
     cache_invalidation_events: list = ["appointment_created", "appointment_updated", "appointment_deleted", "user_updated"]
+    availability_bitmap_enabled: bool = True  # Per barber-day occupancy bitmaps for slot reads
+    # Prefix of the route tables SmartCacheMiddleware caches and invalidates;
+    # "/api/v2" turns response caching on for the mounted routers
+    smart_cache_api_prefix: str = "/api/v1"
     
     # AWS ElastiCache Configuration
     aws_elasticache_enabled: bool = False
@@ -221,6 +225,8 @@ class Settings(BaseSettings):
     appointment_reminder_hours: list[int] = [24, 2]  # Send reminders 24h and 2h before
     notification_retry_attempts: int = 3
     notification_retry_delay_seconds: int = 60
+    notification_dispatch_concurrency: int = 8  # Parallel provider calls per dispatch
+    notification_lease_seconds: int = 300  # Claimed rows are reclaimable after this
     enable_email_notifications: bool = True
     enable_sms_notifications: bool = True
     
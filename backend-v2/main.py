@@ -16,12 +16,14 @@ from utils.error_handling import create_error_handler
 from services.integration_service import IntegrationServiceFactory
 from models.integration import IntegrationType
 from middleware import SecurityHeadersMiddleware, RequestValidationMiddleware, MFAEnforcementMiddleware
+from middleware.request_validation import install_parsed_body_routes
 from middleware.multi_tenancy import MultiTenancyMiddleware
 from middleware.financial_security import FinancialSecurityMiddleware
 from middleware.sentry_middleware import SentryEnhancementMiddleware
 from middleware.enhanced_security import EnhancedSecurityMiddleware, WebhookSecurityMiddleware
 from middleware.configuration_security import ConfigurationSecurityMiddleware, configuration_reporter
 from middleware.cache_middleware import SmartCacheMiddleware
+from config import settings
 import logging
 
 # Initialize Sentry error tracking (must be done before importing FastAPI app)
@@ -124,11 +126,7 @@ async def startup_event():
             import sentry_sdk
             sentry_sdk.capture_exception(e)
 
-# Add Redis caching middleware
-from middleware.cache_middleware import SmartCacheMiddleware
-
 # Add security middleware
-import logging
 import os
 
 logger = logging.getLogger(__name__)
@@ -142,7 +140,7 @@ if ENVIRONMENT == "development" and ENABLE_DEVELOPMENT_MODE:
     logger.info("🔧 Development mode: Using lightweight middleware stack")
     
     # Add smart cache middleware for development
-    app.add_middleware(SmartCacheMiddleware, enable_cache=True)
+    app.add_middleware(SmartCacheMiddleware, enable_cache=True, api_prefix=settings.smart_cache_api_prefix)
     
     # Only essential middleware for development
     app.add_middleware(SecurityHeadersMiddleware)
@@ -157,10 +155,9 @@ else:
     # Add enhanced security middleware stack
     environment = ENVIRONMENT if ENVIRONMENT != "development" else "production"
     
-    # Add configuration security middleware (first for critical security validation)
-    config_security_middleware = ConfigurationSecurityMiddleware(app, check_interval_minutes=30)
+    # Add configuration security middleware (first for critical security validation);
+    # the installed instance registers itself with configuration_reporter
     app.add_middleware(ConfigurationSecurityMiddleware, check_interval_minutes=30)
-    configuration_reporter.set_middleware(config_security_middleware)
     
     # Add Sentry enhancement middleware (early in chain for comprehensive coverage)
     if sentry_configured:
@@ -196,7 +193,7 @@ else:
     app.add_middleware(SecurityHeadersMiddleware)
     
     # Add smart cache middleware for production (after security middleware)
-    app.add_middleware(SmartCacheMiddleware, enable_cache=True)
+    app.add_middleware(SmartCacheMiddleware, enable_cache=True, api_prefix=settings.smart_cache_api_prefix)
     
     logger.info("✅ Enhanced security stack applied with production-grade settings, configuration validation, and intelligent caching")
 
@@ -400,4 +397,9 @@ def security_status():
 @app.get("/security/compliance")
 def security_compliance():
     """Get security compliance report"""
-    return configuration_reporter.get_compliance_report()
\ No newline at end of file
+    return configuration_reporter.get_compliance_report()
+
+
+# Route handlers reuse the JSON body decoded by RequestValidationMiddleware
+# (must run after every route above is registered)
+install_parsed_body_routes(app)
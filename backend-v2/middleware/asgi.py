@@ -0,0 +1,111 @@
+"""
+Helpers for writing middleware as plain ASGI callables.
+
+``BaseHTTPMiddleware`` runs the rest of the stack in a separate task and
+relays every response through an in-memory stream, so each layer adds a
+task switch and a body copy per request.  The middleware in this package
+instead wrap ``send`` to edit response headers as they go by, answer
+directly with a ``Response`` (itself an ASGI app) to reject a request, and
+buffer the request body only when they need to inspect it.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import Message, Receive, Scope, Send
+
+from utils.json_body import parse_json
+
+# Scope key holding the buffered request body, shared by every layer that reads it
+BODY_SCOPE_KEY = "bookedbarber.body"
+
+# Scope key holding the decoded JSON body, shared the same way (and with routes)
+JSON_SCOPE_KEY = "bookedbarber.json"
+
+
+class ResponseStart:
+    """Status and headers of a response, as seen in ``http.response.start``"""
+
+    __slots__ = ("status_code", "headers")
+
+    def __init__(self, status_code: int = 500, headers: Optional[Headers] = None):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else Headers()
+
+
+def watch_response(
+    send: Send,
+    on_start: Optional[Callable[[MutableHeaders, Message], None]] = None
+) -> Tuple[Send, ResponseStart]:
+    """Wrap ``send`` to record the response start and let ``on_start`` edit its headers
+
+    The returned ``ResponseStart`` keeps a 500 status until the downstream
+    app starts a response.
+    """
+    started = ResponseStart()
+
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(scope=message)
+            if on_start is not None:
+                on_start(headers, message)
+            started.status_code = message["status"]
+            started.headers = headers
+        await send(message)
+
+    return wrapped, started
+
+
+async def read_body(scope: Scope, receive: Receive) -> Tuple[bytes, Receive]:
+    """Buffer the request body once and return a ``receive`` that replays it
+
+    A layer below the one that buffered the body gets the cached bytes and
+    its own ``receive`` back unchanged, since that already replays them.
+    """
+    body = scope.get(BODY_SCOPE_KEY)
+    if body is not None:
+        return body, receive
+
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = scope[BODY_SCOPE_KEY] = b"".join(chunks)
+
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # After the body, only a disconnect can arrive
+        return await receive()
+
+    return body, replay
+
+
+async def read_json(scope: Scope, receive: Receive) -> Tuple[Any, Receive]:
+    """Buffer and decode the JSON body once; ``None`` for an empty body
+
+    Raises ValidationError for excessive nesting and ValueError for invalid
+    JSON.  A successful decode is cached for every later layer and the route.
+    """
+    if JSON_SCOPE_KEY in scope:
+        return scope[JSON_SCOPE_KEY], receive
+
+    body, receive = await read_body(scope, receive)
+    if not body:
+        return None, receive
+    data = scope[JSON_SCOPE_KEY] = parse_json(body)
+    return data, receive
+
+
+def error_response(status_code: int, detail: Any, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """JSON error in the shape FastAPI uses for ``HTTPException``"""
+    return JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
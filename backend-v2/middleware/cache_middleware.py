@@ -3,19 +3,24 @@ FastAPI Cache Middleware for BookedBarber V2
 Provides automatic request/response caching with intelligent cache management.
 """
 
+import asyncio
+import gzip
 import json
 import hashlib
 import logging
-from typing import Any, Dict, List, Optional, Set, Callable
+import re
+import struct
+import time
+from typing import Any, Dict, List, Optional, Set, Callable, Tuple
 from datetime import datetime
 
 from fastapi import Request, Response
-from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from services.redis_cache import cache_service
 from config import settings
+from middleware.asgi import ResponseStart, watch_response
 
 logger = logging.getLogger(__name__)
 
@@ -30,80 +35,179 @@ class CacheableRoute:
         cache_key_generator: Optional[Callable] = None,
         cache_condition: Optional[Callable] = None,
         vary_headers: Optional[List[str]] = None,
-        invalidation_patterns: Optional[List[str]] = None
+        invalidation_patterns: Optional[List[str]] = None,
+        stale_ttl: int = 0
     ):
         self.path_pattern = path_pattern
         self.methods = methods
         self.ttl = ttl
+        # Seconds past ``ttl`` during which an expired entry is still served
+        # while a single background refresh runs (stale-while-revalidate)
+        self.stale_ttl = stale_ttl
         self.cache_key_generator = cache_key_generator
         self.cache_condition = cache_condition
         self.vary_headers = vary_headers or []
         self.invalidation_patterns = invalidation_patterns or []
 
-class SmartCacheMiddleware(BaseHTTPMiddleware):
-    """Intelligent caching middleware with automatic cache management"""
+class CachedResponse:
+    """Cache entry holding a response's encoded body bytes and headers
+    
+    Wire format: ``MAGIC``, a 4-byte big-endian metadata length, the JSON
+    metadata (status, headers, ETag, timestamp, compression) and the body.
+    Bodies above ``COMPRESS_MIN_BYTES`` are stored gzip-compressed and sent
+    as-is to clients that accept gzip.
+    """
+    
+    MAGIC = b"BBRC1"
+    COMPRESS_MIN_BYTES = 1024
+    
+    __slots__ = ("status_code", "headers", "body", "etag", "cached_at", "compressed")
+    
+    def __init__(
+        self,
+        status_code: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        etag: str,
+        cached_at: float,
+        compressed: bool = False
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.cached_at = cached_at
+        self.compressed = compressed
+    
+    @classmethod
+    def from_response(
+        cls,
+        status_code: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        compress: bool = True
+    ) -> "CachedResponse":
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        already_encoded = any(k.lower() == "content-encoding" for k, _ in headers)
+        if compress and not already_encoded and len(body) >= cls.COMPRESS_MIN_BYTES:
+            return cls(status_code, headers, gzip.compress(body, compresslevel=5), etag, time.time(), True)
+        return cls(status_code, headers, body, etag, time.time())
+    
+    def encode(self) -> bytes:
+        meta = json.dumps({
+            "s": self.status_code,
+            "h": self.headers,
+            "e": self.etag,
+            "t": self.cached_at,
+            "z": self.compressed
+        }, separators=(",", ":")).encode()
+        return b"".join((self.MAGIC, struct.pack(">I", len(meta)), meta, self.body))
+    
+    @classmethod
+    def decode(cls, data: Optional[bytes]) -> Optional["CachedResponse"]:
+        """Parse an encoded entry; ``None`` for missing or foreign data"""
+        if not data or not data.startswith(cls.MAGIC):
+            return None
+        offset = len(cls.MAGIC)
+        (meta_length,) = struct.unpack(">I", data[offset:offset + 4])
+        meta = json.loads(data[offset + 4:offset + 4 + meta_length])
+        body = data[offset + 4 + meta_length:]
+        return cls(meta["s"], [tuple(h) for h in meta["h"]], body, meta["e"], meta["t"], meta["z"])
+    
+    def plain_body(self) -> bytes:
+        return gzip.decompress(self.body) if self.compressed else self.body
+
+
+class SmartCacheMiddleware:
+    """Intelligent caching middleware with automatic cache management
+    
+    Misses are coalesced per cache key (single flight): the first request
+    runs the handler and concurrent requests for the same key await its
+    result.  Routes with a ``stale_ttl`` keep serving an expired entry for
+    that long while one background refresh recomputes it.  Coalescing is
+    per worker process.
+    """
     
     def __init__(
         self,
         app: ASGIApp,
         enable_cache: bool = True,
         default_ttl: int = 300,
-        cache_prefix: str = "api_cache"
+        cache_prefix: str = "api_cache",
+        api_prefix: str = "/api/v1"
     ):
-        super().__init__(app)
+        self.app = app
         self.enable_cache = enable_cache
         self.default_ttl = default_ttl
         self.cache_prefix = cache_prefix
+        # Prefix the route tables below are mounted under; see
+        # ``settings.smart_cache_api_prefix``
+        self.api_prefix = api_prefix.rstrip("/")
+        api_prefix = self.api_prefix
         
         # Define cacheable routes with specific configurations
         self.cacheable_routes = [
             # User and authentication routes
             CacheableRoute(
-                "/api/v1/users/me",
+                f"{api_prefix}/users/me",
                 methods=["GET"],
                 ttl=60,  # 1 minute for user data
-                vary_headers=["Authorization"]
+                vary_headers=["Authorization"],
+                invalidation_patterns=["users"]
             ),
             
             # Appointment slots (high-frequency, short TTL)
             CacheableRoute(
-                "/api/v1/appointments/slots",
+                f"{api_prefix}/appointments/slots",
                 methods=["GET"],
                 ttl=300,  # 5 minutes for availability
                 cache_key_generator=self._generate_slots_cache_key,
-                invalidation_patterns=["slots", "appointments"]
+                invalidation_patterns=["slots", "appointments"],
+                stale_ttl=60
+            ),
+            CacheableRoute(
+                f"{api_prefix}/bookings/slots",
+                methods=["GET"],
+                ttl=300,
+                cache_key_generator=self._generate_slots_cache_key,
+                invalidation_patterns=["slots", "appointments"],
+                stale_ttl=60
             ),
             
             # Business analytics (expensive queries, longer TTL)
             CacheableRoute(
-                "/api/v1/analytics/",
+                f"{api_prefix}/analytics/",
                 methods=["GET"],
                 ttl=1800,  # 30 minutes for analytics
                 cache_condition=self._should_cache_analytics,
-                vary_headers=["Authorization"]
+                vary_headers=["Authorization"],
+                stale_ttl=600
             ),
             
-            # Service listings (rarely changes)
+            # Service listings (rarely changes; the router requires auth)
             CacheableRoute(
-                "/api/v1/services",
+                f"{api_prefix}/services",
                 methods=["GET"],
                 ttl=3600,  # 1 hour for services
+                vary_headers=["Authorization"],
                 invalidation_patterns=["services"]
             ),
             
-            # Location data (rarely changes)
+            # Location data (rarely changes; scoped to the caller)
             CacheableRoute(
-                "/api/v1/locations",
+                f"{api_prefix}/locations",
                 methods=["GET"],
                 ttl=3600,  # 1 hour for locations
+                vary_headers=["Authorization"],
                 invalidation_patterns=["locations"]
             ),
             
-            # Reviews (moderate frequency)
+            # Reviews (moderate frequency; scoped to the caller)
             CacheableRoute(
-                "/api/v1/reviews",
+                f"{api_prefix}/reviews",
                 methods=["GET"],
                 ttl=600,  # 10 minutes for reviews
+                vary_headers=["Authorization"],
                 invalidation_patterns=["reviews"]
             ),
             
@@ -118,39 +222,66 @@ class SmartCacheMiddleware(BaseHTTPMiddleware):
         
         # Routes that invalidate cache when modified
         self.cache_invalidating_routes = {
-            "/api/v1/appointments": ["appointments", "slots"],
-            "/api/v1/services": ["services"],
-            "/api/v1/locations": ["locations"],
-            "/api/v1/reviews": ["reviews"],
-            "/api/v1/users": ["users"],
+            f"{api_prefix}/appointments": ["appointments", "slots"],
+            f"{api_prefix}/bookings": ["appointments", "slots"],
+            f"{api_prefix}/recurring-appointments": ["appointments", "slots"],
+            "/api/v1/public/booking": ["appointments", "slots"],
+            f"{api_prefix}/services": ["services"],
+            f"{api_prefix}/locations": ["locations"],
+            f"{api_prefix}/reviews": ["reviews"],
+            f"{api_prefix}/users": ["users"],
+            "/api/v2/barber-availability": ["slots"],
+        }
+        
+        # Writes that also invalidate a single entity's tag set (POST only;
+        # other verbs address availability rows, not barbers)
+        self.entity_invalidation_rules = [
+            (re.compile(r"^/api/v2/barber-availability/(?:availability|time-off|special)/(\d+)$"), "barber:{0}"),
+        ]
+        
+        # Query parameters that tag cached entries with the entity they cover
+        self.entity_tag_params = {
+            "barber_id": "barber:{0}",
+            "date": "date:{0}",
+            "appointment_date": "date:{0}",
         }
         
         # Headers to exclude from caching
         self.exclude_headers = {
             "authorization", "cookie", "set-cookie", "x-request-id", 
-            "x-correlation-id", "date", "server"
+            "x-correlation-id", "date", "server", "content-length"
         }
+        
+        # Single-flight state: cache key -> future of the leader's response,
+        # and keys with a background refresh in progress
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        self.coalescing_stats = {"leaders": 0, "coalesced": 0, "stale_served": 0, "background_refreshes": 0}
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Main middleware dispatch method"""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Main middleware entry point"""
         
-        if not self.enable_cache:
-            return await call_next(request)
+        if scope["type"] != "http" or not self.enable_cache:
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
         
         # Check if this route is cacheable
         cache_config = self._get_cache_config(request)
         
         if cache_config and request.method in cache_config.methods:
-            return await self._handle_cacheable_request(request, call_next, cache_config)
+            return await self._handle_cacheable_request(request, receive, send, cache_config)
         
         # Handle cache invalidation for non-cacheable routes
         if request.method in ["POST", "PUT", "PATCH", "DELETE"]:
-            response = await call_next(request)
+            send, response = watch_response(send)
+            await self.app(scope, receive, send)
             await self._handle_cache_invalidation(request, response)
-            return response
+            return
         
         # Non-cacheable request
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
     def _get_cache_config(self, request: Request) -> Optional[CacheableRoute]:
         """Get cache configuration for the request path"""
@@ -166,47 +297,209 @@ class SmartCacheMiddleware(BaseHTTPMiddleware):
     async def _handle_cacheable_request(
         self, 
         request: Request, 
-        call_next: Callable, 
+        receive: Receive, 
+        send: Send, 
         config: CacheableRoute
-    ) -> Response:
+    ) -> None:
         """Handle a cacheable request"""
+        scope = request.scope
         
         # Check cache condition
         if config.cache_condition and not config.cache_condition(request):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
+        
+        # Per-caller routes are only cached for callers with credentials;
+        # anonymous requests always reach the app's authentication
+        if self._varies_on_authorization(config) and not request.headers.get("authorization"):
+            return await self.app(scope, receive, send)
         
         # Generate cache key
         cache_key = await self._generate_cache_key(request, config)
         
         # Try to get from cache
-        cached_response = await cache_service.get(cache_key)
+        cached_response = CachedResponse.decode(await cache_service.get_raw(cache_key))
         
         if cached_response:
-            logger.debug(f"Cache HIT for {request.url.path}")
-            return JSONResponse(
-                content=cached_response["content"],
-                status_code=cached_response["status_code"],
-                headers={
-                    **cached_response["headers"],
+            age = time.time() - cached_response.cached_at
+            if age < config.ttl:
+                logger.debug(f"Cache HIT for {request.url.path}")
+                response = self._entry_to_response(cached_response, request, {
                     "X-Cache-Status": "HIT",
                     "X-Cache-Key": cache_key[:16] + "..."
-                }
-            )
+                })
+                return await response(scope, receive, send)
+            
+            if age < config.ttl + config.stale_ttl:
+                # Serve the stale copy now; one background task refreshes it
+                logger.debug(f"Cache STALE for {request.url.path}")
+                self.coalescing_stats["stale_served"] += 1
+                self._schedule_refresh(request, cache_key, config)
+                response = self._entry_to_response(cached_response, request, {
+                    "X-Cache-Status": "STALE",
+                    "X-Cache-Key": cache_key[:16] + "..."
+                })
+                return await response(scope, receive, send)
         
-        # Execute request
-        response = await call_next(request)
+        # Miss: the first request for this key computes, the rest wait for it
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.coalescing_stats["coalesced"] += 1
+            try:
+                entry = await asyncio.shield(inflight)
+            except Exception:
+                # Leader failed or was cancelled; compute independently
+                return await self.app(scope, receive, send)
+            logger.debug(f"Cache COALESCED for {request.url.path}")
+            response = self._entry_to_response(entry, request, {"X-Cache-Status": "COALESCED"})
+            return await response(scope, receive, send)
         
-        # Cache response if successful
-        if response.status_code < 400:
-            await self._cache_response(cache_key, response, config.ttl)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        self.coalescing_stats["leaders"] += 1
+        try:
+            # Execute request
+            status_code, headers, body = await self._call_downstream(scope, receive)
+            entry = self._make_entry(status_code, headers, body)
             
-            # Add cache headers
-            response.headers["X-Cache-Status"] = "MISS"
-            response.headers["X-Cache-TTL"] = str(config.ttl)
+            # Cache response if successful
+            if status_code < 400:
+                await self._store(cache_key, entry, config, self._cache_tags(request, config))
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError("cache leader cancelled"))
+            # Nobody else may be awaiting the future; mark the exception retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
         
         logger.debug(f"Cache MISS for {request.url.path}")
+        # The leader keeps its full header set (cookies etc.); waiters and
+        # cache hits only ever see the filtered copy
+        extra_headers = {"ETag": entry.etag}
+        if status_code < 400:
+            extra_headers.update({"X-Cache-Status": "MISS", "X-Cache-TTL": str(config.ttl)})
+        await self._build_response(status_code, headers, body, extra_headers)(scope, receive, send)
+    
+    @staticmethod
+    def _varies_on_authorization(config: CacheableRoute) -> bool:
+        return any(header.lower() == "authorization" for header in config.vary_headers)
+    
+    def _schedule_refresh(self, request: Request, cache_key: str, config: CacheableRoute) -> None:
+        """Start one background refresh for ``cache_key`` unless one is running"""
+        if cache_key in self._refreshing or cache_key in self._inflight:
+            return
+        
+        self._refreshing.add(cache_key)
+        self.coalescing_stats["background_refreshes"] += 1
+        scope = dict(request.scope)
+        scope["state"] = dict(scope.get("state") or {})
+        task = asyncio.create_task(self._refresh(scope, cache_key, config, self._cache_tags(request, config)))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh(self, scope: Dict[str, Any], cache_key: str, config: CacheableRoute, tags: List[str]) -> None:
+        """Re-run the downstream app for a GET outside the original request"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            entry = self._make_entry(*await self._call_downstream(scope))
+            if entry.status_code < 400:
+                await self._store(cache_key, entry, config, tags)
+            future.set_result(entry)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {scope.get('path')}: {e}")
+            future.set_exception(e)
+            future.exception()
+        finally:
+            self._inflight.pop(cache_key, None)
+            self._refreshing.discard(cache_key)
+    
+    async def _call_downstream(
+        self,
+        scope: Dict[str, Any],
+        receive: Optional[Receive] = None
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """Invoke the wrapped ASGI app directly and collect its response
+        
+        Without ``receive`` (a background refresh) the app sees an empty body.
+        """
+        if receive is None:
+            request_sent = False
+            
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                # No client behind a background refresh; block until cancelled
+                await asyncio.Event().wait()
+        
+        status_code = 500
+        headers: List[Tuple[str, str]] = []
+        chunks: List[bytes] = []
+        
+        async def send(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+        
+        await self.app(scope, receive, send)
+        return status_code, headers, b"".join(chunks)
+    
+    def _build_response(
+        self,
+        status_code: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        extra_headers: Dict[str, str]
+    ) -> Response:
+        """Fresh Response object around captured bytes (each caller gets its own)"""
+        response = Response(content=body, status_code=status_code)
+        # Replace the defaults with the captured headers, preserving duplicates
+        response.raw_headers = [
+            (k.lower().encode("latin-1"), v.encode("latin-1"))
+            for k, v in headers if k.lower() != "content-length"
+        ] + [(b"content-length", str(len(body)).encode("latin-1"))]
+        for name, value in extra_headers.items():
+            response.headers[name] = value
         return response
     
+    def _make_entry(self, status_code: int, headers: List[Tuple[str, str]], body: bytes) -> CachedResponse:
+        """Shareable cache entry: per-user/per-request headers are dropped"""
+        filtered_headers = [
+            (k, v) for k, v in headers
+            if k.lower() not in self.exclude_headers
+        ]
+        return CachedResponse.from_response(status_code, filtered_headers, body)
+    
+    def _entry_to_response(self, entry: CachedResponse, request: Request, extra_headers: Dict[str, str]) -> Response:
+        """Serve a cache entry as bytes, honouring If-None-Match and Accept-Encoding"""
+        extra_headers = {**extra_headers, "ETag": entry.etag}
+        
+        if entry.status_code == 200 and self._etag_matches(request.headers.get("if-none-match"), entry.etag):
+            response = Response(status_code=304)
+            for name, value in extra_headers.items():
+                response.headers[name] = value
+            return response
+        
+        if entry.compressed:
+            extra_headers["Vary"] = "Accept-Encoding"
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                extra_headers["Content-Encoding"] = "gzip"
+                return self._build_response(entry.status_code, entry.headers, entry.body, extra_headers)
+        return self._build_response(entry.status_code, entry.headers, entry.plain_body(), extra_headers)
+    
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+    
     async def _generate_cache_key(self, request: Request, config: CacheableRoute) -> str:
         """Generate cache key for request"""
         
@@ -235,65 +528,73 @@ class SmartCacheMiddleware(BaseHTTPMiddleware):
         
         return f"{self.cache_prefix}:request:{key_hash}"
     
-    async def _cache_response(self, cache_key: str, response: Response, ttl: int):
-        """Cache response data"""
+    def _cache_tags(self, request: Request, config: CacheableRoute) -> List[str]:
+        """Tag sets a cached response registers in: the route's invalidation
+        patterns plus entity tags taken from the query string."""
+        tags = list(config.invalidation_patterns)
+        for param, template in self.entity_tag_params.items():
+            value = request.query_params.get(param)
+            if value:
+                tags.append(template.format(value))
+        return tags
+    
+    async def _store(
+        self,
+        cache_key: str,
+        entry: CachedResponse,
+        config: CacheableRoute,
+        tags: Optional[List[str]] = None
+    ):
+        """Cache response data
+        
+        The entry lives for ``ttl + stale_ttl``; its timestamp decides whether
+        a read is fresh or stale.
+        """
         try:
-            # Extract response data
-            if hasattr(response, 'body'):
-                # For StreamingResponse and other response types
-                body = response.body
-                if isinstance(body, bytes):
-                    content = json.loads(body.decode())
-                else:
-                    content = body
-            else:
-                # For JSONResponse
-                content = getattr(response, 'content', {})
-            
-            # Filter headers
-            headers = {
-                k: v for k, v in response.headers.items()
-                if k.lower() not in self.exclude_headers
-            }
-            
-            cache_data = {
-                "content": content,
-                "status_code": response.status_code,
-                "headers": headers,
-                "cached_at": datetime.now().isoformat()
-            }
-            
-            await cache_service.set(cache_key, cache_data, ttl)
-            
+            await cache_service.set_raw(cache_key, entry.encode(), config.ttl + config.stale_ttl, tags=tags)
         except Exception as e:
             logger.warning(f"Failed to cache response for key {cache_key}: {e}")
     
-    async def _handle_cache_invalidation(self, request: Request, response: Response):
+    async def _handle_cache_invalidation(self, request: Request, response: ResponseStart):
         """Handle cache invalidation after modifying operations"""
         
         if response.status_code >= 400:
             return  # Don't invalidate on errors
         
-        # Find invalidation patterns for this route
+        # Resolve the tag sets this write affects; no keyspace scan
+        tags = []
         for route_pattern, patterns in self.cache_invalidating_routes.items():
             if self._path_matches(request.url.path, route_pattern):
-                for pattern in patterns:
-                    await cache_service.clear_pattern(f"{self.cache_prefix}:*:{pattern}:*")
-                    logger.debug(f"Invalidated cache pattern: {pattern}")
+                tags.extend(patterns)
                 break
+        
+        if request.method == "POST":
+            for path_regex, template in self.entity_invalidation_rules:
+                match = path_regex.match(request.url.path)
+                if match:
+                    tags.append(template.format(*match.groups()))
+        
+        if tags:
+            deleted = await cache_service.invalidate_tags(tags)
+            logger.debug(f"Invalidated cache tags {tags}: {deleted} entries")
     
     def _generate_slots_cache_key(self, request: Request) -> str:
-        """Specialized cache key generator for appointment slots"""
+        """Specialized cache key generator for appointment slots
+        
+        ``/slots``, ``/slots/range`` and ``/slots/next-available`` answer
+        different questions, and labels depend on the caller's timezone, so
+        the key covers the path and every query parameter (date or date
+        range, barber, service, timezone, location).
+        """
         barber_id = request.query_params.get("barber_id", "all")
-        date = request.query_params.get("date", "today")
-        location_id = request.query_params.get("location_id", "default")
+        params = hashlib.md5(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:12]
         
         # Include user context for personalized availability
         user_context = ""
         if auth_header := request.headers.get("authorization"):
             user_context = hashlib.md5(auth_header.encode()).hexdigest()[:8]
         
-        return f"{self.cache_prefix}:slots:barber:{barber_id}:date:{date}:loc:{location_id}:user:{user_context}"
+        return f"{self.cache_prefix}:slots:{request.url.path}:barber:{barber_id}:q:{params}:user:{user_context}"
     
     def _should_cache_analytics(self, request: Request) -> bool:
         """Determine if analytics request should be cached"""
@@ -309,11 +610,12 @@ class CacheControlMiddleware(BaseHTTPMiddleware):
         # Define cache control policies by route pattern
         self.cache_policies = {
             "/api/v1/health": "public, max-age=30",
-            "/api/v1/services": "public, max-age=3600",
-            "/api/v1/locations": "public, max-age=3600",
-            "/api/v1/users/me": "private, max-age=60",
-            "/api/v1/appointments/slots": "private, max-age=300",
-            "/api/v1/analytics": "private, max-age=1800",
+            "/api/v2/services": "private, max-age=3600",
+            "/api/v2/locations": "private, max-age=3600",
+            "/api/v2/users/me": "private, max-age=60",
+            "/api/v2/appointments/slots": "private, max-age=300",
+            "/api/v2/bookings/slots": "private, max-age=300",
+            "/api/v2/analytics": "private, max-age=1800",
         }
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
@@ -350,8 +652,7 @@ class CacheWarmer:
             base_url = settings.backend_url
             common_endpoints = [
                 "/api/v1/health",
-                "/api/v1/services",
-                "/api/v1/locations",
+                "/api/v2/services",
             ]
             
             async with httpx.AsyncClient() as client:
@@ -7,20 +7,21 @@ import logging
 import os
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from config import settings
+from middleware.asgi import watch_response
 
 logger = logging.getLogger(__name__)
 
-class ConfigurationSecurityMiddleware(BaseHTTPMiddleware):
+class ConfigurationSecurityMiddleware:
     """
     Middleware to validate and enforce security configuration at runtime
     """
     
-    def __init__(self, app, check_interval_minutes: int = 60):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, check_interval_minutes: int = 60):
+        self.app = app
         self.check_interval = timedelta(minutes=check_interval_minutes)
         self.last_check = datetime.now()
         self.security_issues: List[str] = []
@@ -28,9 +29,14 @@ class ConfigurationSecurityMiddleware(BaseHTTPMiddleware):
         
         # Run initial security validation
         self._validate_configuration()
+        
+        # The instance installed in the stack is the one reported on
+        configuration_reporter.set_middleware(self)
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Validate security configuration before processing requests"""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
         
         # Periodic security checks
         if datetime.now() - self.last_check > self.check_interval:
@@ -40,28 +46,28 @@ class ConfigurationSecurityMiddleware(BaseHTTPMiddleware):
         # Block requests if critical security issues exist
         if not self.configuration_valid and settings.is_production():
             logger.error("Request blocked due to critical security configuration issues")
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=503,
                 content={
                     "error": "Service unavailable due to security configuration issues",
                     "message": "Critical security configuration problems detected"
                 }
             )
+            return await response(scope, receive, send)
         
-        # Add security headers to response
-        response = await call_next(request)
-        
-        # Add configuration security headers
-        response.headers["X-Configuration-Security"] = "validated"
-        response.headers["X-Security-Check-Timestamp"] = self.last_check.isoformat()
+        send, _ = watch_response(send, self._add_headers)
+        await self.app(scope, receive, send)
+    
+    def _add_headers(self, headers: MutableHeaders, message: Message):
+        """Add configuration security headers to the response"""
+        headers["X-Configuration-Security"] = "validated"
+        headers["X-Security-Check-Timestamp"] = self.last_check.isoformat()
         
         if self.security_issues:
-            response.headers["X-Security-Issues-Count"] = str(len(self.security_issues))
+            headers["X-Security-Issues-Count"] = str(len(self.security_issues))
             if not settings.is_production():
                 # Only expose details in non-production environments
-                response.headers["X-Security-Issues"] = "; ".join(self.security_issues[:3])
-        
-        return response
+                headers["X-Security-Issues"] = "; ".join(self.security_issues[:3])
     
     def _validate_configuration(self):
         """Validate security configuration"""
@@ -3,26 +3,28 @@ Enhanced Security Middleware for BookedBarber V2
 Enhances existing middleware with production security features
 """
 
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
 import redis
 import json
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import logging
 from datetime import datetime, timedelta
 import hashlib
 import secrets
 
 from config.security_config import SecurityConfig
+from middleware.asgi import ResponseStart, error_response, read_body, watch_response
 
 logger = logging.getLogger(__name__)
 
-class EnhancedSecurityMiddleware(BaseHTTPMiddleware):
+class EnhancedSecurityMiddleware:
     """Enhanced security middleware that works with existing middleware"""
     
-    def __init__(self, app, environment: str = "production"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, environment: str = "production"):
+        self.app = app
         self.config = SecurityConfig.get_environment_specific_config(environment)
         self.security_headers = self.config["SECURITY_HEADERS"]
         self.rate_limits = self.config["RATE_LIMITS"]
@@ -37,28 +39,28 @@ class EnhancedSecurityMiddleware(BaseHTTPMiddleware):
             self.memory_store = {}
             logger.warning("Redis not available, using memory for rate limiting")
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Enhanced security checks for existing application"""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
         start_time = time.time()
+        request = Request(scope)
         
         # 1. Rate limiting check
         if not await self._check_rate_limit(request):
-            raise HTTPException(status_code=429, detail="Rate limit exceeded")
+            return await error_response(429, "Rate limit exceeded")(scope, receive, send)
         
         # 2. Security headers and validation
         if not self._validate_request_security(request):
-            raise HTTPException(status_code=400, detail="Security validation failed")
-        
-        # 3. Process request
-        response = await call_next(request)
+            return await error_response(400, "Security validation failed")(scope, receive, send)
         
-        # 4. Add security headers to response
-        self._add_security_headers(response)
+        # 3. Process request, adding security headers to the response
+        send, response = watch_response(send, self._add_security_headers)
+        await self.app(scope, receive, send)
         
-        # 5. Log security events
+        # 4. Log security events
         self._log_security_event(request, response, time.time() - start_time)
-        
-        return response
     
     async def _check_rate_limit(self, request: Request) -> bool:
         """Enhanced rate limiting for existing endpoints"""
@@ -175,16 +177,16 @@ class EnhancedSecurityMiddleware(BaseHTTPMiddleware):
         
         return True
     
-    def _add_security_headers(self, response: Response):
+    def _add_security_headers(self, headers: MutableHeaders, message: Message):
         """Add security headers to response"""
         for header, value in self.security_headers.items():
-            response.headers[header] = value
+            headers[header] = value
         
         # Remove server header for security
-        if "server" in response.headers:
-            del response.headers["server"]
+        if "server" in headers:
+            del headers["server"]
     
-    def _log_security_event(self, request: Request, response: Response, duration: float):
+    def _log_security_event(self, request: Request, response: ResponseStart, duration: float):
         """Log security-relevant events"""
         client_ip = request.client.host
         user_agent = request.headers.get("user-agent", "")
@@ -213,39 +215,44 @@ class EnhancedSecurityMiddleware(BaseHTTPMiddleware):
                 f"method={method}, status={status_code}, duration={duration:.2f}s"
             )
 
-class WebhookSecurityMiddleware(BaseHTTPMiddleware):
+class WebhookSecurityMiddleware:
     """Enhanced webhook security for existing webhook handlers"""
     
-    def __init__(self, app, webhook_secrets: Dict[str, str]):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, webhook_secrets: Dict[str, str]):
+        self.app = app
         self.webhook_secrets = webhook_secrets
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Validate webhook signatures"""
-        if "/webhooks/" in request.url.path:
-            if not await self._validate_webhook_signature(request):
-                raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        if scope["type"] == "http" and "/webhooks/" in scope["path"]:
+            valid, receive = await self._validate_webhook_signature(Request(scope), receive)
+            if not valid:
+                return await error_response(401, "Invalid webhook signature")(scope, receive, send)
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
-    async def _validate_webhook_signature(self, request: Request) -> bool:
-        """Validate webhook signature for existing webhook endpoints"""
+    async def _validate_webhook_signature(self, request: Request, receive: Receive) -> Tuple[bool, Receive]:
+        """Validate webhook signature for existing webhook endpoints
+        
+        Returns the verdict and the ``receive`` to pass on, which replays the
+        body if it had to be read.
+        """
         path = request.url.path
         
         # Stripe webhook validation (existing handler)
         if "/webhooks/stripe" in path:
-            return await self._validate_stripe_webhook(request)
+            return await self._validate_stripe_webhook(request), receive
         
         # Generic webhook validation
         signature = request.headers.get("x-signature")
         if not signature:
-            return False
+            return False, receive
         
         # Get body for signature validation
-        body = await request.body()
+        body, receive = await read_body(request.scope, receive)
         
         # Validate signature (implement based on webhook provider)
-        return self._validate_generic_signature(body, signature, path)
+        return self._validate_generic_signature(body, signature, path), receive
     
     async def _validate_stripe_webhook(self, request: Request) -> bool:
         """Validate Stripe webhook signature (enhance existing)"""
@@ -9,17 +9,18 @@ import hashlib
 from typing import Dict, Optional, List, Set
 from datetime import datetime, timedelta
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 import redis
 from collections import defaultdict
 import logging
 from config import settings
+from middleware.asgi import read_body, read_json, watch_response
 
 logger = logging.getLogger(__name__)
 
 
-class FinancialSecurityMiddleware(BaseHTTPMiddleware):
+class FinancialSecurityMiddleware:
     """
     Enhanced security middleware for financial operations
     - Velocity checks (unusual transaction patterns)
@@ -42,8 +43,8 @@ class FinancialSecurityMiddleware(BaseHTTPMiddleware):
         "/api/v1/pos/transactions",
     }
     
-    def __init__(self, app, redis_client: Optional[redis.Redis] = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, redis_client: Optional[redis.Redis] = None):
+        self.app = app
         self.redis_client = redis_client
         self.local_cache = defaultdict(list)  # Fallback if Redis not available
         
@@ -53,18 +54,25 @@ class FinancialSecurityMiddleware(BaseHTTPMiddleware):
         self.max_amount_per_hour = 10000  # $10,000
         self.suspicious_amount_threshold = 5000  # $5,000
         
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process request with financial security checks"""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
         
         # Only check financial endpoints
         if not self._is_financial_endpoint(request.url.path):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
         
         # Skip checks for admin operations
         user = getattr(request.state, "user", None)
         if user and user.role in ["admin", "super_admin"]:
             logger.info(f"Admin user {user.id} accessing financial endpoint {request.url.path}")
-            return await call_next(request)
+            return await self.app(scope, receive, send)
+        
+        # Buffer the body once so the amount checks and the endpoint both see it
+        _, receive = await read_body(scope, receive)
         
         # Perform security checks
         try:
@@ -73,12 +81,12 @@ class FinancialSecurityMiddleware(BaseHTTPMiddleware):
             
             # Check velocity limits
             if not await self._check_velocity_limits(user_id, request):
-                return self._velocity_exceeded_response()
+                return await self._velocity_exceeded_response()(scope, receive, send)
             
             # Check for suspicious patterns
             if await self._detect_suspicious_patterns(user_id, request):
                 await self._flag_suspicious_activity(user_id, request)
-                return self._suspicious_activity_response()
+                return await self._suspicious_activity_response()(scope, receive, send)
             
             # Record transaction for future checks
             await self._record_transaction(user_id, request)
@@ -88,13 +96,12 @@ class FinancialSecurityMiddleware(BaseHTTPMiddleware):
             # Don't block on errors, but log them
         
         # Process request
-        response = await call_next(request)
+        send, response = watch_response(send)
+        await self.app(scope, receive, send)
         
         # Additional checks on response
         if response.status_code in [200, 201]:
             await self._post_transaction_checks(user_id, request, response)
-        
-        return response
     
     def _is_financial_endpoint(self, path: str) -> bool:
         """Check if endpoint handles financial operations"""
@@ -264,13 +271,10 @@ class FinancialSecurityMiddleware(BaseHTTPMiddleware):
         pass
     
     async def _get_request_body(self, request: Request) -> Optional[Dict]:
-        """Safely get request body"""
+        """Safely get the JSON body buffered in ``__call__``, decoded at most once per request"""
         try:
-            body = await request.body()
-            if body:
-                # Store body for later use in request
-                request._body = body
-                return json.loads(body)
+            body, _ = await read_json(request.scope, request.receive)
+            return body
         except Exception:
             pass
         return None
@@ -10,8 +10,8 @@ import logging
 from typing import Optional, Dict, Set
 from datetime import datetime, timedelta
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from sqlalchemy.orm import Session
 import jwt
 from jwt import InvalidTokenError
@@ -24,8 +24,13 @@ from services.mfa_service import MFAService
 
 logger = logging.getLogger(__name__)
 
+# MFA sessions keyed by "user_id:token", shared by every middleware instance
+# so sessions created through app.state.mfa_middleware are seen by the
+# instance installed in the stack
+_mfa_sessions: Dict[str, Dict] = {}
 
-class MFAEnforcementMiddleware(BaseHTTPMiddleware):
+
+class MFAEnforcementMiddleware:
     """
     Middleware to enforce MFA verification for sensitive admin operations.
     
@@ -86,30 +91,35 @@ class MFAEnforcementMiddleware(BaseHTTPMiddleware):
         "/api/v1/database/",
     }
     
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # MFA session duration (minutes)
         self.mfa_session_duration = getattr(settings, 'MFA_SESSION_DURATION', 30)
         # Cache for MFA session validation
-        self.mfa_sessions: Dict[str, Dict] = {}
+        self.mfa_sessions: Dict[str, Dict] = _mfa_sessions
         
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process request with MFA enforcement"""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
         
         # Check if this endpoint requires MFA
         if not self._requires_mfa(request):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
             
         # Extract user from request
         user = await self._get_user_from_request(request)
         if not user:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
             
         # Check if user is admin
         if user.role not in ["admin", "super_admin"]:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
             
         # Get database session
+        rejection = None
         db = SessionLocal()
         try:
             # Check if user has MFA enabled
@@ -117,10 +127,10 @@ class MFAEnforcementMiddleware(BaseHTTPMiddleware):
             
             if not mfa_status["enabled"]:
                 # MFA not enabled - require setup
-                return self._mfa_setup_required_response()
+                rejection = self._mfa_setup_required_response()
                 
             # Check if user has valid MFA session
-            if not await self._has_valid_mfa_session(user.id, request):
+            elif not await self._has_valid_mfa_session(user.id, request):
                 # Log MFA verification required
                 self._log_mfa_event(
                     user_id=user.id,
@@ -130,20 +140,21 @@ class MFAEnforcementMiddleware(BaseHTTPMiddleware):
                     ip_address=self._get_client_ip(request),
                     db=db
                 )
-                return self._mfa_verification_required_response()
+                rejection = self._mfa_verification_required_response()
                 
-            # MFA verified - update session activity
-            await self._update_mfa_session_activity(user.id)
-            
-            # Log successful MFA-protected access
-            self._log_mfa_event(
-                user_id=user.id,
-                event_type="mfa_protected_access",
-                event_status="success",
-                endpoint=str(request.url.path),
-                ip_address=self._get_client_ip(request),
-                db=db
-            )
+            else:
+                # MFA verified - update session activity
+                await self._update_mfa_session_activity(user.id)
+                
+                # Log successful MFA-protected access
+                self._log_mfa_event(
+                    user_id=user.id,
+                    event_type="mfa_protected_access",
+                    event_status="success",
+                    endpoint=str(request.url.path),
+                    ip_address=self._get_client_ip(request),
+                    db=db
+                )
             
         except Exception as e:
             logger.error(f"MFA enforcement error: {str(e)}")
@@ -151,8 +162,11 @@ class MFAEnforcementMiddleware(BaseHTTPMiddleware):
         finally:
             db.close()
             
+        if rejection is not None:
+            return await rejection(scope, receive, send)
+            
         # Process request
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
     def _requires_mfa(self, request: Request) -> bool:
         """Check if the requested endpoint requires MFA"""
@@ -7,9 +7,11 @@ from typing import Optional, List, Set
 from fastapi import HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
 from functools import wraps
 from models import User
+from middleware.asgi import error_response
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,7 @@ class MultiTenancyMiddleware:
     Ensures users can only access data from their assigned location(s)
     """
     
-    def __init__(self, app):
+    def __init__(self, app: ASGIApp):
         self.app = app
     
     # Endpoints that don't require location validation
@@ -54,37 +56,35 @@ class MultiTenancyMiddleware:
         "/api/v1/locations/delete",
     }
     
-    async def __call__(self, scope, receive, send):
-        """ASGI interface for middleware"""
-        from starlette.middleware.base import BaseHTTPMiddleware
-        middleware = BaseHTTPMiddleware(self.app, self.dispatch)
-        return await middleware(scope, receive, send)
-    
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process request and enforce location-based access"""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
         
         # Skip validation for exempt paths
         if self._is_exempt_path(request.url.path):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
         
         # Extract user from request (set by auth middleware)
         user = getattr(request.state, "user", None)
         if not user:
             # Let auth middleware handle unauthenticated requests
-            return await call_next(request)
+            return await self.app(scope, receive, send)
         
         # Super admins can access all locations
         if user.role == "super_admin":
             request.state.allowed_locations = "all"
-            return await call_next(request)
+            return await self.app(scope, receive, send)
         
         # Admin paths require admin role
         if self._is_admin_path(request.url.path) and user.role not in ["admin", "super_admin"]:
-            raise LocationAccessError("Admin access required")
+            return await self._deny("Admin access required", scope, receive, send)
         
         # Regular users must have location_id
         if not user.location_id and user.role not in ["admin", "super_admin"]:
-            raise LocationAccessError("User not assigned to any location")
+            return await self._deny("User not assigned to any location", scope, receive, send)
         
         # Set allowed locations on request state
         request.state.allowed_locations = self._get_allowed_locations(user)
@@ -95,8 +95,12 @@ class MultiTenancyMiddleware:
             f"with allowed locations: {request.state.allowed_locations}"
         )
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
+    
+    async def _deny(self, detail: str, scope: Scope, receive: Receive, send: Send):
+        """Answer with the same 403 that LocationAccessError produces in a route"""
+        error = LocationAccessError(detail)
+        await error_response(error.status_code, error.detail)(scope, receive, send)
     
     def _is_exempt_path(self, path: str) -> bool:
         """Check if path is exempt from location validation"""
@@ -1,51 +1,128 @@
 """
 Request validation middleware to enforce size limits and validate JSON depth.
+
+JSON bodies are decoded here once (``middleware.asgi.read_json``) with the
+depth check applied before decoding.  The decoded body is kept in the scope;
+routes reuse it through ``install_parsed_body_routes`` instead of decoding the
+bytes again for their body models.  Other bodies (uploads, webhooks) are
+streamed through untouched, with the size limit counted as they arrive.
 """
 
-from fastapi import Request, HTTPException, status
+from typing import Callable
+
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-import json
-from utils.input_validation import validate_json_depth, ValidationError
+from fastapi.routing import APIRoute, request_response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.input_validation import ValidationError
+from middleware.asgi import BODY_SCOPE_KEY, JSON_SCOPE_KEY, read_json
+
 
-class RequestValidationMiddleware(BaseHTTPMiddleware):
+def is_json_content_type(content_type: str) -> bool:
+    """application/json or a +json media type, parameters ignored"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+class RequestValidationMiddleware:
     """Middleware to validate incoming requests."""
     
-    def __init__(self, app, max_body_size: int = 10 * 1024 * 1024):  # 10MB default
-        super().__init__(app)
+    # Bodies verified against a signature by their handler are passed through raw
+    RAW_BODY_PATH_MARKERS = ("/webhooks/",)
+    
+    def __init__(self, app: ASGIApp, max_body_size: int = 10 * 1024 * 1024):  # 10MB default
+        self.app = app
         self.max_body_size = max_body_size
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        request = Request(scope)
+        
         # Check content length
         content_length = request.headers.get('content-length')
         if content_length and int(content_length) > self.max_body_size:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 content={"error": "Request body too large"}
             )
+            return await response(scope, receive, send)
         
-        # For JSON requests, validate depth
-        if request.headers.get('content-type') == 'application/json':
+        # For JSON requests, decode once and validate depth
+        if (
+            is_json_content_type(request.headers.get('content-type', ''))
+            and not any(marker in scope["path"] for marker in self.RAW_BODY_PATH_MARKERS)
+        ):
             try:
-                # Read body
-                body = await request.body()
-                if body:
-                    # Parse JSON and validate depth
-                    data = json.loads(body)
-                    validate_json_depth(data)
-                    
-                    # Store the parsed data for use in endpoint
-                    request.state.json_data = data
-            except json.JSONDecodeError:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content={"error": "Invalid JSON"}
-                )
+                data, receive = await read_json(scope, receive)
             except ValidationError as e:
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     content={"error": str(e)}
                 )
+                return await response(scope, receive, send)
+            except ValueError:
+                response = JSONResponse(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    content={"error": "Invalid JSON"}
+                )
+                return await response(scope, receive, send)
+            
+            if data is not None:
+                # Store the parsed data for use in endpoint
+                request.state.json_data = data
+        elif BODY_SCOPE_KEY not in scope:
+            # Chunked uploads carry no content-length; count while streaming
+            receive = self._limit_body(receive)
+        
+        await self.app(scope, receive, send)
+    
+    def _limit_body(self, receive: Receive) -> Receive:
+        """Wrap ``receive`` to fail with 413 once the body passes the size limit"""
+        received = 0
+        
+        async def limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Request body too large"
+                    )
+            return message
         
-        response = await call_next(request)
-        return response
+        return limited
+
+
+def reuse_parsed_body(handler: Callable) -> Callable:
+    """Wrap a route handler to take the body already read by the middleware
+    
+    FastAPI reads ``request.body()``/``request.json()`` for body parameters;
+    both check for cached attributes before touching the stream.
+    """
+    async def handler_with_parsed_body(request: Request):
+        scope = request.scope
+        if BODY_SCOPE_KEY in scope:
+            request._body = scope[BODY_SCOPE_KEY]
+            if JSON_SCOPE_KEY in scope:
+                request._json = scope[JSON_SCOPE_KEY]
+        return await handler(request)
+    
+    return handler_with_parsed_body
+
+
+def install_parsed_body_routes(app: FastAPI) -> int:
+    """Rebuild every API route's handler with ``reuse_parsed_body``
+    
+    Call once after all routers are included.  Returns the number of routes
+    updated.
+    """
+    installed = 0
+    for route in app.router.routes:
+        if isinstance(route, APIRoute):
+            route.app = request_response(reuse_parsed_body(route.get_route_handler()))
+            installed += 1
+    return installed
@@ -17,27 +17,28 @@ from typing import List, Dict, Any
 from fastapi import Request, Response, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from datetime import datetime
 import ipaddress
 import hashlib
 
+from middleware.asgi import watch_response
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Adds comprehensive security headers following OWASP guidelines
     """
     
-    def __init__(self, app):
-        super().__init__(app)
-        
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         
         # Enhanced Security Headers (OWASP + Production hardening)
-        security_headers = {
+        self.security_headers = {
             # XSS Protection
             "X-XSS-Protection": "1; mode=block",
             "X-Content-Type-Options": "nosniff",
@@ -141,18 +142,24 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "X-API-Version": "v2.0"
         }
         
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        send, _ = watch_response(send, self._apply_headers)
+        await self.app(scope, receive, send)
+    
+    def _apply_headers(self, headers: MutableHeaders, message: Message):
         # Apply security headers
-        for header, value in security_headers.items():
-            response.headers[header] = value
+        for header, value in self.security_headers.items():
+            headers[header] = value
         
         # Remove server information
-        if "server" in response.headers:
-            del response.headers["server"]
+        if "server" in headers:
+            del headers["server"]
         
         # Add security timestamp
-        response.headers["X-Security-Scan"] = datetime.utcnow().isoformat()
-        
-        return response
+        headers["X-Security-Scan"] = datetime.utcnow().isoformat()
 
 class InputSanitizationMiddleware(BaseHTTPMiddleware):
     """
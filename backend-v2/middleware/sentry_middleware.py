@@ -17,18 +17,18 @@ from typing import Dict, Any, Optional, Callable
 from urllib.parse import urlparse
 
 import sentry_sdk
-from fastapi import Request, Response
+from fastapi import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 from jose import jwt, JWTError
 
 from config.sentry import add_user_context, add_business_context
+from middleware.asgi import ResponseStart, watch_response
 
 logger = logging.getLogger(__name__)
 
 
-class SentryEnhancementMiddleware(BaseHTTPMiddleware):
+class SentryEnhancementMiddleware:
     """
     Middleware to enhance Sentry error reporting with request context and user information.
     
@@ -41,7 +41,7 @@ class SentryEnhancementMiddleware(BaseHTTPMiddleware):
     """
     
     def __init__(self, app: ASGIApp, secret_key: Optional[str] = None):
-        super().__init__(app)
+        self.app = app
         self.secret_key = secret_key
         
         # Define endpoints that should have enhanced monitoring
@@ -60,22 +60,25 @@ class SentryEnhancementMiddleware(BaseHTTPMiddleware):
             '/api/v1/webhooks'
         }
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and enhance Sentry context."""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
         
         start_time = time.time()
+        request = Request(scope)
         
         # Set up Sentry scope for this request
-        with sentry_sdk.push_scope() as scope:
+        with sentry_sdk.push_scope() as sentry_scope:
             try:
                 # Add request context
-                self._add_request_context(request, scope)
+                self._add_request_context(request, sentry_scope)
                 
                 # Extract and add user context
-                await self._add_user_context(request, scope)
+                await self._add_user_context(request, sentry_scope)
                 
                 # Add business context from request
-                self._add_business_context_from_request(request, scope)
+                self._add_business_context_from_request(request, sentry_scope)
                 
                 # Add custom breadcrumb
                 sentry_sdk.add_breadcrumb(
@@ -91,26 +94,25 @@ class SentryEnhancementMiddleware(BaseHTTPMiddleware):
                 )
                 
                 # Process the request
-                response = await call_next(request)
+                send, response = watch_response(send)
+                await self.app(scope, receive, send)
                 
                 # Calculate request duration
                 duration = time.time() - start_time
                 
                 # Add performance measurements
-                self._add_performance_measurements(request, response, duration, scope)
+                self._add_performance_measurements(request, response, duration, sentry_scope)
                 
                 # Monitor critical endpoints
                 if self._is_critical_endpoint(request.url.path):
                     self._monitor_critical_endpoint(request, response, duration)
                 
-                return response
-                
             except Exception as e:
                 # Calculate duration for error cases
                 duration = time.time() - start_time
                 
                 # Capture enhanced error context
-                self._capture_request_error(request, e, duration, scope)
+                self._capture_request_error(request, e, duration, sentry_scope)
                 
                 # Re-raise the exception to be handled by FastAPI
                 raise
@@ -235,7 +237,7 @@ class SentryEnhancementMiddleware(BaseHTTPMiddleware):
                 integration_type=integration_type
             )
     
-    def _add_performance_measurements(self, request: Request, response: Response, 
+    def _add_performance_measurements(self, request: Request, response: ResponseStart, 
                                     duration: float, scope) -> None:
         """Add performance measurements to Sentry."""
         
@@ -277,7 +279,7 @@ class SentryEnhancementMiddleware(BaseHTTPMiddleware):
             data=performance_context
         )
     
-    def _monitor_critical_endpoint(self, request: Request, response: Response, duration: float) -> None:
+    def _monitor_critical_endpoint(self, request: Request, response: ResponseStart, duration: float) -> None:
         """Monitor critical endpoints for performance and errors."""
         
         endpoint = request.url.path
@@ -282,7 +282,7 @@ class BarberProfile(Base):
     __tablename__ = "barber_profiles"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
     
     # Profile Information
     bio = Column(Text, nullable=True)  # Detailed biography/description
@@ -393,6 +393,16 @@ class Appointment(Base):
     payment = relationship("Payment", back_populates="appointment", uselist=False)
     recurring_pattern = relationship("RecurringAppointmentPattern", backref="appointments")
     recurring_series = relationship("RecurringAppointmentSeries", back_populates="appointments")
+    
+    __table_args__ = (
+        # Conflict detection (services/conflict_queries.py) reads id, start_time and
+        # duration_minutes for one barber's half-open start_time range
+        Index(
+            'idx_appointments_conflict_covering',
+            'barber_id', 'start_time', 'status', 'duration_minutes',
+            postgresql_include=['id']
+        ),
+    )
 
 class Payment(Base):
     __tablename__ = "payments"
@@ -617,6 +627,29 @@ class Client(Base):
         return f"{self.first_name} {self.last_name}".strip()
 
 
+class BarberClientRetention(Base):
+    """Per barber/client visit summary maintained as appointments complete.
+
+    Retention dashboards aggregate this table instead of scanning appointments.
+    Rows are written by services/retention_summary_service.py.
+    """
+    __tablename__ = "barber_client_retention"
+
+    id = Column(Integer, primary_key=True, index=True)
+    barber_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    first_visit_at = Column(DateTime, nullable=False)
+    last_visit_at = Column(DateTime, nullable=False)
+    visit_count = Column(Integer, default=0, nullable=False)
+    total_spent = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (
+        Index('idx_barber_client_retention_pair', 'barber_id', 'client_id', unique=True),
+        Index('idx_barber_client_retention_last_visit', 'barber_id', 'last_visit_at'),
+    )
+
+
 class Refund(Base):
     __tablename__ = "refunds"
     
@@ -1106,12 +1139,40 @@ class NotificationQueue(Base):
     attempts = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
     notification_metadata = Column(JSON, nullable=True)  # Additional data
+    # Dispatch lease: a worker owns the row until it expires, then it can be reclaimed
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=utcnow)
     updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     # Relationships
     user = relationship("User", backref="notifications")
     appointment = relationship("Appointment", backref="notifications")
+    
+    __table_args__ = (
+        Index('idx_notification_queue_due', 'status', 'scheduled_for'),
+    )
+
+
+class AppointmentReminder(Base):
+    """Materialized reminder send times; the worker claims rows once they fall due"""
+    __tablename__ = "appointment_reminders"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
+    hours_before = Column(Integer, nullable=False)
+    due_at = Column(DateTime, nullable=False)  # Appointment start minus hours_before (UTC)
+    status = Column(String(20), default="pending")  # pending, queued, cancelled
+    queued_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=utcnow)
+    
+    # Relationships
+    appointment = relationship("Appointment", backref="reminders")
+    
+    __table_args__ = (
+        Index('idx_appointment_reminders_due', 'status', 'due_at'),
+        Index('idx_appointment_reminders_slot', 'appointment_id', 'hours_before', 'due_at', unique=True),
+    )
 
 
 # SMS Conversation Models for Direct Customer Communication
@@ -1540,6 +1601,7 @@ class BlackoutDate(Base):
     __table_args__ = (
         Index('idx_blackout_date_location', 'blackout_date', 'location_id'),
         Index('idx_blackout_date_barber', 'blackout_date', 'barber_id'),
+        Index('idx_blackout_dates_barber_date', 'barber_id', 'blackout_date', 'end_date'),
     )
 
 
@@ -25,6 +25,7 @@ PasswordResetToken = models_file.PasswordResetToken
 Payout = models_file.Payout
 GiftCertificate = models_file.GiftCertificate
 Client = models_file.Client
+BarberClientRetention = models_file.BarberClientRetention
 Refund = models_file.Refund
 BookingSettings = models_file.BookingSettings
 ServiceCategoryEnum = models_file.ServiceCategoryEnum
@@ -37,6 +38,7 @@ NotificationTemplate = models_file.NotificationTemplate
 NotificationPreference = models_file.NotificationPreference
 NotificationStatus = models_file.NotificationStatus
 NotificationQueue = models_file.NotificationQueue
+AppointmentReminder = models_file.AppointmentReminder
 SMSConversation = models_file.SMSConversation
 SMSMessage = models_file.SMSMessage
 SMSMessageDirection = models_file.SMSMessageDirection
@@ -129,10 +131,10 @@ from .guest_booking import (
 __all__ = [
     # Main models from parent models.py
     'UnifiedUserRole', 'User', 'Appointment', 'Payment', 'Service', 'BarberAvailability', 'BarberProfile',
-    'PasswordResetToken', 'Payout', 'GiftCertificate', 'Client', 'Refund',
+    'PasswordResetToken', 'Payout', 'GiftCertificate', 'Client', 'BarberClientRetention', 'Refund',
     'BookingSettings', 'ServiceCategoryEnum', 'ServicePricingRule', 'ServiceBookingRule',
     'ServiceTemplate', 'ServiceTemplateCategory', 'UserServiceTemplate',
-    'NotificationTemplate', 'NotificationPreference', 'NotificationStatus', 'NotificationQueue',
+    'NotificationTemplate', 'NotificationPreference', 'NotificationStatus', 'NotificationQueue', 'AppointmentReminder',
     'SMSConversation', 'SMSMessage', 'SMSMessageDirection', 'SMSMessageStatus',
     'BarberTimeOff', 'BarberSpecialAvailability', 'RecurringAppointmentPattern', 'BookingRule',
     'WebhookEndpoint', 'WebhookLog', 'WebhookAuthType', 'WebhookEventType', 'WebhookStatus',
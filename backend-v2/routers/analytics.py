@@ -299,6 +299,30 @@ async def get_client_retention_analytics(
     analytics_service = AnalyticsService(db)
     return analytics_service.get_client_retention_metrics(target_user_id, date_range)
 
+@router.get("/barber-retention")
+async def get_barber_retention_summary(
+    user_id: Optional[int] = Query(None, description="Barber user ID to summarize (admin only)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Get a barber's client retention buckets from the per-barber summary table
+    """
+    checker = PermissionChecker(current_user, db)
+    
+    if not checker.has_permission(Permission.VIEW_BASIC_ANALYTICS):
+        raise HTTPException(status_code=403, detail="You don't have permission to view analytics")
+    
+    # If trying to view another barber's data, need system admin permission
+    if user_id and user_id != current_user.id:
+        if not checker.has_permission(Permission.SYSTEM_ADMIN):
+            raise HTTPException(status_code=403, detail="You don't have permission to view other users' analytics")
+    
+    target_user_id = user_id if user_id else current_user.id
+    
+    analytics_service = AnalyticsService(db)
+    return analytics_service.get_barber_retention_summary(target_user_id)
+
 @router.get("/client-lifetime-value")
 async def get_client_lifetime_value_analytics(
     user_id: Optional[int] = Query(None, description="User ID to filter analytics (admin only)"),
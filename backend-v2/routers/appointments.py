@@ -140,6 +140,44 @@ def get_available_appointment_slots(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/slots/range", response_model=schemas.SlotsRangeResponse)
+@booking_slots_rate_limit
+def get_available_appointment_slots_range(
+    request: Request,
+    start_date: date = Query(..., description="First date of the range (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last date of the range, inclusive (YYYY-MM-DD)"),
+    barber_id: Optional[int] = Query(None, description="Specific barber ID to filter availability"),
+    timezone: Optional[str] = Query(None, description="User's timezone (e.g., 'America/New_York'). If not provided, uses business timezone."),
+    current_user: Optional[schemas.User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """Get available time slots for every day in a date range, plus the earliest open slot."""
+    # Determine timezone to use
+    user_timezone = timezone
+    if not user_timezone and current_user:
+        user_timezone = current_user.timezone
+    
+    settings = booking_service.get_booking_settings(db)
+    
+    if start_date < date.today():
+        raise HTTPException(status_code=400, detail="Cannot check slots for past dates")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - date.today()).days > settings.max_advance_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot schedule appointments more than {settings.max_advance_days} days in advance"
+        )
+    
+    try:
+        return booking_service.get_available_slots_range(
+            db, start_date, end_date, barber_id=barber_id, user_timezone=user_timezone
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/", response_model=schemas.AppointmentResponse)
 @booking_create_rate_limit  # RE-ENABLED AFTER FIXING RATE LIMITING TIMEOUT
 def create_appointment(
@@ -598,7 +636,10 @@ def update_appointment_settings(
 ):
     """Update appointment booking settings (admin only)."""
     require_admin_role(current_user)
-    settings = booking_service.update_booking_settings(db, updates)
+    try:
+        settings = booking_service.update_booking_settings(db, updates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return settings
 
 @router.put("/{appointment_id}/cancel", response_model=schemas.AppointmentResponse)
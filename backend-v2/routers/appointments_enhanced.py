@@ -22,6 +22,7 @@ from schemas_new.booking_validation import (
 )
 from validators.booking_validators import BookingValidator
 from services.booking_service import BookingService
+from services.retention_summary_service import record_appointment_completion
 from utils.logging_config import setup_logger
 
 router = APIRouter(prefix="/api/v1/appointments", tags=["appointments-enhanced"])
@@ -245,7 +246,10 @@ async def update_appointment_with_validation(
             appointment.notes = update_data.notes
         
         if update_data.status:
+            completing = update_data.status == "completed" and appointment.status != "completed"
             appointment.status = update_data.status
+            if completing:
+                record_appointment_completion(db, appointment)
         
         # Increment version for optimistic locking
         appointment.version += 1
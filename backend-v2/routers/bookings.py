@@ -526,32 +526,10 @@ def update_booking_settings(
 ):
     """Update booking settings. Requires admin role."""
     try:
-        # Get current settings
-        settings = booking_service.get_booking_settings(db)
-        
-        # Update only provided fields
-        update_data = settings_update.dict(exclude_unset=True)
-        
-        for field, value in update_data.items():
-            if field in ["same_day_cutoff_time", "business_start_time", "business_end_time"] and value:
-                # Convert time strings to time objects
-                try:
-                    hour, minute = map(int, value.split(":"))
-                    time_obj = time(hour, minute)
-                    setattr(settings, field, time_obj)
-                except (ValueError, AttributeError):
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Invalid time format for {field}. Use HH:MM format."
-                    )
-            else:
-                setattr(settings, field, value)
-        
-        # Update timestamp
-        settings.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(settings)
+        # Update only provided fields and refresh the shared snapshot
+        settings = booking_service.update_booking_settings(
+            db, settings_update.dict(exclude_unset=True)
+        )
         
         # Convert back to response format
         settings_dict = {
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from datetime import date, datetime
 import base64
 import logging
+import os
 from pydantic import BaseModel, Field
 
 from database import get_db
 from utils.auth import get_current_user, require_admin_role
 from services.export_service import export_service
+from services.export_job_service import export_job_manager, parse_byte_range
 import models
 
 # Configure logging
@@ -68,8 +70,32 @@ class ExportProgress(BaseModel):
     completed_at: Optional[datetime] = None
     download_url: Optional[str] = Field(None, description="URL to download completed export")
 
-# In-memory progress tracking (in production, use Redis or database)
-export_progress: Dict[str, ExportProgress] = {}
+class ExportJobRequest(BaseModel):
+    """Request for a background export job"""
+    data_type: str = Field(..., description="What to export: clients, appointments, analytics")
+    format: str = Field(default="excel", description="File format: excel, csv, ndjson (analytics: excel)")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Client or appointment filter criteria")
+    include_pii: bool = Field(default=False, description="Include PII (clients, super admins only)")
+    include_details: bool = Field(default=True, description="Include detailed information (appointments)")
+    include_charts: bool = Field(default=True, description="Include charts (analytics)")
+
+class ExportJobResponse(ExportProgress):
+    """Background export job status"""
+    deduplicated: bool = Field(default=False, description="An identical export was reused")
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+def _iter_file_range(path: str, start: int, end: int):
+    """Yield bytes start..end (inclusive) of a file"""
+    with open(path, "rb") as artifact:
+        artifact.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = artifact.read(min(DOWNLOAD_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
 @router.get("/clients", response_model=ExportResponse)
 async def export_clients(
@@ -231,6 +257,111 @@ async def export_appointments(
         logger.error(f"Appointment export failed for user {current_user.id}: {e}")
         raise HTTPException(status_code=500, detail="Export failed. Please try again later.")
 
+@router.get("/clients/stream")
+async def stream_clients_export(
+    format: str = Query("csv", description="Streaming format: csv, ndjson"),
+    compress: bool = Query(False, description="Gzip the file while streaming"),
+    include_pii: bool = Query(False, description="Include personally identifiable information"),
+    date_from: Optional[date] = Query(None, description="Filter from date"),
+    date_to: Optional[date] = Query(None, description="Filter to date"),
+    customer_type: Optional[str] = Query(None, description="Filter by customer type"),
+    preferred_barber_id: Optional[int] = Query(None, description="Filter by preferred barber"),
+    tags: Optional[str] = Query(None, description="Filter by tags (contains)"),
+    min_visits: Optional[int] = Query(None, description="Minimum number of visits"),
+    min_spent: Optional[float] = Query(None, description="Minimum amount spent"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Stream client data as a file download
+    
+    Rows are paged from the database and written as they are read, so there is
+    no record limit and memory use does not grow with the export size.
+    """
+    if current_user.role not in ["barber", "admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions to export client data")
+    
+    if include_pii and current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Insufficient permissions to export PII data")
+    
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'customer_type': customer_type,
+        'preferred_barber_id': preferred_barber_id,
+        'tags': tags,
+        'min_visits': min_visits,
+        'min_spent': min_spent
+    }
+    
+    try:
+        chunks = export_service.stream_clients(
+            format=format,
+            filters=filters,
+            include_pii=include_pii,
+            compress=compress
+        )
+        filename, media_type = export_service.stream_file_info('clients', format, compress)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Streaming client export for user {current_user.id}: format={format}, compress={compress}")
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/appointments/stream")
+async def stream_appointments_export(
+    format: str = Query("csv", description="Streaming format: csv, ndjson"),
+    compress: bool = Query(False, description="Gzip the file while streaming"),
+    include_details: bool = Query(True, description="Include detailed information"),
+    date_from: Optional[date] = Query(None, description="Filter from date"),
+    date_to: Optional[date] = Query(None, description="Filter to date"),
+    status: Optional[List[str]] = Query(None, description="Filter by status"),
+    barber_id: Optional[int] = Query(None, description="Filter by barber"),
+    service_name: Optional[str] = Query(None, description="Filter by service"),
+    min_price: Optional[float] = Query(None, description="Minimum price"),
+    max_price: Optional[float] = Query(None, description="Maximum price"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Stream appointment data as a file download
+    
+    Regular users can only export their own appointments.
+    """
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'status': status,
+        'barber_id': barber_id,
+        'service_name': service_name,
+        'min_price': min_price,
+        'max_price': max_price
+    }
+    if current_user.role not in ["barber", "admin", "super_admin"]:
+        filters['user_id'] = current_user.id
+    
+    try:
+        chunks = export_service.stream_appointments(
+            format=format,
+            filters=filters,
+            include_details=include_details,
+            compress=compress
+        )
+        filename, media_type = export_service.stream_file_info('appointments', format, compress)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Streaming appointment export for user {current_user.id}: format={format}, compress={compress}")
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @router.get("/analytics", response_model=ExportResponse)
 async def export_analytics(
     format: str = Query("excel", description="Export format: excel, json, pdf"),
@@ -356,42 +487,103 @@ async def custom_export(
         logger.error(f"Custom export failed for user {current_user.id}: {e}")
         raise HTTPException(status_code=500, detail="Export failed. Please try again later.")
 
+@router.post("/jobs", response_model=ExportJobResponse, status_code=202)
+async def create_export_job(
+    job_request: ExportJobRequest,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Start a background export job
+    
+    The file is built outside the request; poll /progress/{export_id} and
+    fetch the result from /download/{export_id}.  Identical requests reuse the
+    running or completed job instead of building the file again.
+    """
+    data_type = job_request.data_type
+    staff = current_user.role in ["barber", "admin", "super_admin"]
+    
+    if data_type in ("clients", "analytics") and not staff:
+        raise HTTPException(status_code=403, detail=f"Insufficient permissions to export {data_type}")
+    if job_request.include_pii and current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Insufficient permissions to export PII data")
+    
+    try:
+        if data_type == "clients":
+            filters = ClientExportFilters(**job_request.filters).dict(exclude_none=True)
+            options = {"filters": filters, "include_pii": job_request.include_pii}
+        elif data_type == "appointments":
+            filters = AppointmentExportFilters(**job_request.filters).dict(exclude_none=True)
+            if not staff:
+                # Regular users can only export their own appointments
+                filters["user_id"] = current_user.id
+            options = {"filters": filters, "include_details": job_request.include_details}
+        elif data_type == "analytics":
+            filters = ExportFilters(**job_request.filters)
+            date_range = None
+            if filters.date_from and filters.date_to:
+                date_range = {"start_date": filters.date_from, "end_date": filters.date_to}
+            options = {"date_range": date_range, "include_charts": job_request.include_charts}
+        else:
+            raise ValueError(f"Unsupported export type: {data_type}")
+        
+        job, deduplicated = export_job_manager.submit(data_type, job_request.format, options, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(
+        f"Export job {job.id} for user {current_user.id}: {data_type}/{job_request.format}"
+        f"{' (deduplicated)' if deduplicated else ''}"
+    )
+    
+    return ExportJobResponse(**job.to_progress(), deduplicated=deduplicated)
+
 @router.get("/download/{export_id}")
 async def download_export(
     export_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user: models.User = Depends(get_current_user)
 ):
     """
     Download a completed export file
     
-    Used for large exports that are processed asynchronously.
+    Used for large exports that are processed asynchronously.  Supports
+    single-range ``Range`` requests so interrupted downloads can resume.
     """
+    job = export_job_manager.get(export_id)
+    if job is None or not export_job_manager.can_access(job, current_user):
+        raise HTTPException(status_code=404, detail="Export not found")
+    
+    if job.status != "completed":
+        raise HTTPException(status_code=400, detail=f"Export not ready. Status: {job.status}")
+    
+    if not job.path or not os.path.exists(job.path):
+        raise HTTPException(status_code=404, detail="Export file not available")
+    
+    size = os.path.getsize(job.path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename={job.filename}"
+    }
+    
     try:
-        # Check if export exists and belongs to user
-        if export_id not in export_progress:
-            raise HTTPException(status_code=404, detail="Export not found")
-        
-        progress = export_progress[export_id]
-        
-        # For now, we don't have user ownership tracking in progress
-        # In production, you'd check if the export belongs to the current user
-        
-        if progress.status != "completed":
-            raise HTTPException(status_code=400, detail=f"Export not ready. Status: {progress.status}")
-        
-        if not progress.download_url:
-            raise HTTPException(status_code=404, detail="Export file not available")
-        
-        # In a real implementation, you'd fetch the file from storage
-        # For now, return the progress info
-        return progress
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Download failed for export {export_id}: {e}")
-        raise HTTPException(status_code=500, detail="Download failed")
+        byte_range = parse_byte_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    return StreamingResponse(
+        _iter_file_range(job.path, start, end),
+        status_code=status_code,
+        media_type=job.mime_type,
+        headers=headers
+    )
 
 @router.get("/progress/{export_id}", response_model=ExportProgress)
 async def get_export_progress(
@@ -403,10 +595,11 @@ async def get_export_progress(
     
     Used to check the status of long-running exports.
     """
-    if export_id not in export_progress:
+    job = export_job_manager.get(export_id)
+    if job is None or not export_job_manager.can_access(job, current_user):
         raise HTTPException(status_code=404, detail="Export not found")
     
-    return export_progress[export_id]
+    return ExportProgress(**job.to_progress())
 
 @router.get("/formats")
 async def get_supported_formats(
@@ -465,13 +658,10 @@ async def clear_export_cache(
     Admin-only endpoint for maintenance.
     """
     try:
-        # Clear in-memory progress tracking
-        global export_progress
-        export_progress.clear()
-        
-        # In production, you'd also clear file storage, database records, etc.
+        # Forget export jobs and delete their artifacts
+        removed = export_job_manager.clear()
         
-        logger.info(f"Export cache cleared by admin user {current_user.id}")
+        logger.info(f"Export cache cleared by admin user {current_user.id}: {removed} files removed")
         
         return {"message": "Export cache cleared successfully"}
         
@@ -12,6 +12,8 @@ from datetime import datetime
 
 from database import get_db, engine
 from services.redis_service import cache_service
+from services.booking_settings_cache import booking_settings_cache
+from services.principal_cache import principal_cache
 from config import settings
 
 # Import pool monitor if available
@@ -165,6 +167,18 @@ async def detailed_health_check(db: Session = Depends(get_db)):
             "message": "Connection pool monitoring not configured"
         }
     
+    # Shared booking settings snapshot
+    health_status["checks"]["booking_settings_cache"] = {
+        "status": "healthy",
+        **booking_settings_cache.get_stats()
+    }
+    
+    # Authenticated principal cache (hit_rate is the share of requests without a user query)
+    health_status["checks"]["principal_cache"] = {
+        "status": "healthy",
+        **principal_cache.get_stats()
+    }
+    
     return health_status
 
 @router.get("/redis", response_model=Dict[str, Any])
@@ -7,6 +7,7 @@ import json
 import csv
 import io
 import uuid
+import tempfile
 from enum import Enum
 
 import schemas
@@ -36,6 +37,16 @@ class ImportSourceType(str, Enum):
 # In-memory store for import jobs (in production, use Redis or database)
 import_jobs: Dict[str, Dict[str, Any]] = {}
 
+# Uploads are copied in chunks to a temp file that spills to disk past this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_SPOOL_MAX_MEMORY = 5 * 1024 * 1024
+
+
+def _read_upload(upload) -> str:
+    """Decode a spooled upload in full, for validation and previews"""
+    upload.seek(0)
+    return upload.read().decode('utf-8-sig')
+
 @router.post("/upload", response_model=schemas.ImportUploadResponse)
 async def upload_import_file(
     file: UploadFile = File(...),
@@ -77,8 +88,11 @@ async def upload_import_file(
     import_id = str(uuid.uuid4())
     
     try:
-        # Read file content
-        content = await file.read()
+        # Spool the upload in chunks; it outlives the request for the import job
+        upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            upload.write(chunk)
+        upload.seek(0)
         
         # Validate import type
         valid_import_types = ["clients", "appointments", "services", "barbers", "payments"]
@@ -106,14 +120,14 @@ async def upload_import_file(
             "warnings": [],
             "uploaded_at": datetime.utcnow().isoformat(),
             "uploaded_by": current_user.id,
-            "file_content": content.decode('utf-8') if file_extension in [".csv", ".json"] else None
+            "file": upload if file_extension in [".csv", ".json"] else None
         }
         
         # Start background processing for initial validation
         background_tasks.add_task(
             validate_import_file,
             import_id,
-            content,
+            upload,
             source_type,
             import_type,
             file_extension
@@ -186,7 +200,8 @@ async def get_import_status(
 async def preview_import_data(
     import_id: str,
     preview_request: schemas.ImportPreviewRequest,
-    current_user: models.User = Depends(require_admin_role)
+    current_user: models.User = Depends(require_admin_role),
+    db: Session = Depends(get_db)
 ):
     """
     Preview the data that will be imported before executing the import.
@@ -211,9 +226,9 @@ async def preview_import_data(
     
     try:
         # Parse file content based on source type and format
-        file_content = job.get("file_content")
-        if not file_content:
+        if not job.get("file"):
             raise HTTPException(status_code=400, detail="File content not available for preview")
+        file_content = _read_upload(job["file"])
         
         import_service = ImportService()
         preview_data = import_service.generate_preview(
@@ -221,7 +236,8 @@ async def preview_import_data(
             source_type=job["source_type"],
             import_type=job["import_type"],
             field_mapping=preview_request.field_mapping,
-            max_records=preview_request.max_preview_records
+            max_records=preview_request.max_preview_records,
+            db=db
         )
         
         # Update job status
@@ -428,7 +444,7 @@ async def get_import_history(
 
 async def validate_import_file(
     import_id: str,
-    content: bytes,
+    upload: Any,
     source_type: str,
     import_type: str,
     file_extension: str
@@ -439,7 +455,7 @@ async def validate_import_file(
         
         # Decode content
         if file_extension in [".csv", ".json"]:
-            file_content = content.decode('utf-8')
+            file_content = _read_upload(upload)
         else:
             # For Excel files, would need additional processing
             import_jobs[import_id]["status"] = "validation_failed"
@@ -480,9 +496,10 @@ async def execute_import_job(
         job = import_jobs[import_id]
         import_service = ImportService()
         
-        # Execute import with progress tracking
+        # Execute import with progress tracking, reading the spooled upload batch by batch
         result = import_service.execute_import(
-            content=job["file_content"],
+            content=None,
+            file=job["file"],
             source_type=job["source_type"],
             import_type=job["import_type"],
             field_mapping=execution_request.field_mapping,
@@ -513,6 +530,11 @@ async def execute_import_job(
         import_jobs[import_id]["status"] = "failed"
         import_jobs[import_id]["errors"].append(f"Import execution error: {str(e)}")
         import_jobs[import_id]["completed_at"] = datetime.utcnow().isoformat()
+    finally:
+        # The spooled upload is only needed until the import has run
+        upload = import_jobs.get(import_id, {}).pop("file", None)
+        if upload is not None:
+            upload.close()
 
 
 async def execute_rollback_job(
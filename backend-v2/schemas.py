@@ -405,6 +405,19 @@ class SlotsResponse(BaseModel):
     business_hours: BusinessHours = Field(..., description="Business operating hours")
     slot_duration_minutes: int = Field(..., description="Duration of each booking slot in minutes", example=30)
 
+class DaySlots(BaseModel):
+    date: str = Field(..., description="Date in YYYY-MM-DD format")
+    slots: List[TimeSlotEnhanced] = Field(..., description="Time slots for the date")
+
+class SlotsRangeResponse(BaseModel):
+    start_date: str = Field(..., description="First date of the range in YYYY-MM-DD format")
+    end_date: str = Field(..., description="Last date of the range in YYYY-MM-DD format")
+    barber_id: Optional[int] = Field(None, description="Barber the slots were computed for, if any")
+    days: List[DaySlots] = Field(..., description="Slot grid for each day in the range")
+    next_available: Optional[NextAvailableSlot] = Field(None, description="Earliest available slot in the range")
+    business_hours: BusinessHours = Field(..., description="Business operating hours")
+    slot_duration_minutes: int = Field(..., description="Duration of each booking slot in minutes", example=30)
+
 class BookingSettingsResponse(BaseModel):
     id: int = Field(..., description="Unique identifier for booking settings")
     business_id: int = Field(..., description="Business identifier")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Materialize reminders for upcoming appointments that have none.
+
+Reminders are materialized by Session listeners (and by the import service
+for bulk-inserted appointments), so this only needs to run once, for
+appointments booked before reminders were materialized.
+
+Usage:
+    python scripts/backfill_appointment_reminders.py
+    python scripts/backfill_appointment_reminders.py --days 8 --batch-size 1000
+"""
+
+import argparse
+import logging
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import SessionLocal  # noqa: E402
+from services.reminder_scheduler import reminder_scheduler  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill reminders for upcoming appointments")
+    parser.add_argument("--days", type=int, default=None, help="Only appointments starting within this many days")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    horizon = timedelta(days=args.days) if args.days is not None else None
+    db = SessionLocal()
+    try:
+        materialized = reminder_scheduler.backfill(db, horizon=horizon, batch_size=args.batch_size)
+        db.commit()
+        logger.info(f"Materialized {materialized} appointment reminders")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ import logging
 
 from models import User, Appointment, Payment, Client, Service, BarberAvailability
 from schemas import DateRange
+from services.retention_summary_service import get_barber_retention_summary
 from utils.cache_decorators import cache_result, cache_analytics, cache_user_data, invalidate_user_cache
 
 logger = logging.getLogger(__name__)
@@ -208,53 +209,62 @@ class AnalyticsService:
         Returns:
             Dictionary containing client retention metrics
         """
-        # Get all clients with their appointment history
-        query = self.db.query(Client).join(Appointment, Client.id == Appointment.client_id)
+        # Clients seen in scope; the appointment filters only select clients,
+        # the buckets below come from the client rows themselves
+        client_ids = self.db.query(Appointment.client_id).filter(Appointment.client_id.isnot(None))
         
         if user_id:
-            query = query.filter(Appointment.user_id == user_id)
-        
-        clients = query.distinct().all()
+            client_ids = client_ids.filter(Appointment.user_id == user_id)
         
-        # Calculate retention metrics
-        total_clients = len(clients)
-        active_clients = 0
-        new_clients = 0
-        returning_clients = 0
-        at_risk_clients = 0
-        lost_clients = 0
+        if date_range:
+            client_ids = client_ids.filter(
+                Appointment.start_time >= date_range.start_date,
+                Appointment.start_time <= date_range.end_date
+            )
         
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         sixty_days_ago = datetime.utcnow() - timedelta(days=60)
-        ninety_days_ago = datetime.utcnow() - timedelta(days=90)
         
-        for client in clients:
-            if client.last_visit_date:
-                if client.last_visit_date >= thirty_days_ago:
-                    active_clients += 1
-                elif client.last_visit_date >= sixty_days_ago:
-                    at_risk_clients += 1
-                else:
-                    lost_clients += 1
-                    
-            if client.total_visits == 1:
-                new_clients += 1
-            elif client.total_visits > 1:
-                returning_clients += 1
+        def bucket(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+        
+        # One aggregation pass over the matching clients
+        row = self.db.query(
+            func.count(Client.id).label("total_clients"),
+            bucket(Client.last_visit_date >= thirty_days_ago).label("active_clients"),
+            bucket(and_(
+                Client.last_visit_date < thirty_days_ago,
+                Client.last_visit_date >= sixty_days_ago
+            )).label("at_risk_clients"),
+            bucket(Client.last_visit_date < sixty_days_ago).label("lost_clients"),
+            bucket(Client.total_visits == 1).label("new_clients"),
+            bucket(Client.total_visits > 1).label("returning_clients"),
+            func.coalesce(func.sum(Client.total_spent), 0).label("total_revenue"),
+            bucket(Client.customer_type == 'vip').label("vip"),
+            bucket(Client.customer_type == 'returning').label("regular"),
+            bucket(Client.customer_type == 'new').label("new"),
+            bucket(Client.customer_type == 'at_risk').label("at_risk")
+        ).filter(Client.id.in_(client_ids.distinct())).one()
+        
+        total_clients = row.total_clients or 0
+        active_clients = int(row.active_clients)
+        new_clients = int(row.new_clients)
+        returning_clients = int(row.returning_clients)
+        at_risk_clients = int(row.at_risk_clients)
+        lost_clients = int(row.lost_clients)
         
         # Calculate retention rate
         retention_rate = (returning_clients / total_clients * 100) if total_clients > 0 else 0
         
         # Calculate average customer lifetime value
-        total_revenue = sum(client.total_spent or 0 for client in clients)
-        avg_lifetime_value = total_revenue / total_clients if total_clients > 0 else 0
+        avg_lifetime_value = float(row.total_revenue) / total_clients if total_clients > 0 else 0
         
         # Client segmentation
         client_segments = {
-            "vip": sum(1 for c in clients if c.customer_type == 'vip'),
-            "regular": sum(1 for c in clients if c.customer_type == 'returning'),
-            "new": sum(1 for c in clients if c.customer_type == 'new'),
-            "at_risk": sum(1 for c in clients if c.customer_type == 'at_risk')
+            "vip": int(row.vip),
+            "regular": int(row.regular),
+            "new": int(row.new),
+            "at_risk": int(row.at_risk)
         }
         
         return {
@@ -275,6 +285,32 @@ class AnalyticsService:
                 "lost_percentage": (lost_clients / total_clients * 100) if total_clients > 0 else 0
             }
         }
+    
+    def get_barber_retention_summary(self, barber_id: int) -> Dict[str, Any]:
+        """
+        Get retention buckets for one barber from the incremental summary table
+        
+        Args:
+            barber_id: Barber user ID
+            
+        Returns:
+            Dictionary containing the barber's client retention metrics
+        """
+        summary = get_barber_retention_summary(self.db, barber_ids=[barber_id]).get(barber_id)
+        if summary is None:
+            # No completed visits yet
+            summary = {
+                "total_clients": 0,
+                "active_clients": 0,
+                "at_risk_clients": 0,
+                "lost_clients": 0,
+                "new_clients": 0,
+                "returning_clients": 0,
+                "total_visits": 0,
+                "retention_rate": 0,
+                "average_lifetime_value": 0
+            }
+        return {"barber_id": barber_id, "summary": summary}
 
     @cache_analytics(ttl=900)  # Cache for 15 minutes
     def calculate_six_figure_barber_metrics(
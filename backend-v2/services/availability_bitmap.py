@@ -0,0 +1,546 @@
+"""
+Per-barber, per-day occupancy bitmaps for availability reads.
+
+Each barber-day is stored as a small bitmap with one bit per
+``QUANTUM_MINUTES`` slice of the business-local day (bit 0 starts at local
+midnight; 25 hours are covered so DST days fit).  A set bit means the barber
+is busy: an appointment (including its buffers), partial-day time off or a
+special "unavailable" block overlaps that slice.
+
+Bitmaps live in Redis when it is reachable and in a local in-process store
+otherwise.  Unlike the TTL response caches they are kept current by the
+writes themselves: Session listeners (bottom of this module) collect every
+flushed Appointment, BarberTimeOff and BarberSpecialAvailability change and
+apply it once the transaction commits.  A newly booked appointment sets its
+bits in place (``record_appointment``); edits, cancellations, deletions and
+time-off or special-availability changes can free time, so their old and new
+barber-days are dropped and rebuilt on the next read.  That covers every
+writer - bookings, cancellations, payments, guest and recurring bookings,
+imports, SMS replies - without each one having to remember the store.  The
+same listener invalidates the ``slots`` and ``barber:<id>`` cache tags that
+SmartCacheMiddleware registers slot responses under.
+
+A missing bitmap is built from the database on first read.  Bitmaps that
+are built concurrently with a write, or touched by bulk query updates that
+bypass the ORM, can miss that write, so stored bitmaps expire after a few
+minutes; ``create_booking`` still performs the authoritative conflict check
+against the database.
+
+Slot boundaries must be multiples of the quantum for bitmap reads to be
+exact; appointment edges are rounded outwards (never freeing busy time).
+"""
+
+import logging
+import threading
+import time as time_module
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pytz
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from services import slot_engine
+from services.booking_settings_cache import booking_settings_cache
+from services.redis_cache import cache_service
+
+logger = logging.getLogger(__name__)
+
+QUANTUM_MINUTES = 5
+DAY_QUANTA = 25 * 60 // QUANTUM_MINUTES  # 25 hours so DST fall-back days fit
+BITMAP_BYTES = (DAY_QUANTA + 7) // 8
+KEY_PREFIX = "availability:bitmap"
+
+# Redis bitmaps are invalidated on commit, so the TTL only bounds writes
+# that slip past the listeners; the local stand-in is per-process and cannot
+# see other workers' writes.
+REDIS_TTL_SECONDS = 10 * 60
+LOCAL_TTL_SECONDS = 60
+
+# Set bits atomically, but only on bitmaps that already exist - a missing
+# bitmap is rebuilt from the database on the next read anyway.
+_SET_BITS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+return 1
+"""
+
+
+def bitmap_key(barber_id: int, day: date) -> str:
+    return f"{KEY_PREFIX}:{barber_id}:{day.isoformat()}"
+
+
+def empty_bitmap() -> bytearray:
+    return bytearray(BITMAP_BYTES)
+
+
+def set_bits(bitmap: bytearray, start_bit: int, end_bit: int) -> None:
+    """Set bits ``[start_bit, end_bit)`` (Redis SETBIT order: MSB first)."""
+    for bit in range(max(start_bit, 0), min(end_bit, DAY_QUANTA)):
+        bitmap[bit >> 3] |= 0x80 >> (bit & 7)
+
+
+def bitmap_to_intervals(bitmap: bytes) -> List[Tuple[int, int]]:
+    """Runs of set bits as ``(start_minute, end_minute)`` offsets from local midnight."""
+    intervals = []
+    run_start = None
+
+    for bit in range(DAY_QUANTA):
+        byte_index = bit >> 3
+        is_set = byte_index < len(bitmap) and bitmap[byte_index] & (0x80 >> (bit & 7))
+        if is_set and run_start is None:
+            run_start = bit
+        elif not is_set and run_start is not None:
+            intervals.append((run_start * QUANTUM_MINUTES, bit * QUANTUM_MINUTES))
+            run_start = None
+
+    if run_start is not None:
+        intervals.append((run_start * QUANTUM_MINUTES, DAY_QUANTA * QUANTUM_MINUTES))
+
+    return intervals
+
+
+def appointment_bit_ranges(
+    appointment: Any,
+    business_tz: pytz.BaseTzInfo
+) -> Dict[date, Tuple[int, int]]:
+    """Bit range touched by an appointment (with buffers) on each local day it spans."""
+    if appointment.start_time is None:
+        return {}
+
+    start = appointment.start_time
+    if start.tzinfo is None:
+        start = pytz.UTC.localize(start)
+    busy_start = start - timedelta(minutes=appointment.buffer_time_before or 0)
+    busy_end = start + timedelta(
+        minutes=(appointment.duration_minutes or 0) + (appointment.buffer_time_after or 0)
+    )
+    if busy_end <= busy_start:
+        return {}
+
+    ranges = {}
+    day = busy_start.astimezone(business_tz).date()
+    last_day = busy_end.astimezone(business_tz).date()
+    while day <= last_day:
+        anchor_utc = slot_engine.day_anchor(day, business_tz)
+        start_minute = slot_engine.minute_offset(busy_start, anchor_utc)
+        end_minute = slot_engine.minute_offset(busy_end, anchor_utc, round_up=True)
+        start_bit = max(start_minute // QUANTUM_MINUTES, 0)
+        end_bit = min(-(-end_minute // QUANTUM_MINUTES), DAY_QUANTA)
+        if end_bit > start_bit:
+            ranges[day] = (start_bit, end_bit)
+        day += timedelta(days=1)
+
+    return ranges
+
+
+class LocalBitmapBackend:
+    """In-process stand-in for Redis, used when Redis is unavailable."""
+
+    def __init__(self, ttl_seconds: int = LOCAL_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[bytearray, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        now = time_module.monotonic()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and entry[1] > now:
+                    results.append(bytes(entry[0]))
+                else:
+                    self._entries.pop(key, None)
+                    results.append(None)
+        return results
+
+    def set_many(self, mapping: Dict[str, bytes]) -> None:
+        expires_at = time_module.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (bytearray(value), expires_at)
+
+    def set_bits(self, key: str, start_bit: int, end_bit: int) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry[1] <= time_module.monotonic():
+                return False
+            set_bits(entry[0], start_bit, end_bit)
+            return True
+
+    def delete(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBitmapBackend:
+    """Bitmap storage in Redis: MGET for reads, a Lua SETBIT loop for writes."""
+
+    def __init__(self, client, ttl_seconds: int = REDIS_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return list(self.client.mget(keys))
+
+    def set_many(self, mapping: Dict[str, bytes]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, bytes(value), ex=self.ttl_seconds)
+        pipe.execute()
+
+    def set_bits(self, key: str, start_bit: int, end_bit: int) -> bool:
+        bits = list(range(max(start_bit, 0), min(end_bit, DAY_QUANTA)))
+        if not bits:
+            return False
+        return bool(self.client.eval(_SET_BITS_SCRIPT, 1, key, *bits))
+
+    def delete(self, keys: List[str]) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+
+class AvailabilityBitmapStore:
+    """Reads and maintains barber-day occupancy bitmaps."""
+
+    def __init__(self, backend: Optional[Any] = None):
+        self._backend_override = backend
+        self._local = LocalBitmapBackend()
+        self.stats = {"hits": 0, "misses": 0, "rebuilds": 0, "bit_updates": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.availability_bitmap_enabled
+
+    def _backend(self):
+        if self._backend_override is not None:
+            return self._backend_override
+        try:
+            from services.redis_service import get_redis_client
+            client = get_redis_client()
+            if client is not None:
+                return RedisBitmapBackend(client)
+        except Exception as e:
+            logger.debug(f"Redis unavailable for availability bitmaps: {e}")
+        return self._local
+
+    # Reads
+
+    def get_busy_intervals(
+        self,
+        db: Session,
+        barber_ids: List[int],
+        target_date: date,
+        business_tz: pytz.BaseTzInfo,
+        anchor_utc: datetime
+    ) -> Dict[int, slot_engine.BusyIntervals]:
+        """Busy intervals per barber for one day: one multi-get, plus a single
+        bulk rebuild query for any barbers whose bitmap is missing."""
+        if not barber_ids:
+            return {}
+
+        keys = [bitmap_key(barber_id, target_date) for barber_id in barber_ids]
+        bitmaps: Dict[int, Optional[bytes]] = {}
+        backend = self._backend()
+        try:
+            bitmaps = dict(zip(barber_ids, backend.get_many(keys)))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to read availability bitmaps: {e}")
+
+        missing = [barber_id for barber_id in barber_ids if bitmaps.get(barber_id) is None]
+        self.stats["hits"] += len(barber_ids) - len(missing)
+        self.stats["misses"] += len(missing)
+        if missing:
+            rebuilt = self._build(db, missing, [target_date], business_tz)
+            bitmaps.update({barber_id: rebuilt[(barber_id, target_date)] for barber_id in missing})
+            self._store(backend, {
+                bitmap_key(barber_id, target_date): rebuilt[(barber_id, target_date)]
+                for barber_id in missing
+            })
+
+        # Bitmap offsets are relative to local midnight of ``target_date``
+        shift = slot_engine.minute_offset(slot_engine.day_anchor(target_date, business_tz), anchor_utc)
+        return {
+            barber_id: slot_engine.BusyIntervals(
+                anchor_utc,
+                [(start + shift, end + shift) for start, end in bitmap_to_intervals(bitmaps[barber_id])]
+            )
+            for barber_id in barber_ids
+        }
+
+    # Writes
+
+    def record_appointment(self, appointment: Any, business_timezone: str) -> None:
+        """Mark a newly booked appointment busy in any bitmaps that already exist."""
+        if not self.enabled or not appointment.barber_id or appointment.status == "cancelled":
+            return
+
+        backend = self._backend()
+        business_tz = pytz.timezone(business_timezone)
+        try:
+            for day, (start_bit, end_bit) in appointment_bit_ranges(appointment, business_tz).items():
+                if backend.set_bits(bitmap_key(appointment.barber_id, day), start_bit, end_bit):
+                    self.stats["bit_updates"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to update availability bitmap for barber {appointment.barber_id}: {e}")
+            self.invalidate(appointment.barber_id, appointment_bit_ranges(appointment, business_tz).keys())
+
+    def invalidate(self, barber_id: int, days: Iterable[date]) -> None:
+        """Drop bitmaps so the next read rebuilds them."""
+        keys = [bitmap_key(barber_id, day) for day in days]
+        if not keys:
+            return
+        self._local.delete(keys)
+        try:
+            self._backend().delete(keys)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to invalidate availability bitmaps {keys}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0.0,
+            "quantum_minutes": QUANTUM_MINUTES
+        }
+
+    # Internals
+
+    def _store(self, backend, mapping: Dict[str, bytes]) -> None:
+        if not mapping:
+            return
+        try:
+            backend.set_many(mapping)
+            self.stats["rebuilds"] += len(mapping)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to store availability bitmaps: {e}")
+
+    def _build(
+        self,
+        db: Session,
+        barber_ids: List[int],
+        days: List[date],
+        business_tz: pytz.BaseTzInfo
+    ) -> Dict[Tuple[int, date], bytearray]:
+        """Build bitmaps for every (barber, day) pair with one query per table."""
+        bitmaps = {(barber_id, day): empty_bitmap() for barber_id in barber_ids for day in days}
+
+        window_start = (slot_engine.day_anchor(min(days), business_tz) - timedelta(days=1)).replace(tzinfo=None)
+        window_end = (slot_engine.day_anchor(max(days), business_tz) + timedelta(days=2)).replace(tzinfo=None)
+        appointments = db.query(models.Appointment).filter(
+            models.Appointment.barber_id.in_(barber_ids),
+            models.Appointment.start_time >= window_start,
+            models.Appointment.start_time < window_end,
+            models.Appointment.status != "cancelled"
+        ).all()
+
+        for appointment in appointments:
+            for day, (start_bit, end_bit) in appointment_bit_ranges(appointment, business_tz).items():
+                bitmap = bitmaps.get((appointment.barber_id, day))
+                if bitmap is not None:
+                    set_bits(bitmap, start_bit, end_bit)
+
+        # Partial-day time off and "unavailable" overrides also block time
+        time_off = db.query(models.BarberTimeOff).filter(
+            models.BarberTimeOff.barber_id.in_(barber_ids),
+            models.BarberTimeOff.status == "approved",
+            models.BarberTimeOff.start_date <= max(days),
+            models.BarberTimeOff.end_date >= min(days),
+            models.BarberTimeOff.start_time.isnot(None),
+            models.BarberTimeOff.end_time.isnot(None)
+        ).all()
+        special = db.query(models.BarberSpecialAvailability).filter(
+            models.BarberSpecialAvailability.barber_id.in_(barber_ids),
+            models.BarberSpecialAvailability.date >= min(days),
+            models.BarberSpecialAvailability.date <= max(days),
+            models.BarberSpecialAvailability.availability_type == "unavailable"
+        ).all()
+
+        blocks = [
+            (entry.barber_id, day, entry.start_time, entry.end_time)
+            for entry in time_off
+            for day in days
+            if entry.start_date <= day <= entry.end_date
+        ]
+        blocks.extend((entry.barber_id, entry.date, entry.start_time, entry.end_time) for entry in special)
+
+        for barber_id, day, start_time, end_time in blocks:
+            bitmap = bitmaps.get((barber_id, day))
+            if bitmap is None:
+                continue
+            anchor_utc = slot_engine.day_anchor(day, business_tz)
+            start_minute = slot_engine.local_offset(day, start_time, business_tz, anchor_utc)
+            end_minute = slot_engine.local_offset(day, end_time, business_tz, anchor_utc)
+            set_bits(bitmap, start_minute // QUANTUM_MINUTES, -(-end_minute // QUANTUM_MINUTES))
+
+        return bitmaps
+
+
+# Global store instance
+availability_bitmap_store = AvailabilityBitmapStore()
+
+
+# Session listeners: collect what each flush touches, apply it once the
+# transaction commits
+
+_PENDING_KEY = "availability_bitmap.pending"
+_BOOKED_KEY = "availability_bitmap.booked"
+
+TRACKED_FIELDS = {
+    models.Appointment: (
+        "barber_id", "start_time", "duration_minutes", "buffer_time_before", "buffer_time_after", "status"
+    ),
+    models.BarberTimeOff: ("barber_id", "start_date", "end_date", "start_time", "end_time", "status"),
+    models.BarberSpecialAvailability: ("barber_id", "date", "start_time", "end_time", "availability_type"),
+}
+
+
+def _versions(instance: Any, fields: Tuple[str, ...], deleted: bool) -> List[Dict[str, Any]]:
+    """Tracked values before and after the flush; empty if none changed."""
+    state = inspect(instance)
+    if deleted:
+        # Still in the database before the flush, so expired values can load
+        return [{name: getattr(instance, name) for name in fields}]
+    histories = {name: state.attrs[name].history for name in fields}
+    if state.has_identity and not any(history.has_changes() for history in histories.values()):
+        return []
+    after = {name: state.dict.get(name) for name in fields}
+    before = {
+        name: history.deleted[0] if history.deleted else after[name]
+        for name, history in histories.items()
+    }
+    return [before, after] if before != after else [after]
+
+
+def _date_range(first: date, last: date) -> List[date]:
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+def _appointment_days(values: Dict[str, Any]) -> List[date]:
+    """Local days an appointment may occupy.
+
+    Start times are stored in UTC and the business timezone is not at hand
+    during a flush, so one day either side is included; a UTC offset never
+    moves a time by more than a day.
+    """
+    start = values["start_time"]
+    if start is None:
+        return []
+    busy_start = start - timedelta(minutes=values["buffer_time_before"] or 0)
+    busy_end = start + timedelta(minutes=(values["duration_minutes"] or 0) + (values["buffer_time_after"] or 0))
+    return _date_range(busy_start.date() - timedelta(days=1), busy_end.date() + timedelta(days=1))
+
+
+def _touched_days(instance: Any, deleted: bool = False) -> Set[Tuple[int, date]]:
+    fields = TRACKED_FIELDS.get(type(instance))
+    if fields is None:
+        return set()
+    touched = set()
+    for values in _versions(instance, fields, deleted):
+        if isinstance(instance, models.Appointment):
+            days = _appointment_days(values)
+        elif isinstance(instance, models.BarberTimeOff):
+            days = _date_range(values["start_date"], values["end_date"]) if values["start_date"] and values["end_date"] else []
+        else:
+            days = [values["date"]] if values["date"] else []
+        if values["barber_id"]:
+            touched.update((values["barber_id"], day) for day in days)
+    return touched
+
+
+def _keep_previous_value(target, value, oldvalue, initiator) -> None:
+    """No-op; registering it with ``active_history`` makes SQLAlchemy load
+    the old value of an expired attribute before it is overwritten."""
+
+
+# Old values are only needed to drop the bitmaps a change moves away from,
+# so the extra loads are skipped entirely when bitmaps are turned off
+if settings.availability_bitmap_enabled:
+    for _model, _fields in TRACKED_FIELDS.items():
+        for _name in _fields:
+            event.listen(getattr(_model, _name), "set", _keep_previous_value, active_history=True)
+
+
+def _business_timezone() -> Optional[str]:
+    """Business timezone of the loaded settings snapshot, if any; a commit
+    listener cannot query for it."""
+    snapshot = booking_settings_cache.snapshot
+    return snapshot.business_timezone if snapshot is not None else None
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_occupancy_changes(session: Session, flush_context, instances) -> None:
+    barber_days = set()
+    booked = []
+    for instance in session.new:
+        if isinstance(instance, models.Appointment):
+            # Copied now: instances are expired by the time the commit lands
+            booked.append(SimpleNamespace(**{
+                name: getattr(instance, name) for name in TRACKED_FIELDS[models.Appointment]
+            }))
+        else:
+            barber_days.update(_touched_days(instance))
+    for instance in session.dirty:
+        barber_days.update(_touched_days(instance))
+    for instance in session.deleted:
+        barber_days.update(_touched_days(instance, deleted=True))
+    if barber_days:
+        session.info.setdefault(_PENDING_KEY, set()).update(barber_days)
+    if booked:
+        session.info.setdefault(_BOOKED_KEY, []).extend(booked)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_occupancy_changes(session: Session) -> None:
+    barber_days = session.info.pop(_PENDING_KEY, None) or set()
+    booked = [
+        appointment for appointment in session.info.pop(_BOOKED_KEY, None) or []
+        if appointment.barber_id and appointment.start_time
+    ]
+    if not barber_days and not booked:
+        return
+
+    if availability_bitmap_store.enabled:
+        business_timezone = _business_timezone()
+        for appointment in booked:
+            if business_timezone:
+                availability_bitmap_store.record_appointment(appointment, business_timezone)
+            else:
+                barber_days.update((appointment.barber_id, day) for day in _appointment_days(vars(appointment)))
+        # After the inserts: a booking edited again in the same transaction
+        # is dropped along with the days it was moved away from
+        days_by_barber: Dict[int, Set[date]] = {}
+        for barber_id, day in barber_days:
+            days_by_barber.setdefault(barber_id, set()).add(day)
+        for barber_id, days in days_by_barber.items():
+            availability_bitmap_store.invalidate(barber_id, sorted(days))
+
+    barber_ids = {barber_id for barber_id, _ in barber_days} | {appointment.barber_id for appointment in booked}
+
+    # Slot responses cached by SmartCacheMiddleware are registered under
+    # these tags; whole-shop, range and next-available entries only under
+    # ``slots``
+    cache_service.invalidate_tags_sync(["slots", *(f"barber:{barber_id}" for barber_id in sorted(barber_ids))])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_occupancy_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BOOKED_KEY, None)
@@ -217,6 +217,85 @@ def get_barber_special_availability(
     return query.order_by(models.BarberSpecialAvailability.date, models.BarberSpecialAvailability.start_time).all()
 
 
+def get_schedule_window(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    window_start: datetime,
+    window_end: datetime,
+    barber_ids: Optional[List[int]] = None,
+    include_appointments: bool = True
+) -> Dict[str, Dict[int, List[Any]]]:
+    """Bulk-load everything needed to compute availability over a date window.
+    
+    Runs one query per table (weekly availability, approved time off, special
+    availability, appointments) for all requested barbers - or every barber
+    when ``barber_ids`` is None - and groups the rows by barber in memory.
+    
+    ``window_start``/``window_end`` bound the appointment query and are naive
+    UTC datetimes, matching how appointment start times are stored.
+    Appointments without a barber are grouped under ``None``.  Pass
+    ``include_appointments=False`` when occupancy comes from elsewhere (the
+    availability bitmap store) to skip the appointment query.
+    """
+    def _filter_barbers(query, column):
+        if barber_ids is not None:
+            query = query.filter(column.in_(barber_ids))
+        return query
+    
+    availability = _filter_barbers(
+        db.query(models.BarberAvailability).filter(
+            models.BarberAvailability.is_active == True
+        ),
+        models.BarberAvailability.barber_id
+    ).order_by(models.BarberAvailability.start_time).all()
+    
+    time_off = _filter_barbers(
+        db.query(models.BarberTimeOff).filter(
+            models.BarberTimeOff.status == "approved",
+            models.BarberTimeOff.start_date <= end_date,
+            models.BarberTimeOff.end_date >= start_date
+        ),
+        models.BarberTimeOff.barber_id
+    ).all()
+    
+    special = _filter_barbers(
+        db.query(models.BarberSpecialAvailability).filter(
+            models.BarberSpecialAvailability.date >= start_date,
+            models.BarberSpecialAvailability.date <= end_date
+        ),
+        models.BarberSpecialAvailability.barber_id
+    ).order_by(models.BarberSpecialAvailability.start_time).all()
+    
+    appointments = []
+    if include_appointments:
+        appointments = _filter_barbers(
+            db.query(models.Appointment).filter(
+                models.Appointment.start_time >= window_start,
+                models.Appointment.start_time < window_end,
+                models.Appointment.status != "cancelled"
+            ),
+            models.Appointment.barber_id
+        ).all()
+    
+    grouped: Dict[str, Dict[int, List[Any]]] = {
+        "availability": {},
+        "time_off": {},
+        "special": {},
+        "appointments": {}
+    }
+    for key, rows in (
+        ("availability", availability),
+        ("time_off", time_off),
+        ("special", special),
+        ("appointments", appointments)
+    ):
+        for row in rows:
+            grouped[key].setdefault(row.barber_id, []).append(row)
+    
+    return grouped
+
+
 def is_barber_available(
     db: Session,
     barber_id: int,
@@ -342,6 +421,71 @@ def is_barber_available(
     return _check_availability()
 
 
+def get_active_barbers(db: Session, service_id: Optional[int] = None) -> List[models.User]:
+    """Get every active barber, optionally only those offering ``service_id``"""
+    barber_query = db.query(models.User).filter(
+        models.User.role.in_(["barber", "admin"]),
+        models.User.is_active == True
+    )
+    
+    # If service_id is provided, filter barbers who offer this service
+    if service_id:
+        barber_query = barber_query.join(models.barber_services).filter(
+            models.barber_services.c.service_id == service_id,
+            models.barber_services.c.is_available == True
+        )
+    
+    return barber_query.order_by(models.User.id).all()
+
+
+def _is_available_in_schedule(
+    barber_id: int,
+    schedule: Dict[str, Dict[int, List[Any]]],
+    check_date: date,
+    start_time: time,
+    end_time: time
+) -> bool:
+    """In-memory equivalent of ``is_barber_available`` over bulk-loaded rows"""
+    day_of_week = check_date.weekday()
+    
+    has_regular_availability = any(
+        av.day_of_week == day_of_week and av.start_time <= start_time and av.end_time >= end_time
+        for av in schedule["availability"].get(barber_id, [])
+    )
+    if not has_regular_availability:
+        return False
+    
+    for time_off in schedule["time_off"].get(barber_id, []):
+        if not (time_off.start_date <= check_date <= time_off.end_date):
+            continue
+        if time_off.start_time is None or time_off.end_time is None:
+            # Full day time off
+            return False
+        if not (end_time <= time_off.start_time or start_time >= time_off.end_time):
+            return False
+    
+    for special in schedule["special"].get(barber_id, []):
+        if (
+            special.date == check_date
+            and special.start_time <= start_time
+            and special.end_time >= end_time
+            and special.availability_type == "unavailable"
+        ):
+            return False
+    
+    check_start_datetime = datetime.combine(check_date, start_time)
+    check_end_datetime = datetime.combine(check_date, end_time)
+    for appointment in schedule["appointments"].get(barber_id, []):
+        if appointment.status not in ("scheduled", "confirmed", "pending"):
+            continue
+        appointment_start = appointment.start_time.replace(tzinfo=None)
+        appointment_end = appointment_start + timedelta(minutes=appointment.duration_minutes or 0)
+        if appointment_start < check_end_datetime and appointment_end > check_start_datetime:
+            return False
+    
+    return True
+
+
 def get_available_barbers_for_slot(
     db: Session,
     check_date: date,
@@ -349,39 +493,34 @@ def get_available_barbers_for_slot(
     end_time: time,
     service_id: Optional[int] = None
 ) -> List[models.User]:
-    """Get all barbers available for a specific time slot - OPTIMIZED"""
+    """Get all barbers available for a specific time slot.
+    
+    Set-based: barbers, weekly availability, time off, special availability
+    and appointments are each loaded with a single query for the whole shop,
+    so the query count does not grow with the number of barbers.
+    """
     
     from utils.database_timeout import timeout_query
     
     @timeout_query(timeout_seconds=20.0)
     def _get_available_barbers():
-        # Get all active barbers
-        barber_query = db.query(models.User).filter(
-            models.User.role.in_(["barber", "admin"]),
-            models.User.is_active == True
-        )
+        all_barbers = get_active_barbers(db, service_id)
+        if not all_barbers:
+            return []
         
-        # If service_id is provided, filter barbers who offer this service
-        if service_id:
-            barber_query = barber_query.join(models.barber_services).filter(
-                models.barber_services.c.service_id == service_id,
-                models.barber_services.c.is_available == True
-            )
-        
-        # OPTIMIZED: Limit the number of barbers we check to prevent excessive queries
-        all_barbers = barber_query.limit(50).all()  # Reasonable limit for performance
-        available_barbers = []
-        
-        # OPTIMIZED: Check availability in batches to reduce total query time
-        for barber in all_barbers:
-            try:
-                if is_barber_available(db, barber.id, check_date, start_time, end_time):
-                    available_barbers.append(barber)
-            except Exception as e:
-                logger.warning(f"Error checking availability for barber {barber.id}: {str(e)}")
-                continue  # Skip this barber if there's an error
+        schedule = get_schedule_window(
+            db,
+            check_date,
+            check_date,
+            datetime.combine(check_date - timedelta(days=1), time.min),
+            datetime.combine(check_date + timedelta(days=2), time.min),
+            barber_ids=[barber.id for barber in all_barbers]
+        )
         
-        return available_barbers
+        return [
+            barber for barber in all_barbers
+            if _is_available_in_schedule(barber.id, schedule, check_date, start_time, end_time)
+        ]
     
     return _get_available_barbers()
 
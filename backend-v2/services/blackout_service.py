@@ -6,10 +6,12 @@ Comprehensive service for managing blackout dates and their impact on appointmen
 from datetime import datetime, time, timedelta, date
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_
 import models
 import schemas
 import logging
+from services.calendar_service import blackout_calendar
+from services.conflict_queries import active_appointments
 from dateutil.relativedelta import relativedelta
 
 # Configure logging
@@ -99,15 +101,23 @@ class BlackoutDateService:
             )
         
         if start_date:
-            query = query.filter(
-                or_(
-                    models.BlackoutDate.blackout_date >= start_date,
-                    and_(
-                        models.BlackoutDate.end_date.isnot(None),
-                        models.BlackoutDate.end_date >= start_date
-                    )
+            still_covers = [
+                models.BlackoutDate.blackout_date >= start_date,
+                and_(
+                    models.BlackoutDate.end_date.isnot(None),
+                    models.BlackoutDate.end_date >= start_date
                 )
-            )
+            ]
+            if include_recurring:
+                # Later occurrences of an earlier recurring blackout
+                still_covers.append(and_(
+                    models.BlackoutDate.is_recurring == True,
+                    or_(
+                        models.BlackoutDate.recurrence_end_date.is_(None),
+                        models.BlackoutDate.recurrence_end_date >= start_date
+                    )
+                ))
+            query = query.filter(or_(*still_covers))
         
         if end_date:
             query = query.filter(models.BlackoutDate.blackout_date <= end_date)
@@ -145,40 +155,48 @@ class BlackoutDateService:
         if not end_date:
             end_date = blackout.recurrence_end_date or (date.today() + timedelta(days=365))
         
+        steps = {
+            "weekly": relativedelta(weeks=1),
+            "monthly": relativedelta(months=1),
+            "annually": relativedelta(years=1)
+        }
+        if blackout.recurrence_pattern not in steps:
+            return [blackout]  # Unknown pattern
+        
+        span = (blackout.end_date - blackout.blackout_date) if blackout.end_date else timedelta(0)
+        last_date = min(end_date, blackout.recurrence_end_date or end_date)
+        
+        step = steps[blackout.recurrence_pattern]
         occurrences = []
-        current_date = max(blackout.blackout_date, start_date)
-        
-        while current_date <= end_date and (not blackout.recurrence_end_date or current_date <= blackout.recurrence_end_date):
-            # Create a virtual blackout for this occurrence
-            occurrence = models.BlackoutDate(
-                id=blackout.id,  # Keep original ID for reference
-                blackout_date=current_date,
-                end_date=current_date if not blackout.end_date else current_date + (blackout.end_date - blackout.blackout_date),
-                start_time=blackout.start_time,
-                end_time=blackout.end_time,
-                reason=blackout.reason,
-                blackout_type=blackout.blackout_type,
-                is_recurring=True,
-                allow_emergency_bookings=blackout.allow_emergency_bookings,
-                affects_existing_appointments=blackout.affects_existing_appointments,
-                auto_reschedule=blackout.auto_reschedule,
-                description=blackout.description,
-                location_id=blackout.location_id,
-                barber_id=blackout.barber_id,
-                created_by_id=blackout.created_by_id,
-                is_active=blackout.is_active
-            )
-            occurrences.append(occurrence)
+        n = 0
+        current_date = blackout.blackout_date
+        
+        # Count from the original date so occurrences keep its weekday / day of month
+        while current_date <= last_date:
+            if current_date + span >= start_date:
+                # Create a virtual blackout for this occurrence
+                occurrence = models.BlackoutDate(
+                    id=blackout.id,  # Keep original ID for reference
+                    blackout_date=current_date,
+                    end_date=current_date + span,
+                    start_time=blackout.start_time,
+                    end_time=blackout.end_time,
+                    reason=blackout.reason,
+                    blackout_type=blackout.blackout_type,
+                    is_recurring=True,
+                    allow_emergency_bookings=blackout.allow_emergency_bookings,
+                    affects_existing_appointments=blackout.affects_existing_appointments,
+                    auto_reschedule=blackout.auto_reschedule,
+                    description=blackout.description,
+                    location_id=blackout.location_id,
+                    barber_id=blackout.barber_id,
+                    created_by_id=blackout.created_by_id,
+                    is_active=blackout.is_active
+                )
+                occurrences.append(occurrence)
             
-            # Move to next occurrence based on pattern
-            if blackout.recurrence_pattern == "weekly":
-                current_date += timedelta(weeks=1)
-            elif blackout.recurrence_pattern == "monthly":
-                current_date += relativedelta(months=1)
-            elif blackout.recurrence_pattern == "annually":
-                current_date += relativedelta(years=1)
-            else:
-                break  # Unknown pattern
+            n += 1
+            current_date = blackout.blackout_date + step * n
         
         return occurrences
     
@@ -194,61 +212,26 @@ class BlackoutDateService:
         """
         Check if a specific date/time is blocked by blackout dates
         Returns (is_blocked, blackout_object, reason)
+        
+        Answered from the session's cached blackout calendar, so checking
+        many dates costs one blackout query.
         """
         
-        blackouts = BlackoutDateService.get_blackout_dates(
+        return blackout_calendar.is_blocked(
             db=db,
+            check_date=check_date,
+            check_time=check_time,
             location_id=location_id,
             barber_id=barber_id,
-            start_date=check_date,
-            end_date=check_date,
-            include_recurring=True
+            duration_minutes=duration_minutes
         )
-        
-        for blackout in blackouts:
-            # Check if date is within blackout range
-            blackout_start = blackout.blackout_date
-            blackout_end = blackout.end_date or blackout.blackout_date
-            
-            if not (blackout_start <= check_date <= blackout_end):
-                continue
-            
-            # For full day blackouts, no need to check time
-            if blackout.blackout_type == "full_day":
-                reason = f"Full day blackout: {blackout.reason}"
-                return True, blackout, reason
-            
-            # For partial day blackouts, check time overlap
-            if (blackout.blackout_type == "partial_day" and 
-                blackout.start_time and blackout.end_time and check_time):
-                
-                # Calculate appointment end time
-                if duration_minutes > 0:
-                    appointment_start = datetime.combine(check_date, check_time)
-                    appointment_end = appointment_start + timedelta(minutes=duration_minutes)
-                    check_end_time = appointment_end.time()
-                else:
-                    check_end_time = check_time
-                
-                # Check for time overlap
-                if (check_time < blackout.end_time and check_end_time > blackout.start_time):
-                    reason = f"Partial day blackout ({blackout.start_time}-{blackout.end_time}): {blackout.reason}"
-                    return True, blackout, reason
-        
-        return False, None, ""
     
     @staticmethod
     def _handle_existing_appointments(db: Session, blackout: models.BlackoutDate):
         """Handle existing appointments affected by a new blackout"""
         
         # Find appointments that conflict with the blackout
-        query = db.query(models.Appointment).filter(
-            models.Appointment.status.in_(["pending", "confirmed"]),
-            func.date(models.Appointment.start_time) == blackout.blackout_date
-        )
-        
-        if blackout.barber_id:
-            query = query.filter(models.Appointment.barber_id == blackout.barber_id)
+        query = active_appointments(db, blackout.blackout_date, barber_id=blackout.barber_id)
         
         if blackout.location_id:
             query = query.filter(models.Appointment.location_id == blackout.location_id)
@@ -359,11 +342,10 @@ class BlackoutDateService:
             return True
         
         # Check for existing appointments
-        existing_appointments = db.query(models.Appointment).filter(
-            models.Appointment.id != original_appointment.id,
-            models.Appointment.barber_id == original_appointment.barber_id,
-            func.date(models.Appointment.start_time) == candidate_start.date(),
-            models.Appointment.status.in_(["pending", "confirmed"])
+        existing_appointments = active_appointments(
+            db, candidate_start.date(),
+            barber_id=original_appointment.barber_id,
+            exclude_appointment_id=original_appointment.id
         ).all()
         
         for existing in existing_appointments:
@@ -440,19 +422,10 @@ class BlackoutDateService:
             raise ValueError("Blackout date not found")
         
         # Find affected appointments (without actually modifying them)
-        query = db.query(models.Appointment).filter(
-            models.Appointment.status.in_(["pending", "confirmed"]),
-            func.date(models.Appointment.start_time) >= blackout.blackout_date
+        query = active_appointments(
+            db, blackout.blackout_date, blackout.end_date, barber_id=blackout.barber_id
         )
         
-        if blackout.end_date:
-            query = query.filter(func.date(models.Appointment.start_time) <= blackout.end_date)
-        else:
-            query = query.filter(func.date(models.Appointment.start_time) == blackout.blackout_date)
-        
-        if blackout.barber_id:
-            query = query.filter(models.Appointment.barber_id == blackout.barber_id)
-        
         if blackout.location_id:
             query = query.filter(models.Appointment.location_id == blackout.location_id)
         
@@ -1,11 +1,13 @@
 from datetime import datetime, time, timedelta, date
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 import models
 import pytz
 import logging
-from services import barber_availability_service
+from services import barber_availability_service, slot_engine
+from services.availability_bitmap import availability_bitmap_store
+from services.booking_settings_cache import BookingSettingsSnapshot, booking_settings_cache
 from config import settings
 
 # Configure logging
@@ -28,8 +30,17 @@ SERVICES = {
     "Haircut & Shave": {"duration": 30, "price": 45}
 }
 
-def get_booking_settings(db: Session) -> models.BookingSettings:
-    """Get booking settings from database, create default if none exist."""
+def get_booking_settings(db: Session) -> BookingSettingsSnapshot:
+    """Get the shared read-only booking settings snapshot.
+    
+    The row is only read from the database when the process-wide snapshot is
+    missing or stale (see services/booking_settings_cache.py).  Use
+    update_booking_settings to change settings.
+    """
+    return booking_settings_cache.get(lambda: get_booking_settings_row(db))
+
+def get_booking_settings_row(db: Session) -> models.BookingSettings:
+    """Get the booking settings row from the database, create default if none exist."""
     settings = db.query(models.BookingSettings).filter(
         models.BookingSettings.business_id == 1
     ).first()
@@ -43,6 +54,44 @@ def get_booking_settings(db: Session) -> models.BookingSettings:
     
     return settings
 
+def update_booking_settings(db: Session, updates: Any) -> BookingSettingsSnapshot:
+    """Apply a partial settings update and publish the new snapshot.
+    
+    Args:
+        db: Database session
+        updates: BookingSettingsUpdate schema or dict of fields to change;
+            time fields are HH:MM strings
+    
+    Returns:
+        The new settings snapshot
+    
+    Raises:
+        ValueError: If a time field is not in HH:MM format
+    """
+    if hasattr(updates, "dict"):
+        updates = updates.dict(exclude_unset=True)
+    
+    settings = get_booking_settings_row(db)
+    
+    for field, value in updates.items():
+        if field in ["same_day_cutoff_time", "business_start_time", "business_end_time"] and value:
+            # Convert time strings to time objects
+            try:
+                hour, minute = map(int, value.split(":"))
+                value = time(hour, minute)
+            except (ValueError, AttributeError):
+                raise ValueError(f"Invalid time format for {field}. Use HH:MM format.")
+        setattr(settings, field, value)
+    
+    # Update timestamp
+    settings.updated_at = datetime.utcnow()
+    
+    db.commit()
+    db.refresh(settings)
+    
+    logger.info(f"Updated booking settings: {', '.join(updates) or 'no fields'}")
+    return booking_settings_cache.publish(settings)
+
 def get_available_slots(db: Session, target_date: date, user_timezone: Optional[str] = None, include_next_available: bool = True) -> Dict[str, Any]:
     """Get available time slots for a given date with configurable settings.
     
@@ -64,49 +113,23 @@ def get_available_slots(db: Session, target_date: date, user_timezone: Optional[
     
     logger.info(f"Timezone conversion: Business TZ={settings.business_timezone}, User TZ={user_timezone or settings.business_timezone}")
     
-    # Generate all possible slots for the day in business timezone
-    all_slots = []
-    
-    # Create timezone-aware start and end times in business timezone
-    naive_start = datetime.combine(target_date, settings.business_start_time)
-    naive_end = datetime.combine(target_date, settings.business_end_time)
-    
-    # Make them timezone-aware in business timezone
-    start_time = business_tz.localize(naive_start)
-    end_time = business_tz.localize(naive_end)
-    
-    logger.debug(f"Business hours: {start_time} to {end_time} (business timezone)")
-    
-    # If this is today, start from current time + lead time buffer
-    # Get current time in business timezone
-    now_business = datetime.now(business_tz)
-    
-    if target_date == now_business.date():
-        now_plus_buffer = now_business + timedelta(minutes=settings.min_lead_time_minutes)
-        
-        # Round up to next slot interval properly (handle hour overflow)
-        next_slot_time = now_plus_buffer.replace(second=0, microsecond=0)
-        if next_slot_time.minute % settings.slot_duration_minutes != 0:
-            # Calculate how many minutes to add to reach next slot
-            minutes_to_add = settings.slot_duration_minutes - (next_slot_time.minute % settings.slot_duration_minutes)
-            next_slot_time = next_slot_time + timedelta(minutes=minutes_to_add)
-        
-        # Use the later of business start or next available slot
-        start_time = max(start_time, next_slot_time)
-        
-        logger.debug(f"Today's slots start from: {start_time} (business timezone)")
+    # Work in integer minute offsets from business-local midnight so the
+    # day's slots and busy intervals can be compared with a single sweep
+    anchor_utc = slot_engine.day_anchor(target_date, business_tz)
+    earliest = slot_engine.earliest_bookable(
+        target_date, business_tz, settings.min_lead_time_minutes, settings.slot_duration_minutes
+    )
+    grid = slot_engine.SlotGrid.for_period(
+        target_date,
+        settings.business_start_time,
+        settings.business_end_time,
+        settings.slot_duration_minutes,
+        business_tz,
+        anchor_utc,
+        earliest=earliest
+    )
     
-    current_time = start_time
-    while current_time < end_time:
-        # Convert to user timezone for display
-        current_time_user = current_time.astimezone(user_tz)
-        
-        all_slots.append({
-            "time": current_time_user.strftime("%H:%M"),
-            "datetime": current_time,  # Keep business timezone datetime for comparisons
-            "datetime_user": current_time_user  # User timezone for display
-        })
-        current_time += timedelta(minutes=settings.slot_duration_minutes)
+    logger.debug(f"Generated {len(grid.offsets)} slots for {target_date} (anchor {anchor_utc.isoformat()})")
     
     # Get existing appointments for the day (convert to UTC for database query)
     start_of_day = business_tz.localize(datetime.combine(target_date, time.min))
@@ -126,45 +149,22 @@ def get_available_slots(db: Session, target_date: date, user_timezone: Optional[
     
     logger.debug(f"Found {len(existing_appointments)} existing appointments for {target_date}")
     
-    # Mark slots as unavailable if they conflict with existing appointments
-    available_slots = []
-    next_available_slot = None
+    # Shop-wide view: appointment durations only (buffers apply per barber)
+    busy = slot_engine.BusyIntervals.from_appointments(
+        existing_appointments, anchor_utc, include_buffers=False
+    )
+    formatter = slot_engine.SlotFormatter(
+        anchor_utc, user_tz,
+        grid.offsets[0] if grid.offsets else 0,
+        grid.offsets[-1] if grid.offsets else 0
+    )
+    available_slots, first_free = slot_engine.build_slot_list(grid, busy, formatter)
     
-    for slot in all_slots:
-        is_available = True
-        slot_end = slot["datetime"] + timedelta(minutes=settings.slot_duration_minutes)
-        
-        # Convert slot times to UTC for comparison with database times
-        slot_start_utc = slot["datetime"].astimezone(pytz.UTC)
-        slot_end_utc = slot_end.astimezone(pytz.UTC)
-        
-        for appointment in existing_appointments:
-            # Ensure appointment times are timezone-aware (they should be in UTC from database)
-            if appointment.start_time.tzinfo is None:
-                appointment_start = pytz.UTC.localize(appointment.start_time)
-            else:
-                appointment_start = appointment.start_time
-                
-            appointment_end = appointment_start + timedelta(minutes=appointment.duration_minutes)
-            
-            # Check if there's any overlap
-            if not (slot_end_utc <= appointment_start or slot_start_utc >= appointment_end):
-                is_available = False
-                break
-        
-        # Always create slot data, but mark availability correctly
-        slot_data = {
-            "time": slot["time"],
-            "available": is_available,
-            "is_next_available": False
-        }
-        
-        # Mark the first available slot as next available if enabled
-        if is_available and include_next_available and settings.show_soonest_available and next_available_slot is None:
-            next_available_slot = slot["datetime_user"]  # Use user timezone for display
-            slot_data["is_next_available"] = True
-        
-        available_slots.append(slot_data)
+    # Mark the first available slot as next available if enabled
+    next_available_slot = None
+    if first_free is not None and include_next_available and settings.show_soonest_available:
+        next_available_slot = formatter.display(first_free)  # Use user timezone for display
+        available_slots[grid.offsets.index(first_free)]["is_next_available"] = True
     
     # Find next available slot across multiple days if today is full
     next_available_summary = None
@@ -215,53 +215,226 @@ def get_next_available_slot(db: Session, start_date: date, user_timezone: Option
     """
     settings = get_booking_settings(db)
     
-    # Set up timezones
+    # Resolve the whole search window in one pass instead of probing day by day
+    max_search_date = start_date + timedelta(days=min(max_days_ahead, settings.max_advance_days))
+    _, next_available = _compute_available_range(
+        db, settings, start_date, max_search_date, user_timezone=user_timezone
+    )
+    
+    return next_available
+
+def get_available_slots_range(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    barber_id: Optional[int] = None,
+    user_timezone: Optional[str] = None
+) -> Dict[str, Any]:
+    """Get per-day slot grids for a date range plus the earliest open slot.
+    
+    All appointments (and, for a specific barber, weekly availability, time
+    off and special availability) in the window are fetched with one query
+    per table and resolved in a single in-memory pass.
+    
+    Args:
+        db: Database session
+        start_date: First date of the range (inclusive)
+        end_date: Last date of the range (inclusive)
+        barber_id: Specific barber ID (optional - if None, uses business hours for the whole shop)
+        user_timezone: User's timezone string. If None, uses business timezone.
+    
+    Returns:
+        Dict containing a slot list per day and the earliest available slot
+    """
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+    
+    settings = get_booking_settings(db)
+    days, next_available = _compute_available_range(
+        db, settings, start_date, end_date, barber_id=barber_id, user_timezone=user_timezone
+    )
+    
+    next_available_summary = None
+    if next_available and settings.show_soonest_available:
+        next_available_summary = {
+            "date": next_available.date().isoformat(),
+            "time": next_available.strftime("%H:%M"),
+            "datetime": next_available.isoformat()
+        }
+    
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "barber_id": barber_id,
+        "days": days,
+        "next_available": next_available_summary,
+        "business_hours": {
+            "start": settings.business_start_time.strftime("%H:%M"),
+            "end": settings.business_end_time.strftime("%H:%M")
+        },
+        "slot_duration_minutes": settings.slot_duration_minutes
+    }
+
+def _compute_available_range(
+    db: Session,
+    settings: models.BookingSettings,
+    start_date: date,
+    end_date: date,
+    barber_id: Optional[int] = None,
+    user_timezone: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+    """Build per-day slot lists for ``[start_date, end_date]`` from bulk-loaded rows.
+    
+    Returns the list of ``{"date", "slots"}`` dicts and the earliest available
+    slot as a datetime in the user's timezone (or None).
+    """
     business_tz = pytz.timezone(settings.business_timezone)
     user_tz = pytz.timezone(user_timezone) if user_timezone else business_tz
     
-    # Start searching from the given date
-    current_date = start_date
-    max_search_date = start_date + timedelta(days=min(max_days_ahead, settings.max_advance_days))
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
     
-    # Calculate the minimum allowed booking time (same logic as slot generation)
-    now_business = datetime.now(business_tz)
+    # One anchor for the whole window so every day shares a single busy index
+    anchor_utc = slot_engine.day_anchor(start_date, business_tz)
+    window_start = (anchor_utc - timedelta(days=1)).replace(tzinfo=None)
+    window_end = (slot_engine.day_anchor(end_date, business_tz) + timedelta(days=2)).replace(tzinfo=None)
+    now = datetime.now(pytz.UTC)
     
-    if current_date == now_business.date():
-        min_allowed_time = now_business + timedelta(minutes=settings.min_lead_time_minutes)
-        # Round up to next slot interval properly (handle hour overflow)
-        min_allowed_time = min_allowed_time.replace(second=0, microsecond=0)
-        if min_allowed_time.minute % settings.slot_duration_minutes != 0:
-            # Calculate how many minutes to add to reach next slot
-            minutes_to_add = settings.slot_duration_minutes - (min_allowed_time.minute % settings.slot_duration_minutes)
-            min_allowed_time = min_allowed_time + timedelta(minutes=minutes_to_add)
+    if barber_id:
+        barber = db.query(models.User).filter(
+            models.User.id == barber_id,
+            models.User.role.in_(["barber", "admin", "super_admin"]),
+            models.User.is_active == True
+        ).first()
+        
+        if not barber:
+            raise ValueError(f"Barber with ID {barber_id} not found or not active")
+        
+        schedule = barber_availability_service.get_schedule_window(
+            db, start_date, end_date, window_start, window_end, barber_ids=[barber_id]
+        )
+        busy = _barber_busy_index(
+            schedule["appointments"].get(barber_id, []),
+            schedule["time_off"].get(barber_id, []),
+            schedule["special"].get(barber_id, []),
+            days, business_tz, anchor_utc
+        )
+        weekly = schedule["availability"].get(barber_id, [])
+        time_off = schedule["time_off"].get(barber_id, [])
+        special = schedule["special"].get(barber_id, [])
+        
+        def day_grids(day: date) -> List[slot_engine.SlotGrid]:
+            return _barber_day_grids(day, weekly, time_off, special, settings, business_tz, anchor_utc, now)
     else:
-        # For future dates, start from beginning of business day
-        min_allowed_time = business_tz.localize(datetime.combine(current_date, settings.business_start_time))
-    
-    while current_date <= max_search_date:
-        # Get available slots for this date (without next_available processing to avoid recursion)
-        day_slots = get_available_slots(db, current_date, user_timezone=user_timezone, include_next_available=False)
+        # Shop-wide view: business hours against every appointment (no buffers)
+        appointments = db.query(models.Appointment).filter(
+            and_(
+                models.Appointment.start_time >= window_start,
+                models.Appointment.start_time < window_end,
+                models.Appointment.status != "cancelled"
+            )
+        ).all()
+        busy = slot_engine.BusyIntervals.from_appointments(appointments, anchor_utc, include_buffers=False)
+        
+        def day_grids(day: date) -> List[slot_engine.SlotGrid]:
+            return [_generate_slots_for_period(
+                day, settings.business_start_time, settings.business_end_time,
+                settings, business_tz, anchor_utc, now=now
+            )]
+    
+    results = []
+    next_available = None
+    
+    for day in days:
+        grids = day_grids(day)
+        offsets = [offset for grid in grids for offset in grid.offsets]
+        formatter = slot_engine.SlotFormatter(
+            anchor_utc, user_tz, min(offsets, default=0), max(offsets, default=0)
+        )
         
-        # Find the first available slot that meets the minimum time requirement
-        for slot in day_slots["slots"]:
-            if slot["available"]:
-                # Parse the time and create datetime in business timezone
-                time_str = slot["time"]
-                hour, minute = map(int, time_str.split(":"))
-                
-                # Create timezone-aware datetime in business timezone  
-                slot_datetime = business_tz.localize(datetime.combine(current_date, time(hour, minute)))
-                
-                # Use the same time filtering logic as slot generation
-                if slot_datetime >= min_allowed_time:
-                    # Return in user's timezone
-                    return slot_datetime.astimezone(user_tz)
+        day_slots = []
+        for grid in grids:
+            grid_slots, first_free = slot_engine.build_slot_list(grid, busy, formatter)
+            if first_free is not None and next_available is None:
+                next_available = formatter.display(first_free)
+                if settings.show_soonest_available:
+                    grid_slots[grid.offsets.index(first_free)]["is_next_available"] = True
+            day_slots.extend(grid_slots)
         
-        # Move to next day - reset min_allowed_time for future dates
-        current_date += timedelta(days=1)
-        min_allowed_time = business_tz.localize(datetime.combine(current_date, settings.business_start_time))
+        results.append({"date": day.isoformat(), "slots": day_slots})
+    
+    return results, next_available
+
+def _barber_busy_index(
+    appointments: List[models.Appointment],
+    time_off: List[models.BarberTimeOff],
+    special: List[models.BarberSpecialAvailability],
+    days: List[date],
+    business_tz: pytz.timezone,
+    anchor_utc: datetime
+) -> slot_engine.BusyIntervals:
+    """Busy intervals for one barber across a window: appointments with buffers,
+    partial-day time off and special "unavailable" blocks."""
+    busy = slot_engine.BusyIntervals.from_appointments(appointments, anchor_utc)
+    blocks = list(zip(busy.starts, busy.ends))
+    
+    for entry in time_off:
+        if entry.start_time is None or entry.end_time is None:
+            continue  # Full days are removed from the grid instead
+        for day in days:
+            if entry.start_date <= day <= entry.end_date:
+                blocks.append((
+                    slot_engine.local_offset(day, entry.start_time, business_tz, anchor_utc),
+                    slot_engine.local_offset(day, entry.end_time, business_tz, anchor_utc)
+                ))
+    
+    for entry in special:
+        if entry.availability_type == "unavailable":
+            blocks.append((
+                slot_engine.local_offset(entry.date, entry.start_time, business_tz, anchor_utc),
+                slot_engine.local_offset(entry.date, entry.end_time, business_tz, anchor_utc)
+            ))
+    
+    return slot_engine.BusyIntervals(anchor_utc, blocks)
+
+def _barber_day_grids(
+    day: date,
+    weekly: List[models.BarberAvailability],
+    time_off: List[models.BarberTimeOff],
+    special: List[models.BarberSpecialAvailability],
+    settings: models.BookingSettings,
+    business_tz: pytz.timezone,
+    anchor_utc: datetime,
+    now: Optional[datetime] = None
+) -> List[slot_engine.SlotGrid]:
+    """Slot grids for one barber-day: weekly periods plus special "available"
+    periods, or nothing when the barber has full-day time off.
+    
+    Overlapping or touching periods are merged first, so the grids are
+    disjoint and in time order and no slot is listed twice.
+    """
+    for entry in time_off:
+        if entry.start_date <= day <= entry.end_date and (entry.start_time is None or entry.end_time is None):
+            return []
+    
+    periods = [(av.start_time, av.end_time) for av in weekly if av.day_of_week == day.weekday()]
+    periods.extend(
+        (entry.start_time, entry.end_time)
+        for entry in special
+        if entry.date == day and entry.availability_type != "unavailable"
+    )
+    periods.sort()
     
-    return None
+    merged = []
+    for start, end in periods:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    
+    return [
+        _generate_slots_for_period(day, start, end, settings, business_tz, anchor_utc, now=now)
+        for start, end in merged
+    ]
 
 def get_available_slots_with_barber_availability(
     db: Session, 
@@ -273,10 +446,15 @@ def get_available_slots_with_barber_availability(
 ) -> Dict[str, Any]:
     """Get available time slots considering barber availability.
     
+    Without ``barber_id`` every active barber with at least one free slot on
+    ``target_date`` is listed, including barbers who only work part of the
+    day or already have bookings. Barbers are no longer required to be free
+    for the whole business-hours window to appear.
+    
     Args:
         db: Database session
         target_date: Date to check for available slots
-        barber_id: Specific barber ID (optional - if None, returns slots for all available barbers)
+        barber_id: Specific barber ID (optional - if None, returns slots for every active barber with free slots)
         user_timezone: User's timezone string. If None, uses business timezone.
         include_next_available: Whether to find and mark the next available slot
     
@@ -292,6 +470,11 @@ def get_available_slots_with_barber_availability(
     
     logger.info(f"Getting slots with barber availability: Barber={barber_id}, Date={target_date}, User TZ={user_timezone or settings.business_timezone}")
     
+    business_hours = {
+        "start": settings.business_start_time.strftime("%H:%M"),
+        "end": settings.business_end_time.strftime("%H:%M")
+    }
+    
     if barber_id:
         # Get slots for specific barber
         barber = db.query(models.User).filter(
@@ -302,220 +485,163 @@ def get_available_slots_with_barber_availability(
         
         if not barber:
             raise ValueError(f"Barber with ID {barber_id} not found or not active")
-        
-        # Check if barber is available for this slot using the barber availability service
-        day_of_week = target_date.weekday()
-        
-        # Get barber's availability for this day
-        availability = barber_availability_service.get_barber_availability(db, barber_id, day_of_week)
-        
-        if not availability:
-            return {
-                "date": target_date.isoformat(),
-                "barber_id": barber_id,
-                "barber_name": barber.name,
-                "slots": [],
-                "next_available": None,
-                "business_hours": {
-                    "start": settings.business_start_time.strftime("%H:%M"),
-                    "end": settings.business_end_time.strftime("%H:%M")
-                },
-                "slot_duration_minutes": settings.slot_duration_minutes,
-                "availability_note": "Barber not available on this day"
-            }
-        
-        # Generate slots based on barber's availability
-        all_slots = []
-        for av in availability:
-            period_slots = _generate_slots_for_period(
-                target_date, av.start_time, av.end_time, settings, business_tz, user_tz
+        barbers = [barber]
+    else:
+        # Whole shop: every active barber, resolved together below; barbers
+        # without a free slot are dropped when their grids come back empty
+        barbers = barber_availability_service.get_active_barbers(db)
+    
+    # Load availability, time off, special availability and appointments for
+    # all barbers with one query per table, then compute every grid in memory
+    anchor_utc = slot_engine.day_anchor(target_date, business_tz)
+    schedule = {"availability": {}, "time_off": {}, "special": {}, "appointments": {}}
+    busy_by_barber = None
+    if barbers:
+        barber_ids = [b.id for b in barbers]
+        use_bitmaps = availability_bitmap_store.enabled
+        schedule = barber_availability_service.get_schedule_window(
+            db,
+            target_date,
+            target_date,
+            (anchor_utc - timedelta(days=1)).replace(tzinfo=None),
+            (anchor_utc + timedelta(days=2)).replace(tzinfo=None),
+            barber_ids=barber_ids,
+            include_appointments=not use_bitmaps
+        )
+        if use_bitmaps:
+            # Occupancy comes from the maintained per-barber-day bitmaps
+            busy_by_barber = availability_bitmap_store.get_busy_intervals(
+                db, barber_ids, target_date, business_tz, anchor_utc
             )
-            all_slots.extend(period_slots)
-        
-        # Filter out slots with existing appointments
-        available_slots = _filter_slots_by_appointments(
-            db, all_slots, target_date, barber_id, settings
+    now = datetime.now(pytz.UTC)
+    
+    barber_slots = []
+    earliest = None  # (offset, barber, formatter)
+    
+    for barber in barbers:
+        slots, first_free, formatter = _barber_day_slots(
+            barber.id, schedule, target_date, settings, business_tz, user_tz, anchor_utc, now,
+            busy=busy_by_barber.get(barber.id) if busy_by_barber is not None else None
         )
+        if not slots:
+            continue
         
-        # Find next available slot if requested
-        next_available_summary = None
-        if include_next_available and settings.show_soonest_available:
-            next_available_slot = next((slot for slot in available_slots if slot["available"]), None)
-            if next_available_slot:
-                next_available_summary = {
-                    "date": target_date.isoformat(),
-                    "time": next_available_slot["time"],
-                    "barber_id": barber_id,
-                    "barber_name": barber.name
-                }
+        barber_slots.append({
+            "barber_id": barber.id,
+            "barber_name": barber.name,
+            "slots": slots
+        })
         
-        return {
+        if first_free is not None and (earliest is None or first_free < earliest[0]):
+            earliest = (first_free, barber, formatter)
+    
+    next_available_summary = None
+    if include_next_available and settings.show_soonest_available and earliest:
+        first_free, barber, formatter = earliest
+        next_time = formatter.label(first_free)
+        next_available_summary = {
             "date": target_date.isoformat(),
-            "barber_id": barber_id,
-            "barber_name": barber.name,
-            "slots": available_slots,
-            "next_available": next_available_summary,
-            "business_hours": {
-                "start": settings.business_start_time.strftime("%H:%M"),
-                "end": settings.business_end_time.strftime("%H:%M")
-            },
-            "slot_duration_minutes": settings.slot_duration_minutes
+            "time": next_time,
+            "datetime": f"{target_date.isoformat()}T{next_time}:00",
+            "barber_id": barber.id,
+            "barber_name": barber.name
         }
     
-    else:
-        # Get slots for all available barbers
-        available_barbers = barber_availability_service.get_available_barbers_for_slot(
-            db=db,
-            check_date=target_date,
-            start_time=settings.business_start_time,
-            end_time=settings.business_end_time
-        )
-        
-        barber_slots = []
-        overall_next_available = None
-        
-        for barber in available_barbers:
-            barber_data = get_available_slots_with_barber_availability(
-                db, target_date, barber.id, service_id, user_timezone, include_next_available=False
-            )
-            
-            if barber_data["slots"]:
-                barber_slots.append({
-                    "barber_id": barber.id,
-                    "barber_name": barber.name,
-                    "slots": barber_data["slots"]
-                })
-                
-                # Track earliest available slot across all barbers
-                if include_next_available and not overall_next_available:
-                    first_available = next((slot for slot in barber_data["slots"] if slot["available"]), None)
-                    if first_available:
-                        overall_next_available = {
-                            "date": target_date.isoformat(),
-                            "time": first_available["time"],
-                            "datetime": f"{target_date.isoformat()}T{first_available['time']}:00",
-                            "barber_id": barber.id,
-                            "barber_name": barber.name
-                        }
-        
-        return {
+    if barber_id:
+        result = {
             "date": target_date.isoformat(),
-            "available_barbers": barber_slots,
-            "next_available": overall_next_available,
-            "business_hours": {
-                "start": settings.business_start_time.strftime("%H:%M"),
-                "end": settings.business_end_time.strftime("%H:%M")
-            },
+            "barber_id": barber_id,
+            "barber_name": barbers[0].name,
+            "slots": barber_slots[0]["slots"] if barber_slots else [],
+            "next_available": next_available_summary,
+            "business_hours": business_hours,
             "slot_duration_minutes": settings.slot_duration_minutes
         }
+        if not barber_slots:
+            result["availability_note"] = "Barber not available on this day"
+        return result
+    
+    return {
+        "date": target_date.isoformat(),
+        "available_barbers": barber_slots,
+        "next_available": next_available_summary,
+        "business_hours": business_hours,
+        "slot_duration_minutes": settings.slot_duration_minutes
+    }
 
-def _generate_slots_for_period(
+def _barber_day_slots(
+    barber_id: int,
+    schedule: Dict[str, Dict[int, List[Any]]],
     target_date: date,
-    start_time: time,
-    end_time: time,
     settings: models.BookingSettings,
     business_tz: pytz.timezone,
-    user_tz: pytz.timezone
-) -> List[Dict[str, Any]]:
-    """Generate time slots for a specific time period."""
-    slots = []
-    
-    # Create timezone-aware start and end times in business timezone
-    naive_start = datetime.combine(target_date, start_time)
-    naive_end = datetime.combine(target_date, end_time)
-    
-    # Make them timezone-aware in business timezone
-    period_start = business_tz.localize(naive_start)
-    period_end = business_tz.localize(naive_end)
-    
-    # If this is today, start from current time + lead time buffer
-    now_business = datetime.now(business_tz)
+    user_tz: pytz.timezone,
+    anchor_utc: datetime,
+    now: Optional[datetime] = None,
+    busy: Optional[slot_engine.BusyIntervals] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int], slot_engine.SlotFormatter]:
+    """Slot list for one barber-day from bulk-loaded schedule rows.
+    
+    ``busy`` is a precomputed occupancy index (e.g. from the availability
+    bitmap store); without it the index is built from the schedule rows.
+    
+    Returns the slots, the offset of the first free slot (or None) and the
+    formatter used for the labels.
+    """
+    time_off = schedule["time_off"].get(barber_id, [])
+    special = schedule["special"].get(barber_id, [])
     
-    if target_date == now_business.date():
-        now_plus_buffer = now_business + timedelta(minutes=settings.min_lead_time_minutes)
-        
-        # Round up to next slot interval properly
-        next_slot_time = now_plus_buffer.replace(second=0, microsecond=0)
-        if next_slot_time.minute % settings.slot_duration_minutes != 0:
-            minutes_to_add = settings.slot_duration_minutes - (next_slot_time.minute % settings.slot_duration_minutes)
-            next_slot_time = next_slot_time + timedelta(minutes=minutes_to_add)
-        
-        # Use the later of period start or next available slot
-        period_start = max(period_start, next_slot_time)
+    grids = _barber_day_grids(
+        target_date, schedule["availability"].get(barber_id, []), time_off, special,
+        settings, business_tz, anchor_utc, now
+    )
+    offsets = [offset for grid in grids for offset in grid.offsets]
+    formatter = slot_engine.SlotFormatter(
+        anchor_utc, user_tz, min(offsets, default=0), max(offsets, default=0)
+    )
+    if not grids:
+        return [], None, formatter
     
-    current_time = period_start
-    while current_time < period_end:
-        # Convert to user timezone for display
-        current_time_user = current_time.astimezone(user_tz)
-        
-        slots.append({
-            "time": current_time_user.strftime("%H:%M"),
-            "datetime": current_time,  # Keep business timezone datetime for comparisons
-            "datetime_user": current_time_user  # User timezone for display
-        })
-        current_time += timedelta(minutes=settings.slot_duration_minutes)
+    if busy is None:
+        busy = _barber_busy_index(
+            schedule["appointments"].get(barber_id, []), time_off, special,
+            [target_date], business_tz, anchor_utc
+        )
     
-    return slots
+    slots = []
+    first_free = None
+    for grid in grids:
+        grid_slots, grid_first_free = slot_engine.build_slot_list(grid, busy, formatter)
+        if grid_first_free is not None and (first_free is None or grid_first_free < first_free):
+            first_free = grid_first_free
+        slots.extend(grid_slots)
+    
+    return slots, first_free, formatter
 
-def _filter_slots_by_appointments(
-    db: Session,
-    slots: List[Dict[str, Any]],
+def _generate_slots_for_period(
     target_date: date,
-    barber_id: int,
-    settings: models.BookingSettings
-) -> List[Dict[str, Any]]:
-    """Filter slots by checking against existing appointments."""
-    # Get existing appointments for this barber on this date
-    start_of_day = datetime.combine(target_date, time.min)
-    end_of_day = datetime.combine(target_date, time.max)
-    
-    existing_appointments = db.query(models.Appointment).filter(
-        and_(
-            models.Appointment.barber_id == barber_id,
-            models.Appointment.start_time >= start_of_day,
-            models.Appointment.start_time <= end_of_day,
-            models.Appointment.status != "cancelled"
-        )
-    ).all()
-    
-    available_slots = []
-    
-    for slot in slots:
-        is_available = True
-        slot_end = slot["datetime"] + timedelta(minutes=settings.slot_duration_minutes)
-        
-        # Convert slot times to UTC for comparison with database times
-        slot_start_utc = slot["datetime"].astimezone(pytz.UTC)
-        slot_end_utc = slot_end.astimezone(pytz.UTC)
-        
-        for appointment in existing_appointments:
-            # Ensure appointment times are timezone-aware
-            if appointment.start_time.tzinfo is None:
-                appointment_start = pytz.UTC.localize(appointment.start_time)
-            else:
-                appointment_start = appointment.start_time
-                
-            appointment_end = appointment_start + timedelta(minutes=appointment.duration_minutes)
-            
-            # Add buffer times
-            buffer_before = timedelta(minutes=appointment.buffer_time_before or 0)
-            buffer_after = timedelta(minutes=appointment.buffer_time_after or 0)
-            
-            appointment_start_with_buffer = appointment_start - buffer_before
-            appointment_end_with_buffer = appointment_end + buffer_after
-            
-            # Check if there's any overlap
-            if not (slot_end_utc <= appointment_start_with_buffer or slot_start_utc >= appointment_end_with_buffer):
-                is_available = False
-                break
-        
-        available_slots.append({
-            "time": slot["time"],
-            "available": is_available,
-            "is_next_available": False
-        })
+    start_time: time,
+    end_time: time,
+    settings: models.BookingSettings,
+    business_tz: pytz.timezone,
+    anchor_utc: datetime,
+    now: Optional[datetime] = None
+) -> slot_engine.SlotGrid:
+    """Generate the slot grid (minute offsets from ``anchor_utc``) for a specific time period."""
+    # If this is today, start from current time + lead time buffer
+    earliest = slot_engine.earliest_bookable(
+        target_date, business_tz, settings.min_lead_time_minutes, settings.slot_duration_minutes, now=now
+    )
     
-    return available_slots
+    return slot_engine.SlotGrid.for_period(
+        target_date,
+        start_time,
+        end_time,
+        settings.slot_duration_minutes,
+        business_tz,
+        anchor_utc,
+        earliest=earliest
+    )
 
 def create_booking(
     db: Session,
@@ -821,10 +947,7 @@ def create_booking(
                 appointment_id=appointment.id
             )
             
-            # Schedule reminder notifications
-            notification_service.schedule_appointment_reminders(db, appointment)
-            
-            logger.info(f"Queued confirmation and reminder notifications for appointment {appointment.id}")
+            logger.info(f"Queued confirmation notification for appointment {appointment.id}")
         else:
             logger.warning(f"Notification service not available for appointment {appointment.id}")
             
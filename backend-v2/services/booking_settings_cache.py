@@ -0,0 +1,204 @@
+"""
+Process-wide snapshot of the BookingSettings singleton.
+
+Availability paths read booking settings several times per request (and
+``get_next_available_slot`` used to read them once per searched day).  This
+module keeps one immutable, versioned snapshot per process instead:
+
+* reads return the cached snapshot without touching the database;
+* ``booking_service.update_booking_settings`` publishes the new row, which
+  replaces the local snapshot immediately and bumps a shared version counter
+  in Redis;
+* other workers compare their snapshot with that counter at most once every
+  ``VERSION_CHECK_SECONDS`` and reload when it moved.  Without Redis a
+  snapshot is simply reloaded after ``MAX_AGE_SECONDS``.
+"""
+
+import logging
+import threading
+import time as time_module
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional
+
+import models
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "booking_settings:version"
+VERSION_CHECK_SECONDS = 5
+MAX_AGE_SECONDS = 60
+
+
+class BookingSettingsSnapshot:
+    """Read-only copy of a BookingSettings row.
+
+    Exposes the same column attributes and helper methods as the ORM model,
+    so it can be used wherever settings are only read.  It is detached from
+    any session and safe to share between threads.
+    """
+
+    __slots__ = ("_values", "version")
+
+    # Model helpers only read attributes, so they work unchanged on a snapshot
+    get_min_booking_time = models.BookingSettings.get_min_booking_time
+    get_max_booking_time = models.BookingSettings.get_max_booking_time
+
+    def __init__(self, row: models.BookingSettings, version: int):
+        values = {
+            column.key: getattr(row, column.key)
+            for column in models.BookingSettings.__table__.columns
+        }
+        if isinstance(values.get("allowed_timezones"), list):
+            values["allowed_timezones"] = tuple(values["allowed_timezones"])
+        object.__setattr__(self, "_values", MappingProxyType(values))
+        object.__setattr__(self, "version", version)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"BookingSettingsSnapshot has no attribute '{name}'") from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("BookingSettingsSnapshot is read-only; use booking_service.update_booking_settings")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+    def __repr__(self) -> str:
+        return f"<BookingSettingsSnapshot business_id={self.business_id} version={self.version}>"
+
+
+class BookingSettingsCache:
+    """Holds the current snapshot and decides when it must be reloaded."""
+
+    def __init__(
+        self,
+        version_check_seconds: float = VERSION_CHECK_SECONDS,
+        max_age_seconds: float = MAX_AGE_SECONDS,
+        redis_client_factory: Optional[Callable[[], Any]] = None
+    ):
+        self.version_check_seconds = version_check_seconds
+        self.max_age_seconds = max_age_seconds
+        self._redis_client_factory = redis_client_factory
+        self._lock = threading.Lock()
+        self._snapshot: Optional[BookingSettingsSnapshot] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._local_version = 0
+        self.stats = {"hits": 0, "reloads": 0, "version_checks": 0, "publishes": 0, "errors": 0}
+
+    def get(self, loader: Callable[[], models.BookingSettings]) -> BookingSettingsSnapshot:
+        """Current snapshot; ``loader`` fetches the row when a reload is due."""
+        snapshot = self._snapshot
+        now = time_module.monotonic()
+
+        if snapshot is not None and not self._is_stale(snapshot, now):
+            self.stats["hits"] += 1
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._snapshot is not None and self._snapshot is not snapshot:
+                self.stats["hits"] += 1
+                return self._snapshot
+
+            shared_version = self._shared_version()
+            row = loader()
+            return self._install(row, shared_version)
+
+    def publish(self, row: models.BookingSettings) -> BookingSettingsSnapshot:
+        """Install freshly committed settings and tell other workers to reload."""
+        with self._lock:
+            version = self._bump_shared_version()
+            self.stats["publishes"] += 1
+            return self._install(row, version)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    @property
+    def snapshot(self) -> Optional[BookingSettingsSnapshot]:
+        """The loaded snapshot as-is (no reload), or None before the first read"""
+        return self._snapshot
+
+    @property
+    def version(self) -> Optional[int]:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["reloads"]
+        return {
+            **self.stats,
+            "version": self.version,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0.0
+        }
+
+    # Internals
+
+    def _install(self, row: models.BookingSettings, version: Optional[int]) -> BookingSettingsSnapshot:
+        if version is None:
+            # No shared counter - version only has to increase within this process
+            self._local_version += 1
+            version = self._local_version
+        snapshot = BookingSettingsSnapshot(row, version)
+        now = time_module.monotonic()
+        self._snapshot = snapshot
+        self._loaded_at = now
+        self._checked_at = now
+        self.stats["reloads"] += 1
+        return snapshot
+
+    def _is_stale(self, snapshot: BookingSettingsSnapshot, now: float) -> bool:
+        if now - self._checked_at < self.version_check_seconds:
+            return False
+
+        client = self._redis()
+        shared_version = None
+        if client is not None:
+            self._checked_at = now
+            self.stats["version_checks"] += 1
+            shared_version = self._shared_version(client)
+
+        if shared_version is None:
+            return now - self._loaded_at >= self.max_age_seconds
+        return shared_version != snapshot.version
+
+    def _redis(self):
+        try:
+            if self._redis_client_factory is not None:
+                return self._redis_client_factory()
+            from services.redis_service import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"Redis unavailable for booking settings version: {e}")
+            return None
+
+    def _shared_version(self, client: Any = None) -> Optional[int]:
+        client = client or self._redis()
+        if client is None:
+            return None
+        try:
+            value = client.get(VERSION_KEY)
+            return int(value) if value is not None else 0
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to read booking settings version: {e}")
+            return None
+
+    def _bump_shared_version(self) -> Optional[int]:
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            return int(client.incr(VERSION_KEY))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to publish booking settings version: {e}")
+            return None
+
+
+# Global cache instance
+booking_settings_cache = BookingSettingsCache()
@@ -0,0 +1,261 @@
+"""
+Cached holiday and blackout calendars for scheduling checks.
+
+Recurring generation, blackout rescheduling and the blackout check endpoint
+ask "is this day a holiday?" and "is this slot blacked out?" once per
+candidate date.  Each answer used to build a year of holidays with the
+``holidays`` package or run a BlackoutDate query.  This module answers them
+from memory instead:
+
+* ``holiday_calendar`` memoizes the holiday set of each (country, year) for
+  the life of the process - holiday tables do not change at runtime;
+* ``blackout_calendar`` keeps one ``BlackoutIndex`` per (location, barber)
+  scope in the request's session (``Session.info``), loaded with a single
+  query over a window starting at the first date asked about.  Flushing any
+  BlackoutDate change through that session drops its indexes (the listener
+  at the bottom); call ``blackout_calendar.invalidate`` after bulk updates.
+
+``BlackoutIndex`` splits the blackout date ranges into disjoint segments,
+each listing the blackouts that cover it, so ``is_blocked`` is one binary
+search plus a look at the (usually one or two) blackouts on that day.
+"""
+
+import logging
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import models
+
+try:
+    import holidays
+except ImportError:
+    holidays = None
+
+logger = logging.getLogger(__name__)
+
+# Blackouts loaded past the first date checked, so day-by-day probes share one load
+LOOKAHEAD_DAYS = 90
+SESSION_KEY = "blackout_calendar"
+
+
+def _country_holidays(country_code: str, year: int) -> Iterable[date]:
+    if holidays is None:
+        raise RuntimeError("holidays package is not installed")
+    return holidays.country_holidays(country_code, years=year).keys()
+
+
+class HolidayCalendar:
+    """Process-wide memo of holiday dates per (country, year)"""
+
+    def __init__(self, loader: Optional[Callable[[str, int], Iterable[date]]] = None):
+        self._loader = loader or _country_holidays
+        self._years: Dict[Tuple[str, int], FrozenSet[date]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0}
+
+    def holidays(self, year: int, country_code: str = "US") -> FrozenSet[date]:
+        """Holiday dates of one year; a failed load is cached as no holidays"""
+        key = (country_code, year)
+        cached = self._years.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        with self._lock:
+            if key not in self._years:
+                try:
+                    self._years[key] = frozenset(self._loader(country_code, year))
+                except Exception as e:
+                    logger.warning(f"Could not load holidays for {country_code} {year}: {e}")
+                    self._years[key] = frozenset()
+                self.stats["loads"] += 1
+            return self._years[key]
+
+    def is_holiday(self, check_date: date, country_code: str = "US") -> bool:
+        return check_date in self.holidays(check_date.year, country_code)
+
+    def between(self, start_date: date, end_date: date, country_code: str = "US") -> Set[date]:
+        """Holidays from start_date to end_date inclusive"""
+        return {
+            day
+            for year in range(start_date.year, end_date.year + 1)
+            for day in self.holidays(year, country_code)
+            if start_date <= day <= end_date
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._years.clear()
+
+
+class BlackoutIndex:
+    """Blackouts over a date window, indexed for O(log n) date lookups
+
+    ``blackouts`` are BlackoutDate rows or expanded recurring occurrences;
+    when several cover a day the earliest in the given order is reported.
+    """
+
+    def __init__(
+        self,
+        blackouts: Iterable[models.BlackoutDate],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+
+        # Sweep over range boundaries: segment i runs from _bounds[i] up to
+        # _bounds[i + 1] and is covered by exactly _covering[i]
+        events: Dict[date, List[Tuple[int, int]]] = {}
+        ordered = []
+        for blackout in blackouts:
+            first = blackout.blackout_date
+            last = blackout.end_date or first
+            if last < first:
+                continue
+            order = len(ordered)
+            ordered.append(blackout)
+            events.setdefault(first, []).append((1, order))
+            events.setdefault(last + timedelta(days=1), []).append((-1, order))
+
+        self._bounds: List[date] = sorted(events)
+        self._covering: List[Tuple[models.BlackoutDate, ...]] = []
+        active: Set[int] = set()
+        for bound in self._bounds[:-1]:
+            for change, order in events[bound]:
+                if change > 0:
+                    active.add(order)
+                else:
+                    active.discard(order)
+            self._covering.append(tuple(ordered[order] for order in sorted(active)))
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def spans(self, start_date: date, end_date: date) -> bool:
+        """Whether the index was loaded for every date from start_date to end_date"""
+        return (
+            (self.start_date is None or self.start_date <= start_date) and
+            (self.end_date is None or end_date <= self.end_date)
+        )
+
+    def covering(self, check_date: date) -> Tuple[models.BlackoutDate, ...]:
+        """Blackouts whose date range includes check_date"""
+        position = bisect_right(self._bounds, check_date) - 1
+        if position < 0 or position >= len(self._covering):
+            return ()
+        return self._covering[position]
+
+    def is_blocked(
+        self,
+        check_date: date,
+        check_time: Optional[time] = None,
+        duration_minutes: int = 0
+    ) -> Tuple[bool, Optional[models.BlackoutDate], str]:
+        """(is_blocked, blackout, reason) for a date, or a slot when check_time is given
+
+        Partial-day blackouts with a time range block slots overlapping it
+        (a slot without duration is blocked from start_time up to end_time)
+        and never block a bare date; every other blackout blocks the day.
+        """
+        for blackout in self.covering(check_date):
+            if not (blackout.blackout_type == "partial_day" and blackout.start_time and blackout.end_time):
+                return True, blackout, f"Full day blackout: {blackout.reason}"
+
+            if check_time is None:
+                continue
+
+            if duration_minutes > 0:
+                check_end_time = (datetime.combine(check_date, check_time) + timedelta(minutes=duration_minutes)).time()
+                overlaps = check_time < blackout.end_time and check_end_time > blackout.start_time
+            else:
+                overlaps = blackout.start_time <= check_time < blackout.end_time
+
+            if overlaps:
+                reason = f"Partial day blackout ({blackout.start_time}-{blackout.end_time}): {blackout.reason}"
+                return True, blackout, reason
+
+        return False, None, ""
+
+
+class BlackoutCalendar:
+    """Per-session BlackoutIndex for each (location_id, barber_id) scope"""
+
+    def __init__(self, lookahead_days: int = LOOKAHEAD_DAYS):
+        self.lookahead = timedelta(days=lookahead_days)
+        self.stats = {"hits": 0, "loads": 0}
+
+    def index(
+        self,
+        db: Session,
+        start_date: date,
+        end_date: Optional[date] = None,
+        location_id: Optional[int] = None,
+        barber_id: Optional[int] = None
+    ) -> BlackoutIndex:
+        """The scope's index, (re)loaded when it does not cover start_date..end_date"""
+        end_date = end_date or start_date
+        indexes = db.info.setdefault(SESSION_KEY, {})
+        key = (location_id, barber_id)
+
+        current = indexes.get(key)
+        if current is not None and current.spans(start_date, end_date):
+            self.stats["hits"] += 1
+            return current
+
+        window_start = start_date
+        window_end = max(end_date, start_date + self.lookahead)
+        if current is not None:
+            window_start = min(window_start, current.start_date)
+            window_end = max(window_end, current.end_date)
+
+        # Imported here: blackout_service checks slots through this module
+        from services.blackout_service import BlackoutDateService
+
+        blackouts = BlackoutDateService.get_blackout_dates(
+            db=db,
+            location_id=location_id,
+            barber_id=barber_id,
+            start_date=window_start,
+            end_date=window_end,
+            include_recurring=True
+        )
+        indexes[key] = BlackoutIndex(blackouts, window_start, window_end)
+        self.stats["loads"] += 1
+        return indexes[key]
+
+    def is_blocked(
+        self,
+        db: Session,
+        check_date: date,
+        check_time: Optional[time] = None,
+        location_id: Optional[int] = None,
+        barber_id: Optional[int] = None,
+        duration_minutes: int = 0
+    ) -> Tuple[bool, Optional[models.BlackoutDate], str]:
+        """BlackoutIndex.is_blocked for the scope's blackouts"""
+        index = self.index(db, check_date, location_id=location_id, barber_id=barber_id)
+        return index.is_blocked(check_date, check_time, duration_minutes)
+
+    def invalidate(self, db: Session) -> None:
+        """Drop the session's indexes, e.g. after a bulk BlackoutDate update"""
+        db.info.pop(SESSION_KEY, None)
+
+
+# Global instances
+holiday_calendar = HolidayCalendar()
+blackout_calendar = BlackoutCalendar()
+
+
+@event.listens_for(Session, "after_flush")
+def _drop_on_blackout_change(session, flush_context):
+    if SESSION_KEY not in session.info:
+        return
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(instance, models.BlackoutDate) for instance in changed):
+        blackout_calendar.invalidate(session)
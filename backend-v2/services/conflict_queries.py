@@ -0,0 +1,68 @@
+"""
+Index-friendly appointment queries for conflict detection.
+
+Filtering with ``func.date(start_time) == day`` or ``start_time.cast(Date)``
+wraps the column in a function, so no index on ``start_time`` can be used and
+every check scans the appointments table.  These helpers express days as
+half-open timestamp ranges instead::
+
+    start_time >= <first day> 00:00 AND start_time < <day after last day> 00:00
+
+and put the filters in the order of the covering index
+``idx_appointments_conflict_covering`` - (barber_id, start_time, status,
+duration_minutes), carrying id on PostgreSQL - so a barber's conflict lookup
+is a single index range scan that never visits the table.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Query, Session
+
+import models
+
+# Appointments that occupy their slot
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+
+def day_bounds(start_date: date, end_date: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """Half-open ``[start_date 00:00, day after end_date 00:00)``"""
+    end_date = end_date or start_date
+    return datetime.combine(start_date, time.min), datetime.combine(end_date + timedelta(days=1), time.min)
+
+
+def starts_between(start_date: date, end_date: Optional[date] = None):
+    """Predicate: the appointment starts on a day from start_date to end_date inclusive"""
+    lower, upper = day_bounds(start_date, end_date)
+    return and_(models.Appointment.start_time >= lower, models.Appointment.start_time < upper)
+
+
+def active_appointments(
+    db: Session,
+    start_date: date,
+    end_date: Optional[date] = None,
+    barber_id: Optional[int] = None,
+    exclude_appointment_id: Optional[int] = None,
+    columns: Tuple[Any, ...] = ()
+) -> Query:
+    """Pending and confirmed appointments starting from start_date to end_date
+
+    ``columns`` selects only those columns (e.g. ``Appointment.id``,
+    ``Appointment.start_time``, ``Appointment.duration_minutes``, which the
+    covering index answers alone) instead of full Appointment objects.
+    """
+    query = db.query(*columns) if columns else db.query(models.Appointment)
+
+    if barber_id:
+        query = query.filter(models.Appointment.barber_id == barber_id)
+
+    query = query.filter(
+        starts_between(start_date, end_date),
+        models.Appointment.status.in_(ACTIVE_STATUSES)
+    )
+
+    if exclude_appointment_id:
+        query = query.filter(models.Appointment.id != exclude_appointment_id)
+
+    return query
@@ -3,8 +3,10 @@ Enhanced Recurring Appointments Service
 Comprehensive service for managing recurring appointment patterns, series, and conflicts
 """
 
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import datetime, time, timedelta, date
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterable, Set, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, text
 import models
@@ -13,8 +15,10 @@ import pytz
 import logging
 from dateutil.relativedelta import relativedelta
 from calendar import monthrange
-import holidays
 from dataclasses import dataclass
+from services.retention_summary_service import record_appointment_completion
+from services.calendar_service import BlackoutIndex, blackout_calendar, holiday_calendar
+from services.conflict_queries import active_appointments
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,21 +54,17 @@ class HolidayService:
         if year is None:
             year = datetime.now().year
         
-        try:
-            country_holidays = holidays.country_holidays(country_code, years=year)
-            return list(country_holidays.keys())
-        except Exception as e:
-            logger.warning(f"Could not load holidays for {country_code}: {e}")
-            return []
+        return sorted(holiday_calendar.holidays(year, country_code))
     
     @staticmethod
     def is_holiday(check_date: date, country_code: str = "US") -> bool:
         """Check if a date is a holiday"""
-        try:
-            country_holidays = holidays.country_holidays(country_code, years=check_date.year)
-            return check_date in country_holidays
-        except Exception:
-            return False
+        return holiday_calendar.is_holiday(check_date, country_code)
+    
+    @staticmethod
+    def get_holidays_between(start_date: date, end_date: date, country_code: str = "US") -> Set[date]:
+        """Holidays from start_date to end_date inclusive"""
+        return holiday_calendar.between(start_date, end_date, country_code)
 
 
 class BlackoutDateService:
@@ -95,12 +95,15 @@ class BlackoutDateService:
             )
         
         if start_date:
-            query = query.filter(models.BlackoutDate.blackout_date >= start_date)
+            # Multi-day blackouts that began earlier still cover the range
+            query = query.filter(
+                func.coalesce(models.BlackoutDate.end_date, models.BlackoutDate.blackout_date) >= start_date
+            )
         
         if end_date:
             query = query.filter(models.BlackoutDate.blackout_date <= end_date)
         
-        return query.all()
+        return query.order_by(models.BlackoutDate.id).all()
     
     @staticmethod
     def is_date_blocked(
@@ -110,29 +113,11 @@ class BlackoutDateService:
         barber_id: Optional[int] = None,
         check_time: Optional[time] = None
     ) -> Tuple[bool, Optional[models.BlackoutDate]]:
-        """Check if a specific date/time is blocked"""
-        blackouts = BlackoutDateService.get_blackout_dates(
-            db, location_id, barber_id, check_date, check_date
+        """Check if a specific date/time is blocked, using the session's cached blackout calendar"""
+        is_blocked, blackout, _ = blackout_calendar.is_blocked(
+            db, check_date, check_time, location_id=location_id, barber_id=barber_id
         )
-        
-        for blackout in blackouts:
-            # Check date range
-            if blackout.end_date:
-                if not (blackout.blackout_date <= check_date <= blackout.end_date):
-                    continue
-            else:
-                if blackout.blackout_date != check_date:
-                    continue
-            
-            # Check time range for partial day blackouts
-            if (blackout.blackout_type == "partial_day" and 
-                blackout.start_time and blackout.end_time and check_time):
-                if not (blackout.start_time <= check_time <= blackout.end_time):
-                    continue
-            
-            return True, blackout
-        
-        return False, None
+        return is_blocked, blackout
 
 
 class ConflictDetectionService:
@@ -149,38 +134,87 @@ class ConflictDetectionService:
         exclude_appointment_id: Optional[int] = None
     ) -> List[ConflictInfo]:
         """Detect conflicts for a proposed appointment slot"""
+        conflict_index = ConflictIndex.load(
+            db, appointment_date, appointment_date, barber_id, location_id, exclude_appointment_id
+        )
+        return conflict_index.conflicts(appointment_date, appointment_time, duration_minutes)
+
+
+class ConflictIndex:
+    """Appointments, blackouts and holidays over a date span, checked in memory
+    
+    Loaded with one appointment query and one blackout query, so a whole
+    recurring series and every alternative slot it probes cost two queries
+    instead of two per probe.  ``conflicts`` reports what
+    ``ConflictDetectionService.detect_appointment_conflicts`` reports for a
+    single slot.
+    """
+    
+    def __init__(
+        self,
+        appointments: Iterable[Tuple[Optional[int], datetime, int]],
+        blackouts: Iterable[models.BlackoutDate],
+        holiday_dates: Set[date]
+    ):
+        # Per day: appointment start times in order, and matching (start, end, id) entries
+        self._starts: Dict[date, List[datetime]] = defaultdict(list)
+        self._entries: Dict[date, List[Tuple[datetime, datetime, Optional[int]]]] = defaultdict(list)
+        self._max_duration = timedelta(0)
+        for appointment_id, start_time, duration_minutes in appointments:
+            self.add(start_time, duration_minutes, appointment_id)
+        
+        self._blackouts = BlackoutIndex(blackouts)
+        self._holidays = holiday_dates
+    
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        start_date: date,
+        end_date: date,
+        barber_id: Optional[int] = None,
+        location_id: Optional[int] = None,
+        exclude_appointment_id: Optional[int] = None
+    ) -> "ConflictIndex":
+        """Index everything that can conflict with a slot from start_date to end_date"""
+        # Answered from the covering (barber_id, start_time, status) index
+        query = active_appointments(
+            db, start_date, end_date, barber_id, exclude_appointment_id,
+            columns=(models.Appointment.id, models.Appointment.start_time, models.Appointment.duration_minutes)
+        )
+        
+        blackouts = BlackoutDateService.get_blackout_dates(db, location_id, barber_id, start_date, end_date)
+        return cls(query.all(), blackouts, HolidayService.get_holidays_between(start_date, end_date))
+    
+    def add(self, start_time: datetime, duration_minutes: int, appointment_id: Optional[int] = None) -> None:
+        """Record an appointment, e.g. one just accepted for the series"""
+        duration = timedelta(minutes=duration_minutes or 0)
+        day = start_time.date()
+        position = bisect_right(self._starts[day], start_time)
+        self._starts[day].insert(position, start_time)
+        self._entries[day].insert(position, (start_time, start_time + duration, appointment_id))
+        self._max_duration = max(self._max_duration, duration)
+    
+    def conflicts(self, appointment_date: date, appointment_time: time, duration_minutes: int) -> List[ConflictInfo]:
+        """Conflicts for a proposed appointment slot"""
         conflicts = []
         
-        # Calculate appointment end time
         start_datetime = datetime.combine(appointment_date, appointment_time)
         end_datetime = start_datetime + timedelta(minutes=duration_minutes)
         
-        # Check for overlapping appointments
-        query = db.query(models.Appointment).filter(
-            models.Appointment.start_time.cast(models.Date) == appointment_date,
-            models.Appointment.status.in_(["pending", "confirmed"]),
-        )
-        
-        if barber_id:
-            query = query.filter(models.Appointment.barber_id == barber_id)
-        
-        if exclude_appointment_id:
-            query = query.filter(models.Appointment.id != exclude_appointment_id)
-        
-        existing_appointments = query.all()
-        
-        for apt in existing_appointments:
-            existing_start = apt.start_time
-            existing_end = existing_start + timedelta(minutes=apt.duration_minutes)
-            
-            # Check for overlap
-            if not (end_datetime <= existing_start or start_datetime >= existing_end):
+        # Only appointments starting within the longest duration before the
+        # slot can still be running when it starts
+        starts = self._starts.get(appointment_date, [])
+        first = bisect_left(starts, start_datetime - self._max_duration)
+        last = bisect_left(starts, end_datetime)
+        for existing_start, existing_end, appointment_id in self._entries.get(appointment_date, [])[first:last]:
+            if existing_end > start_datetime:
                 conflicts.append(ConflictInfo(
                     conflict_type="double_booking",
                     conflict_date=appointment_date,
                     conflict_time=appointment_time,
                     details={
-                        "existing_appointment_id": apt.id,
+                        "existing_appointment_id": appointment_id,
                         "existing_start": existing_start.isoformat(),
                         "existing_end": existing_end.isoformat(),
                         "overlap_minutes": min(end_datetime, existing_end).timestamp() - 
@@ -189,12 +223,8 @@ class ConflictDetectionService:
                     suggested_resolution="reschedule"
                 ))
         
-        # Check blackout dates
-        is_blocked, blackout = BlackoutDateService.is_date_blocked(
-            db, appointment_date, location_id, barber_id, appointment_time
-        )
-        
-        if is_blocked:
+        _, blackout, _ = self._blackouts.is_blocked(appointment_date, appointment_time, duration_minutes)
+        if blackout:
             conflicts.append(ConflictInfo(
                 conflict_type="blackout_date",
                 conflict_date=appointment_date,
@@ -208,8 +238,7 @@ class ConflictDetectionService:
                 suggested_resolution="skip" if not blackout.allow_emergency_bookings else "manual_review"
             ))
         
-        # Check holidays if pattern excludes them
-        if HolidayService.is_holiday(appointment_date):
+        if appointment_date in self._holidays:
             conflicts.append(ConflictInfo(
                 conflict_type="holiday",
                 conflict_date=appointment_date,
@@ -448,20 +477,22 @@ class EnhancedRecurringService:
         )
         
         successful_appointments = []
+        new_appointments = []
         conflicts = []
         skipped_dates = []
         
+        # Everything the series can conflict with, loaded once for its whole span
+        if occurrence_dates:
+            conflict_index = ConflictIndex.load(
+                db, occurrence_dates[0], occurrence_dates[-1], pattern.barber_id, pattern.location_id
+            )
+        
         for i, occurrence_date in enumerate(occurrence_dates):
             appointment_datetime = datetime.combine(occurrence_date, pattern.preferred_time)
             
             # Check for conflicts
-            appointment_conflicts = ConflictDetectionService.detect_appointment_conflicts(
-                db=db,
-                appointment_date=occurrence_date,
-                appointment_time=pattern.preferred_time,
-                duration_minutes=pattern.duration_minutes,
-                barber_id=pattern.barber_id,
-                location_id=pattern.location_id
+            appointment_conflicts = conflict_index.conflicts(
+                occurrence_date, pattern.preferred_time, pattern.duration_minutes
             )
             
             if appointment_conflicts:
@@ -471,7 +502,7 @@ class EnhancedRecurringService:
                 if auto_resolve_conflicts and pattern.reschedule_on_conflict:
                     # Try to find alternative time slots
                     resolved_slot = EnhancedRecurringService._find_alternative_slot(
-                        db, occurrence_date, pattern, appointment_conflicts
+                        conflict_index, occurrence_date, pattern, appointment_conflicts
                     )
                     
                     if resolved_slot:
@@ -501,14 +532,24 @@ class EnhancedRecurringService:
                 "buffer_time_after": pattern.buffer_time_after
             }
             
+            # Later occurrences must not be placed on top of this one
+            conflict_index.add(appointment_datetime, pattern.duration_minutes)
+            
             if not preview_only:
-                appointment = models.Appointment(**appointment_data)
-                db.add(appointment)
-                appointment_data["appointment_id"] = appointment.id
+                # Appointment has no location column; the location stays in the returned data
+                new_appointments.append(models.Appointment(
+                    **{key: value for key, value in appointment_data.items() if key != "location_id"}
+                ))
             
             successful_appointments.append(appointment_data)
         
         if not preview_only:
+            # One batched INSERT for the whole series; the flush assigns the ids
+            db.add_all(new_appointments)
+            db.flush()
+            for appointment_data, appointment in zip(successful_appointments, new_appointments):
+                appointment_data["appointment_id"] = appointment.id
+            
             # Update pattern tracking
             pattern.last_generated_date = date.today()
             pattern.total_generated += len(successful_appointments)
@@ -525,7 +566,7 @@ class EnhancedRecurringService:
     
     @staticmethod
     def _find_alternative_slot(
-        db: Session,
+        conflict_index: ConflictIndex,
         target_date: date,
         pattern: models.RecurringAppointmentPattern,
         conflicts: List[ConflictInfo]
@@ -548,14 +589,7 @@ class EnhancedRecurringService:
                 continue
             
             # Check for conflicts at this time
-            test_conflicts = ConflictDetectionService.detect_appointment_conflicts(
-                db=db,
-                appointment_date=target_date,
-                appointment_time=candidate_time,
-                duration_minutes=pattern.duration_minutes,
-                barber_id=pattern.barber_id,
-                location_id=pattern.location_id
-            )
+            test_conflicts = conflict_index.conflicts(target_date, candidate_time, pattern.duration_minutes)
             
             if not test_conflicts:
                 return datetime.combine(target_date, candidate_time)
@@ -631,7 +665,9 @@ class EnhancedRecurringService:
                 })
             
             elif action_data.action == "complete":
-                apt.status = "completed"
+                if apt.status != "completed":
+                    apt.status = "completed"
+                    record_appointment_completion(db, apt)
                 result["affected_appointments"].append({
                     "appointment_id": apt.id,
                     "action": "completed"
@@ -656,6 +692,7 @@ __all__ = [
     "EnhancedRecurringService",
     "RecurringSeriesService", 
     "ConflictDetectionService",
+    "ConflictIndex",
     "BlackoutDateService",
     "HolidayService",
     "AppointmentGenerationResult",
@@ -0,0 +1,312 @@
+"""
+Background export jobs with artifacts kept on disk.
+
+Large exports are built outside the request: ``submit`` registers a job and
+returns immediately, a small thread pool writes the file with
+``ExportService.write_export_file`` (openpyxl write-only mode for Excel), and
+the finished artifact is served from disk with HTTP range support.
+
+Artifacts are named after a hash of the export parameters, so an identical
+filter set reuses the running or completed job instead of rebuilding, and a
+completed artifact survives worker restarts until ``ARTIFACT_TTL_SECONDS``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time as time_module
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from services.export_service import export_service
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_TTL_SECONDS = 6 * 3600
+MAX_WORKERS = 2
+
+FILE_TYPES = {
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('csv', 'text/csv'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+}
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single-range ``Range`` header.
+
+    Returns None when there is no usable header (serve the whole file) and
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match:
+        # Multi-range and other units are not supported; send everything
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+class ExportJob:
+    """State of one export job; ``to_progress`` matches routers.exports.ExportProgress"""
+
+    def __init__(self, job_id: str, artifact_key: str, data_type: str, format: str, user_id: Optional[int]):
+        self.id = job_id
+        self.artifact_key = artifact_key
+        self.data_type = data_type
+        self.format = format
+        self.owner_ids = {user_id} if user_id is not None else set()
+        self.status = "pending"
+        self.rows_written = 0
+        self.total_rows = 0
+        self.message: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.completed_at: Optional[datetime] = None
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.mime_type = FILE_TYPES[format][1]
+
+    @property
+    def progress_percent(self) -> int:
+        if self.status == "completed":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.rows_written / self.total_rows * 100), 99)
+
+    def to_progress(self) -> Dict[str, Any]:
+        return {
+            "export_id": self.id,
+            "status": self.status,
+            "progress_percent": self.progress_percent,
+            "message": self.message,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "download_url": f"/api/v2/exports/download/{self.id}" if self.status == "completed" else None
+        }
+
+
+class ExportJobManager:
+    """Runs export jobs on a thread pool and tracks their artifacts"""
+
+    def __init__(
+        self,
+        artifact_dir: Optional[str] = None,
+        max_workers: int = MAX_WORKERS,
+        artifact_ttl_seconds: int = ARTIFACT_TTL_SECONDS,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        self.artifact_dir = artifact_dir or os.path.join(tempfile.gettempdir(), "bookedbarber_exports")
+        self.artifact_ttl_seconds = artifact_ttl_seconds
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExportJob] = {}
+        self._by_artifact: Dict[str, str] = {}
+        self.stats = {"submitted": 0, "deduplicated": 0, "reused_from_disk": 0, "completed": 0, "failed": 0}
+
+    @staticmethod
+    def artifact_key(data_type: str, format: str, options: Dict[str, Any]) -> str:
+        """Stable hash of everything that determines the artifact's contents"""
+        payload = json.dumps(
+            {"type": data_type, "format": format.lower(), "options": options},
+            sort_keys=True,
+            default=lambda value: value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def submit(
+        self,
+        data_type: str,
+        format: str = 'excel',
+        options: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None
+    ) -> Tuple[ExportJob, bool]:
+        """Queue an export, or attach to an identical one.
+
+        Returns:
+            (job, deduplicated) - ``deduplicated`` is True when an existing
+            job or artifact on disk was reused
+        """
+        format = format.lower()
+        if format not in FILE_TYPES:
+            raise ValueError(f"Unsupported export format: {format}. Supported formats: {', '.join(FILE_TYPES)}")
+        if data_type == 'analytics' and format != 'excel':
+            raise ValueError(f"Analytics export not supported for format: {format}")
+        if data_type not in ('clients', 'appointments', 'analytics'):
+            raise ValueError(f"Unsupported export type: {data_type}")
+
+        options = {key: value for key, value in (options or {}).items() if value is not None}
+        if isinstance(options.get('filters'), dict):
+            options['filters'] = {key: value for key, value in options['filters'].items() if value is not None}
+        key = self.artifact_key(data_type, format, options)
+
+        with self._lock:
+            self.cleanup_expired()
+            existing = self._jobs.get(self._by_artifact.get(key, ""))
+            if existing is not None and existing.status != "failed":
+                if user_id is not None:
+                    existing.owner_ids.add(user_id)
+                self.stats["deduplicated"] += 1
+                return existing, True
+
+            job = ExportJob(uuid.uuid4().hex, key, data_type, format, user_id)
+            self._jobs[job.id] = job
+            self._by_artifact[key] = job.id
+            self.stats["submitted"] += 1
+
+            if self._restore_from_disk(job):
+                self.stats["reused_from_disk"] += 1
+                return job, True
+
+        self._executor.submit(self._run, job, options)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def can_access(self, job: ExportJob, user: Any) -> bool:
+        return user.id in job.owner_ids or getattr(user, "role", None) in ("admin", "super_admin")
+
+    def clear(self) -> int:
+        """Forget all jobs and delete artifacts; returns files removed"""
+        with self._lock:
+            self._jobs.clear()
+            self._by_artifact.clear()
+            removed = 0
+            if os.path.isdir(self.artifact_dir):
+                for name in os.listdir(self.artifact_dir):
+                    try:
+                        os.remove(os.path.join(self.artifact_dir, name))
+                        removed += 1
+                    except OSError:
+                        pass
+            return removed
+
+    def cleanup_expired(self) -> None:
+        """Drop finished jobs and artifacts older than the TTL"""
+        cutoff = time_module.time() - self.artifact_ttl_seconds
+        expired: List[str] = [
+            job_id for job_id, job in self._jobs.items()
+            if job.completed_at is not None and job.completed_at.timestamp() < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_artifact.get(job.artifact_key) == job_id:
+                del self._by_artifact[job.artifact_key]
+
+        if not os.path.isdir(self.artifact_dir):
+            return
+        for name in os.listdir(self.artifact_dir):
+            path = os.path.join(self.artifact_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in list(self._jobs.values()):
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {**self.stats, "jobs": statuses}
+
+    # Internals
+
+    def _paths(self, job: ExportJob) -> Tuple[str, str]:
+        extension = FILE_TYPES[job.format][0]
+        base = os.path.join(self.artifact_dir, f"{job.data_type}_{job.artifact_key}")
+        return f"{base}.{extension}", f"{base}.json"
+
+    def _restore_from_disk(self, job: ExportJob) -> bool:
+        """Attach a completed artifact left by an earlier job or process"""
+        path, meta_path = self._paths(job)
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return False
+        if os.path.getmtime(path) < time_module.time() - self.artifact_ttl_seconds:
+            return False
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return False
+
+        job.path = path
+        job.filename = meta.get("filename") or os.path.basename(path)
+        job.rows_written = job.total_rows = meta.get("rows", 0)
+        job.status = "completed"
+        job.completed_at = datetime.utcnow()
+        job.message = "Reused existing export"
+        return True
+
+    def _run(self, job: ExportJob, options: Dict[str, Any]) -> None:
+        path, meta_path = self._paths(job)
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        # Write next to the final path so the rename is atomic
+        temp_path = f"{path}.{job.id}.part"
+        job.status = "processing"
+
+        def progress(written: int, total: int) -> None:
+            job.rows_written = written
+            job.total_rows = total
+
+        try:
+            rows = export_service.write_export_file(
+                temp_path,
+                job.data_type,
+                job.format,
+                options,
+                session_factory=self.session_factory,
+                progress=progress
+            )
+            os.replace(temp_path, path)
+            job.filename = f'{job.data_type}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{FILE_TYPES[job.format][0]}'
+            with open(meta_path, "w") as meta_file:
+                json.dump({"filename": job.filename, "rows": rows, "format": job.format}, meta_file)
+
+            job.path = path
+            job.rows_written = rows
+            job.status = "completed"
+            job.completed_at = datetime.utcnow()
+            job.message = f"Exported {rows} records"
+            self.stats["completed"] += 1
+            logger.info(f"Export job {job.id} completed: {job.data_type}/{job.format}, {rows} rows")
+        except Exception as e:
+            job.status = "failed"
+            job.completed_at = datetime.utcnow()
+            job.message = "Export failed. Please try again later."
+            self.stats["failed"] += 1
+            logger.error(f"Export job {job.id} failed: {e}", exc_info=True)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+# Global job manager instance
+export_job_manager = ExportJobManager()
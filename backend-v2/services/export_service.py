@@ -1,6 +1,6 @@
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any, Union
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy import and_, or_, func, text
 import models
 import pandas as pd
@@ -12,6 +12,8 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.chart import LineChart, PieChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils import get_column_letter
+from openpyxl.cell import WriteOnlyCell
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
@@ -19,7 +21,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import logging
 import asyncio
-from typing import AsyncIterator
+import zlib
+from typing import AsyncIterator, Callable, Iterable, Iterator, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +34,11 @@ class ExportService:
     def __init__(self):
         self.supported_formats = ['csv', 'excel', 'json', 'pdf']
         self.max_export_records = 50000  # Prevent memory issues
+        self.stream_formats = {
+            'csv': ('csv', 'text/csv'),
+            'ndjson': ('ndjson', 'application/x-ndjson')
+        }
+        self.stream_batch_size = 1000
         
     async def export_clients(
         self,
@@ -55,24 +63,7 @@ class ExportService:
         """
         logger.info(f"Starting client export: format={format}, filters={filters}, include_pii={include_pii}")
         
-        # Build query with filters
-        query = db.query(models.Client)
-        
-        if filters:
-            if 'date_from' in filters and filters['date_from']:
-                query = query.filter(models.Client.created_at >= filters['date_from'])
-            if 'date_to' in filters and filters['date_to']:
-                query = query.filter(models.Client.created_at <= filters['date_to'])
-            if 'customer_type' in filters and filters['customer_type']:
-                query = query.filter(models.Client.customer_type == filters['customer_type'])
-            if 'preferred_barber_id' in filters and filters['preferred_barber_id']:
-                query = query.filter(models.Client.preferred_barber_id == filters['preferred_barber_id'])
-            if 'tags' in filters and filters['tags']:
-                query = query.filter(models.Client.tags.contains(filters['tags']))
-            if 'min_visits' in filters and filters['min_visits']:
-                query = query.filter(models.Client.total_visits >= filters['min_visits'])
-            if 'min_spent' in filters and filters['min_spent']:
-                query = query.filter(models.Client.total_spent >= filters['min_spent'])
+        query = self._apply_client_filters(db.query(models.Client), filters)
         
         # Limit records to prevent memory issues
         total_count = query.count()
@@ -82,36 +73,7 @@ class ExportService:
         clients = query.order_by(models.Client.created_at.desc()).all()
         
         # Prepare data for export
-        client_data = []
-        for client in clients:
-            client_row = {
-                'id': client.id,
-                'first_name': client.first_name if include_pii else 'REDACTED',
-                'last_name': client.last_name if include_pii else 'REDACTED',
-                'email': str(client.email) if include_pii else 'REDACTED',
-                'phone': str(client.phone) if (include_pii and client.phone) else 'REDACTED',
-                'customer_type': client.customer_type,
-                'total_visits': client.total_visits,
-                'total_spent': client.total_spent,
-                'average_ticket': client.average_ticket,
-                'visit_frequency_days': client.visit_frequency_days,
-                'no_show_count': client.no_show_count,
-                'cancellation_count': client.cancellation_count,
-                'referral_count': client.referral_count,
-                'first_visit_date': client.first_visit_date.isoformat() if client.first_visit_date else None,
-                'last_visit_date': client.last_visit_date.isoformat() if client.last_visit_date else None,
-                'tags': client.tags,
-                'preferred_barber_id': client.preferred_barber_id,
-                'created_at': client.created_at.isoformat(),
-                'updated_at': client.updated_at.isoformat() if client.updated_at else None,
-            }
-            
-            if not include_pii:
-                client_row['notes'] = 'REDACTED' if client.notes else None
-            else:
-                client_row['notes'] = str(client.notes) if client.notes else None
-                
-            client_data.append(client_row)
+        client_data = [self._client_row(client, include_pii) for client in clients]
         
         # Generate export based on format
         if format.lower() == 'csv':
@@ -148,41 +110,7 @@ class ExportService:
         """
         logger.info(f"Starting appointment export: format={format}, filters={filters}")
         
-        # Build query with joins for related data
-        query = db.query(
-            models.Appointment,
-            models.User.name.label('user_name'),
-            models.User.email.label('user_email'),
-            models.Client.first_name.label('client_first_name'),
-            models.Client.last_name.label('client_last_name'),
-            models.User.name.label('barber_name')  # This will be for barber
-        ).outerjoin(
-            models.User, models.Appointment.user_id == models.User.id
-        ).outerjoin(
-            models.Client, models.Appointment.client_id == models.Client.id
-        ).outerjoin(
-            models.User.alias('barber'), models.Appointment.barber_id == models.User.alias('barber').id
-        )
-        
-        # Apply filters
-        if filters:
-            if 'date_from' in filters and filters['date_from']:
-                query = query.filter(models.Appointment.start_time >= filters['date_from'])
-            if 'date_to' in filters and filters['date_to']:
-                query = query.filter(models.Appointment.start_time <= filters['date_to'])
-            if 'status' in filters and filters['status']:
-                if isinstance(filters['status'], list):
-                    query = query.filter(models.Appointment.status.in_(filters['status']))
-                else:
-                    query = query.filter(models.Appointment.status == filters['status'])
-            if 'barber_id' in filters and filters['barber_id']:
-                query = query.filter(models.Appointment.barber_id == filters['barber_id'])
-            if 'service_name' in filters and filters['service_name']:
-                query = query.filter(models.Appointment.service_name == filters['service_name'])
-            if 'min_price' in filters and filters['min_price']:
-                query = query.filter(models.Appointment.price >= filters['min_price'])
-            if 'max_price' in filters and filters['max_price']:
-                query = query.filter(models.Appointment.price <= filters['max_price'])
+        query = self._apply_appointment_filters(self._appointment_query(db), filters)
         
         # Limit records
         total_count = query.count()
@@ -192,33 +120,7 @@ class ExportService:
         appointments = query.order_by(models.Appointment.start_time.desc()).all()
         
         # Prepare data
-        appointment_data = []
-        for row in appointments:
-            appointment = row[0]  # The Appointment object
-            
-            appointment_row = {
-                'id': appointment.id,
-                'user_name': row.user_name,
-                'user_email': row.user_email,
-                'client_name': f"{row.client_first_name or ''} {row.client_last_name or ''}".strip() or 'N/A',
-                'barber_name': row.barber_name or 'Unassigned',
-                'service_name': appointment.service_name,
-                'start_time': appointment.start_time.isoformat(),
-                'duration_minutes': appointment.duration_minutes,
-                'price': appointment.price,
-                'status': appointment.status,
-                'created_at': appointment.created_at.isoformat(),
-            }
-            
-            if include_details:
-                appointment_row.update({
-                    'notes': appointment.notes or '',
-                    'buffer_time_before': appointment.buffer_time_before or 0,
-                    'buffer_time_after': appointment.buffer_time_after or 0,
-                    'google_event_id': appointment.google_event_id or '',
-                })
-            
-            appointment_data.append(appointment_row)
+        appointment_data = [self._appointment_row(row, include_details) for row in appointments]
         
         # Generate export
         if format.lower() == 'csv':
@@ -232,6 +134,280 @@ class ExportService:
         else:
             raise ValueError(f"Unsupported export format: {format}")
     
+    def stream_clients(
+        self,
+        format: str = 'csv',
+        filters: Optional[Dict[str, Any]] = None,
+        include_pii: bool = False,
+        compress: bool = False,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Stream client rows as CSV or NDJSON without materialising the export
+        
+        Rows are read in keyset-paginated batches (newest id first) as plain
+        column tuples, so memory stays flat regardless of row count and
+        ``max_export_records`` does not apply.
+        
+        Args:
+            format: 'csv' or 'ndjson'
+            filters: Same filter criteria as export_clients
+            include_pii: Whether to include personally identifiable information
+            compress: Gzip the stream on the fly
+            session_factory: Creates the session owned by the stream
+                (request-scoped sessions close before the body is sent)
+            batch_size: Rows fetched per round-trip
+            
+        Returns:
+            Iterator of encoded chunks, suitable for a StreamingResponse
+        """
+        self._validate_stream_format(format)
+        
+        def build_query(db: Session):
+            return self._apply_client_filters(db.query(*self._client_columns()), filters)
+        
+        rows = (
+            self._client_row(row, include_pii)
+            for row in self._keyset_rows(build_query, models.Client.id, session_factory, batch_size)
+        )
+        return self._encode_stream(rows, format, compress)
+    
+    def stream_appointments(
+        self,
+        format: str = 'csv',
+        filters: Optional[Dict[str, Any]] = None,
+        include_details: bool = True,
+        compress: bool = False,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Stream appointment rows as CSV or NDJSON; see stream_clients
+        
+        Args:
+            format: 'csv' or 'ndjson'
+            filters: Same filter criteria as export_appointments
+            include_details: Whether to include detailed information
+            compress: Gzip the stream on the fly
+            session_factory: Creates the session owned by the stream
+            batch_size: Rows fetched per round-trip
+            
+        Returns:
+            Iterator of encoded chunks, suitable for a StreamingResponse
+        """
+        self._validate_stream_format(format)
+        
+        def build_query(db: Session):
+            return self._apply_appointment_filters(self._appointment_query(db), filters)
+        
+        rows = (
+            self._appointment_row(row, include_details)
+            for row in self._keyset_rows(build_query, models.Appointment.id, session_factory, batch_size)
+        )
+        return self._encode_stream(rows, format, compress)
+    
+    def stream_file_info(self, data_type: str, format: str, compress: bool = False) -> Tuple[str, str]:
+        """Filename and media type for a streamed export"""
+        extension, media_type = self.stream_formats[format.lower()]
+        filename = f'{data_type}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+        if compress:
+            return f'{filename}.gz', 'application/gzip'
+        return filename, media_type
+    
+    # File exports (used by background export jobs)
+    
+    def write_export_file(
+        self,
+        path: str,
+        data_type: str,
+        format: str = 'excel',
+        options: Optional[Dict[str, Any]] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Write an export to ``path`` without holding it in memory
+        
+        Args:
+            path: Destination file
+            data_type: 'clients', 'appointments' or 'analytics'
+            format: 'excel', 'csv' or 'ndjson' (analytics: 'excel' only)
+            options: filters, include_pii, include_details, date_range, include_charts
+            session_factory: Creates the session used while writing
+            progress: Called with (rows_written, total_rows)
+            
+        Returns:
+            Number of data rows written
+        """
+        options = options or {}
+        format = format.lower()
+        
+        if data_type == 'analytics':
+            if format != 'excel':
+                raise ValueError(f"Analytics export not supported for format: {format}")
+            return self._write_analytics_workbook(path, options, session_factory, progress)
+        
+        if data_type == 'clients':
+            key_column = models.Client.id
+            
+            def build_query(db: Session):
+                return self._apply_client_filters(db.query(*self._client_columns()), options.get('filters'))
+            
+            def to_row(row):
+                return self._client_row(row, options.get('include_pii', False))
+        elif data_type == 'appointments':
+            key_column = models.Appointment.id
+            
+            def build_query(db: Session):
+                return self._apply_appointment_filters(self._appointment_query(db), options.get('filters'))
+            
+            def to_row(row):
+                return self._appointment_row(row, options.get('include_details', True))
+        else:
+            raise ValueError(f"Unsupported export type: {data_type}")
+        
+        total = self._count_rows(build_query, key_column, session_factory)
+        written = [0]
+        
+        def rows():
+            for row in self._keyset_rows(build_query, key_column, session_factory):
+                written[0] += 1
+                if progress and written[0] % self.stream_batch_size == 0:
+                    progress(written[0], total)
+                yield to_row(row)
+        
+        if format == 'excel':
+            self._write_rows_workbook(path, data_type, rows())
+        elif format in self.stream_formats:
+            with open(path, 'wb') as output:
+                for chunk in self._encode_stream(rows(), format, compress=False):
+                    output.write(chunk)
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+        
+        if progress:
+            progress(written[0], max(total, written[0]))
+        return written[0]
+    
+    def _count_rows(
+        self,
+        build_query: Callable[[Session], Any],
+        key_column: Any,
+        session_factory: Optional[Callable[[], Session]] = None
+    ) -> int:
+        if session_factory is None:
+            from database import SessionLocal
+            session_factory = SessionLocal
+        db = session_factory()
+        try:
+            return build_query(db).with_entities(func.count(key_column)).scalar() or 0
+        finally:
+            db.close()
+    
+    def _write_rows_workbook(self, path: str, data_type: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Write-only workbook: rows go straight to disk, summary sheet follows"""
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(data_type.title())
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF")
+        
+        totals = {'rows': 0, 'visits': 0, 'active': 0, 'spent': 0.0, 'no_shows': 0}
+        counts: Dict[str, int] = {}
+        count_field = 'customer_type' if data_type == 'clients' else 'status'
+        
+        for row in rows:
+            if totals['rows'] == 0:
+                # Write-only sheets need widths before the first row
+                for index, name in enumerate(row.keys(), start=1):
+                    ws.column_dimensions[get_column_letter(index)].width = min(max(len(name) + 4, 12), 50)
+                header = []
+                for name in row.keys():
+                    cell = WriteOnlyCell(ws, value=name)
+                    cell.fill = header_fill
+                    cell.font = header_font
+                    cell.alignment = Alignment(horizontal="center")
+                    header.append(cell)
+                ws.append(header)
+            ws.append(list(row.values()))
+            
+            totals['rows'] += 1
+            counts[row.get(count_field)] = counts.get(row.get(count_field), 0) + 1
+            if data_type == 'clients':
+                totals['visits'] += row['total_visits'] or 0
+                totals['active'] += 1 if row['total_visits'] else 0
+                totals['spent'] += row['total_spent'] or 0.0
+                totals['no_shows'] += row['no_show_count'] or 0
+        
+        if totals['rows']:
+            summary_ws = wb.create_sheet("Summary")
+            if data_type == 'clients':
+                self._write_client_summary(summary_ws, totals, counts)
+            else:
+                self._write_appointment_summary(summary_ws, counts)
+        
+        wb.save(path)
+    
+    def _write_client_summary(self, ws, totals: Dict[str, Any], customer_types: Dict[str, int]) -> None:
+        """Client summary computed while rows were written (matches _generate_client_summary)"""
+        rows = totals['rows']
+        summary = {
+            'total_clients': rows,
+            'active_clients': totals['active'],
+            'average_visits': totals['visits'] / rows,
+            'average_spent': totals['spent'] / rows,
+            'total_revenue': totals['spent'],
+            'customer_types': str(customer_types),
+            'no_show_rate': (totals['no_shows'] / totals['visits'] * 100) if totals['visits'] > 0 else 0
+        }
+        
+        title = WriteOnlyCell(ws, value="Client Export Summary")
+        title.font = Font(bold=True, size=14)
+        ws.append([title])
+        ws.append([])
+        for key, value in summary.items():
+            label = WriteOnlyCell(ws, value=key.replace('_', ' ').title())
+            label.font = Font(bold=True)
+            ws.append([label, value])
+    
+    def _write_appointment_summary(self, ws, status_counts: Dict[str, int]) -> None:
+        """Status distribution with a pie chart (matches _add_appointment_summary_charts)"""
+        ws.append(["Appointment Summary"])
+        ws.append([])
+        ws.append(["Status", "Count"])
+        for status, count in status_counts.items():
+            ws.append([status, count])
+        
+        pie = PieChart()
+        labels = Reference(ws, min_col=1, min_row=4, max_row=3 + len(status_counts))
+        data = Reference(ws, min_col=2, min_row=3, max_row=3 + len(status_counts))
+        pie.add_data(data, titles_from_data=True)
+        pie.set_categories(labels)
+        pie.title = "Appointments by Status"
+        ws.add_chart(pie, "E3")
+    
+    def _write_analytics_workbook(
+        self,
+        path: str,
+        options: Dict[str, Any],
+        session_factory: Optional[Callable[[], Session]] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        if session_factory is None:
+            from database import SessionLocal
+            session_factory = SessionLocal
+        db = session_factory()
+        try:
+            data = self._collect_analytics_data(db, options.get('date_range'))
+        finally:
+            db.close()
+        if progress:
+            progress(1, 2)
+        self._build_analytics_workbook(data, options.get('include_charts', True)).save(path)
+        if progress:
+            progress(2, 2)
+        return 1
+    
     async def export_analytics(
         self,
         db: Session,
@@ -255,6 +431,20 @@ class ExportService:
         """
         logger.info(f"Starting analytics export: format={format}, date_range={date_range}")
         
+        analytics_data = self._collect_analytics_data(db, date_range)
+        
+        # Generate export
+        if format.lower() == 'excel':
+            return await self._export_analytics_to_excel(analytics_data, include_charts)
+        elif format.lower() == 'json':
+            return await self._export_to_json(analytics_data, 'analytics')
+        elif format.lower() == 'pdf':
+            return await self._export_analytics_to_pdf(analytics_data)
+        else:
+            raise ValueError(f"Analytics export not supported for format: {format}")
+    
+    def _collect_analytics_data(self, db: Session, date_range: Optional[Dict[str, date]] = None) -> Dict[str, Any]:
+        """Gather the analytics sections included in analytics exports"""
         # Set default date range if not provided
         if not date_range:
             end_date = date.today()
@@ -292,23 +482,13 @@ class ExportService:
             logger.warning(f"Could not get Six Figure Barber metrics: {e}")
             six_figure_metrics = None
         
-        analytics_data = {
+        return {
             'revenue': revenue_data,
             'performance': performance_data,
             'clients': client_analytics,
             'six_figure_barber': six_figure_metrics,
             'date_range': date_range
         }
-        
-        # Generate export
-        if format.lower() == 'excel':
-            return await self._export_analytics_to_excel(analytics_data, include_charts)
-        elif format.lower() == 'json':
-            return await self._export_to_json(analytics_data, 'analytics')
-        elif format.lower() == 'pdf':
-            return await self._export_analytics_to_pdf(analytics_data)
-        else:
-            raise ValueError(f"Analytics export not supported for format: {format}")
     
     async def custom_export(
         self,
@@ -352,6 +532,250 @@ class ExportService:
         
         return data
     
+    # Query and row helpers
+    
+    @staticmethod
+    def _iso(value: Optional[Union[datetime, date]]) -> Optional[str]:
+        return value.isoformat() if value else None
+    
+    @staticmethod
+    def _client_columns() -> List[Any]:
+        """Client columns used by exports (no ORM identity map for streams)"""
+        client = models.Client
+        return [
+            client.id, client.first_name, client.last_name, client.email, client.phone,
+            client.customer_type, client.total_visits, client.total_spent, client.average_ticket,
+            client.visit_frequency_days, client.no_show_count, client.cancellation_count,
+            client.referral_count, client.first_visit_date, client.last_visit_date, client.tags,
+            client.preferred_barber_id, client.created_at, client.updated_at, client.notes
+        ]
+    
+    @staticmethod
+    def _apply_client_filters(query, filters: Optional[Dict[str, Any]]):
+        if filters:
+            if 'date_from' in filters and filters['date_from']:
+                query = query.filter(models.Client.created_at >= filters['date_from'])
+            if 'date_to' in filters and filters['date_to']:
+                query = query.filter(models.Client.created_at <= filters['date_to'])
+            if 'customer_type' in filters and filters['customer_type']:
+                query = query.filter(models.Client.customer_type == filters['customer_type'])
+            if 'preferred_barber_id' in filters and filters['preferred_barber_id']:
+                query = query.filter(models.Client.preferred_barber_id == filters['preferred_barber_id'])
+            if 'tags' in filters and filters['tags']:
+                query = query.filter(models.Client.tags.contains(filters['tags']))
+            if 'min_visits' in filters and filters['min_visits']:
+                query = query.filter(models.Client.total_visits >= filters['min_visits'])
+            if 'min_spent' in filters and filters['min_spent']:
+                query = query.filter(models.Client.total_spent >= filters['min_spent'])
+        return query
+    
+    def _client_row(self, client: Any, include_pii: bool) -> Dict[str, Any]:
+        """Export row for a Client model or a row of _client_columns()"""
+        client_row = {
+            'id': client.id,
+            'first_name': client.first_name if include_pii else 'REDACTED',
+            'last_name': client.last_name if include_pii else 'REDACTED',
+            'email': str(client.email) if include_pii else 'REDACTED',
+            'phone': str(client.phone) if (include_pii and client.phone) else 'REDACTED',
+            'customer_type': client.customer_type,
+            'total_visits': client.total_visits,
+            'total_spent': client.total_spent,
+            'average_ticket': client.average_ticket,
+            'visit_frequency_days': client.visit_frequency_days,
+            'no_show_count': client.no_show_count,
+            'cancellation_count': client.cancellation_count,
+            'referral_count': client.referral_count,
+            'first_visit_date': self._iso(client.first_visit_date),
+            'last_visit_date': self._iso(client.last_visit_date),
+            'tags': client.tags,
+            'preferred_barber_id': client.preferred_barber_id,
+            'created_at': self._iso(client.created_at),
+            'updated_at': self._iso(client.updated_at),
+        }
+        
+        if not include_pii:
+            client_row['notes'] = 'REDACTED' if client.notes else None
+        else:
+            client_row['notes'] = str(client.notes) if client.notes else None
+        
+        return client_row
+    
+    @staticmethod
+    def _appointment_query(db: Session):
+        """Appointment columns joined with booking user, client and barber names"""
+        barber = aliased(models.User)
+        appointment = models.Appointment
+        return db.query(
+            appointment.id,
+            appointment.service_name,
+            appointment.start_time,
+            appointment.duration_minutes,
+            appointment.price,
+            appointment.status,
+            appointment.created_at,
+            appointment.notes,
+            appointment.buffer_time_before,
+            appointment.buffer_time_after,
+            appointment.google_event_id,
+            models.User.name.label('user_name'),
+            models.User.email.label('user_email'),
+            models.Client.first_name.label('client_first_name'),
+            models.Client.last_name.label('client_last_name'),
+            barber.name.label('barber_name')
+        ).outerjoin(
+            models.User, appointment.user_id == models.User.id
+        ).outerjoin(
+            models.Client, appointment.client_id == models.Client.id
+        ).outerjoin(
+            barber, appointment.barber_id == barber.id
+        )
+    
+    @staticmethod
+    def _apply_appointment_filters(query, filters: Optional[Dict[str, Any]]):
+        if filters:
+            if 'user_id' in filters and filters['user_id']:
+                query = query.filter(models.Appointment.user_id == filters['user_id'])
+            if 'date_from' in filters and filters['date_from']:
+                query = query.filter(models.Appointment.start_time >= filters['date_from'])
+            if 'date_to' in filters and filters['date_to']:
+                query = query.filter(models.Appointment.start_time <= filters['date_to'])
+            if 'status' in filters and filters['status']:
+                if isinstance(filters['status'], list):
+                    query = query.filter(models.Appointment.status.in_(filters['status']))
+                else:
+                    query = query.filter(models.Appointment.status == filters['status'])
+            if 'barber_id' in filters and filters['barber_id']:
+                query = query.filter(models.Appointment.barber_id == filters['barber_id'])
+            if 'service_name' in filters and filters['service_name']:
+                query = query.filter(models.Appointment.service_name == filters['service_name'])
+            if 'min_price' in filters and filters['min_price']:
+                query = query.filter(models.Appointment.price >= filters['min_price'])
+            if 'max_price' in filters and filters['max_price']:
+                query = query.filter(models.Appointment.price <= filters['max_price'])
+        return query
+    
+    def _appointment_row(self, row: Any, include_details: bool) -> Dict[str, Any]:
+        """Export row for a row of _appointment_query()"""
+        appointment_row = {
+            'id': row.id,
+            'user_name': row.user_name,
+            'user_email': row.user_email,
+            'client_name': f"{row.client_first_name or ''} {row.client_last_name or ''}".strip() or 'N/A',
+            'barber_name': row.barber_name or 'Unassigned',
+            'service_name': row.service_name,
+            'start_time': self._iso(row.start_time),
+            'duration_minutes': row.duration_minutes,
+            'price': row.price,
+            'status': row.status,
+            'created_at': self._iso(row.created_at),
+        }
+        
+        if include_details:
+            appointment_row.update({
+                'notes': row.notes or '',
+                'buffer_time_before': row.buffer_time_before or 0,
+                'buffer_time_after': row.buffer_time_after or 0,
+                'google_event_id': row.google_event_id or '',
+            })
+        
+        return appointment_row
+    
+    # Streaming helpers
+    
+    def _validate_stream_format(self, format: str) -> None:
+        if format.lower() not in self.stream_formats:
+            raise ValueError(
+                f"Unsupported streaming format: {format}. Supported formats: {', '.join(self.stream_formats)}"
+            )
+    
+    def _keyset_rows(
+        self,
+        build_query: Callable[[Session], Any],
+        key_column: Any,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[Any]:
+        """Yield query rows in descending ``key_column`` order, one batch at a time
+        
+        Each batch is ``WHERE key < last_key ORDER BY key DESC LIMIT n`` on the
+        primary key index, so late pages cost the same as the first and no
+        server-side cursor has to stay open between chunks.  The first
+        selected column must be ``key_column``.
+        """
+        if session_factory is None:
+            from database import SessionLocal
+            session_factory = SessionLocal
+        batch_size = batch_size or self.stream_batch_size
+        
+        db = session_factory()
+        try:
+            last_key = None
+            while True:
+                query = build_query(db)
+                if last_key is not None:
+                    query = query.filter(key_column < last_key)
+                batch = query.order_by(key_column.desc()).limit(batch_size).all()
+                if not batch:
+                    return
+                
+                yield from batch
+                
+                if len(batch) < batch_size:
+                    return
+                last_key = batch[-1][0]
+        finally:
+            db.close()
+    
+    def _encode_stream(self, rows: Iterable[Dict[str, Any]], format: str, compress: bool) -> Iterator[bytes]:
+        if format.lower() == 'ndjson':
+            chunks = self._ndjson_chunks(rows)
+        else:
+            chunks = self._csv_chunks(rows)
+        return self._gzip_chunks(chunks) if compress else chunks
+    
+    def _csv_chunks(self, rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """CSV encoded in chunks of ``stream_batch_size`` rows"""
+        buffer = io.StringIO()
+        writer = None
+        pending = 0
+        
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            pending += 1
+            if pending >= self.stream_batch_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    
+    def _ndjson_chunks(self, rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """One JSON document per line, emitted in chunks of ``stream_batch_size`` rows"""
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, default=str))
+            if len(lines) >= self.stream_batch_size:
+                yield ('\n'.join(lines) + '\n').encode()
+                lines = []
+        
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode()
+    
+    @staticmethod
+    def _gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+        """Gzip-compress a byte stream incrementally"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    
     # Format-specific export methods
     
     async def _export_to_csv(self, data: List[Dict], data_type: str) -> Dict[str, Any]:
@@ -504,6 +928,22 @@ class ExportService:
     
     async def _export_analytics_to_excel(self, data: Dict, include_charts: bool = True) -> Dict[str, Any]:
         """Export analytics to Excel with charts and summaries"""
+        wb = self._build_analytics_workbook(data, include_charts)
+        
+        # Save to bytes
+        output = io.BytesIO()
+        wb.save(output)
+        output.seek(0)
+        
+        return {
+            'content': base64.b64encode(output.getvalue()).decode(),
+            'filename': f'analytics_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
+            'mime_type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'encoding': 'base64'
+        }
+    
+    def _build_analytics_workbook(self, data: Dict, include_charts: bool = True) -> Workbook:
+        """Analytics workbook with one sheet per section and an executive summary"""
         wb = Workbook()
         wb.remove(wb.active)  # Remove default sheet
         
@@ -532,17 +972,7 @@ class ExportService:
         wb.active = summary_ws  # Make this the first sheet
         self._add_executive_summary(summary_ws, data)
         
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return {
-            'content': base64.b64encode(output.getvalue()).decode(),
-            'filename': f'analytics_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
-            'mime_type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'encoding': 'base64'
-        }
+        return wb
     
     def _generate_client_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Generate summary statistics for client data"""
@@ -2,15 +2,138 @@ import csv
 import json
 import io
 import re
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, BinaryIO, Iterator, TextIO
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, insert, update, String, type_coerce
 
 import models
 import schemas
 from services import client_service
-from utils.encryption import encrypt_data
+from services.reminder_scheduler import reminder_scheduler
+from utils.encryption import encrypt_data, SearchableEncryptedString
+from utils.parsers.base_parser import ParsedClient
+from utils.parsers.duplicate_index import DuplicateIndex, client_similarity
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits only, without a leading US country code"""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits
+
+
+DUPLICATE_THRESHOLD = 0.8
+
+# Characters read at a time when streaming an import file
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ImportIndex:
+    """In-memory lookup of existing records, loaded once per import.
+    
+    Client emails are stored as ``search_hash|ciphertext``
+    (SearchableEncryptedString); the email index keeps only those hashes,
+    read without decrypting.  Phones are decrypted once and indexed by their
+    digits, since stored hashes only match the exact original formatting.
+    Records inserted during the import are added after each batch is
+    written, so later batches see them too.
+    """
+    
+    MIN_PHONE_DIGITS = 7
+    
+    def __init__(self):
+        self.client_emails: Dict[str, int] = {}
+        self.client_phones: Dict[str, int] = {}
+        self.service_names: Dict[str, int] = {}
+        self.client_names: Dict[str, int] = {}
+    
+    @staticmethod
+    def email_hash(email: Optional[str]) -> Optional[str]:
+        email = (email or "").strip().lower()
+        return SearchableEncryptedString.create_search_hash(email) if email else None
+    
+    @classmethod
+    def phone_key(cls, phone: Optional[str]) -> Optional[str]:
+        digits = normalize_phone(phone)
+        return digits if len(digits) >= cls.MIN_PHONE_DIGITS else None
+    
+    @staticmethod
+    def name_key(first_name: Optional[str], last_name: Optional[str], date_of_birth: Any) -> Optional[str]:
+        first_name = (first_name or "").strip().lower()
+        last_name = (last_name or "").strip().lower()
+        if not (first_name and last_name and date_of_birth):
+            return None
+        return f"{first_name}|{last_name}|{date_of_birth}"
+    
+    @classmethod
+    def load(cls, db: Session, import_type: str, include_names: bool = False) -> "ImportIndex":
+        """Build the index; ``include_names`` adds name + date of birth keys for duplicate previews"""
+        index = cls()
+        if import_type in ("clients", "appointments"):
+            raw = db.query(
+                models.Client.id,
+                type_coerce(models.Client.email, String),
+                type_coerce(models.Client.phone, String)
+            ).yield_per(5000)
+            decoder = SearchableEncryptedString()
+            for client_id, email, phone in raw:
+                email_hash = cls._stored_email_hash(decoder, email)
+                if email_hash:
+                    index.client_emails.setdefault(email_hash, client_id)
+                if phone and import_type == "clients":
+                    try:
+                        phone_key = cls.phone_key(decoder.process_result_value(phone, None))
+                    except Exception:
+                        phone_key = None
+                    if phone_key:
+                        index.client_phones.setdefault(phone_key, client_id)
+        if import_type == "clients" and include_names:
+            named = db.query(
+                models.Client.id, models.Client.first_name, models.Client.last_name, models.Client.date_of_birth
+            ).filter(models.Client.date_of_birth.isnot(None)).yield_per(5000)
+            for client_id, first_name, last_name, date_of_birth in named:
+                name_key = cls.name_key(first_name, last_name, date_of_birth)
+                if name_key:
+                    index.client_names.setdefault(name_key, client_id)
+        if import_type == "services":
+            for service_id, name in db.query(models.Service.id, models.Service.name):
+                if name:
+                    index.service_names.setdefault(name.strip(), service_id)
+        return index
+    
+    @classmethod
+    def _stored_email_hash(cls, decoder: SearchableEncryptedString, stored: Optional[str]) -> Optional[str]:
+        if not stored:
+            return None
+        search_hash, separator, _ = stored.partition("|")
+        if separator:
+            return search_hash
+        # Legacy value without a search hash: decrypt once to index it
+        try:
+            return cls.email_hash(decoder.process_result_value(stored, None))
+        except Exception:
+            return None
+    
+    def find_client(self, email: Optional[str], phone: Optional[str] = None) -> Optional[int]:
+        email_hash = self.email_hash(email)
+        if email_hash and email_hash in self.client_emails:
+            return self.client_emails[email_hash]
+        phone_key = self.phone_key(phone)
+        if phone_key:
+            return self.client_phones.get(phone_key)
+        return None
+    
+    def add_client(self, client_id: int, email: Optional[str], phone: Optional[str]) -> None:
+        self.add_client_hashed(client_id, self.email_hash(email), phone)
+    
+    def add_client_hashed(self, client_id: int, email_hash: Optional[str], phone: Optional[str]) -> None:
+        if email_hash:
+            self.client_emails.setdefault(email_hash, client_id)
+        phone_key = self.phone_key(phone)
+        if phone_key:
+            self.client_phones.setdefault(phone_key, client_id)
 
 
 class ImportService:
@@ -26,6 +149,12 @@ class ImportService:
             "json": self._parse_json_format
         }
         
+        # Per-record transforms applied by both the list and streaming parsers
+        self.record_transforms = {
+            "booksy": self._booksy_record,
+            "square": self._square_record
+        }
+        
         # Standard field mappings for different import types
         self.standard_mappings = {
             "clients": {
@@ -123,7 +252,8 @@ class ImportService:
             }
 
     def generate_preview(self, content: str, source_type: str, import_type: str, 
-                        field_mapping: Optional[Dict[str, str]], max_records: int = 10) -> Dict[str, Any]:
+                        field_mapping: Optional[Dict[str, str]], max_records: int = 10,
+                        db: Optional[Session] = None) -> Dict[str, Any]:
         """Generate preview of import data with field mapping and validation"""
         try:
             # Parse content
@@ -137,6 +267,11 @@ class ImportService:
             if not field_mapping:
                 field_mapping = self._generate_field_mapping(parsed_data[0].keys(), import_type)
             
+            # Existing clients, for flagging sample records already in the database
+            index = None
+            if db is not None and import_type == "clients":
+                index = ImportIndex.load(db, import_type, include_names=True)
+            
             # Apply field mapping and validate sample records
             preview_records = []
             for i, record in enumerate(parsed_data[:max_records]):
@@ -148,7 +283,7 @@ class ImportService:
                     "data": mapped_record,
                     "validation_status": "error" if validation_result else "valid",
                     "validation_messages": validation_result,
-                    "is_duplicate": self._is_potential_duplicate(mapped_record, import_type),
+                    "is_duplicate": self._is_potential_duplicate(mapped_record, import_type, index),
                     "suggested_action": "review" if validation_result else "import"
                 })
             
@@ -165,7 +300,7 @@ class ImportService:
                 "total_records": len(parsed_data),
                 "suggested_mapping": field_mapping,
                 "validation_results": validation_results,
-                "potential_duplicates": len(self._find_potential_duplicates(parsed_data, import_type)),
+                "potential_duplicates": len(self._find_potential_duplicates(parsed_data, import_type, field_mapping)),
                 "data_quality_issues": self._identify_data_quality_issues(parsed_data, import_type),
                 "recommendations": recommendations,
                 "estimated_duration": self._estimate_import_duration(len(parsed_data))
@@ -174,20 +309,24 @@ class ImportService:
         except Exception as e:
             raise ValueError(f"Preview generation failed: {str(e)}")
 
-    def execute_import(self, content: str, source_type: str, import_type: str,
+    def execute_import(self, content: Optional[str], source_type: str, import_type: str,
                       field_mapping: Dict[str, str], options: Dict[str, Any],
-                      progress_callback: Callable, db: Session, user_id: int) -> Dict[str, Any]:
-        """Execute the actual import process"""
+                      progress_callback: Callable, db: Session, user_id: int,
+                      file: Optional[BinaryIO] = None) -> Dict[str, Any]:
+        """Execute the actual import process
+        
+        Records are read from ``file`` (a binary file object, e.g. the spooled
+        upload) one batch at a time, so memory stays bounded by the batch
+        size.  ``content`` is still accepted for callers holding the decoded
+        file; it is streamed the same way.
+        """
         try:
-            # Parse data
-            parser = self.supported_sources[source_type]
-            parsed_data = parser(content, import_type)
-            
-            if not parsed_data:
-                raise ValueError("No data found to import")
+            if file is None:
+                file = io.BytesIO((content or "").encode("utf-8"))
+            file_size = file.seek(0, io.SEEK_END) or 1
+            file.seek(0)
             
             # Initialize counters
-            total_records = len(parsed_data)
             processed = 0
             successful = 0
             failed = 0
@@ -198,33 +337,42 @@ class ImportService:
             batch_size = options.get("batch_size", 100)
             error_threshold = options.get("error_threshold", 10)
             rollback_on_error = options.get("rollback_on_error", True)
+            updated = 0
+            skipped = 0
             
-            # Process in batches
-            for batch_start in range(0, total_records, batch_size):
-                batch_end = min(batch_start + batch_size, total_records)
-                batch_data = parsed_data[batch_start:batch_end]
+            # One pass over existing records instead of a lookup per row
+            index = ImportIndex.load(db, import_type)
+            
+            # Process in batches as they are read
+            batches = self.iter_record_batches(file, source_type, import_type, batch_size)
+            for batch_number, batch_data in enumerate(batches, 1):
+                batch_end = processed + len(batch_data)
                 
                 try:
                     batch_result = self._process_batch(
-                        batch_data, field_mapping, import_type, options, db, user_id
+                        batch_data, field_mapping, import_type, options, db, user_id, index
                     )
                     
                     successful += batch_result["successful"]
                     failed += batch_result["failed"]
+                    updated += batch_result["updated"]
+                    skipped += batch_result["skipped"]
                     errors.extend(batch_result["errors"])
                     warnings.extend(batch_result["warnings"])
                     imported_ids.extend(batch_result["imported_ids"])
                     
                     processed = batch_end
                     
-                    # Update progress
+                    # Update progress; the record count is unknown until the
+                    # end, so progress is measured in bytes read
+                    bytes_read = min(file.tell(), file_size)
                     progress_callback({
-                        "percentage": int((processed / total_records) * 100),
+                        "percentage": int((bytes_read / file_size) * 100),
                         "processed": processed,
                         "successful": successful,
                         "failed": failed,
-                        "operation": f"Processing batch {batch_start//batch_size + 1}",
-                        "estimated_completion": self._calculate_eta(processed, total_records)
+                        "operation": f"Processing batch {batch_number}",
+                        "estimated_completion": self._calculate_eta(bytes_read, file_size)
                     })
                     
                     # Check error threshold
@@ -244,10 +392,13 @@ class ImportService:
                         self._rollback_imported_records(imported_ids, import_type, db)
                         raise
                     else:
-                        errors.append(f"Batch {batch_start//batch_size + 1} failed: {str(batch_error)}")
+                        errors.append(f"Batch {batch_number} failed: {str(batch_error)}")
                         failed += len(batch_data)
                         processed = batch_end
             
+            if processed == 0 and not errors:
+                raise ValueError("No data found to import")
+            
             # Final results
             return {
                 "success": failed < error_threshold,
@@ -259,6 +410,9 @@ class ImportService:
                 "imported_record_ids": imported_ids,
                 "summary": {
                     "total_processed": processed,
+                    "inserted": len(imported_ids),
+                    "updated": updated,
+                    "skipped": skipped,
                     "success_rate": (successful / processed * 100) if processed > 0 else 0,
                     "error_rate": (failed / processed * 100) if processed > 0 else 0
                 }
@@ -276,6 +430,87 @@ class ImportService:
                 "summary": {"error": str(e)}
             }
 
+    def iter_record_batches(self, file: BinaryIO, source_type: str, import_type: str,
+                            batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """Read records from a binary file object, yielding lists of at most ``batch_size``
+        
+        CSV sources go through csv.DictReader row by row; a top-level JSON
+        array is decoded one element at a time.  The caller's file is left
+        open.
+        """
+        if source_type not in self.supported_sources:
+            raise ValueError(f"Unsupported source type: {source_type}")
+        
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            if source_type == "json":
+                records = self._iter_json_records(text)
+            else:
+                records = csv.DictReader(text)
+            transform = self.record_transforms.get(source_type)
+            
+            batch = []
+            for record in records:
+                batch.append(transform(dict(record)) if transform else record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            text.detach()
+
+    def _iter_json_records(self, text: TextIO) -> Iterator[Dict[str, Any]]:
+        """Yield the elements of a top-level JSON array without loading the whole document
+        
+        Any other document (an object wrapping the records, or a single
+        record) is small enough in practice and is decoded whole.
+        """
+        buffer = text.read(STREAM_CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            yield from self._json_records(json.loads(buffer + text.read()))
+            return
+        
+        decoder = json.JSONDecoder()
+        position = 1
+        eof = False
+        while True:
+            # Skip separators, refilling the buffer as needed
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer) or eof:
+                    break
+                chunk = text.read(STREAM_CHUNK_SIZE)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+            
+            if position >= len(buffer):
+                raise ValueError("JSON parsing failed: unterminated array")
+            if buffer[position] == "]":
+                return
+            
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                record, end = None, None
+            # A value ending exactly at the buffer edge may be cut short
+            if end is None or (end == len(buffer) and not eof):
+                chunk = text.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    if end is None:
+                        raise ValueError("JSON parsing failed: truncated record")
+                    eof = True
+                    continue
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            
+            yield record
+            position = end
+            # Drop consumed text so the buffer stays around one chunk
+            if position > STREAM_CHUNK_SIZE:
+                buffer, position = buffer[position:], 0
+
     def rollback_import(self, import_id: str, imported_record_ids: List[int],
                        rollback_type: str, selective_criteria: Optional[Dict[str, Any]],
                        db: Session, user_id: int) -> Dict[str, Any]:
@@ -330,54 +565,58 @@ class ImportService:
     def _parse_json_format(self, content: str, import_type: str) -> List[Dict[str, Any]]:
         """Parse JSON format data"""
         try:
-            data = json.loads(content)
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                # Try to find the data array in the JSON
-                for key in ["data", "records", "items", "clients", "appointments"]:
-                    if key in data and isinstance(data[key], list):
-                        return data[key]
-                return [data]  # Single record
-            else:
-                raise ValueError("JSON format not supported")
+            return self._json_records(json.loads(content))
         except Exception as e:
             raise ValueError(f"JSON parsing failed: {str(e)}")
 
+    @staticmethod
+    def _json_records(data: Any) -> List[Dict[str, Any]]:
+        if isinstance(data, list):
+            return data
+        elif isinstance(data, dict):
+            # Try to find the data array in the JSON
+            for key in ["data", "records", "items", "clients", "appointments"]:
+                if key in data and isinstance(data[key], list):
+                    return data[key]
+            return [data]  # Single record
+        else:
+            raise ValueError("JSON format not supported")
+
     def _parse_booksy_format(self, content: str, import_type: str) -> List[Dict[str, Any]]:
         """Parse Booksy export format"""
         # Booksy typically exports CSV with specific column names
-        data = self._parse_csv_format(content, import_type)
+        return [self._booksy_record(record) for record in self._parse_csv_format(content, import_type)]
+
+    @staticmethod
+    def _booksy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply Booksy-specific field transformations"""
+        # Standardize Booksy field names
+        if "Customer Name" in record:
+            name_parts = record["Customer Name"].split(" ", 1)
+            record["first_name"] = name_parts[0]
+            record["last_name"] = name_parts[1] if len(name_parts) > 1 else ""
         
-        # Apply Booksy-specific field transformations
-        for record in data:
-            # Standardize Booksy field names
-            if "Customer Name" in record:
-                name_parts = record["Customer Name"].split(" ", 1)
-                record["first_name"] = name_parts[0]
-                record["last_name"] = name_parts[1] if len(name_parts) > 1 else ""
-            
-            if "Customer Email" in record:
-                record["email"] = record["Customer Email"]
-                
-            if "Customer Phone" in record:
-                record["phone"] = record["Customer Phone"]
+        if "Customer Email" in record:
+            record["email"] = record["Customer Email"]
+            
+        if "Customer Phone" in record:
+            record["phone"] = record["Customer Phone"]
         
-        return data
+        return record
 
     def _parse_square_format(self, content: str, import_type: str) -> List[Dict[str, Any]]:
         """Parse Square export format"""
-        data = self._parse_csv_format(content, import_type)
-        
-        # Apply Square-specific transformations
-        for record in data:
-            # Square uses different field names
-            if "Customer Name" in record:
-                record["customer_name"] = record["Customer Name"]
-            if "Email Address" in record:
-                record["email"] = record["Email Address"]
-        
-        return data
+        return [self._square_record(record) for record in self._parse_csv_format(content, import_type)]
+
+    @staticmethod
+    def _square_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply Square-specific transformations"""
+        # Square uses different field names
+        if "Customer Name" in record:
+            record["customer_name"] = record["Customer Name"]
+        if "Email Address" in record:
+            record["email"] = record["Email Address"]
+        return record
 
     def _parse_acuity_format(self, content: str, import_type: str) -> List[Dict[str, Any]]:
         """Parse Acuity Scheduling export format"""
@@ -440,27 +679,49 @@ class ImportService:
         
         return errors
 
-    def _find_potential_duplicates(self, data: List[Dict[str, Any]], import_type: str) -> List[Dict[str, Any]]:
-        """Find potential duplicate records"""
+    def _find_potential_duplicates(self, data: List[Dict[str, Any]], import_type: str,
+                                   field_mapping: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Find records that look like an earlier record in the file
+        
+        Uses the parsers' blocking index and similarity weights, so only
+        records sharing an email, phone or name key (or a single field, for
+        records missing a name part) are compared.
+        """
         duplicates = []
-        seen = set()
+        if import_type != "clients":
+            return duplicates
         
-        for record in data:
-            if import_type == "clients":
-                # Check for duplicate emails
-                email = record.get("email", "").strip().lower()
-                if email and email in seen:
-                    duplicates.append(record)
-                elif email:
-                    seen.add(email)
+        index = DuplicateIndex(client_similarity, DUPLICATE_THRESHOLD)
+        for position, record in enumerate(data):
+            mapped = self._apply_field_mapping(record, field_mapping) if field_mapping else record
+            client = self._comparable_client(mapped)
+            if index.matches(client):
+                duplicates.append(record)
+            index.add(client, position)
         
         return duplicates
 
-    def _is_potential_duplicate(self, record: Dict[str, Any], import_type: str) -> bool:
-        """Check if a single record is a potential duplicate"""
-        # This would check against existing database records
-        # For now, return False as a placeholder
-        return False
+    def _is_potential_duplicate(self, record: Dict[str, Any], import_type: str,
+                                index: Optional[ImportIndex] = None) -> bool:
+        """Check if a single record matches an existing client by email, phone or name + date of birth"""
+        if import_type != "clients" or index is None:
+            return False
+        if index.find_client(record.get("email"), record.get("phone")) is not None:
+            return True
+        name_key = index.name_key(
+            record.get("first_name"), record.get("last_name"), self._parse_date(record.get("date_of_birth"))
+        )
+        return name_key is not None and name_key in index.client_names
+
+    def _comparable_client(self, record: Dict[str, Any]) -> ParsedClient:
+        """Mapped record with email/phone/date normalized the way ``client_similarity`` compares them"""
+        return ParsedClient(
+            first_name=(record.get("first_name") or "").strip(),
+            last_name=(record.get("last_name") or "").strip(),
+            email=(record.get("email") or "").strip().lower() or None,
+            phone=normalize_phone(record.get("phone")) or None,
+            date_of_birth=self._parse_date(record.get("date_of_birth"))
+        )
 
     def _generate_field_mapping(self, available_fields: List[str], import_type: str) -> Dict[str, str]:
         """Generate automatic field mapping based on field names"""
@@ -583,220 +844,259 @@ class ImportService:
             return f"{int(eta_seconds / 60)} minutes"
 
     def _process_batch(self, batch_data: List[Dict[str, Any]], field_mapping: Dict[str, str],
-                      import_type: str, options: Dict[str, Any], db: Session, user_id: int) -> Dict[str, Any]:
-        """Process a batch of records"""
-        successful = 0
-        failed = 0
+                      import_type: str, options: Dict[str, Any], db: Session, user_id: int,
+                      index: Optional[ImportIndex] = None) -> Dict[str, Any]:
+        """Process a batch of records
+        
+        Records are classified into inserts, updates and skips against the
+        in-memory index, then written with one bulk INSERT (and at most one
+        bulk UPDATE) for the whole batch.  Nothing is committed here.
+        """
+        if index is None:
+            index = ImportIndex.load(db, import_type)
+        
+        if import_type == "clients":
+            plan = self._plan_clients(batch_data, field_mapping, options, index, user_id)
+            model = models.Client
+        elif import_type == "appointments":
+            plan = self._plan_appointments(batch_data, field_mapping, index)
+            model = models.Appointment
+        elif import_type == "services":
+            plan = self._plan_services(batch_data, field_mapping, options, index, user_id)
+            model = models.Service
+        else:
+            raise ValueError(f"Unsupported import type: {import_type}")
+        
+        mappings = [mapping for mapping, _ in plan["inserts"]]
+        if import_type == "clients":
+            # Stored email/phone values start with their search hash, which
+            # ties each returned ID back to its record without decrypting
+            returned = self._bulk_insert(
+                db, model, mappings,
+                type_coerce(models.Client.email, String), type_coerce(models.Client.phone, String)
+            )
+            phones = {
+                SearchableEncryptedString.create_search_hash(mapping["phone"]): mapping["phone"]
+                for mapping in mappings if mapping["phone"]
+            }
+            for record_id, stored_email, stored_phone in returned:
+                phone_hash = (stored_phone or "").partition("|")[0]
+                index.add_client_hashed(record_id, (stored_email or "").partition("|")[0], phones.get(phone_hash))
+        elif import_type == "services":
+            returned = self._bulk_insert(db, model, mappings, model.name)
+            for record_id, name in returned:
+                index.service_names.setdefault(name, record_id)
+        else:
+            returned = self._bulk_insert(db, model, mappings)
+            if returned:
+                # Bulk inserts bypass the Session listeners that materialize reminders
+                reminder_scheduler.refresh(
+                    db, db.query(model).filter(model.id.in_([row[0] for row in returned])), replace=False
+                )
+        imported_ids = [row[0] for row in returned]
+        
+        if plan["updates"]:
+            db.execute(update(model), plan["updates"])
+        
+        return {
+            "successful": len(plan["inserts"]) + len(plan["updates"]) + plan["skipped"],
+            "failed": len(plan["errors"]),
+            "updated": len(plan["updates"]),
+            "skipped": plan["skipped"],
+            "errors": plan["errors"],
+            "warnings": [],
+            "imported_ids": imported_ids
+        }
+
+    @staticmethod
+    def _bulk_insert(db: Session, model: Any, mappings: List[Dict[str, Any]], *columns: Any) -> List[Any]:
+        """Insert all mappings as one executemany, returning (id, *columns) rows
+        
+        Rows come back in no particular order; requiring parameter order would
+        make SQLAlchemy fall back to one INSERT per row on SQLite.
+        """
+        if not mappings:
+            return []
+        # render_nulls keeps rows with missing optional values in the same
+        # executemany instead of grouping them by which keys are None
+        statement = insert(model).returning(model.id, *columns).execution_options(render_nulls=True)
+        return list(db.execute(statement, mappings))
+
+    @staticmethod
+    def _parse_date(value: Optional[str]) -> Optional[Any]:
+        value = (value or "").strip()
+        if not value:
+            return None
+        for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    def _plan_clients(self, batch_data: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                      options: Dict[str, Any], index: ImportIndex, user_id: int) -> Dict[str, Any]:
+        """Classify client records into inserts, updates and skips"""
+        duplicate_handling = options.get("duplicate_handling", "skip")
+        now = datetime.utcnow()
+        inserts = []
+        updates: Dict[int, Dict[str, Any]] = {}
+        pending = ImportIndex()  # Records inserted earlier in this batch
+        skipped = 0
         errors = []
-        warnings = []
-        imported_ids = []
         
         for i, record in enumerate(batch_data):
             try:
-                mapped_record = self._apply_field_mapping(record, field_mapping)
+                record = self._apply_field_mapping(record, field_mapping)
+                email = (record.get("email") or "").strip().lower()
+                phone = (record.get("phone") or "").strip() or None
                 
-                # Import based on type
-                if import_type == "clients":
-                    result = self._import_client(mapped_record, options, db, user_id)
-                elif import_type == "appointments":
-                    result = self._import_appointment(mapped_record, options, db, user_id)
-                elif import_type == "services":
-                    result = self._import_service(mapped_record, options, db, user_id)
-                else:
-                    raise ValueError(f"Unsupported import type: {import_type}")
+                existing_id = index.find_client(email, phone)
+                if existing_id is None and pending.find_client(email, phone) is not None:
+                    # Repeated within the batch: first occurrence wins
+                    skipped += 1
+                    continue
+                
+                if existing_id is not None:
+                    if duplicate_handling == "update":
+                        changes = updates.setdefault(existing_id, {"id": existing_id})
+                        for field in ("first_name", "last_name", "phone", "notes"):
+                            if record.get(field):
+                                changes[field] = record[field]
+                        date_of_birth = self._parse_date(record.get("date_of_birth"))
+                        if date_of_birth:
+                            changes["date_of_birth"] = date_of_birth
+                        changes["updated_at"] = now
+                    else:
+                        skipped += 1
+                    continue
+                
+                mapping = {
+                    "first_name": record.get("first_name", ""),
+                    "last_name": record.get("last_name", ""),
+                    "email": email,
+                    "phone": phone,
+                    "notes": record.get("notes", ""),
+                    "date_of_birth": self._parse_date(record.get("date_of_birth")),
+                    "created_by_id": user_id,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                pending.add_client(len(inserts), email, phone)
+                inserts.append((mapping, i))
                 
-                if result["success"]:
-                    successful += 1
-                    if result.get("record_id"):
-                        imported_ids.append(result["record_id"])
-                else:
-                    failed += 1
-                    errors.append(result["error"])
-                    
             except Exception as e:
-                failed += 1
-                errors.append(f"Record {i + 1}: {str(e)}")
+                errors.append(f"Record {i + 1}: Failed to import client: {str(e)}")
         
-        return {
-            "successful": successful,
-            "failed": failed,
-            "errors": errors,
-            "warnings": warnings,
-            "imported_ids": imported_ids
-        }
+        return {"inserts": inserts, "updates": list(updates.values()), "skipped": skipped, "errors": errors}
 
-    def _import_client(self, record: Dict[str, Any], options: Dict[str, Any], 
-                      db: Session, user_id: int) -> Dict[str, Any]:
-        """Import a single client record"""
-        try:
-            # Check for existing client by email
-            email = record.get("email", "").strip().lower()
-            existing_client = None
-            
-            if email:
-                existing_client = db.query(models.Client).filter(
-                    models.Client.email == email
-                ).first()
-            
-            duplicate_handling = options.get("duplicate_handling", "skip")
-            
-            if existing_client:
-                if duplicate_handling == "skip":
-                    return {"success": True, "message": "Skipped duplicate"}
-                elif duplicate_handling == "update":
-                    # Update existing client
-                    for field, value in record.items():
-                        if hasattr(existing_client, field) and value:
-                            setattr(existing_client, field, value)
-                    
-                    existing_client.updated_at = datetime.utcnow()
-                    db.commit()
-                    db.refresh(existing_client)
-                    
-                    return {"success": True, "record_id": existing_client.id, "message": "Updated existing client"}
-            
-            # Create new client
-            client_data = {
-                "first_name": record.get("first_name", ""),
-                "last_name": record.get("last_name", ""),
-                "email": email,
-                "phone": record.get("phone", ""),
-                "notes": record.get("notes", ""),
-                "created_by_id": user_id,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-            # Handle date of birth
-            dob_str = record.get("date_of_birth", "")
-            if dob_str:
+    def _plan_appointments(self, batch_data: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                           index: ImportIndex) -> Dict[str, Any]:
+        """Resolve clients from the index and build appointment rows"""
+        now = datetime.utcnow()
+        inserts = []
+        errors = []
+        
+        for i, record in enumerate(batch_data):
+            try:
+                record = self._apply_field_mapping(record, field_mapping)
+                client_email = (record.get("client_email") or "").strip().lower()
+                if not client_email:
+                    errors.append("Client email is required")
+                    continue
+                
+                client_id = index.find_client(client_email)
+                if client_id is None:
+                    errors.append(f"Client not found: {client_email}")
+                    continue
+                
+                start_time_str = record.get("start_time", "")
                 try:
-                    client_data["date_of_birth"] = datetime.strptime(dob_str, "%Y-%m-%d").date()
+                    start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
                 except ValueError:
-                    # Try other date formats
-                    for fmt in ["%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]:
-                        try:
-                            client_data["date_of_birth"] = datetime.strptime(dob_str, fmt).date()
-                            break
-                        except ValueError:
-                            continue
-            
-            new_client = models.Client(**client_data)
-            db.add(new_client)
-            db.flush()  # Get ID without committing
-            
-            return {"success": True, "record_id": new_client.id, "message": "Created new client"}
-            
-        except Exception as e:
-            return {"success": False, "error": f"Failed to import client: {str(e)}"}
+                    errors.append(f"Invalid start time format: {start_time_str}")
+                    continue
+                
+                inserts.append(({
+                    "user_id": client_id,  # Link to client's user account if exists
+                    "client_id": client_id,
+                    "service_name": record.get("service_name", ""),
+                    "start_time": start_time,
+                    "duration_minutes": int(record.get("duration_minutes", 30)),
+                    "price": float(record.get("price", 0)),
+                    "status": record.get("status", "confirmed"),
+                    "notes": record.get("notes", ""),
+                    "created_at": now
+                }, i))
+                
+            except Exception as e:
+                errors.append(f"Record {i + 1}: Failed to import appointment: {str(e)}")
+        
+        return {"inserts": inserts, "updates": [], "skipped": 0, "errors": errors}
 
-    def _import_appointment(self, record: Dict[str, Any], options: Dict[str, Any],
-                           db: Session, user_id: int) -> Dict[str, Any]:
-        """Import a single appointment record"""
-        try:
-            # Find client by email
-            client_email = record.get("client_email", "").strip().lower()
-            if not client_email:
-                return {"success": False, "error": "Client email is required"}
-            
-            client = db.query(models.Client).filter(
-                models.Client.email == client_email
-            ).first()
-            
-            if not client:
-                return {"success": False, "error": f"Client not found: {client_email}"}
-            
-            # Parse start time
-            start_time_str = record.get("start_time", "")
+    def _plan_services(self, batch_data: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                       options: Dict[str, Any], index: ImportIndex, user_id: int) -> Dict[str, Any]:
+        """Build service rows, skipping names that already exist"""
+        duplicate_handling = options.get("duplicate_handling", "skip")
+        category_mapping = {
+            "haircut": models.ServiceCategoryEnum.HAIRCUT,
+            "shave": models.ServiceCategoryEnum.SHAVE,
+            "beard": models.ServiceCategoryEnum.BEARD,
+            "treatment": models.ServiceCategoryEnum.HAIR_TREATMENT,
+            "styling": models.ServiceCategoryEnum.STYLING,
+            "color": models.ServiceCategoryEnum.COLOR
+        }
+        now = datetime.utcnow()
+        inserts = []
+        batch_names = set()
+        skipped = 0
+        errors = []
+        
+        for i, record in enumerate(batch_data):
             try:
-                start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
-            except ValueError:
-                return {"success": False, "error": f"Invalid start time format: {start_time_str}"}
-            
-            # Create appointment
-            appointment_data = {
-                "user_id": client.id,  # Link to client's user account if exists
-                "client_id": client.id,
-                "service_name": record.get("service_name", ""),
-                "start_time": start_time,
-                "duration_minutes": int(record.get("duration_minutes", 30)),
-                "price": float(record.get("price", 0)),
-                "status": record.get("status", "confirmed"),
-                "notes": record.get("notes", ""),
-                "created_at": datetime.utcnow()
-            }
-            
-            new_appointment = models.Appointment(**appointment_data)
-            db.add(new_appointment)
-            db.flush()
-            
-            return {"success": True, "record_id": new_appointment.id, "message": "Created appointment"}
-            
-        except Exception as e:
-            return {"success": False, "error": f"Failed to import appointment: {str(e)}"}
-
-    def _import_service(self, record: Dict[str, Any], options: Dict[str, Any],
-                       db: Session, user_id: int) -> Dict[str, Any]:
-        """Import a single service record"""
-        try:
-            # Check for existing service by name
-            service_name = record.get("name", "").strip()
-            if not service_name:
-                return {"success": False, "error": "Service name is required"}
-            
-            existing_service = db.query(models.Service).filter(
-                models.Service.name == service_name
-            ).first()
-            
-            duplicate_handling = options.get("duplicate_handling", "skip")
-            
-            if existing_service and duplicate_handling == "skip":
-                return {"success": True, "message": "Skipped duplicate service"}
-            
-            # Create new service
-            service_data = {
-                "name": service_name,
-                "description": record.get("description", ""),
-                "duration_minutes": int(record.get("duration_minutes", 30)),
-                "base_price": float(record.get("base_price", 0)),
-                "category": models.ServiceCategoryEnum.OTHER,  # Default category
-                "created_by_id": user_id,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-            # Map category if provided
-            category_str = record.get("category", "").lower()
-            category_mapping = {
-                "haircut": models.ServiceCategoryEnum.HAIRCUT,
-                "shave": models.ServiceCategoryEnum.SHAVE,
-                "beard": models.ServiceCategoryEnum.BEARD,
-                "treatment": models.ServiceCategoryEnum.HAIR_TREATMENT,
-                "styling": models.ServiceCategoryEnum.STYLING,
-                "color": models.ServiceCategoryEnum.COLOR
-            }
-            
-            if category_str in category_mapping:
-                service_data["category"] = category_mapping[category_str]
-            
-            new_service = models.Service(**service_data)
-            db.add(new_service)
-            db.flush()
-            
-            return {"success": True, "record_id": new_service.id, "message": "Created service"}
-            
-        except Exception as e:
-            return {"success": False, "error": f"Failed to import service: {str(e)}"}
+                record = self._apply_field_mapping(record, field_mapping)
+                service_name = (record.get("name") or "").strip()
+                if not service_name:
+                    errors.append("Service name is required")
+                    continue
+                
+                exists = service_name in index.service_names or service_name in batch_names
+                if exists and duplicate_handling == "skip":
+                    skipped += 1
+                    continue
+                
+                inserts.append(({
+                    "name": service_name,
+                    "description": record.get("description", ""),
+                    "duration_minutes": int(record.get("duration_minutes", 30)),
+                    "base_price": float(record.get("base_price", 0)),
+                    "category": category_mapping.get(
+                        (record.get("category") or "").lower(), models.ServiceCategoryEnum.OTHER
+                    ),
+                    "created_by_id": user_id,
+                    "created_at": now,
+                    "updated_at": now
+                }, i))
+                batch_names.add(service_name)
+                
+            except Exception as e:
+                errors.append(f"Record {i + 1}: Failed to import service: {str(e)}")
+        
+        return {"inserts": inserts, "updates": [], "skipped": skipped, "errors": errors}
 
     def _rollback_imported_records(self, imported_ids: List[int], import_type: str, db: Session):
         """Rollback imported records in case of error"""
         try:
-            if import_type == "clients":
-                db.query(models.Client).filter(models.Client.id.in_(imported_ids)).delete()
-            elif import_type == "appointments":
-                db.query(models.Appointment).filter(models.Appointment.id.in_(imported_ids)).delete()
-            elif import_type == "services":
-                db.query(models.Service).filter(models.Service.id.in_(imported_ids)).delete()
+            model = {
+                "clients": models.Client,
+                "appointments": models.Appointment,
+                "services": models.Service
+            }.get(import_type)
+            if model is not None:
+                # Chunked so large imports stay under bind parameter limits
+                for start in range(0, len(imported_ids), 1000):
+                    chunk = imported_ids[start:start + 1000]
+                    db.query(model).filter(model.id.in_(chunk)).delete(synchronize_session=False)
             
             db.commit()
         except Exception:
@@ -0,0 +1,260 @@
+"""
+Batched notification dispatch.
+
+``NotificationDispatcher.dispatch`` drains due rows of the notification queue
+in three steps:
+
+1. Claim - due rows are selected (``FOR UPDATE SKIP LOCKED`` where the
+   database supports it) and leased to this run with one UPDATE, then
+   committed.  Concurrent workers skip leased rows; rows whose lease expired
+   because a worker died mid-batch become claimable again.
+2. Send - emails with the same subject and body go out as one SendGrid
+   request with a personalization per recipient; everything else is sent
+   individually.  Provider calls run on a bounded thread pool.
+3. Record - results are written with bulk UPDATEs by primary key and
+   committed every ``flush_size`` results, so a crash loses at most one
+   flush of status updates.
+
+The provider is any object with ``send_email`` / ``send_sms`` (and optionally
+``send_email_batch``) returning the result dicts of ``NotificationService``.
+``FakeNotificationProvider`` stands in for SendGrid/Twilio in local
+throughput benchmarks and tests.
+"""
+
+import json
+import logging
+import threading
+import time as time_module
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import NotificationQueue, NotificationStatus
+
+logger = logging.getLogger(__name__)
+
+# SendGrid accepts at most 1000 personalizations per request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+
+@dataclass
+class ClaimedNotification:
+    """Snapshot of a leased queue row; sends run without touching the session"""
+    id: int
+    notification_type: str
+    recipient: str
+    subject: Optional[str]
+    body: str
+    attempts: int
+    scheduled_for: datetime
+
+
+@dataclass
+class SendJob:
+    """One provider request covering one or more notifications"""
+    channel: str
+    notifications: List[ClaimedNotification] = field(default_factory=list)
+
+
+class NotificationDispatcher:
+    """Claims, sends and records a batch of queued notifications"""
+
+    def __init__(
+        self,
+        provider: Any,
+        max_workers: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        flush_size: int = 100
+    ):
+        self.provider = provider
+        self.max_workers = max_workers or settings.notification_dispatch_concurrency
+        self.lease_seconds = lease_seconds or settings.notification_lease_seconds
+        self.flush_size = flush_size
+
+    def dispatch(self, db: Session, batch_size: int = 50) -> Dict[str, int]:
+        """Send up to ``batch_size`` due notifications; returns processed/successful/failed counts"""
+        claimed = self.claim(db, batch_size, owner=uuid.uuid4().hex)
+        counts = {"processed": len(claimed), "successful": 0, "failed": 0}
+        if not claimed:
+            return counts
+
+        updates: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="notify") as executor:
+            futures = {executor.submit(self._send, job): job for job in self.plan(claimed)}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Exception sending {job.channel} to {len(job.notifications)} recipient(s): {str(e)}")
+                    result = {"success": False, "error": f"Unexpected error: {str(e)}", "unexpected": True}
+
+                for notification in job.notifications:
+                    row = self._status_update(notification, result)
+                    if row["status"] == NotificationStatus.SENT:
+                        counts["successful"] += 1
+                    elif row["status"] == NotificationStatus.FAILED:
+                        counts["failed"] += 1
+                    updates.append(row)
+
+                if len(updates) >= self.flush_size:
+                    self._flush(db, updates)
+                    updates = []
+
+        self._flush(db, updates)
+        return counts
+
+    def claim(self, db: Session, batch_size: int, owner: str) -> List[ClaimedNotification]:
+        """Lease up to ``batch_size`` due rows to ``owner`` and commit the lease"""
+        now = datetime.utcnow()
+        lease_free = or_(NotificationQueue.lease_expires_at.is_(None), NotificationQueue.lease_expires_at < now)
+        due = select(NotificationQueue.id).where(
+            NotificationQueue.status == NotificationStatus.PENDING,
+            NotificationQueue.scheduled_for <= now,
+            NotificationQueue.attempts < settings.notification_retry_attempts,
+            lease_free
+        ).order_by(NotificationQueue.scheduled_for).limit(batch_size).with_for_update(skip_locked=True)
+
+        ids = list(db.scalars(due))
+        if not ids:
+            db.commit()
+            return []
+
+        # Re-checking the lease keeps claims disjoint where SKIP LOCKED is unavailable
+        db.execute(
+            update(NotificationQueue)
+            .where(NotificationQueue.id.in_(ids), lease_free)
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.execute(
+            select(
+                NotificationQueue.id,
+                NotificationQueue.notification_type,
+                NotificationQueue.recipient,
+                NotificationQueue.subject,
+                NotificationQueue.body,
+                NotificationQueue.attempts,
+                NotificationQueue.scheduled_for
+            ).where(NotificationQueue.id.in_(ids), NotificationQueue.lease_owner == owner)
+            .order_by(NotificationQueue.scheduled_for)
+        ).all()
+        db.commit()
+        return [ClaimedNotification(*row) for row in rows]
+
+    def plan(self, claimed: Iterable[ClaimedNotification]) -> List[SendJob]:
+        """Group identical emails into batch requests when the provider supports them"""
+        jobs: List[SendJob] = []
+        groups: Dict[tuple, List[ClaimedNotification]] = {}
+        batch_emails = hasattr(self.provider, "send_email_batch")
+
+        for notification in claimed:
+            if batch_emails and notification.notification_type == "email" and "@" in (notification.recipient or ""):
+                groups.setdefault((notification.subject or "", notification.body), []).append(notification)
+            else:
+                jobs.append(SendJob(notification.notification_type, [notification]))
+
+        for members in groups.values():
+            for start in range(0, len(members), SENDGRID_MAX_PERSONALIZATIONS):
+                chunk = members[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+                jobs.append(SendJob("email_batch" if len(chunk) > 1 else "email", chunk))
+        return jobs
+
+    def _send(self, job: SendJob) -> Dict[str, Any]:
+        first = job.notifications[0]
+        if job.channel == "email_batch":
+            return self.provider.send_email_batch(
+                [notification.recipient for notification in job.notifications],
+                first.subject or "",
+                first.body,
+                retry_count=min(notification.attempts for notification in job.notifications)
+            )
+        if job.channel == "email":
+            return self.provider.send_email(first.recipient, first.subject or "", first.body, retry_count=first.attempts)
+        if job.channel == "sms":
+            return self.provider.send_sms(first.recipient, first.body, retry_count=first.attempts)
+        return {"success": False, "error": f"Unknown notification type: {job.channel}"}
+
+    @staticmethod
+    def _status_update(notification: ClaimedNotification, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Row for the bulk UPDATE; every row carries the same keys so one executemany covers them"""
+        now = datetime.utcnow()
+        row = {
+            "id": notification.id,
+            "status": NotificationStatus.PENDING,
+            "sent_at": None,
+            "attempts": notification.attempts,
+            "error_message": None,
+            "scheduled_for": notification.scheduled_for,
+            "notification_metadata": json.dumps(result, default=str),
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "updated_at": now
+        }
+
+        if result.get("success"):
+            row["status"] = NotificationStatus.SENT
+            row["sent_at"] = now
+            return row
+
+        row["attempts"] = notification.attempts + 1
+        row["error_message"] = result.get("error", "Unknown error")
+        # Unexpected exceptions are retried until attempts run out; provider
+        # errors only when the provider marks them retryable
+        should_retry = result.get("unexpected") or result.get("should_retry", False)
+        if row["attempts"] >= settings.notification_retry_attempts or not should_retry:
+            row["status"] = NotificationStatus.FAILED
+            logger.error(f"Notification {notification.id} failed permanently: {row['error_message']}")
+        else:
+            # Schedule retry with exponential backoff
+            retry_delay = settings.notification_retry_delay_seconds * (2 ** (row["attempts"] - 1))
+            row["scheduled_for"] = now + timedelta(seconds=retry_delay)
+        return row
+
+    @staticmethod
+    def _flush(db: Session, updates: List[Dict[str, Any]]) -> None:
+        if not updates:
+            return
+        db.execute(update(NotificationQueue), updates)
+        db.commit()
+
+
+class FakeNotificationProvider:
+    """In-process stand-in for SendGrid/Twilio with a fixed latency per request"""
+
+    def __init__(self, latency_seconds: float = 0.05, fail_recipients: Iterable[str] = ()):
+        self.latency_seconds = latency_seconds
+        self.fail_recipients = set(fail_recipients)
+        self.requests = 0
+        self.delivered: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def send_email(self, to_email: str, subject: str, body: str, retry_count: int = 0, **kwargs) -> Dict[str, Any]:
+        return self._deliver("email", [to_email], retry_count)
+
+    def send_email_batch(self, to_emails: List[str], subject: str, body: str, retry_count: int = 0) -> Dict[str, Any]:
+        return self._deliver("email", to_emails, retry_count)
+
+    def send_sms(self, to_phone: str, body: str, retry_count: int = 0) -> Dict[str, Any]:
+        return self._deliver("sms", [to_phone], retry_count)
+
+    def _deliver(self, channel: str, recipients: List[str], retry_count: int) -> Dict[str, Any]:
+        time_module.sleep(self.latency_seconds)
+        with self._lock:
+            self.requests += 1
+            failed = [recipient for recipient in recipients if recipient in self.fail_recipients]
+            if failed:
+                return {
+                    "success": False,
+                    "error": f"503 service unavailable for {', '.join(failed)}",
+                    "retry_count": retry_count,
+                    "should_retry": True
+                }
+            self.delivered.extend((channel, recipient) for recipient in recipients)
+        return {"success": True, "status_code": 202, "retry_count": retry_count}
@@ -5,11 +5,11 @@ import asyncio
 import json
 from jinja2 import Template, Environment, FileSystemLoader
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
+from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition, Personalization, To
 from twilio.rest import Client as TwilioClient
 from twilio.base.exceptions import TwilioRestException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, desc, func
 from contextlib import asynccontextmanager
 import redis
 import celery
@@ -21,10 +21,17 @@ from models import (
     NotificationQueue, NotificationStatus, Client, NotificationPreferences
 )
 from database import get_db
+from services.notification_dispatch import NotificationDispatcher
+from services.reminder_scheduler import REMINDER_APPOINTMENT_STATUSES, reminder_scheduler
 from utils.url_shortener import create_appointment_short_url, create_booking_short_url
 
 logger = logging.getLogger(__name__)
 
+# Users per IN (...) when loading preferences and recent sends
+PREFERENCE_CHUNK_SIZE = 1000
+# Compiled Jinja templates kept per service instance
+TEMPLATE_CACHE_SIZE = 256
+
 # Initialize Redis for queueing
 try:
     redis_client = redis.from_url(settings.redis_url)
@@ -62,6 +69,8 @@ class NotificationService:
             loader=FileSystemLoader(str(template_dir)),
             autoescape=True
         )
+        # Compiled database templates keyed by (id, updated_at, part)
+        self._template_cache: Dict[tuple, Template] = {}
         
         # Statistics tracking
         self.stats = {
@@ -92,14 +101,14 @@ class NotificationService:
                     enhanced_context['business_url'] = getattr(settings, 'app_url', 'https://app.bookedbarber.com')
             
             # Render body
-            body_template = Template(template.body)
+            body_template = self._compiled(template, "body")
             rendered_body = body_template.render(**enhanced_context)
             
             result = {"body": rendered_body}
             
             # Render subject for emails
             if template.template_type == "email" and template.subject:
-                subject_template = Template(template.subject)
+                subject_template = self._compiled(template, "subject")
                 result["subject"] = subject_template.render(**enhanced_context)
             
             return result
@@ -107,6 +116,20 @@ class NotificationService:
             logger.error(f"Error rendering template {template.name}: {str(e)}")
             raise
     
+    def _compiled(self, template: NotificationTemplate, part: str) -> Template:
+        """Compiled Jinja template for a template's body or subject, cached per revision"""
+        source = getattr(template, part)
+        if template.id is None:
+            return Template(source)
+        
+        key = (template.id, template.updated_at, part)
+        compiled = self._template_cache.get(key)
+        if compiled is None:
+            if len(self._template_cache) >= TEMPLATE_CACHE_SIZE:
+                self._template_cache.clear()
+            compiled = self._template_cache[key] = Template(source)
+        return compiled
+    
     def send_email(self, to_email: str, subject: str, body: str, 
                    template_id: Optional[str] = None, 
                    attachments: Optional[List[Dict]] = None,
@@ -182,6 +205,64 @@ class NotificationService:
                 "should_retry": should_retry
             }
     
+    def send_email_batch(self, to_emails: List[str], subject: str, body: str,
+                         retry_count: int = 0) -> Dict[str, Any]:
+        """Send the same email to many recipients in one SendGrid request
+        
+        Each recipient gets its own personalization, so addresses are not
+        visible to each other.  At most 1000 recipients per call.
+        """
+        if not self.sendgrid_client:
+            error_msg = "SendGrid client not initialized"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg, "retry_count": retry_count}
+        
+        try:
+            message = Mail(
+                from_email=(settings.sendgrid_from_email, settings.sendgrid_from_name),
+                subject=subject,
+                html_content=body
+            )
+            for to_email in to_emails:
+                personalization = Personalization()
+                personalization.add_to(To(to_email))
+                message.add_personalization(personalization)
+            
+            # Add reply-to address if configured
+            if hasattr(settings, 'sendgrid_reply_to') and settings.sendgrid_reply_to:
+                message.reply_to = settings.sendgrid_reply_to
+            
+            response = self.sendgrid_client.send(message)
+            
+            if response.status_code in [200, 202]:
+                self.stats['emails_sent'] += len(to_emails)
+                logger.info(f"Batch email sent to {len(to_emails)} recipients, status: {response.status_code}")
+                return {
+                    "success": True,
+                    "status_code": response.status_code,
+                    "recipients": len(to_emails),
+                    "retry_count": retry_count
+                }
+            else:
+                raise Exception(f"SendGrid returned status {response.status_code}: {response.body}")
+                
+        except Exception as e:
+            self.stats['emails_failed'] += len(to_emails)
+            error_msg = f"Error sending batch email to {len(to_emails)} recipients: {str(e)}"
+            logger.error(error_msg)
+            
+            should_retry = (
+                retry_count < settings.notification_retry_attempts and
+                self._is_retryable_error(str(e))
+            )
+            
+            return {
+                "success": False,
+                "error": error_msg,
+                "retry_count": retry_count,
+                "should_retry": should_retry
+            }
+    
     def send_sms(self, to_phone: str, body: str, retry_count: int = 0) -> Dict[str, Any]:
         """Send an SMS using Twilio with enhanced error handling"""
         if not self.twilio_client:
@@ -262,49 +343,102 @@ class NotificationService:
         appointment_id: Optional[int] = None
     ) -> List[NotificationQueue]:
         """Queue notifications based on enhanced user preferences"""
-        # Get template
-        template_email = db.query(NotificationTemplate).filter(
-            and_(
-                NotificationTemplate.name == template_name,
-                NotificationTemplate.template_type == "email",
-                NotificationTemplate.is_active == True
-            )
-        ).first()
-        
-        template_sms = db.query(NotificationTemplate).filter(
-            and_(
-                NotificationTemplate.name == template_name,
-                NotificationTemplate.template_type == "sms",
-                NotificationTemplate.is_active == True
-            )
-        ).first()
-        
-        if not template_email and not template_sms:
+        templates = self._load_templates(db, [template_name]).get(template_name)
+        if not templates:
             logger.error(f"No active templates found for {template_name}")
             return []
         
-        # Get enhanced user preferences (fallback to legacy if not found)
-        enhanced_preferences = db.query(NotificationPreferences).filter(
-            NotificationPreferences.user_id == user.id
-        ).first()
+        preferences = self._load_preferences(db, [user])
+        recent_sends = self._load_recent_sends(db, preferences.values())
         
-        legacy_preferences = db.query(NotificationPreference).filter(
-            NotificationPreference.user_id == user.id
-        ).first()
+        queued_notifications = self._queue_for_user(
+            db, user, template_name, templates, preferences[user.id], recent_sends,
+            context, scheduled_for, appointment_id
+        )
         
-        # Create default enhanced preferences if not found
-        if not enhanced_preferences:
-            enhanced_preferences = NotificationPreferences(
-                user_id=user.id,
-                timezone=user.timezone or 'UTC',
-                email_enabled=True,
-                sms_enabled=bool(user.phone),
-                marketing_consent=False  # Default to false for GDPR compliance
+        db.commit()
+        return queued_notifications
+    
+    def _load_templates(self, db: Session, template_names) -> Dict[str, Dict[str, NotificationTemplate]]:
+        """Active email/SMS templates for several names in one query: {name: {type: template}}"""
+        templates: Dict[str, Dict[str, NotificationTemplate]] = {}
+        rows = db.query(NotificationTemplate).filter(
+            and_(
+                NotificationTemplate.name.in_(list(template_names)),
+                NotificationTemplate.template_type.in_(["email", "sms"]),
+                NotificationTemplate.is_active == True
             )
-            db.add(enhanced_preferences)
-            db.commit()
-            db.refresh(enhanced_preferences)
+        ).order_by(NotificationTemplate.id).all()
+        
+        for template in rows:
+            templates.setdefault(template.name, {}).setdefault(template.template_type, template)
+        return templates
+    
+    def _load_preferences(self, db: Session, users) -> Dict[int, NotificationPreferences]:
+        """Enhanced preferences for many users, creating defaults for those without any"""
+        users = {user.id: user for user in users}
+        preferences: Dict[int, NotificationPreferences] = {}
+        user_ids = list(users)
+        for start in range(0, len(user_ids), PREFERENCE_CHUNK_SIZE):
+            chunk = user_ids[start:start + PREFERENCE_CHUNK_SIZE]
+            for row in db.query(NotificationPreferences).filter(NotificationPreferences.user_id.in_(chunk)):
+                preferences[row.user_id] = row
         
+        # Create default enhanced preferences if not found
+        missing = []
+        for user_id, user in users.items():
+            if user_id not in preferences:
+                defaults = NotificationPreferences(
+                    user_id=user_id,
+                    timezone=user.timezone or 'UTC',
+                    email_enabled=True,
+                    sms_enabled=bool(user.phone),
+                    marketing_consent=False  # Default to false for GDPR compliance
+                )
+                preferences[user_id] = defaults
+                missing.append(defaults)
+        if missing:
+            db.add_all(missing)
+            db.flush()
+        return preferences
+    
+    def _load_recent_sends(self, db: Session, preferences) -> Dict[tuple, datetime]:
+        """Last sent time per (user_id, channel) within the weekly window, for frequency limits"""
+        limited = [
+            p.user_id for p in preferences
+            if p.email_frequency in ("daily", "weekly") or p.sms_frequency in ("daily", "weekly")
+        ]
+        recent: Dict[tuple, datetime] = {}
+        since = datetime.utcnow() - timedelta(days=7)
+        for start in range(0, len(limited), PREFERENCE_CHUNK_SIZE):
+            rows = db.query(
+                NotificationQueue.user_id,
+                NotificationQueue.notification_type,
+                func.max(NotificationQueue.sent_at)
+            ).filter(
+                and_(
+                    NotificationQueue.user_id.in_(limited[start:start + PREFERENCE_CHUNK_SIZE]),
+                    NotificationQueue.status == NotificationStatus.SENT,
+                    NotificationQueue.sent_at >= since
+                )
+            ).group_by(NotificationQueue.user_id, NotificationQueue.notification_type)
+            for user_id, channel, last_sent in rows:
+                recent[(user_id, channel)] = last_sent
+        return recent
+    
+    def _queue_for_user(
+        self,
+        db: Session,
+        user: User,
+        template_name: str,
+        templates: Dict[str, NotificationTemplate],
+        enhanced_preferences: NotificationPreferences,
+        recent_sends: Dict[tuple, datetime],
+        context: Dict[str, Any],
+        scheduled_for: Optional[datetime] = None,
+        appointment_id: Optional[int] = None
+    ) -> List[NotificationQueue]:
+        """Add one user's queue rows to the session; the caller commits"""
         # Check if sending time is within quiet hours
         scheduled_time = scheduled_for or datetime.utcnow()
         if enhanced_preferences.is_quiet_time(scheduled_time):
@@ -329,10 +463,11 @@ class NotificationService:
         
         # Check if email should be sent
         should_send_email = enhanced_preferences.should_send_notification(notification_type, "email")
+        template_email = templates.get("email")
         
         if should_send_email and template_email and user.email:
             # Check frequency constraints
-            if self._check_frequency_limit(db, user.id, "email", enhanced_preferences.email_frequency):
+            if self._frequency_allows(recent_sends, user.id, "email", enhanced_preferences.email_frequency):
                 # Add appointment_id to context for URL generation
                 email_context = context.copy()
                 if appointment_id:
@@ -361,10 +496,11 @@ class NotificationService:
         
         # Check if SMS should be sent
         should_send_sms = enhanced_preferences.should_send_notification(notification_type, "sms")
+        template_sms = templates.get("sms")
         
         if should_send_sms and template_sms and user.phone:
             # Check frequency constraints
-            if self._check_frequency_limit(db, user.id, "sms", enhanced_preferences.sms_frequency):
+            if self._frequency_allows(recent_sends, user.id, "sms", enhanced_preferences.sms_frequency):
                 # Add appointment_id to context for URL generation
                 sms_context = context.copy()
                 if appointment_id:
@@ -389,7 +525,6 @@ class NotificationService:
             else:
                 logger.info(f"SMS notification {template_name} skipped for user {user.id} due to frequency limits")
         
-        db.commit()
         return queued_notifications
     
     def _extract_notification_type(self, template_name: str) -> str:
@@ -414,183 +549,119 @@ class NotificationService:
         # Default fallback
         return "system_alerts"
     
-    def _check_frequency_limit(self, db: Session, user_id: int, channel: str, frequency: str) -> bool:
+    def _frequency_allows(self, recent_sends: Dict[tuple, datetime], user_id: int, channel: str, frequency: str) -> bool:
         """Check if user hasn't exceeded their frequency limit"""
         if frequency == "never":
             return False
         elif frequency == "immediate":
             return True
-        elif frequency == "daily":
-            # Check if any notification was sent in the last 24 hours
-            since = datetime.utcnow() - timedelta(days=1)
-            recent_count = db.query(NotificationQueue).filter(
-                and_(
-                    NotificationQueue.user_id == user_id,
-                    NotificationQueue.notification_type == channel,
-                    NotificationQueue.status == NotificationStatus.SENT,
-                    NotificationQueue.sent_at >= since
-                )
-            ).count()
-            return recent_count == 0
-        elif frequency == "weekly":
-            # Check if any notification was sent in the last 7 days
-            since = datetime.utcnow() - timedelta(days=7)
-            recent_count = db.query(NotificationQueue).filter(
-                and_(
-                    NotificationQueue.user_id == user_id,
-                    NotificationQueue.notification_type == channel,
-                    NotificationQueue.status == NotificationStatus.SENT,
-                    NotificationQueue.sent_at >= since
-                )
-            ).count()
-            return recent_count == 0
+        elif frequency in ("daily", "weekly"):
+            # Nothing may have been sent in the last 24 hours / 7 days
+            window = timedelta(days=1) if frequency == "daily" else timedelta(days=7)
+            last_sent = recent_sends.get((user_id, channel))
+            return last_sent is None or last_sent < datetime.utcnow() - window
         
         return True
     
     def schedule_appointment_reminders(self, db: Session, appointment: Appointment):
-        """Schedule reminder notifications for an appointment"""
-        # Get enhanced user preferences
-        enhanced_preferences = db.query(NotificationPreferences).filter(
-            NotificationPreferences.user_id == appointment.user_id
-        ).first()
-        
-        # Fallback to legacy preferences if enhanced not found
-        if not enhanced_preferences:
-            legacy_preferences = db.query(NotificationPreference).filter(
-                NotificationPreference.user_id == appointment.user_id
-            ).first()
-            reminder_hours = legacy_preferences.reminder_hours if legacy_preferences else [24, 2]
-        else:
-            reminder_hours = enhanced_preferences.get_reminder_hours()
+        """Materialize reminder send times for a new or rescheduled appointment
         
-        # Get client and barber information
-        client = db.query(Client).filter(Client.id == appointment.client_id).first() if appointment.client_id else None
-        barber = db.query(User).filter(User.id == appointment.barber_id).first() if appointment.barber_id else None
+        Committed appointment changes are picked up automatically (see
+        services/reminder_scheduler.py); this re-materializes on demand.  The
+        reminders are rendered and queued when they fall due; see
+        queue_due_reminders.
+        """
+        reminders = reminder_scheduler.refresh(db, [appointment])
+        db.commit()
+        return reminders
+    
+    def queue_due_reminders(self, db: Session, batch_size: int = 500) -> int:
+        """Queue every reminder that has fallen due, claiming them in batches
         
-        # Get booking settings for business information
+        Appointments, clients and barbers for a batch are loaded with one
+        query each, and each batch's claim commits together with its queued
+        notifications.
+        """
         from services.booking_service import get_booking_settings
-        booking_settings = get_booking_settings(db)
         
-        # Schedule reminders
-        for hours_before in reminder_hours:
-            reminder_time = appointment.start_time - timedelta(hours=hours_before)
-            if reminder_time > datetime.utcnow():
-                # Calculate hours until appointment for this specific reminder
-                hours_until = hours_before
-                
-                # Create context for templates with all required variables
-                context = {
-                    "user_name": appointment.user.name if appointment.user else "Guest",
-                    "client_name": f"{client.first_name} {client.last_name}" if client else "Guest",
-                    "service_name": appointment.service_name,
-                    "appointment_date": appointment.start_time.strftime("%B %d, %Y"),
-                    "appointment_time": appointment.start_time.strftime("%I:%M %p"),
-                    "duration": appointment.duration_minutes,
-                    "price": appointment.price,
-                    "barber_name": barber.name if barber else None,
-                    "business_name": getattr(settings, 'business_name', getattr(settings, 'app_name', 'BookedBarber')),
-                    "business_address": getattr(booking_settings, 'business_address', None),
-                    "business_phone": getattr(settings, 'business_phone', '(555) 123-4567'),
-                    "cancellation_policy": getattr(booking_settings, 'cancellation_policy', 'Please cancel at least 24 hours in advance.'),
-                    "current_year": datetime.now().year,
-                    "hours_until": hours_until,
-                    "appointment_id": appointment.id
-                }
-                
-                self.queue_notification(
-                    db=db,
-                    user=appointment.user,
-                    template_name="appointment_reminder",
-                    context=context,
-                    scheduled_for=reminder_time,
-                    appointment_id=appointment.id
-                )
+        # Read (and possibly create) the settings row before claiming anything
+        booking_settings = get_booking_settings(db)
+        queued = 0
+        while True:
+            now = datetime.utcnow()
+            due = reminder_scheduler.pop_due(db, batch_size, now)
+            if not due:
+                db.commit()
+                return queued
+            
+            appointments = {
+                appointment.id: appointment for appointment in db.query(Appointment).options(
+                    joinedload(Appointment.user)
+                ).filter(Appointment.id.in_({appointment_id for appointment_id, _ in due}))
+            }
+            client_ids = {a.client_id for a in appointments.values() if a.client_id}
+            barber_ids = {a.barber_id for a in appointments.values() if a.barber_id}
+            clients = {c.id: c for c in db.query(Client).filter(Client.id.in_(client_ids))} if client_ids else {}
+            barbers = {b.id: b for b in db.query(User).filter(User.id.in_(barber_ids))} if barber_ids else {}
+            
+            reminders = []
+            for appointment_id, hours_before in due:
+                appointment = appointments.get(appointment_id)
+                # Reminders claimed after the appointment was cancelled or started are dropped
+                if (
+                    not appointment or not appointment.user
+                    or appointment.status not in REMINDER_APPOINTMENT_STATUSES
+                    or appointment.start_time <= now
+                ):
+                    continue
+                reminders.append({
+                    'user': appointment.user,
+                    'template_name': "appointment_reminder",
+                    'context': self._reminder_context(
+                        appointment, clients.get(appointment.client_id), barbers.get(appointment.barber_id),
+                        booking_settings, hours_before
+                    ),
+                    'appointment_id': appointment.id
+                })
+            
+            self.bulk_queue_notifications(db, reminders)
+            db.commit()
+            queued += len(reminders)
+            logger.info(f"Claimed {len(due)} due reminders, queued {len(reminders)}")
+            if len(due) < batch_size:
+                return queued
+    
+    def _reminder_context(self, appointment: Appointment, client, barber, booking_settings, hours_until: int) -> Dict[str, Any]:
+        """Template variables for an appointment reminder"""
+        return {
+            "user_name": appointment.user.name if appointment.user else "Guest",
+            "client_name": f"{client.first_name} {client.last_name}" if client else "Guest",
+            "service_name": appointment.service_name,
+            "appointment_date": appointment.start_time.strftime("%B %d, %Y"),
+            "appointment_time": appointment.start_time.strftime("%I:%M %p"),
+            "duration": appointment.duration_minutes,
+            "price": appointment.price,
+            "barber_name": barber.name if barber else None,
+            "business_name": getattr(settings, 'business_name', getattr(settings, 'app_name', 'BookedBarber')),
+            "business_address": getattr(booking_settings, 'business_address', None),
+            "business_phone": getattr(settings, 'business_phone', '(555) 123-4567'),
+            "cancellation_policy": getattr(booking_settings, 'cancellation_policy', 'Please cancel at least 24 hours in advance.'),
+            "current_year": datetime.now().year,
+            "hours_until": hours_until,
+            "appointment_id": appointment.id
+        }
     
     def process_notification_queue(self, db: Session, batch_size: int = 50):
-        """Process pending notifications in the queue with enhanced error handling"""
-        # Get pending notifications that are due
-        pending = db.query(NotificationQueue).filter(
-            and_(
-                NotificationQueue.status == NotificationStatus.PENDING,
-                NotificationQueue.scheduled_for <= datetime.utcnow(),
-                NotificationQueue.attempts < settings.notification_retry_attempts
-            )
-        ).order_by(NotificationQueue.scheduled_for).limit(batch_size).all()
+        """Process pending notifications in the queue with enhanced error handling
         
-        processed_count = 0
-        success_count = 0
-        failed_count = 0
-        
-        for notification in pending:
-            processed_count += 1
-            result = None
-            
-            try:
-                if notification.notification_type == "email":
-                    result = self.send_email(
-                        notification.recipient,
-                        notification.subject or "",
-                        notification.body,
-                        retry_count=notification.attempts
-                    )
-                elif notification.notification_type == "sms":
-                    result = self.send_sms(
-                        notification.recipient,
-                        notification.body,
-                        retry_count=notification.attempts
-                    )
-                else:
-                    result = {"success": False, "error": f"Unknown notification type: {notification.notification_type}"}
-                
-                # Update notification based on result
-                if result and result.get("success"):
-                    notification.status = NotificationStatus.SENT
-                    notification.sent_at = datetime.utcnow()
-                    notification.notification_metadata = json.dumps(result)
-                    success_count += 1
-                    logger.info(f"Notification {notification.id} sent successfully")
-                else:
-                    # Handle failure
-                    notification.attempts += 1
-                    notification.error_message = result.get("error", "Unknown error") if result else "No result returned"
-                    
-                    # Check if we should retry
-                    should_retry = result.get("should_retry", False) if result else False
-                    
-                    if notification.attempts >= settings.notification_retry_attempts or not should_retry:
-                        notification.status = NotificationStatus.FAILED
-                        failed_count += 1
-                        logger.error(f"Notification {notification.id} failed permanently: {notification.error_message}")
-                    else:
-                        # Schedule retry with exponential backoff
-                        retry_delay = settings.notification_retry_delay_seconds * (2 ** (notification.attempts - 1))
-                        notification.scheduled_for = datetime.utcnow() + timedelta(seconds=retry_delay)
-                        logger.warning(f"Notification {notification.id} scheduled for retry in {retry_delay} seconds")
-                    
-                    notification.notification_metadata = json.dumps(result) if result else None
-                    
-            except Exception as e:
-                notification.attempts += 1
-                notification.error_message = f"Unexpected error: {str(e)}"
-                
-                if notification.attempts >= settings.notification_retry_attempts:
-                    notification.status = NotificationStatus.FAILED
-                    failed_count += 1
-                else:
-                    # Schedule retry
-                    retry_delay = settings.notification_retry_delay_seconds * (2 ** (notification.attempts - 1))
-                    notification.scheduled_for = datetime.utcnow() + timedelta(seconds=retry_delay)
-                
-                logger.error(f"Exception processing notification {notification.id}: {str(e)}")
-            
-            # Update the notification in database
-            notification.updated_at = datetime.utcnow()
-            
-        # Commit all changes
-        db.commit()
+        Rows are leased, sent concurrently (identical emails as one SendGrid
+        batch) and their statuses written in bulk; see
+        services.notification_dispatch.
+        """
+        result = NotificationDispatcher(self).dispatch(db, batch_size)
         
-        logger.info(f"Processed {processed_count} notifications: {success_count} successful, {failed_count} failed")
-        return {"processed": processed_count, "successful": success_count, "failed": failed_count}
+        logger.info(f"Processed {result['processed']} notifications: {result['successful']} successful, {result['failed']} failed")
+        return result
     
     def cancel_appointment_notifications(self, db: Session, appointment_id: int):
         """Cancel all pending notifications for an appointment"""
@@ -603,6 +674,7 @@ class NotificationService:
             NotificationQueue.status: NotificationStatus.CANCELLED,
             NotificationQueue.updated_at: datetime.utcnow()
         })
+        reminder_scheduler.cancel(db, appointment_id)
         db.commit()
         logger.info(f"Cancelled {cancelled_count} notifications for appointment {appointment_id}")
         return cancelled_count
@@ -713,24 +785,43 @@ class NotificationService:
             return error_code < 21000 or error_code > 22000
     
     def bulk_queue_notifications(self, db: Session, notifications: List[Dict[str, Any]]) -> List[NotificationQueue]:
-        """Queue multiple notifications in bulk for better performance"""
+        """Queue multiple notifications in bulk for better performance
+        
+        Templates, preferences and recent sends are loaded once for all
+        recipients and everything is committed together, so the query count
+        does not grow with the number of recipients.
+        """
         queued_notifications = []
+        if not notifications:
+            return queued_notifications
+        
+        templates = self._load_templates(db, {data['template_name'] for data in notifications})
+        preferences = self._load_preferences(db, [data['user'] for data in notifications])
+        recent_sends = self._load_recent_sends(db, preferences.values())
         
         for notification_data in notifications:
             try:
-                notifications = self.queue_notification(
-                    db=db,
-                    user=notification_data['user'],
-                    template_name=notification_data['template_name'],
-                    context=notification_data['context'],
-                    scheduled_for=notification_data.get('scheduled_for'),
-                    appointment_id=notification_data.get('appointment_id')
-                )
-                queued_notifications.extend(notifications)
+                user = notification_data['user']
+                template_name = notification_data['template_name']
+                if template_name not in templates:
+                    logger.error(f"No active templates found for {template_name}")
+                    continue
+                queued_notifications.extend(self._queue_for_user(
+                    db,
+                    user,
+                    template_name,
+                    templates[template_name],
+                    preferences[user.id],
+                    recent_sends,
+                    notification_data['context'],
+                    notification_data.get('scheduled_for'),
+                    notification_data.get('appointment_id')
+                ))
             except Exception as e:
                 logger.error(f"Error queuing bulk notification: {str(e)}")
                 continue
         
+        db.commit()
         logger.info(f"Bulk queued {len(queued_notifications)} notifications")
         return queued_notifications
     
@@ -0,0 +1,264 @@
+"""
+Cache of authenticated principals for ``utils.auth.get_current_user``.
+
+Every authenticated request used to load its user with an email lookup.
+This module keeps a small immutable snapshot of each recently seen user
+(id, email, roles, location and flags) in a process-local LRU keyed by the
+JWT subject:
+
+* a hit rebuilds a ``User`` from the snapshot and attaches it to the
+  request's session with ``merge(load=False)``, so no SQL runs unless the
+  route reads a column outside the snapshot (then one primary-key load);
+* committing a change to any snapshot column (``role``, ``is_active`` ...)
+  or the password hash, or creating or deleting a user, bumps that
+  subject's version (the session listeners at the bottom), which drops the
+  local entry and increments a shared counter in Redis;
+* other workers compare an entry with the shared counter at most once every
+  ``VERSION_CHECK_SECONDS``.  Without Redis an entry simply expires after
+  ``TTL_SECONDS``.
+
+Bulk ``query.update()`` calls bypass the session listeners; call
+``principal_cache.invalidate`` after them.
+"""
+
+import logging
+import threading
+import time as time_module
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = "principal:version:"
+VERSION_CHECK_SECONDS = 5
+TTL_SECONDS = 60
+MAX_ENTRIES = 10000
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Immutable copy of the user columns most routes read"""
+
+    id: int
+    email: str
+    name: Optional[str]
+    role: Optional[str]
+    unified_role: Optional[str]
+    user_type: Optional[str]
+    is_active: Optional[bool]
+    email_verified: Optional[bool]
+    is_test_data: Optional[bool]
+    location_id: Optional[int]
+    timezone: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(**{name: getattr(user, name) for name in SNAPSHOT_FIELDS})
+
+    def to_user(self, db: Session) -> User:
+        """Persistent ``User`` in ``db`` built from the snapshot without a query"""
+        user = User(**{name: getattr(self, name) for name in SNAPSHOT_FIELDS})
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+SNAPSHOT_FIELDS = tuple(field.name for field in fields(UserSnapshot))
+
+# Changes to these columns invalidate the cached principal
+TRACKED_FIELDS = SNAPSHOT_FIELDS + ("hashed_password",)
+
+
+class _Entry:
+    __slots__ = ("snapshot", "local_version", "shared_version", "loaded_at", "checked_at")
+
+    def __init__(self, snapshot: UserSnapshot, local_version: int, shared_version: Optional[int], now: float):
+        self.snapshot = snapshot
+        self.local_version = local_version
+        self.shared_version = shared_version
+        self.loaded_at = now
+        self.checked_at = now
+
+
+class PrincipalCache:
+    """LRU of user snapshots keyed by JWT subject plus a per-subject version"""
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        ttl_seconds: float = TTL_SECONDS,
+        version_check_seconds: float = VERSION_CHECK_SECONDS,
+        redis_client_factory: Optional[Callable[[], Any]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._redis_client_factory = redis_client_factory
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._local_versions: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "version_checks": 0, "errors": 0}
+
+    def get_user(self, db: Session, subject: str) -> Optional[User]:
+        """The ``User`` for a JWT subject, attached to ``db``; ``None`` if it does not exist"""
+        snapshot = self.get(subject, lambda: db.query(User).filter(User.email == subject).first())
+        if snapshot is None:
+            return None
+        return snapshot.to_user(db)
+
+    def get(self, subject: str, loader: Callable[[], Optional[User]]) -> Optional[UserSnapshot]:
+        """Cached snapshot for ``subject``; ``loader`` fetches the user on a miss"""
+        now = time_module.monotonic()
+        entry = self._entries.get(subject)
+        if entry is not None and self._is_current(subject, entry, now):
+            with self._lock:
+                if subject in self._entries:
+                    self._entries.move_to_end(subject)
+            self.stats["hits"] += 1
+            return entry.snapshot
+
+        self.stats["misses"] += 1
+        # Versions are read before loading, so an invalidation committed
+        # while the query runs leaves the new entry already outdated
+        local_version = self._local_versions.get(subject, 0)
+        shared_version = self._shared_version(subject)
+        user = loader()
+        if user is None:
+            return None
+
+        snapshot = UserSnapshot.from_user(user)
+        with self._lock:
+            self._entries[subject] = _Entry(snapshot, local_version, shared_version, now)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return snapshot
+
+    def invalidate(self, subjects: Iterable[str]) -> None:
+        """Drop cached principals for ``subjects`` here and in every other worker"""
+        subjects = {subject for subject in subjects if subject}
+        if not subjects:
+            return
+
+        with self._lock:
+            for subject in subjects:
+                self._local_versions[subject] = self._local_versions.get(subject, 0) + 1
+                self._entries.pop(subject, None)
+            self.stats["invalidations"] += len(subjects)
+
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            pipeline = client.pipeline()
+            for subject in subjects:
+                pipeline.incr(VERSION_KEY_PREFIX + subject)
+            pipeline.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to publish principal invalidation: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0.0
+        }
+
+    # Internals
+
+    def _is_current(self, subject: str, entry: _Entry, now: float) -> bool:
+        if self._local_versions.get(subject, 0) != entry.local_version:
+            return False
+        if now - entry.loaded_at >= self.ttl_seconds:
+            return False
+        if entry.shared_version is None or now - entry.checked_at < self.version_check_seconds:
+            return True
+
+        entry.checked_at = now
+        self.stats["version_checks"] += 1
+        shared_version = self._shared_version(subject)
+        return shared_version is None or shared_version == entry.shared_version
+
+    def _redis(self):
+        try:
+            if self._redis_client_factory is not None:
+                return self._redis_client_factory()
+            from services.redis_service import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"Redis unavailable for principal versions: {e}")
+            return None
+
+    def _shared_version(self, subject: str) -> Optional[int]:
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            value = client.get(VERSION_KEY_PREFIX + subject)
+            return int(value) if value is not None else 0
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to read principal version: {e}")
+            return None
+
+
+# Global cache instance
+principal_cache = PrincipalCache()
+
+
+# Session listeners: collect subjects whose principal changed at flush time,
+# invalidate once the transaction commits
+
+_PENDING_KEY = "principal_cache.pending"
+
+
+def _changed_subjects(user: User, deleted: bool) -> Tuple[str, ...]:
+    state = inspect(user)
+    email_history = state.attrs.email.history
+    subjects = tuple(email_history.deleted or ()) + tuple(email_history.unchanged or ()) + tuple(email_history.added or ())
+    if deleted:
+        return subjects
+    if any(state.attrs[name].history.has_changes() for name in TRACKED_FIELDS):
+        return subjects
+    return ()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session: Session, flush_context) -> None:
+    subjects = set()
+    for user in session.new:
+        if isinstance(user, User):
+            # A re-created account must not inherit a snapshot of the old one
+            subjects.update(_changed_subjects(user, deleted=True))
+    for user in session.dirty:
+        if isinstance(user, User):
+            subjects.update(_changed_subjects(user, deleted=False))
+    for user in session.deleted:
+        if isinstance(user, User):
+            subjects.update(_changed_subjects(user, deleted=True))
+    if subjects:
+        session.info.setdefault(_PENDING_KEY, set()).update(subjects)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_changes(session: Session) -> None:
+    subjects = session.info.pop(_PENDING_KEY, None)
+    if subjects:
+        principal_cache.invalidate(subjects)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,228 @@
+"""
+Multi-window rate limiting evaluated in one Redis round-trip.
+
+Each window (e.g. 60 per minute, 1000 per hour) is a GCRA limiter: Redis
+stores one "theoretical arrival time" (TAT) per key and window.  A request of
+weight ``count`` is allowed when, for every window,
+
+    max(TAT, now) + count * period / limit - period <= now
+
+i.e. a token bucket holding ``limit`` tokens that refills at
+``limit / period``.  A full burst of ``limit`` is allowed at once, after which
+requests are spaced evenly - there is no window boundary at which a client
+can spend two windows' worth back to back, as with the fixed per-timestamp
+counters this replaces.
+
+All windows are checked and updated by a single Lua script, so a request
+rejected by one window consumes nothing from the others and concurrent
+workers cannot interleave between the checks.  The script reads the clock
+with ``TIME`` so workers with skewed clocks agree.
+
+When Redis is unreachable (or a call fails) the same limits are enforced per
+process with ``LocalTokenBuckets`` instead of letting every request through.
+"""
+
+import logging
+import threading
+import time as time_module
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rate:gcra:"
+MAX_LOCAL_KEYS = 100000
+
+# KEYS[i]: TAT key of window i
+# ARGV[1]: request weight; ARGV[2i], ARGV[2i + 1]: period (ms) and limit of window i
+# Returns {allowed, retry_after_ms, index of the rejecting window or 0, remaining_1, ...}
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+local count = tonumber(ARGV[1])
+local tats, intervals, periods = {}, {}, {}
+local retry_after, exceeded = 0, 0
+for i = 1, #KEYS do
+    local period = tonumber(ARGV[2 * i])
+    local interval = period / tonumber(ARGV[2 * i + 1])
+    local tat = math.max(tonumber(redis.call('GET', KEYS[i])) or now, now)
+    local wait = tat + interval * count - period - now
+    if wait > retry_after then
+        retry_after, exceeded = wait, i
+    end
+    tats[i], intervals[i], periods[i] = tat, interval, period
+end
+local allowed = exceeded == 0 and 1 or 0
+local result = {allowed, math.ceil(retry_after), exceeded}
+for i = 1, #KEYS do
+    local tat = tats[i]
+    if allowed == 1 and count > 0 then
+        tat = tat + intervals[i] * count
+        redis.call('SET', KEYS[i], string.format('%.3f', tat), 'PX', math.ceil(tat - now) + 1)
+    end
+    result[i + 3] = math.floor((periods[i] - (tat - now)) / intervals[i] + 1e-6)
+end
+return result
+"""
+
+
+@dataclass(frozen=True)
+class RateWindow:
+    """``limit`` requests per ``period_seconds``"""
+
+    name: str
+    limit: int
+    period_seconds: int
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: Dict[str, int]
+    retry_after: float = 0.0  # seconds until the same request would be allowed
+    exceeded: Optional[str] = None  # name of the window that rejected it
+    backend: str = field(default="redis")
+
+
+class LocalTokenBuckets:
+    """In-process token buckets with the same admission rule as ``GCRA_SCRIPT``
+
+    Buckets are per process, so with several workers a client can get up to
+    one full allowance per worker.  Least recently used buckets are dropped
+    past ``max_keys``; a dropped bucket comes back full.
+    """
+
+    def __init__(self, max_keys: int = MAX_LOCAL_KEYS, clock: Callable[[], float] = time_module.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated_at]
+
+    def acquire(self, key: str, windows: Sequence[RateWindow], count: int = 1) -> RateLimitResult:
+        with self._lock:
+            now = self._clock()
+            levels = []
+            retry_after, exceeded = 0.0, None
+            for window in windows:
+                rate = window.limit / window.period_seconds
+                tokens, updated_at = self._buckets.get(f"{key}:{window.name}", (window.limit, now))
+                tokens = min(window.limit, tokens + (now - updated_at) * rate)
+                wait = (count - tokens) / rate
+                if wait > retry_after:
+                    retry_after, exceeded = wait, window.name
+                levels.append(tokens)
+
+            allowed = exceeded is None
+            remaining = {}
+            for window, tokens in zip(windows, levels):
+                if allowed:
+                    tokens -= count
+                    bucket_key = f"{key}:{window.name}"
+                    self._buckets[bucket_key] = [tokens, now]
+                    self._buckets.move_to_end(bucket_key)
+                remaining[window.name] = max(0, int(tokens + 1e-9))
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return RateLimitResult(allowed, remaining, retry_after, exceeded, backend="local")
+
+    def reset(self, pattern: str) -> int:
+        """Drop buckets whose ``<key>:<window>`` name matches a glob ``pattern``"""
+        with self._lock:
+            matching = [bucket_key for bucket_key in self._buckets if fnmatchcase(bucket_key, pattern)]
+            for bucket_key in matching:
+                del self._buckets[bucket_key]
+        return len(matching)
+
+
+class RateLimitEngine:
+    """Checks every window of a key with one script call, locally without Redis"""
+
+    def __init__(
+        self,
+        redis_client_factory: Optional[Callable[[], Any]] = None,
+        key_prefix: str = KEY_PREFIX,
+        local: Optional[LocalTokenBuckets] = None
+    ):
+        self.key_prefix = key_prefix
+        self.local = local or LocalTokenBuckets()
+        self._redis_client_factory = redis_client_factory
+        self._script = None
+        self._script_client = None
+        self.stats = {"redis_checks": 0, "local_checks": 0, "rejections": 0, "errors": 0}
+
+    def check(self, key: str, windows: Sequence[RateWindow], count: int = 1) -> RateLimitResult:
+        """Consume ``count`` from every window of ``key`` if all of them allow it
+
+        ``count=0`` reports the remaining allowance without consuming any.
+        """
+        client = self._redis()
+        result = None
+        if client is not None:
+            try:
+                result = self._check_redis(client, key, windows, count)
+                self.stats["redis_checks"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Redis rate limit check failed, using local buckets: {e}")
+
+        if result is None:
+            result = self.local.acquire(self.key_prefix + key, windows, count)
+            self.stats["local_checks"] += 1
+        if not result.allowed:
+            self.stats["rejections"] += 1
+        return result
+
+    def reset(self, pattern: str) -> int:
+        """Forget usage in Redis and in this process for keys matching a glob
+
+        The pattern is matched against ``<key>:<window>``.
+        """
+        pattern = self.key_prefix + pattern
+        cleared = self.local.reset(pattern)
+        client = self._redis()
+        if client is not None:
+            try:
+                keys = list(client.scan_iter(match=pattern))
+                if keys:
+                    cleared += client.delete(*keys)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Failed to reset rate limits matching {pattern}: {e}")
+        return cleared
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "local_keys": len(self.local._buckets)}
+
+    # Internals
+
+    def _check_redis(self, client, key: str, windows: Sequence[RateWindow], count: int) -> RateLimitResult:
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(GCRA_SCRIPT)
+            self._script_client = client
+
+        args = [count]
+        for window in windows:
+            args.extend((window.period_seconds * 1000, window.limit))
+        allowed, retry_after_ms, exceeded, *remaining = self._script(
+            keys=[f"{self.key_prefix}{key}:{window.name}" for window in windows], args=args
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            remaining={window.name: max(0, int(left)) for window, left in zip(windows, remaining)},
+            retry_after=int(retry_after_ms) / 1000,
+            exceeded=windows[int(exceeded) - 1].name if exceeded else None
+        )
+
+    def _redis(self):
+        try:
+            if self._redis_client_factory is not None:
+                return self._redis_client_factory()
+            from services.redis_service import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"Redis unavailable for rate limiting: {e}")
+            return None
@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 from functools import wraps
 from dataclasses import dataclass, asdict
 
+import redis as redis_sync
 import redis.asyncio as redis
 from redis.asyncio import ConnectionPool
 from sqlalchemy.orm import Session
@@ -29,6 +30,7 @@ class CacheStats:
     sets: int = 0
     deletes: int = 0
     errors: int = 0
+    invalidations: int = 0
     
     @property
     def hit_rate(self) -> float:
@@ -43,6 +45,7 @@ class RedisManager:
         self.redis: Optional[redis.Redis] = None
         self.stats = CacheStats()
         self._connected = False
+        self._sync_client: Optional[redis_sync.Redis] = None
     
     async def initialize(self):
         """Initialize Redis connection with optimized settings"""
@@ -83,12 +86,31 @@ class RedisManager:
             await self.redis.close()
         if self.pool:
             await self.pool.disconnect()
+        if self._sync_client:
+            self._sync_client.close()
+            self._sync_client = None
         self._connected = False
     
     @property
     def is_connected(self) -> bool:
         return self._connected
     
+    def sync_client(self) -> Optional[redis_sync.Redis]:
+        """Blocking client on the same server and database, for code that runs
+        outside the event loop (ORM event listeners); None until connected"""
+        if not self._connected:
+            return None
+        if self._sync_client is None:
+            self._sync_client = redis_sync.Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=0,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=10,
+                decode_responses=False,
+            )
+        return self._sync_client
+    
     async def health_check(self) -> Dict[str, Any]:
         """Perform comprehensive health check"""
         try:
@@ -163,12 +185,27 @@ class MockRedis:
         return {"connected_clients": 1, "used_memory_human": "mock"}
 
 class EnhancedCacheService:
-    """Enhanced caching service with intelligent cache management"""
+    """Enhanced caching service with intelligent cache management
+    
+    Keys can be registered in tag sets (``set(..., tags=[...])``) such as
+    ``barber:5``, ``date:2025-07-01`` or ``user:12``.  ``invalidate_tags``
+    then resolves the tag sets and unlinks their members in pipelined
+    batches, so invalidating after a write never scans the keyspace.
+    """
+    
+    # Tag sets outlive the entries they index; a set is refreshed on every
+    # write that registers into it
+    TAG_TTL_SECONDS = 24 * 3600
+    DELETE_BATCH_SIZE = 500
     
     def __init__(self):
         self.redis_manager = RedisManager()
         self.namespace = "bookedbarber_v2"
         self.default_ttl = 300  # 5 minutes default TTL
+    
+    def tag_key(self, tag: str) -> str:
+        """Redis key of the set holding the cache keys registered under ``tag``"""
+        return f"{self.namespace}:tag:{tag}"
         
     async def initialize(self):
         """Initialize the cache service"""
@@ -212,8 +249,14 @@ class EnhancedCacheService:
             self.redis_manager.stats.errors += 1
             return None
     
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in cache"""
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """Set value in cache, optionally registering the key under tags"""
         try:
             if not self.redis_manager.is_connected:
                 return False
@@ -226,8 +269,49 @@ class EnhancedCacheService:
                 # Fall back to pickle for complex objects
                 serialized = pickle.dumps(value)
             
-            ttl = ttl or self.default_ttl
-            await self.redis_manager.redis.set(key, serialized, ex=ttl)
+            await self._write(key, serialized, ttl or self.default_ttl, tags)
+            
+            self.redis_manager.stats.sets += 1
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Cache set error for key {key}: {e}")
+            self.redis_manager.stats.errors += 1
+            return False
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Get the stored bytes for a key without deserializing them"""
+        try:
+            if not self.redis_manager.is_connected:
+                return None
+            
+            data = await self.redis_manager.redis.get(key)
+            
+            if data is None:
+                self.redis_manager.stats.misses += 1
+                return None
+            
+            self.redis_manager.stats.hits += 1
+            return data if isinstance(data, bytes) else data.encode()
+            
+        except Exception as e:
+            logger.warning(f"Cache get error for key {key}: {e}")
+            self.redis_manager.stats.errors += 1
+            return None
+    
+    async def set_raw(
+        self,
+        key: str,
+        data: bytes,
+        ttl: Optional[int] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """Store already-encoded bytes as-is (no JSON/pickle round-trip)"""
+        try:
+            if not self.redis_manager.is_connected:
+                return False
+            
+            await self._write(key, data, ttl or self.default_ttl, tags)
             
             self.redis_manager.stats.sets += 1
             return True
@@ -237,6 +321,19 @@ class EnhancedCacheService:
             self.redis_manager.stats.errors += 1
             return False
     
+    async def _write(self, key: str, data: Any, ttl: int, tags: Optional[List[str]]) -> None:
+        if tags:
+            # Value and tag registrations go out in one round-trip
+            tag_ttl = max(ttl, self.TAG_TTL_SECONDS)
+            pipe = self.redis_manager.redis.pipeline(transaction=False)
+            pipe.set(key, data, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self.tag_key(tag), key)
+                pipe.expire(self.tag_key(tag), tag_ttl)
+            await pipe.execute()
+        else:
+            await self.redis_manager.redis.set(key, data, ex=ttl)
+    
     async def delete(self, key: str) -> bool:
         """Delete value from cache"""
         try:
@@ -267,17 +364,89 @@ class EnhancedCacheService:
             logger.warning(f"Cache exists error for key {key}: {e}")
             return False
     
+    async def invalidate_tags(self, tags: List[str]) -> int:
+        """Delete every key registered under any of ``tags`` (and the tag sets)
+        
+        One pipelined SMEMBERS round-trip resolves the tags; members are then
+        unlinked in batches of ``DELETE_BATCH_SIZE``.
+        """
+        try:
+            if not self.redis_manager.is_connected or not tags:
+                return 0
+            
+            redis_client = self.redis_manager.redis
+            tag_keys = [self.tag_key(tag) for tag in tags]
+            
+            pipe = redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = set()
+            for tag_members in await pipe.execute():
+                members.update(tag_members or ())
+            
+            # The tag sets go in their own trailing UNLINK so they are not
+            # counted as cache entries
+            deleted_count = await self._unlink_keys(list(members), trailing_keys=tag_keys)
+            self.redis_manager.stats.invalidations += 1
+            return deleted_count
+            
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error for {tags}: {e}")
+            self.redis_manager.stats.errors += 1
+            return 0
+    
+    def invalidate_tags_sync(self, tags: List[str]) -> int:
+        """Blocking ``invalidate_tags`` for synchronous callers such as Session
+        ``after_commit`` listeners"""
+        try:
+            client = self.redis_manager.sync_client()
+            if client is None or not tags:
+                return 0
+            
+            tag_keys = [self.tag_key(tag) for tag in tags]
+            pipe = client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = set()
+            for tag_members in pipe.execute():
+                members.update(tag_members or ())
+            
+            members = list(members)
+            pipe = client.pipeline(transaction=False)
+            for start in range(0, len(members), self.DELETE_BATCH_SIZE):
+                pipe.unlink(*members[start:start + self.DELETE_BATCH_SIZE])
+            pipe.unlink(*tag_keys)
+            deleted_count = sum(pipe.execute()[:-1])
+            
+            self.redis_manager.stats.deletes += deleted_count
+            self.redis_manager.stats.invalidations += 1
+            return deleted_count
+            
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation error for {tags}: {e}")
+            self.redis_manager.stats.errors += 1
+            return 0
+    
     async def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching a pattern"""
+        """Clear all keys matching a pattern
+        
+        Scans the keyspace, so prefer ``invalidate_tags`` on hot paths; matched
+        keys are unlinked in pipelined batches rather than one DELETE each.
+        """
         try:
             if not self.redis_manager.is_connected:
                 return 0
             
             # Use scan for memory-efficient pattern deletion
             deleted_count = 0
-            async for key in self.redis_manager.redis.scan_iter(match=pattern):
-                await self.redis_manager.redis.delete(key)
-                deleted_count += 1
+            batch = []
+            async for key in self.redis_manager.redis.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= self.DELETE_BATCH_SIZE:
+                    deleted_count += await self._unlink_keys(batch)
+                    batch = []
+            if batch:
+                deleted_count += await self._unlink_keys(batch)
             
             return deleted_count
             
@@ -285,6 +454,25 @@ class EnhancedCacheService:
             logger.warning(f"Cache clear pattern error for {pattern}: {e}")
             return 0
     
+    async def _unlink_keys(self, keys: List[Any], trailing_keys: Optional[List[Any]] = None) -> int:
+        """UNLINK keys in pipelined batches (memory is reclaimed off the main thread)
+        
+        ``trailing_keys`` are unlinked in the same round-trip but not counted.
+        """
+        if not keys and not trailing_keys:
+            return 0
+        
+        pipe = self.redis_manager.redis.pipeline(transaction=False)
+        for start in range(0, len(keys), self.DELETE_BATCH_SIZE):
+            pipe.unlink(*keys[start:start + self.DELETE_BATCH_SIZE])
+        if trailing_keys:
+            pipe.unlink(*trailing_keys)
+        results = await pipe.execute()
+        deleted_count = sum(results[:-1] if trailing_keys else results)
+        
+        self.redis_manager.stats.deletes += deleted_count
+        return deleted_count
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         health = await self.redis_manager.health_check()
@@ -323,7 +511,7 @@ def cached_response(
             result = await func(*args, **kwargs) if asyncio.iscoroutinefunction(func) else func(*args, **kwargs)
             
             # Cache the result
-            await cache_service.set(cache_key, result, ttl)
+            await cache_service.set(cache_key, result, ttl, tags=[namespace])
             
             return result
         
@@ -339,9 +527,8 @@ def cache_invalidator(patterns: List[str]):
             # Execute function first
             result = await func(*args, **kwargs) if asyncio.iscoroutinefunction(func) else func(*args, **kwargs)
             
-            # Invalidate cache patterns
-            for pattern in patterns:
-                await cache_service.clear_pattern(f"{cache_service.namespace}:{pattern}:*")
+            # Invalidate everything cached under these namespaces
+            await cache_service.invalidate_tags(patterns)
             
             return result
         
@@ -355,7 +542,7 @@ class SpecializedCaches:
     async def cache_user_session(user_id: int, session_data: Dict[str, Any], ttl: int = 1800):
         """Cache user session data (30 minutes default)"""
         key = f"session:user:{user_id}"
-        await cache_service.set(key, session_data, ttl)
+        await cache_service.set(key, session_data, ttl, tags=[f"user:{user_id}"])
     
     @staticmethod
     async def get_user_session(user_id: int) -> Optional[Dict[str, Any]]:
@@ -367,7 +554,7 @@ class SpecializedCaches:
     async def cache_appointment_slots(barber_id: int, date_str: str, slots: List[Dict], ttl: int = 600):
         """Cache available appointment slots (10 minutes default)"""
         key = f"slots:barber:{barber_id}:date:{date_str}"
-        await cache_service.set(key, slots, ttl)
+        await cache_service.set(key, slots, ttl, tags=["slots", f"barber:{barber_id}", f"date:{date_str}"])
     
     @staticmethod
     async def get_appointment_slots(barber_id: int, date_str: str) -> Optional[List[Dict]]:
@@ -379,7 +566,7 @@ class SpecializedCaches:
     async def cache_business_analytics(location_id: int, analytics_data: Dict[str, Any], ttl: int = 3600):
         """Cache business analytics (1 hour default)"""
         key = f"analytics:location:{location_id}"
-        await cache_service.set(key, analytics_data, ttl)
+        await cache_service.set(key, analytics_data, ttl, tags=["analytics", f"location:{location_id}"])
     
     @staticmethod
     async def get_business_analytics(location_id: int) -> Optional[Dict[str, Any]]:
@@ -390,26 +577,17 @@ class SpecializedCaches:
     @staticmethod
     async def invalidate_user_cache(user_id: int):
         """Invalidate all cache entries for a user"""
-        patterns = [
-            f"session:user:{user_id}",
-            f"*:user:{user_id}:*",
-            f"user:{user_id}:*"
-        ]
-        
-        for pattern in patterns:
-            await cache_service.clear_pattern(pattern)
+        await cache_service.invalidate_tags([f"user:{user_id}"])
     
     @staticmethod
     async def invalidate_barber_cache(barber_id: int):
         """Invalidate all cache entries for a barber"""
-        patterns = [
-            f"slots:barber:{barber_id}:*",
-            f"*:barber:{barber_id}:*",
-            f"barber:{barber_id}:*"
-        ]
-        
-        for pattern in patterns:
-            await cache_service.clear_pattern(pattern)
+        await cache_service.invalidate_tags([f"barber:{barber_id}"])
+    
+    @staticmethod
+    async def invalidate_date_cache(date_str: str):
+        """Invalidate all cache entries for a date"""
+        await cache_service.invalidate_tags([f"date:{date_str}"])
 
 # Example usage decorators for common BookedBarber operations
 
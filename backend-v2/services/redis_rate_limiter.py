@@ -3,28 +3,46 @@ Redis-based rate limiter for production use.
 Provides distributed rate limiting across multiple server instances.
 """
 
-from typing import Optional, Dict, Tuple
-from datetime import datetime, timedelta
+from typing import Optional, Dict, List
+from datetime import datetime
 import logging
+import math
 from fastapi import Request, HTTPException
-import hashlib
-import json
+
+from services.rate_limit_engine import RateLimitEngine, RateWindow
 
 from services.redis_service import cache_service
 from config.redis_config import get_redis_config
 
 logger = logging.getLogger(__name__)
 
+WINDOW_PERIODS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
 
 class RedisRateLimiter:
     """
     Redis-backed rate limiter with multiple window support.
-    Supports per-minute, per-hour, and per-day limits.
+    Supports per-minute, per-hour, and per-day limits, enforced as GCRA
+    buckets by services.rate_limit_engine (per process if Redis is down).
     """
     
     def __init__(self):
         self.config = get_redis_config()
         self.cache = cache_service
+        self.engine = RateLimitEngine(
+            redis_client_factory=self._get_redis_client,
+            key_prefix=f"{self.config.prefix_rate_limit}gcra:"
+        )
+    
+    def _get_redis_client(self):
+        """Redis client for the engine, or None to use local buckets."""
+        if not self.cache.is_available():
+            return None
+        return self.cache.redis_manager.get_client()
         
     def _get_identifier(self, request: Request, user_id: Optional[int] = None) -> str:
         """Generate unique identifier for rate limiting."""
@@ -40,21 +58,6 @@ class RedisRateLimiter:
         
         return f"ip:{client_ip}"
     
-    def _get_window_keys(self, identifier: str) -> Dict[str, Tuple[str, int]]:
-        """Get Redis keys and TTLs for different time windows."""
-        now = datetime.utcnow()
-        
-        # Generate keys for different windows
-        minute_key = f"{self.config.prefix_rate_limit}minute:{identifier}:{now.strftime('%Y%m%d%H%M')}"
-        hour_key = f"{self.config.prefix_rate_limit}hour:{identifier}:{now.strftime('%Y%m%d%H')}"
-        day_key = f"{self.config.prefix_rate_limit}day:{identifier}:{now.strftime('%Y%m%d')}"
-        
-        return {
-            'minute': (minute_key, 60),
-            'hour': (hour_key, 3600),
-            'day': (day_key, 86400),
-        }
-    
     async def check_rate_limit(
         self,
         request: Request,
@@ -80,59 +83,46 @@ class RedisRateLimiter:
         if not self.config.rate_limit_enabled:
             return {'minute': 999, 'hour': 999, 'day': 999}
         
-        if not self.cache.is_available():
-            # Fallback to allowing requests if Redis is down
-            logger.warning("Redis unavailable, skipping rate limiting")
-            return {'minute': 999, 'hour': 999, 'day': 999}
-        
         identifier = self._get_identifier(request, user_id)
-        window_keys = self._get_window_keys(identifier)
         
         # Get limits for resource
         limits = self._get_resource_limits(resource, user_id is not None)
         
-        remaining = {}
+        # All windows are checked in one script call (local buckets without Redis)
+        result = self.engine.check(f"{resource}:{identifier}", self._get_windows(limits), count)
+        
+        if not result.allowed:
+            # Rate limit exceeded
+            window = result.exceeded
+            limit = limits[window]
+            retry_after = max(1, math.ceil(result.retry_after))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded. Maximum {limit} requests per {window}.",
+                headers={
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Limit": str(limit),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(datetime.utcnow().timestamp()) + retry_after)
+                }
+            )
         
-        try:
-            # Check each window
-            for window, (key, ttl) in window_keys.items():
-                limit = limits[window]
-                
-                # Increment counter
-                current = self.cache.increment(key, count, ttl) or 0
-                
-                if current > limit:
-                    # Rate limit exceeded
-                    retry_after = ttl
-                    raise HTTPException(
-                        status_code=429,
-                        detail=f"Rate limit exceeded. Maximum {limit} requests per {window}.",
-                        headers={
-                            "Retry-After": str(retry_after),
-                            "X-RateLimit-Limit": str(limit),
-                            "X-RateLimit-Remaining": "0",
-                            "X-RateLimit-Reset": str(int(datetime.utcnow().timestamp()) + retry_after)
-                        }
-                    )
-                
-                remaining[window] = max(0, limit - current)
-            
-            # Add rate limit headers to response
-            request.state.rate_limit_headers = {
-                "X-RateLimit-Limit-Minute": str(limits['minute']),
-                "X-RateLimit-Remaining-Minute": str(remaining['minute']),
-                "X-RateLimit-Limit-Hour": str(limits['hour']),
-                "X-RateLimit-Remaining-Hour": str(remaining['hour']),
-            }
-            
-            return remaining
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Rate limiting error: {e}")
-            # Allow request on error
-            return {'minute': 999, 'hour': 999, 'day': 999}
+        remaining = result.remaining
+        
+        # Add rate limit headers to response
+        request.state.rate_limit_headers = {
+            "X-RateLimit-Limit-Minute": str(limits['minute']),
+            "X-RateLimit-Remaining-Minute": str(remaining['minute']),
+            "X-RateLimit-Limit-Hour": str(limits['hour']),
+            "X-RateLimit-Remaining-Hour": str(remaining['hour']),
+        }
+        
+        return remaining
+    
+    @staticmethod
+    def _get_windows(limits: Dict[str, int]) -> List[RateWindow]:
+        """Rate windows for a resource's limits."""
+        return [RateWindow(window, limits[window], period) for window, period in WINDOW_PERIODS.items()]
     
     def _get_resource_limits(self, resource: str, authenticated: bool) -> Dict[str, int]:
         """Get rate limits for specific resource."""
@@ -178,8 +168,7 @@ class RedisRateLimiter:
     async def reset_limits(self, identifier: str) -> bool:
         """Reset rate limits for an identifier (admin function)."""
         try:
-            pattern = f"{self.config.prefix_rate_limit}*:{identifier}:*"
-            deleted = self.cache.delete_pattern(pattern)
+            deleted = self.engine.reset(f"*:{identifier}:*")
             logger.info(f"Reset {deleted} rate limit keys for {identifier}")
             return deleted > 0
         except Exception as e:
@@ -188,24 +177,22 @@ class RedisRateLimiter:
     
     async def get_current_usage(self, request: Request, user_id: Optional[int] = None) -> Dict[str, Dict[str, int]]:
         """Get current usage statistics for an identifier."""
-        if not self.cache.is_available():
-            return {}
-        
         identifier = self._get_identifier(request, user_id)
-        window_keys = self._get_window_keys(identifier)
+        limits = self._get_resource_limits('default', user_id is not None)
         
         usage = {}
         
         try:
-            for window, (key, _) in window_keys.items():
-                value = self.cache.get(key)
-                current = int(value) if value else 0
-                limit = self._get_resource_limits('default', user_id is not None)[window]
+            # A zero-weight check reports the allowance without consuming it
+            result = self.engine.check(f"default:{identifier}", self._get_windows(limits), count=0)
+            for window, limit in limits.items():
+                remaining = result.remaining[window]
+                current = limit - remaining
                 
                 usage[window] = {
                     'current': current,
                     'limit': limit,
-                    'remaining': max(0, limit - current),
+                    'remaining': remaining,
                     'percentage': round((current / limit) * 100, 2) if limit > 0 else 0
                 }
             
@@ -0,0 +1,272 @@
+"""
+Indexed appointment reminder scheduling.
+
+Reminder send times are written to ``appointment_reminders`` when an
+appointment is booked or rescheduled, one row per reminder offset.  The
+worker then pops due rows through the ``(status, due_at)`` index instead of
+scanning every upcoming appointment on each beat:
+
+- Session listeners (bottom of this module) note every appointment that is
+  inserted or whose start time or status changes, and ``refresh`` its
+  reminders just before the transaction commits.  Booking, guest and
+  recurring flows, reschedules and cancellations all go through the ORM, so
+  none of them has to call the scheduler itself.
+- ``refresh`` replaces the pending reminders of active appointments with
+  their owners' preferred offsets and cancels those of cancelled or
+  finished ones; offsets already queued for the same start time are not
+  materialized again.
+- Bulk inserts bypass the listeners, so the import service refreshes the
+  appointments it inserts itself.
+- ``backfill`` materializes reminders for upcoming appointments that have
+  none, i.e. ones booked before reminders were materialized.  It is a
+  one-off run through scripts/backfill_appointment_reminders.py, not part of
+  the worker beat.
+- ``pop_due`` selects due rows (``FOR UPDATE SKIP LOCKED`` where supported)
+  and flips them from pending to queued with one conditional UPDATE.  It
+  does not commit, so the claim lands in the same transaction as the queued
+  notifications and a failed run leaves the reminders pending.
+- ``cancel`` drops pending reminders for cancelled appointments.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import Appointment, AppointmentReminder, NotificationPreference, NotificationPreferences
+
+logger = logging.getLogger(__name__)
+
+# Appointment statuses that still receive reminders
+REMINDER_APPOINTMENT_STATUSES = ("confirmed", "pending", "scheduled")
+DEFAULT_REMINDER_HOURS = [24, 2]
+
+
+class ReminderScheduler:
+    """Materializes reminder due times and claims them once due"""
+
+    def schedule(
+        self,
+        db: Session,
+        appointment: Appointment,
+        reminder_hours: Iterable[int],
+        now: Optional[datetime] = None
+    ) -> List[AppointmentReminder]:
+        """Replace the appointment's pending reminders; the caller commits"""
+        return self._materialize(db, [appointment], {appointment.user_id: list(reminder_hours)}, now)
+
+    def refresh(
+        self,
+        db: Session,
+        appointments: Iterable[Appointment],
+        now: Optional[datetime] = None,
+        replace: bool = True
+    ) -> List[AppointmentReminder]:
+        """Bring reminders in line with the appointments' start times and statuses; the caller commits
+
+        Pass ``replace=False`` for appointments known to have no reminder
+        rows yet to skip looking for existing ones.
+        """
+        appointments = list(appointments)
+        active = [
+            appointment for appointment in appointments
+            if appointment.user_id and appointment.start_time and appointment.status in REMINDER_APPOINTMENT_STATUSES
+        ]
+        inactive_ids = {appointment.id for appointment in appointments} - {appointment.id for appointment in active}
+        if inactive_ids and replace:
+            self._pending(db, inactive_ids).update(
+                {AppointmentReminder.status: "cancelled"}, synchronize_session=False
+            )
+        if not active:
+            return []
+        hours = self.reminder_hours(db, {appointment.user_id for appointment in active})
+        return self._materialize(db, active, hours, now, replace)
+
+    def reminder_hours(self, db: Session, user_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Reminder offsets per user: enhanced preferences, then legacy ones, then the default"""
+        user_ids = set(user_ids)
+        hours = {
+            preferences.user_id: preferences.get_reminder_hours()
+            for preferences in db.query(NotificationPreferences).filter(
+                NotificationPreferences.user_id.in_(user_ids)
+            )
+        } if user_ids else {}
+        missing = user_ids - hours.keys()
+        if missing:
+            for preferences in db.query(NotificationPreference).filter(NotificationPreference.user_id.in_(missing)):
+                hours[preferences.user_id] = preferences.reminder_hours or []
+        for user_id in user_ids - hours.keys():
+            hours[user_id] = DEFAULT_REMINDER_HOURS
+        return hours
+
+    def backfill(
+        self,
+        db: Session,
+        horizon: Optional[timedelta] = None,
+        batch_size: int = 500,
+        now: Optional[datetime] = None
+    ) -> int:
+        """Materialize reminders for upcoming appointments without any, in id order; the caller commits
+
+        ``horizon`` bounds how far ahead appointments are considered (None
+        for all of them).  Appointments whose offsets have all passed, and
+        owners without reminder offsets, keep no rows; every run looks at
+        them again, so this is meant for one-off catch-ups.
+        """
+        now = now or datetime.utcnow()
+        has_reminders = select(AppointmentReminder.id).where(
+            AppointmentReminder.appointment_id == Appointment.id
+        ).exists()
+        query = db.query(Appointment).filter(
+            Appointment.start_time > now,
+            Appointment.status.in_(REMINDER_APPOINTMENT_STATUSES),
+            Appointment.user_id.isnot(None),
+            ~has_reminders
+        )
+        if horizon is not None:
+            query = query.filter(Appointment.start_time <= now + horizon)
+
+        materialized = 0
+        last_id = 0
+        while True:
+            batch = query.filter(Appointment.id > last_id).order_by(Appointment.id).limit(batch_size).all()
+            if not batch:
+                return materialized
+            materialized += len(self.refresh(db, batch, now=now, replace=False))
+            last_id = batch[-1].id
+            if len(batch) < batch_size:
+                return materialized
+
+    def pop_due(self, db: Session, limit: int = 500, now: Optional[datetime] = None) -> List[Tuple[int, int]]:
+        """Claim up to ``limit`` due reminders as (appointment_id, hours_before); the caller commits"""
+        now = now or datetime.utcnow()
+        due = select(AppointmentReminder.id).where(
+            AppointmentReminder.status == "pending",
+            AppointmentReminder.due_at <= now
+        ).order_by(AppointmentReminder.due_at).limit(limit).with_for_update(skip_locked=True)
+
+        ids = list(db.scalars(due))
+        if not ids:
+            return []
+
+        # Only rows still pending flip, so a reminder is claimed exactly once
+        # even where SKIP LOCKED is unavailable
+        claimed = db.execute(
+            update(AppointmentReminder)
+            .where(AppointmentReminder.id.in_(ids), AppointmentReminder.status == "pending")
+            .values(status="queued", queued_at=now)
+            .returning(AppointmentReminder.appointment_id, AppointmentReminder.hours_before)
+            .execution_options(synchronize_session=False)
+        ).all()
+        return [tuple(row) for row in claimed]
+
+    def cancel(self, db: Session, appointment_id: int, delete: bool = False) -> int:
+        """Cancel (or delete) an appointment's pending reminders; the caller commits"""
+        pending = self._pending(db, [appointment_id])
+        if delete:
+            return pending.delete(synchronize_session=False)
+        return pending.update({AppointmentReminder.status: "cancelled"}, synchronize_session=False)
+
+    # Internals
+
+    @staticmethod
+    def _pending(db: Session, appointment_ids: Iterable[int]):
+        return db.query(AppointmentReminder).filter(
+            AppointmentReminder.appointment_id.in_(list(appointment_ids)),
+            AppointmentReminder.status == "pending"
+        )
+
+    def _materialize(
+        self,
+        db: Session,
+        appointments: List[Appointment],
+        hours_by_user: Dict[int, List[int]],
+        now: Optional[datetime],
+        replace: bool = True
+    ) -> List[AppointmentReminder]:
+        now = now or datetime.utcnow()
+        ids = [appointment.id for appointment in appointments]
+        already_queued = set()
+        if replace:
+            # Everything but queued rows is replaced, so a cancelled reminder
+            # does not block re-materializing the same slot
+            db.query(AppointmentReminder).filter(
+                AppointmentReminder.appointment_id.in_(ids),
+                AppointmentReminder.status != "queued"
+            ).delete(synchronize_session=False)
+            already_queued = set(db.query(
+                AppointmentReminder.appointment_id, AppointmentReminder.hours_before, AppointmentReminder.due_at
+            ).filter(
+                AppointmentReminder.appointment_id.in_(ids),
+                AppointmentReminder.status == "queued"
+            ))
+
+        reminders = []
+        for appointment in appointments:
+            # Start times are stored as naive UTC but may still be aware in memory
+            start = appointment.start_time
+            if start.tzinfo is not None:
+                start = start.astimezone(timezone.utc).replace(tzinfo=None)
+            for hours_before in sorted(set(hours_by_user.get(appointment.user_id) or []), reverse=True):
+                due_at = start - timedelta(hours=hours_before)
+                if due_at <= now or (appointment.id, hours_before, due_at) in already_queued:
+                    continue
+                reminders.append(AppointmentReminder(
+                    appointment_id=appointment.id,
+                    hours_before=hours_before,
+                    due_at=due_at,
+                    status="pending"
+                ))
+        db.add_all(reminders)
+        db.flush()
+        return reminders
+
+
+# Global instance
+reminder_scheduler = ReminderScheduler()
+
+
+# Session listeners: note booked, moved and cancelled appointments at flush
+# time, refresh their reminders inside the same transaction before it commits
+
+_PENDING_KEY = "reminder_scheduler.pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_reminder_changes(session: Session, flush_context) -> None:
+    # Appointment -> whether it was inserted in this transaction
+    changed = {instance: True for instance in session.new if isinstance(instance, Appointment)}
+    for instance in session.dirty:
+        if isinstance(instance, Appointment):
+            state = inspect(instance)
+            if state.attrs.start_time.history.has_changes() or state.attrs.status.history.has_changes():
+                changed[instance] = False
+    if changed:
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        for instance, inserted in changed.items():
+            pending[instance] = pending.get(instance, inserted)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_reminders(session: Session) -> None:
+    # Flush first so appointment changes still pending at commit are
+    # collected too; other commits are left alone
+    if any(isinstance(instance, Appointment) for instance in (*session.new, *session.dirty)):
+        session.flush()
+    changed = session.info.pop(_PENDING_KEY, None)
+    if not changed:
+        return
+    appointments = [
+        appointment for appointment in changed
+        if appointment.id is not None and not inspect(appointment).was_deleted
+    ]
+    reminder_scheduler.refresh(
+        session, appointments, replace=not all(changed[appointment] for appointment in appointments)
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reminder_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,152 @@
+"""
+Incrementally maintained per-barber client retention summary.
+
+One ``BarberClientRetention`` row exists per (barber, client) pair and is
+updated when an appointment completes, so retention dashboards aggregate a
+table with one row per relationship instead of walking appointment history.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from models import Appointment, BarberClientRetention
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_DAYS = 30
+AT_RISK_DAYS = 60
+
+
+def retention_barber_id(appointment: Appointment) -> Optional[int]:
+    """Barber credited with a visit; older rows only carry ``user_id``."""
+    return appointment.barber_id or appointment.user_id
+
+
+def record_appointment_completion(db: Session, appointment: Appointment) -> Optional[BarberClientRetention]:
+    """Fold a newly completed appointment into the retention summary.
+
+    Call once per transition to ``completed``; the caller owns the commit.
+    Appointments without a client or barber are ignored.
+    """
+    barber_id = retention_barber_id(appointment)
+    if not appointment.client_id or not barber_id or not appointment.start_time:
+        return None
+
+    summary = db.query(BarberClientRetention).filter(
+        BarberClientRetention.barber_id == barber_id,
+        BarberClientRetention.client_id == appointment.client_id
+    ).first()
+
+    visit_at = appointment.start_time
+    price = appointment.price or 0.0
+
+    if summary is None:
+        summary = BarberClientRetention(
+            barber_id=barber_id,
+            client_id=appointment.client_id,
+            first_visit_at=visit_at,
+            last_visit_at=visit_at,
+            visit_count=1,
+            total_spent=price
+        )
+        db.add(summary)
+        # Sessions do not autoflush; later completions in the same
+        # transaction must see this row instead of inserting a duplicate
+        db.flush()
+    else:
+        summary.visit_count = (summary.visit_count or 0) + 1
+        summary.total_spent = (summary.total_spent or 0.0) + price
+        summary.first_visit_at = min(summary.first_visit_at, visit_at)
+        summary.last_visit_at = max(summary.last_visit_at, visit_at)
+
+    return summary
+
+
+def rebuild_barber_retention(db: Session, barber_id: int) -> int:
+    """Recompute a barber's summary rows from completed appointments.
+
+    Used to repair drift (e.g. after completions were reverted); returns the
+    number of client rows written.  The caller owns the commit.
+    """
+    barber_key = func.coalesce(Appointment.barber_id, Appointment.user_id)
+    rows = db.query(
+        Appointment.client_id,
+        func.min(Appointment.start_time),
+        func.max(Appointment.start_time),
+        func.count(Appointment.id),
+        func.coalesce(func.sum(Appointment.price), 0.0)
+    ).filter(
+        barber_key == barber_id,
+        Appointment.status == "completed",
+        Appointment.client_id.isnot(None),
+        Appointment.start_time.isnot(None)
+    ).group_by(Appointment.client_id).all()
+
+    db.query(BarberClientRetention).filter(
+        BarberClientRetention.barber_id == barber_id
+    ).delete(synchronize_session=False)
+
+    db.bulk_insert_mappings(BarberClientRetention, [
+        {
+            "barber_id": barber_id,
+            "client_id": client_id,
+            "first_visit_at": first_visit,
+            "last_visit_at": last_visit,
+            "visit_count": visits,
+            "total_spent": spent
+        }
+        for client_id, first_visit, last_visit, visits, spent in rows
+    ])
+    return len(rows)
+
+
+def get_barber_retention_summary(
+    db: Session,
+    barber_ids: Optional[Iterable[int]] = None,
+    now: Optional[datetime] = None
+) -> Dict[int, Dict[str, Any]]:
+    """Retention buckets per barber from one grouped aggregation.
+
+    Buckets match ``AnalyticsService.get_client_retention_metrics``: active
+    within 30 days, at risk within 60 days, lost otherwise; new clients have
+    one visit with the barber, returning clients more than one.
+    """
+    now = now or datetime.utcnow()
+    active_since = now - timedelta(days=ACTIVE_DAYS)
+    at_risk_since = now - timedelta(days=AT_RISK_DAYS)
+    last_visit = BarberClientRetention.last_visit_at
+    visits = BarberClientRetention.visit_count
+
+    query = db.query(
+        BarberClientRetention.barber_id,
+        func.count(BarberClientRetention.id).label("total_clients"),
+        func.sum(case((last_visit >= active_since, 1), else_=0)).label("active_clients"),
+        func.sum(case((and_(last_visit < active_since, last_visit >= at_risk_since), 1), else_=0)).label("at_risk_clients"),
+        func.sum(case((last_visit < at_risk_since, 1), else_=0)).label("lost_clients"),
+        func.sum(case((visits == 1, 1), else_=0)).label("new_clients"),
+        func.sum(case((visits > 1, 1), else_=0)).label("returning_clients"),
+        func.sum(visits).label("total_visits"),
+        func.sum(BarberClientRetention.total_spent).label("total_spent")
+    )
+    if barber_ids is not None:
+        query = query.filter(BarberClientRetention.barber_id.in_(list(barber_ids)))
+
+    summaries = {}
+    for row in query.group_by(BarberClientRetention.barber_id).all():
+        total = row.total_clients or 0
+        returning = row.returning_clients or 0
+        summaries[row.barber_id] = {
+            "total_clients": total,
+            "active_clients": row.active_clients or 0,
+            "at_risk_clients": row.at_risk_clients or 0,
+            "lost_clients": row.lost_clients or 0,
+            "new_clients": row.new_clients or 0,
+            "returning_clients": returning,
+            "total_visits": row.total_visits or 0,
+            "retention_rate": (returning / total * 100) if total > 0 else 0,
+            "average_lifetime_value": (float(row.total_spent or 0) / total) if total > 0 else 0
+        }
+    return summaries
@@ -0,0 +1,283 @@
+"""
+Interval-index slot engine for availability calculations.
+
+Availability used to be computed by comparing every generated slot against
+every appointment of the day (O(slots x appointments)) while building a
+pytz-localized datetime per slot.  This module works on integer minute
+offsets from a single UTC anchor instead:
+
+* a barber-day's busy intervals (including ``buffer_time_before/after``) are
+  built once, sorted and merged into disjoint ``[start, end)`` ranges;
+* a whole slot grid is answered with one linear sweep, and single ad-hoc
+  checks use binary search.
+
+Only the slots that are actually returned to the caller are formatted, and
+formatting avoids per-slot ``astimezone`` calls whenever the display offset
+is constant across the day (i.e. on every non-DST-transition day).
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pytz
+
+
+def minute_offset(value: datetime, anchor_utc: datetime, round_up: bool = False) -> int:
+    """Whole minutes between ``anchor_utc`` and ``value``.
+
+    Seconds are floored for interval starts and ceiled for interval ends
+    (``round_up=True``) so a busy interval is never shrunk by rounding.
+    """
+    if value.tzinfo is None:
+        # Naive DB values are UTC; skip localizing by comparing naive-to-naive
+        seconds = (value - anchor_utc.replace(tzinfo=None)).total_seconds()
+    else:
+        seconds = (value - anchor_utc).total_seconds()
+    minutes, remainder = divmod(int(seconds), 60)
+    if round_up and remainder:
+        minutes += 1
+    return minutes
+
+
+class BusyIntervals:
+    """Sorted, merged busy intervals over integer minute offsets.
+
+    Offsets are relative to ``anchor_utc`` (normally the business-local
+    midnight of the day being scheduled, expressed in UTC).
+    """
+
+    __slots__ = ("anchor_utc", "starts", "ends")
+
+    def __init__(self, anchor_utc: datetime, intervals: Iterable[Tuple[int, int]] = ()):
+        self.anchor_utc = anchor_utc
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+        for start, end in sorted(i for i in intervals if i[1] > i[0]):
+            if self.ends and start <= self.ends[-1]:
+                # Overlapping or touching - extend the previous interval
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @classmethod
+    def from_appointments(
+        cls,
+        appointments: Iterable[Any],
+        anchor_utc: datetime,
+        include_buffers: bool = True
+    ) -> "BusyIntervals":
+        """Build the busy index for a barber-day from appointment rows.
+
+        Works with ORM objects or anything exposing ``start_time``,
+        ``duration_minutes`` and (optionally) ``buffer_time_before/after``.
+        """
+        intervals = []
+        for appointment in appointments:
+            if appointment.start_time is None:
+                continue
+
+            start = minute_offset(appointment.start_time, anchor_utc)
+            end = start + (appointment.duration_minutes or 0)
+
+            if include_buffers:
+                start -= getattr(appointment, "buffer_time_before", 0) or 0
+                end += getattr(appointment, "buffer_time_after", 0) or 0
+
+            intervals.append((start, end))
+
+        return cls(anchor_utc, intervals)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: int, end: int) -> None:
+        """Insert a busy interval, keeping the index sorted and merged."""
+        if end <= start:
+            return
+
+        merged = list(zip(self.starts, self.ends))
+        merged.append((start, end))
+        rebuilt = BusyIntervals(self.anchor_utc, merged)
+        self.starts, self.ends = rebuilt.starts, rebuilt.ends
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether ``[start, end)`` intersects any busy interval (binary search)."""
+        if end <= start or not self.starts:
+            return False
+
+        # Last interval that starts before ``end`` is the only candidate,
+        # because intervals are disjoint and sorted.
+        index = bisect_right(self.starts, end - 1) - 1
+        return index >= 0 and self.ends[index] > start
+
+    def overlaps_datetime(self, start: datetime, end: datetime) -> bool:
+        """Datetime convenience wrapper around :meth:`overlaps`."""
+        return self.overlaps(
+            minute_offset(start, self.anchor_utc),
+            minute_offset(end, self.anchor_utc, round_up=True)
+        )
+
+    def free_mask(self, slot_starts: Sequence[int], duration: int) -> List[bool]:
+        """Availability for an ascending list of slot starts in a single sweep."""
+        mask = []
+        count = len(self.starts)
+        # Start at the first interval still open at the first slot, so a
+        # multi-day index does not rescan earlier days for every grid.
+        index = bisect_right(self.ends, slot_starts[0]) if slot_starts else 0
+
+        for start in slot_starts:
+            # Skip intervals that end before this slot begins; slots are
+            # ascending so the pointer never moves backwards.
+            while index < count and self.ends[index] <= start:
+                index += 1
+            mask.append(not (index < count and self.starts[index] < start + duration))
+
+        return mask
+
+
+class SlotGrid:
+    """Slot starts for one day/period as minute offsets from a UTC anchor.
+
+    Mirrors the legacy generation semantics: slots start at the localized
+    period start and advance by a fixed number of minutes (no DST
+    re-normalization inside the period).
+    """
+
+    __slots__ = ("anchor_utc", "offsets", "duration")
+
+    def __init__(self, anchor_utc: datetime, offsets: List[int], duration: int):
+        self.anchor_utc = anchor_utc
+        self.offsets = offsets
+        self.duration = duration
+
+    @classmethod
+    def for_period(
+        cls,
+        target_date: date,
+        period_start: time,
+        period_end: time,
+        slot_duration: int,
+        business_tz: pytz.BaseTzInfo,
+        anchor_utc: datetime,
+        earliest: Optional[datetime] = None
+    ) -> "SlotGrid":
+        """Build the grid for ``[period_start, period_end)`` on ``target_date``.
+
+        ``earliest`` (aware) is the lead-time-adjusted "now" already rounded
+        up to the slot interval; it only applies when it falls later than the
+        period start.
+        """
+        start_utc = business_tz.localize(datetime.combine(target_date, period_start)).astimezone(pytz.UTC)
+        end_utc = business_tz.localize(datetime.combine(target_date, period_end)).astimezone(pytz.UTC)
+
+        first = minute_offset(start_utc, anchor_utc)
+        last = minute_offset(end_utc, anchor_utc)
+
+        if earliest is not None:
+            earliest_utc = earliest.astimezone(pytz.UTC)
+            if earliest_utc > start_utc:
+                first = minute_offset(earliest_utc, anchor_utc, round_up=True)
+
+        if slot_duration <= 0:
+            return cls(anchor_utc, [], slot_duration)
+        return cls(anchor_utc, list(range(first, last, slot_duration)), slot_duration)
+
+    def instant(self, offset: int) -> datetime:
+        """Aware UTC datetime for a slot offset."""
+        return self.anchor_utc + timedelta(minutes=offset)
+
+
+class SlotFormatter:
+    """Formats slot offsets as ``HH:MM`` in a display timezone.
+
+    When the display timezone's UTC offset is the same at both ends of the
+    grid the labels are derived with integer arithmetic; otherwise (DST
+    transition days) it falls back to a per-slot ``astimezone``.
+    """
+
+    def __init__(self, anchor_utc: datetime, display_tz: pytz.BaseTzInfo, first: int, last: int):
+        self.anchor_utc = anchor_utc
+        self.display_tz = display_tz
+
+        first_offset = (anchor_utc + timedelta(minutes=first)).astimezone(display_tz).utcoffset()
+        last_offset = (anchor_utc + timedelta(minutes=last)).astimezone(display_tz).utcoffset()
+        self._fixed_shift: Optional[int] = None
+        if first_offset == last_offset:
+            anchor_minutes = anchor_utc.hour * 60 + anchor_utc.minute
+            self._fixed_shift = anchor_minutes + int(first_offset.total_seconds() // 60)
+
+    def label(self, offset: int) -> str:
+        if self._fixed_shift is not None:
+            minutes = (self._fixed_shift + offset) % 1440
+            return f"{minutes // 60:02d}:{minutes % 60:02d}"
+        return self.display(offset).strftime("%H:%M")
+
+    def display(self, offset: int) -> datetime:
+        """Aware datetime in the display timezone for a slot offset."""
+        return (self.anchor_utc + timedelta(minutes=offset)).astimezone(self.display_tz)
+
+
+def local_offset(
+    target_date: date,
+    local_time: time,
+    business_tz: pytz.BaseTzInfo,
+    anchor_utc: datetime
+) -> int:
+    """Minute offset of a business-local wall-clock time on ``target_date``."""
+    return minute_offset(business_tz.localize(datetime.combine(target_date, local_time)), anchor_utc)
+
+
+def day_anchor(target_date: date, business_tz: pytz.BaseTzInfo) -> datetime:
+    """Business-local midnight of ``target_date`` as an aware UTC datetime."""
+    return business_tz.localize(datetime.combine(target_date, time.min)).astimezone(pytz.UTC)
+
+
+def earliest_bookable(
+    target_date: date,
+    business_tz: pytz.BaseTzInfo,
+    min_lead_time_minutes: int,
+    slot_duration: int,
+    now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """Lead-time-adjusted earliest slot start for today, ``None`` for other days.
+
+    Matches the rounding used by the booking service: add the lead time,
+    drop seconds, then round up to the next multiple of the slot duration.
+    """
+    now_business = (now or datetime.now(pytz.UTC)).astimezone(business_tz)
+    if target_date != now_business.date():
+        return None
+
+    earliest = (now_business + timedelta(minutes=min_lead_time_minutes)).replace(second=0, microsecond=0)
+    if slot_duration > 0 and earliest.minute % slot_duration != 0:
+        earliest += timedelta(minutes=slot_duration - (earliest.minute % slot_duration))
+    return earliest
+
+
+def build_slot_list(
+    grid: SlotGrid,
+    busy: BusyIntervals,
+    formatter: SlotFormatter
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Render a grid into the API slot dicts.
+
+    Returns the slot list and the offset of the first free slot (or ``None``).
+    """
+    mask = busy.free_mask(grid.offsets, grid.duration)
+    slots = []
+    first_free = None
+
+    for offset, is_free in zip(grid.offsets, mask):
+        if is_free and first_free is None:
+            first_free = offset
+        slots.append({
+            "time": formatter.label(offset),
+            "available": is_free,
+            "is_next_available": False
+        })
+
+    return slots, first_free
@@ -10,13 +10,14 @@ import pytest
 import asyncio
 from typing import Generator, AsyncGenerator
 from httpx import AsyncClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
 from main import app
 from database import Base, get_db
 from models import User
+from services.booking_settings_cache import booking_settings_cache
 from utils.auth import get_password_hash, create_access_token
 
 
@@ -41,10 +42,30 @@ def engine():
 
 
 @pytest.fixture(scope="function")
-def db(engine) -> Generator[Session, None, None]:
+def session_factory(engine):
+    """Session factory bound to the test engine, for code that opens its own sessions"""
+    # Each test gets a fresh database, so drop the process-wide settings snapshot
+    booking_settings_cache.invalidate()
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="function")
+def sql_statements(engine) -> Generator[list, None, None]:
+    """SQL statements executed on the test engine, in order"""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _record)
+
+
+@pytest.fixture(scope="function")
+def db(session_factory) -> Generator[Session, None, None]:
     """Create a test database session"""
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = TestingSessionLocal()
+    db = session_factory()
     try:
         yield db
     finally:
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Cache Invalidation Benchmark
+============================
+
+Compares the old SCAN + per-key DELETE invalidation with tag-set
+invalidation (services/redis_cache.EnhancedCacheService.invalidate_tags).
+
+Runs against an in-process fake Redis that counts round-trips and the number
+of keys the server has to examine, so results are reproducible without a
+Redis server.  Reported latency is the measured in-process time plus
+``round_trips x --rtt-ms``, which is what dominates against a real server.
+
+Usage:
+    python tests/performance/benchmark_cache_invalidation.py
+    python tests/performance/benchmark_cache_invalidation.py --keyspace 10000 100000 --tagged 500 --rtt-ms 0.5
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import os
+import sys
+import time as time_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.redis_cache import EnhancedCacheService  # noqa: E402
+
+
+class CountingRedis:
+    """Minimal async Redis stand-in that counts round-trips and key visits."""
+
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+        self.round_trips = 0
+        self.keys_examined = 0
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.round_trips += 1
+        self.store[key] = value
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return self._delete(keys)
+
+    async def scan_iter(self, match=None, count=None):
+        # Server default COUNT is 10: one round-trip per 10 keys visited
+        batch = count or 10
+        keys = list(self.store) + list(self.sets)
+        for start in range(0, len(keys), batch):
+            self.round_trips += 1
+            chunk = keys[start:start + batch]
+            self.keys_examined += len(chunk)
+            for key in chunk:
+                if match is None or fnmatch.fnmatchcase(key, match):
+                    yield key
+
+    def pipeline(self, transaction=True):
+        return CountingPipeline(self)
+
+    def _delete(self, keys):
+        deleted = 0
+        for key in keys:
+            if self.store.pop(key, None) is not None or self.sets.pop(key, None) is not None:
+                deleted += 1
+        return deleted
+
+
+class CountingPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.redis.store.__setitem__(key, value))
+
+    def sadd(self, key, *members):
+        self.commands.append(lambda: self.redis.sets.setdefault(key, set()).update(members))
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: True)
+
+    def smembers(self, key):
+        def run():
+            members = self.redis.sets.get(key, set())
+            self.redis.keys_examined += len(members)
+            return set(members)
+        self.commands.append(run)
+
+    def unlink(self, *keys):
+        self.commands.append(lambda: self.redis._delete(keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [command() for command in self.commands]
+
+
+async def legacy_clear_pattern(redis, pattern):
+    """The previous implementation: SCAN the keyspace, one DELETE per match."""
+    deleted = 0
+    async for key in redis.scan_iter(match=pattern):
+        await redis.delete(key)
+        deleted += 1
+    return deleted
+
+
+def build_service(redis):
+    service = EnhancedCacheService()
+    service.redis_manager.redis = redis
+    service.redis_manager._connected = True
+    return service
+
+
+async def populate(service, keyspace, tagged):
+    """``keyspace`` unrelated keys plus ``tagged`` slot entries for one barber."""
+    redis = service.redis_manager.redis
+    for i in range(keyspace):
+        redis.store[f"api_cache:request:{i:08x}"] = b"{}"
+    for i in range(tagged):
+        await service.set(
+            f"api_cache:slots:barber:5:date:2030-01-{i % 28 + 1:02d}:loc:{i}:user:",
+            {"slots": []},
+            ttl=300,
+            tags=["slots", "barber:5"]
+        )
+
+
+async def run_case(keyspace, tagged, rtt_ms):
+    results = {}
+    for name in ("scan", "tags"):
+        redis = CountingRedis()
+        service = build_service(redis)
+        await populate(service, keyspace, tagged)
+        redis.round_trips = 0
+        redis.keys_examined = 0
+
+        started = time_module.perf_counter()
+        if name == "scan":
+            deleted = await legacy_clear_pattern(redis, "api_cache:slots:barber:5:*")
+        else:
+            deleted = await service.invalidate_tags(["barber:5"])
+        elapsed_ms = (time_module.perf_counter() - started) * 1000
+
+        results[name] = {
+            "deleted": deleted,
+            "round_trips": redis.round_trips,
+            "keys_examined": redis.keys_examined,
+            "latency_ms": elapsed_ms + redis.round_trips * rtt_ms,
+        }
+
+    if results["scan"]["deleted"] != results["tags"]["deleted"]:
+        raise SystemExit(f"Deleted count mismatch at keyspace={keyspace}: {results}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SCAN+DELETE against tag-set invalidation")
+    parser.add_argument("--keyspace", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--tagged", type=int, default=200, help="Entries registered under the invalidated tag")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="Modelled network round-trip time")
+    args = parser.parse_args()
+
+    print(f"Invalidating {args.tagged} entries, modelled RTT {args.rtt_ms} ms")
+    print(f"{'keyspace':>9} {'method':>6} {'round trips':>12} {'keys examined':>14} {'latency ms':>11}")
+
+    for keyspace in args.keyspace:
+        results = asyncio.run(run_case(keyspace, args.tagged, args.rtt_ms))
+        for name, result in results.items():
+            print(
+                f"{keyspace:>9} {name:>6} {result['round_trips']:>12} "
+                f"{result['keys_examined']:>14} {result['latency_ms']:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Conflict Query Benchmark
+========================
+
+Compares the old conflict lookup, ``start_time.cast(Date) == day``, with the
+half-open range query in services/conflict_queries.py over a synthetic
+appointments table (1M rows by default) in a temporary SQLite database.
+
+Three setups are measured with identical data, cross-checked for equal
+results, and printed with their EXPLAIN QUERY PLAN:
+
+* cast     - cast(Date) predicate, no conflict index (the old query on the old schema)
+* cast+idx - cast(Date) predicate with the idx_appointments_conflict_covering
+             index: only the barber_id prefix of the index is usable
+* range    - half-open range predicate with the covering index (today's query)
+
+Usage:
+    python tests/performance/benchmark_conflict_queries.py
+    python tests/performance/benchmark_conflict_queries.py --rows 200000 --barbers 50 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time as time_module
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, func, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import models  # noqa: E402
+from database import Base  # noqa: E402
+from services.conflict_queries import ACTIVE_STATUSES, active_appointments  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+COVERING_INDEX = next(
+    index for index in models.Appointment.__table__.indexes if index.name == "idx_appointments_conflict_covering"
+)
+COLUMNS = (models.Appointment.id, models.Appointment.start_time, models.Appointment.duration_minutes)
+STATUSES = ["pending", "confirmed", "confirmed", "completed", "cancelled"]
+FIRST_DAY = date(2024, 1, 1)
+INSERT_SQL = (
+    "INSERT INTO appointments (id, user_id, barber_id, start_time, duration_minutes, status, version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def legacy_query(db, day, barber_id):
+    """The query detect_appointment_conflicts used to run.
+
+    SQLite turns ``CAST(start_time AS DATE)`` into the year as a number, so
+    the equivalent ``date(start_time)`` is used here; both wrap the column in
+    a function the index cannot see through.
+    """
+    return db.query(*COLUMNS).filter(
+        func.date(models.Appointment.start_time) == day.isoformat(),
+        models.Appointment.status.in_(ACTIVE_STATUSES),
+        models.Appointment.barber_id == barber_id,
+    )
+
+
+def populate(engine, rows, barbers, days, seed):
+    Base.metadata.create_all(engine, tables=[models.Appointment.__table__])
+    # Start from the old schema; create_covering_index adds it back
+    COVERING_INDEX.drop(engine)
+    rng = random.Random(seed)
+    started = time_module.perf_counter()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        batch = []
+        for n in range(1, rows + 1):
+            start = datetime.combine(FIRST_DAY + timedelta(days=rng.randrange(days)), datetime.min.time())
+            start += timedelta(minutes=rng.randrange(8 * 60, 20 * 60, 15))
+            batch.append((n, 1, rng.randrange(1, barbers + 1), start.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                          rng.choice([15, 30, 45, 60]), rng.choice(STATUSES), 1))
+            if len(batch) == 50000:
+                cursor.executemany(
+                    INSERT_SQL, batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                INSERT_SQL, batch
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return time_module.perf_counter() - started
+
+
+def create_covering_index(engine):
+    COVERING_INDEX.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def explain(db, query):
+    statement = query.statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+    return [row[-1] for row in rows]
+
+
+def timed(db, make_query, probes, repeat):
+    samples = []
+    for _ in range(repeat):
+        for day, barber_id in probes:
+            started = time_module.perf_counter()
+            make_query(db, day, barber_id).all()
+            samples.append((time_module.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cast(Date) against half-open range conflict queries")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--barbers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--probes", type=int, default=20, help="Distinct (day, barber) lookups per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    range_query = lambda db, day, barber_id: active_appointments(db, day, barber_id=barber_id, columns=COLUMNS)
+    setups = [("cast", legacy_query, False), ("cast+idx", legacy_query, True), ("range", range_query, True)]
+
+    rng = random.Random(1)
+    probes = [
+        (FIRST_DAY + timedelta(days=rng.randrange(args.days)), rng.randrange(1, args.barbers + 1))
+        for _ in range(args.probes)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'conflicts.db')}")
+        seconds = populate(engine, args.rows, args.barbers, args.days, seed=7)
+        print(f"{args.rows} appointments, {args.barbers} barbers over {args.days} days (loaded in {seconds:.1f}s)")
+
+        results = {}
+        has_index = False
+        for name, make_query, indexed in setups:
+            if indexed and not has_index:
+                create_covering_index(engine)
+                has_index = True
+            with Session(engine) as db:
+                results[name] = [sorted(make_query(db, day, barber_id).all()) for day, barber_id in probes]
+                print(f"\n[{name}]")
+                for line in explain(db, make_query(db, *probes[0])):
+                    print(f"  {line}")
+                median_ms, max_ms = timed(db, make_query, probes, args.repeat)
+                print(f"  median {median_ms:.3f} ms, max {max_ms:.3f} ms per lookup")
+                results[name + " ms"] = median_ms
+
+        if not (results["cast"] == results["cast+idx"] == results["range"]):
+            raise SystemExit("Result mismatch between query forms")
+
+        print(f"\nrange vs cast: {results['cast ms'] / results['range ms']:.1f}x faster; "
+              f"vs cast+idx: {results['cast+idx ms'] / results['range ms']:.1f}x faster")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
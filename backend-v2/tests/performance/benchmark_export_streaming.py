@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Export Streaming Benchmark
+==========================
+
+Compares the buffered client export (``ExportService.export_clients``: load
+every row, build a list of dicts, CSV into StringIO, base64) with the
+streaming export (``ExportService.stream_clients``: keyset-paginated column
+batches encoded chunk by chunk).
+
+Seeds a temporary SQLite database with N clients, then reports wall time,
+peak Python heap (tracemalloc) and bytes produced for each mode.
+
+Usage:
+    python tests/performance/benchmark_export_streaming.py
+    python tests/performance/benchmark_export_streaming.py --clients 100000 250000 --gzip
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+import time as time_module
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Client  # noqa: E402
+from services.export_service import ExportService  # noqa: E402
+
+
+def seed(path, count):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Client.__table__])
+    created = datetime(2024, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(count):
+            batch.append({
+                "first_name": f"First{i}",
+                "last_name": f"Last{i}",
+                "email": f"client{i}@example.com",
+                "customer_type": ("new", "returning", "vip", "at_risk")[i % 4],
+                "total_visits": i % 40,
+                "total_spent": float(i % 40) * 35.0,
+                "average_ticket": 35.0,
+                "no_show_count": i % 3,
+                "cancellation_count": i % 5,
+                "referral_count": 0,
+                "tags": "regular" if i % 7 else "vip,referral",
+                "created_at": created + timedelta(minutes=i)
+            })
+            if len(batch) == 5000:
+                conn.execute(Client.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Client.__table__.insert(), batch)
+    return engine
+
+
+def measure(run):
+    tracemalloc.start()
+    started = time_module.perf_counter()
+    produced = run()
+    elapsed = time_module.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, produced
+
+
+def run_case(count, compress, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = seed(os.path.join(tmp, "export.db"), count)
+        factory = sessionmaker(bind=engine, autoflush=False)
+        service = ExportService()
+        service.max_export_records = count
+        service.stream_batch_size = batch_size
+
+        def buffered():
+            db = factory()
+            try:
+                result = asyncio.run(service.export_clients(db, format="csv"))
+                return len(base64.b64decode(result["content"]))
+            finally:
+                db.close()
+
+        def streamed():
+            return sum(
+                len(chunk) for chunk in
+                service.stream_clients(format="csv", compress=compress, session_factory=factory)
+            )
+
+        results = {"buffered": measure(buffered), "streamed": measure(streamed)}
+        engine.dispose()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark buffered vs streaming client exports")
+    parser.add_argument("--clients", type=int, nargs="+", default=[100000])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per keyset page")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the streamed output")
+    args = parser.parse_args()
+
+    print(f"Streaming batch size {args.batch_size}, gzip={'on' if args.gzip else 'off'}")
+    print(f"{'clients':>8} {'mode':>9} {'seconds':>8} {'peak MB':>8} {'output MB':>10}")
+
+    for count in args.clients:
+        results = run_case(count, args.gzip, args.batch_size)
+        for mode, (elapsed, peak, produced) in results.items():
+            print(
+                f"{count:>8} {mode:>9} {elapsed:>8.2f} "
+                f"{peak / 1024 / 1024:>8.1f} {produced / 1024 / 1024:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
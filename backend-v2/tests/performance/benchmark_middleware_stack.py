@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Middleware Stack Benchmark
+==========================
+
+Measures the latency each middleware layer adds under concurrent load.  The
+production stack from ``main.py`` is rebuilt one layer at a time around a
+trivial endpoint and driven in-process through ``httpx.ASGITransport``, so
+the numbers are middleware overhead only (no sockets, no database work on
+the endpoint).
+
+Each row adds one layer to the previous row's stack and reports p50/p99
+latency plus the delta against the row above.  A final row wraps the bare
+endpoint in one no-op ``BaseHTTPMiddleware`` for comparison with the pure
+ASGI layers.
+
+EnhancedSecurityMiddleware runs with its limits raised so the rate limiter
+is exercised without rejecting the benchmark's own traffic; without Redis it
+uses the in-memory fallback.
+
+Usage:
+    python tests/performance/benchmark_middleware_stack.py
+    python tests/performance/benchmark_middleware_stack.py --requests 5000 --concurrency 100 --method get
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time as time_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from middleware import MFAEnforcementMiddleware, RequestValidationMiddleware, SecurityHeadersMiddleware  # noqa: E402
+from middleware.cache_middleware import SmartCacheMiddleware  # noqa: E402
+from middleware.configuration_security import ConfigurationSecurityMiddleware  # noqa: E402
+from middleware.enhanced_security import EnhancedSecurityMiddleware, WebhookSecurityMiddleware  # noqa: E402
+from middleware.financial_security import FinancialSecurityMiddleware  # noqa: E402
+from middleware.multi_tenancy import MultiTenancyMiddleware  # noqa: E402
+from middleware.sentry_middleware import SentryEnhancementMiddleware  # noqa: E402
+
+PATH = "/api/v1/bench"
+PAYLOAD = {"client_id": 42, "service": "Haircut", "notes": "x" * 200, "tags": ["new", "walk-in"]}
+
+
+class UnthrottledEnhancedSecurity(EnhancedSecurityMiddleware):
+    """EnhancedSecurityMiddleware with limits no benchmark run can reach"""
+
+    def __init__(self, app, environment: str = "production"):
+        super().__init__(app, environment=environment)
+        self.rate_limits = {name: "1000000000/hour" for name in self.rate_limits}
+
+
+class NoOpBaseHTTPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+# Registration order of the production branch in main.py; Starlette makes
+# the last one added the outermost
+PRODUCTION_STACK = [
+    ("ConfigurationSecurity", ConfigurationSecurityMiddleware, {"check_interval_minutes": 30}),
+    ("SentryEnhancement", SentryEnhancementMiddleware, {"secret_key": None}),
+    ("EnhancedSecurity", UnthrottledEnhancedSecurity, {"environment": "production"}),
+    ("WebhookSecurity", WebhookSecurityMiddleware, {"webhook_secrets": {}}),
+    ("RequestValidation", RequestValidationMiddleware, {}),
+    ("MultiTenancy", MultiTenancyMiddleware, {}),
+    ("FinancialSecurity", FinancialSecurityMiddleware, {}),
+    ("MFAEnforcement", MFAEnforcementMiddleware, {}),
+    ("SecurityHeaders", SecurityHeadersMiddleware, {}),
+    ("SmartCache", SmartCacheMiddleware, {"enable_cache": True}),
+]
+
+
+def build_app(layers):
+    app = FastAPI()
+
+    @app.get(PATH)
+    async def read():
+        return {"ok": True}
+
+    @app.post(PATH)
+    async def write(payload: dict):
+        return {"ok": True, "fields": len(payload)}
+
+    for _, middleware_class, options in layers:
+        app.add_middleware(middleware_class, **options)
+    return app
+
+
+async def measure(app, method, total, concurrency):
+    """Per-request latencies in milliseconds and the overall request rate"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time_module.perf_counter()
+                if method == "post":
+                    response = await client.post(PATH, json=PAYLOAD)
+                else:
+                    response = await client.get(PATH)
+                latencies.append((time_module.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{response.status_code}: {response.text}")
+
+        # Warm up routing, validation models and lazy imports
+        await asyncio.gather(*[one() for _ in range(min(total, 50))])
+        latencies.clear()
+
+        started = time_module.perf_counter()
+        await asyncio.gather(*[one() for _ in range(total)])
+        elapsed = time_module.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return p50, p99, total / elapsed
+
+
+def main():
+    # Middleware logging (request audit lines, config warnings) would dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    parser = argparse.ArgumentParser(description="Benchmark per-layer middleware latency")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per stack")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--method", choices=["get", "post"], default="post", help="POST sends a JSON body")
+    args = parser.parse_args()
+
+    print(f"{args.requests} {args.method.upper()} requests per stack, concurrency {args.concurrency}")
+    print(f"{'layer added':>24} {'p50 ms':>8} {'p99 ms':>8} {'+p50':>7} {'+p99':>7} {'req/s':>8}")
+
+    rows = [("(endpoint only)", [])]
+    rows += [(name, PRODUCTION_STACK[:i + 1]) for i, (name, _, _) in enumerate(PRODUCTION_STACK)]
+
+    previous = None
+    for name, layers in rows:
+        p50, p99, rate = asyncio.run(measure(build_app(layers), args.method, args.requests, args.concurrency))
+        delta50 = p50 - previous[0] if previous else 0.0
+        delta99 = p99 - previous[1] if previous else 0.0
+        print(f"{name:>24} {p50:>8.3f} {p99:>8.3f} {delta50:>+7.3f} {delta99:>+7.3f} {rate:>8.0f}")
+        previous = (p50, p99)
+        if not layers:
+            baseline = previous
+
+    p50, p99, rate = asyncio.run(measure(
+        build_app([("NoOpBaseHTTP", NoOpBaseHTTPMiddleware, {})]), args.method, args.requests, args.concurrency
+    ))
+    print(
+        f"{'BaseHTTPMiddleware no-op':>24} {p50:>8.3f} {p99:>8.3f} "
+        f"{p50 - baseline[0]:>+7.3f} {p99 - baseline[1]:>+7.3f} {rate:>8.0f}  (vs endpoint only)"
+    )
+
+
+if __name__ == "__main__":
+    main()
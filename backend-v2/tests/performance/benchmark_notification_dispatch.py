@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatch Benchmark
+===============================
+
+Measures queue throughput against ``FakeNotificationProvider``, which sleeps
+a fixed latency per provider request the way a SendGrid/Twilio round-trip
+would.  Compares:
+
+- sequential: one worker, one request per notification (the old loop)
+- concurrent: the dispatcher's thread pool, one request per notification
+- batched:    the thread pool plus SendGrid-style personalization batches
+
+Seeds a temporary SQLite queue with N due notifications, a share of which
+are identical campaign emails, and drains it with repeated dispatch calls.
+
+Usage:
+    python tests/performance/benchmark_notification_dispatch.py
+    python tests/performance/benchmark_notification_dispatch.py --notifications 5000 --latency 0.08 --workers 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time as time_module
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import NotificationQueue, NotificationStatus  # noqa: E402
+from services.notification_dispatch import FakeNotificationProvider, NotificationDispatcher  # noqa: E402
+
+
+class UnbatchedProvider(FakeNotificationProvider):
+    """Fake provider without a batch API"""
+
+    def __getattribute__(self, name):
+        if name == "send_email_batch":
+            raise AttributeError(name)
+        return super().__getattribute__(name)
+
+
+def seed(path, count, campaign_share):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[NotificationQueue.__table__])
+    due = datetime.utcnow() - timedelta(minutes=5)
+    campaign = int(count * campaign_share)
+    rows = []
+    for i in range(count):
+        is_sms = i % 5 == 4
+        rows.append({
+            "user_id": i,
+            "notification_type": "sms" if is_sms else "email",
+            "template_name": "marketing" if i < campaign else "appointment_reminder",
+            "recipient": f"+1555{i:07d}" if is_sms else f"user{i}@example.com",
+            "subject": "Hello",
+            "body": "<p>Campaign</p>" if i < campaign else f"<p>Reminder {i}</p>",
+            "status": NotificationStatus.PENDING.name,
+            "scheduled_for": due,
+            "attempts": 0
+        })
+    with engine.begin() as conn:
+        conn.execute(NotificationQueue.__table__.insert(), rows)
+    return engine
+
+
+def run_case(mode, count, latency, workers, batch_size, campaign_share):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = seed(os.path.join(tmp, "queue.db"), count, campaign_share)
+        factory = sessionmaker(bind=engine, autoflush=False)
+        provider = FakeNotificationProvider(latency) if mode == "batched" else UnbatchedProvider(latency)
+        dispatcher = NotificationDispatcher(provider, max_workers=1 if mode == "sequential" else workers)
+
+        started = time_module.perf_counter()
+        sent = 0
+        while True:
+            db = factory()
+            try:
+                result = dispatcher.dispatch(db, batch_size=batch_size)
+            finally:
+                db.close()
+            if not result["processed"]:
+                break
+            sent += result["successful"]
+        elapsed = time_module.perf_counter() - started
+        engine.dispose()
+        return elapsed, sent, provider.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notification queue dispatch")
+    parser.add_argument("--notifications", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake provider request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows claimed per dispatch")
+    parser.add_argument("--campaign-share", type=float, default=0.5, help="Fraction of identical campaign emails")
+    args = parser.parse_args()
+
+    print(
+        f"{args.notifications} notifications, {args.latency * 1000:.0f} ms per request, "
+        f"{args.workers} workers, claim batch {args.batch_size}"
+    )
+    print(f"{'mode':>11} {'seconds':>8} {'sent':>6} {'requests':>9} {'per sec':>9}")
+    for mode in ("sequential", "concurrent", "batched"):
+        elapsed, sent, requests = run_case(
+            mode, args.notifications, args.latency, args.workers, args.batch_size, args.campaign_share
+        )
+        print(f"{mode:>11} {elapsed:>8.2f} {sent:>6} {requests:>9} {sent / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
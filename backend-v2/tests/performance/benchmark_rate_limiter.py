@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Benchmark
+======================
+
+Compares the previous fixed-window check (one ``cache.increment`` per
+minute/hour/day window, each an EXISTS plus an INCR/EXPIRE pipeline) with
+the single-script GCRA check in services/rate_limit_engine.py, and with the
+in-process token buckets used when Redis is down.
+
+Runs against an in-process fake Redis that counts round-trips and runs the
+GCRA script's arithmetic in Python, so results are reproducible without a
+Redis server.  Throughput is computed from the measured in-process time plus
+``round_trips x --rtt-ms`` per check, which is what dominates against a real
+server.  The burst column is the most requests one client gets admitted in
+the two seconds around a minute boundary.
+
+Usage:
+    python tests/performance/benchmark_rate_limiter.py
+    python tests/performance/benchmark_rate_limiter.py --checks 50000 --clients 1000 --rtt-ms 0.5
+"""
+
+import argparse
+import math
+import os
+import sys
+import time as time_module
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.rate_limit_engine import LocalTokenBuckets, RateLimitEngine, RateWindow  # noqa: E402
+
+WINDOWS = [RateWindow("minute", 60, 60), RateWindow("hour", 1000, 3600), RateWindow("day", 10000, 86400)]
+
+
+class CountingRedis:
+    """Minimal Redis stand-in that counts round-trips; ``clock`` is in seconds."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.store = {}
+        self.round_trips = 0
+
+    def exists(self, key):
+        self.round_trips += 1
+        return int(key in self.store)
+
+    def pipeline(self):
+        return CountingPipeline(self)
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.round_trips += 1
+            return self._gcra(keys, args)
+        return run
+
+    def _gcra(self, keys, args):
+        # GCRA_SCRIPT, line for line
+        now = self.clock() * 1000
+        count = args[0]
+        windows = []
+        retry_after, exceeded = 0, 0
+        for i, key in enumerate(keys, start=1):
+            period = args[2 * i - 1]
+            interval = period / args[2 * i]
+            tat = max(float(self.store.get(key, now)), now)
+            wait = tat + interval * count - period - now
+            if wait > retry_after:
+                retry_after, exceeded = wait, i
+            windows.append((key, tat, interval, period))
+        allowed = 1 if exceeded == 0 else 0
+        result = [allowed, math.ceil(retry_after), exceeded]
+        for key, tat, interval, period in windows:
+            if allowed and count > 0:
+                tat += interval * count
+                self.store[key] = "%.3f" % tat
+            result.append(math.floor((period - (tat - now)) / interval + 1e-6))
+        return result
+
+
+class CountingPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def incr(self, key, amount=1):
+        def run():
+            self.redis.store[key] = self.redis.store.get(key, 0) + amount
+            return self.redis.store[key]
+        self.commands.append(run)
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: True)
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [command() for command in self.commands]
+
+
+def legacy_check(redis, identifier, count=1):
+    """The previous RedisRateLimiter.check_rate_limit loop over fixed windows."""
+    now = datetime.utcfromtimestamp(redis.clock())
+    keys = {
+        "minute": (f"rate:minute:{identifier}:{now.strftime('%Y%m%d%H%M')}", 60),
+        "hour": (f"rate:hour:{identifier}:{now.strftime('%Y%m%d%H')}", 3600),
+        "day": (f"rate:day:{identifier}:{now.strftime('%Y%m%d')}", 86400),
+    }
+    limits = {window.name: window.limit for window in WINDOWS}
+    for window, (key, ttl) in keys.items():
+        # RedisCacheService.increment
+        pipe = redis.pipeline()
+        pipe.incr(key, count)
+        if not redis.exists(key):
+            pipe.expire(key, ttl)
+        current = pipe.execute()[0]
+        if current > limits[window]:
+            return False
+    return True
+
+
+def make_checker(mode, clock):
+    redis = CountingRedis(clock)
+    if mode == "fixed":
+        return redis, lambda identifier: legacy_check(redis, identifier)
+    if mode == "gcra":
+        engine = RateLimitEngine(redis_client_factory=lambda: redis)
+    else:
+        engine = RateLimitEngine(redis_client_factory=lambda: None, local=LocalTokenBuckets(clock=clock))
+    return redis, lambda identifier: engine.check(identifier, WINDOWS).allowed
+
+
+def throughput(mode, checks, clients, rtt_ms):
+    now = [1_700_000_000.0]
+    redis, check = make_checker(mode, lambda: now[0])
+
+    started = time_module.perf_counter()
+    for n in range(checks):
+        now[0] += 0.001
+        check(f"ip:{n % clients}")
+    elapsed = time_module.perf_counter() - started
+
+    round_trips = redis.round_trips / checks
+    per_check_ms = elapsed * 1000 / checks + round_trips * rtt_ms
+    return {"round_trips": round_trips, "per_check_ms": per_check_ms, "checks_per_s": 1000 / per_check_ms}
+
+
+def boundary_burst(mode):
+    """Requests admitted for one client between 1 s before and 1 s after a minute boundary."""
+    boundary = 1_700_000_040.0  # a multiple of 60
+    now = [boundary - 1]
+    _, check = make_checker(mode, lambda: now[0])
+
+    admitted = 0
+    for n in range(400):
+        now[0] = boundary - 1 + n * 0.005
+        admitted += check("ip:burst")
+    return admitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fixed-window counters against the GCRA rate limit script")
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=500, help="Distinct identifiers the checks rotate through")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="Modelled network round-trip time")
+    args = parser.parse_args()
+
+    limit = WINDOWS[0].limit
+    print(f"{args.checks} checks over {args.clients} clients, limits {limit}/min, modelled RTT {args.rtt_ms} ms")
+    print(f"{'mode':>6} {'round trips':>12} {'ms/check':>9} {'checks/s':>10} {'burst':>6}")
+
+    for mode in ("fixed", "gcra", "local"):
+        result = throughput(mode, args.checks, args.clients, args.rtt_ms)
+        print(
+            f"{mode:>6} {result['round_trips']:>12.1f} {result['per_check_ms']:>9.4f} "
+            f"{result['checks_per_s']:>10.0f} {boundary_burst(mode):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Slot Engine Micro-Benchmark
+===========================
+
+Compares the interval-index slot engine (services/slot_engine.py) with the
+original nested slot x appointment loop that booking_service used to run.
+Both implementations are fed identical synthetic barber-days and the results
+are cross-checked before timing.
+
+Usage:
+    python tests/performance/benchmark_slot_engine.py
+    python tests/performance/benchmark_slot_engine.py --appointments 200 --slot-minutes 10 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import slot_engine  # noqa: E402
+
+
+def legacy_available_slots(target_date, appointments, business_tz, user_tz, slot_minutes, start, end):
+    """The pre-index implementation: localize every slot, compare with every appointment."""
+    all_slots = []
+    current_time = business_tz.localize(datetime.combine(target_date, start))
+    end_time = business_tz.localize(datetime.combine(target_date, end))
+    while current_time < end_time:
+        current_time_user = current_time.astimezone(user_tz)
+        all_slots.append({
+            "time": current_time_user.strftime("%H:%M"),
+            "datetime": current_time,
+            "datetime_user": current_time_user
+        })
+        current_time += timedelta(minutes=slot_minutes)
+
+    available_slots = []
+    for slot in all_slots:
+        is_available = True
+        slot_end = slot["datetime"] + timedelta(minutes=slot_minutes)
+        slot_start_utc = slot["datetime"].astimezone(pytz.UTC)
+        slot_end_utc = slot_end.astimezone(pytz.UTC)
+
+        for appointment in appointments:
+            if appointment.start_time.tzinfo is None:
+                appointment_start = pytz.UTC.localize(appointment.start_time)
+            else:
+                appointment_start = appointment.start_time
+            appointment_end = appointment_start + timedelta(minutes=appointment.duration_minutes)
+            appointment_start_with_buffer = appointment_start - timedelta(minutes=appointment.buffer_time_before or 0)
+            appointment_end_with_buffer = appointment_end + timedelta(minutes=appointment.buffer_time_after or 0)
+            if not (slot_end_utc <= appointment_start_with_buffer or slot_start_utc >= appointment_end_with_buffer):
+                is_available = False
+                break
+
+        available_slots.append({"time": slot["time"], "available": is_available, "is_next_available": False})
+
+    return available_slots
+
+
+def engine_available_slots(target_date, appointments, business_tz, user_tz, slot_minutes, start, end):
+    """The interval-index implementation used by booking_service today."""
+    anchor_utc = slot_engine.day_anchor(target_date, business_tz)
+    grid = slot_engine.SlotGrid.for_period(target_date, start, end, slot_minutes, business_tz, anchor_utc)
+    busy = slot_engine.BusyIntervals.from_appointments(appointments, anchor_utc)
+    formatter = slot_engine.SlotFormatter(
+        anchor_utc, user_tz,
+        grid.offsets[0] if grid.offsets else 0,
+        grid.offsets[-1] if grid.offsets else 0
+    )
+    slots, _ = slot_engine.build_slot_list(grid, busy, formatter)
+    return slots
+
+
+def make_appointments(target_date, business_tz, count, seed):
+    """Synthetic multi-chair day: ``count`` appointments spread over business hours."""
+    rng = random.Random(seed)
+    day_start = business_tz.localize(datetime.combine(target_date, time(8, 0))).astimezone(pytz.UTC)
+    return [
+        SimpleNamespace(
+            start_time=(day_start + timedelta(minutes=rng.randrange(0, 12 * 60, 5))).replace(tzinfo=None),
+            duration_minutes=rng.choice([15, 30, 45, 60]),
+            buffer_time_before=rng.choice([0, 0, 5, 10]),
+            buffer_time_after=rng.choice([0, 5, 10, 15]),
+        )
+        for _ in range(count)
+    ]
+
+
+def timed(func, repeat, *args):
+    samples = []
+    for _ in range(repeat):
+        started = time_module.perf_counter()
+        func(*args)
+        samples.append((time_module.perf_counter() - started) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark slot engine against the legacy nested loop")
+    parser.add_argument("--appointments", type=int, nargs="+", default=[0, 10, 50, 200, 1000])
+    parser.add_argument("--slot-minutes", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--business-tz", default="America/New_York")
+    parser.add_argument("--user-tz", default="America/Los_Angeles")
+    args = parser.parse_args()
+
+    business_tz = pytz.timezone(args.business_tz)
+    user_tz = pytz.timezone(args.user_tz)
+    target_date = date.today() + timedelta(days=3)
+    start, end = time(8, 0), time(20, 0)
+
+    print(f"Slot grid: {start}-{end}, {args.slot_minutes} min slots, median of {args.repeat} runs")
+    print(f"{'appointments':>12} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+
+    for count in args.appointments:
+        appointments = make_appointments(target_date, business_tz, count, seed=count)
+        call_args = (target_date, appointments, business_tz, user_tz, args.slot_minutes, start, end)
+
+        legacy = legacy_available_slots(*call_args)
+        engine = engine_available_slots(*call_args)
+        if legacy != engine:
+            raise SystemExit(f"Result mismatch with {count} appointments")
+
+        legacy_ms, _ = timed(legacy_available_slots, args.repeat, *call_args)
+        engine_ms, _ = timed(engine_available_slots, args.repeat, *call_args)
+        speedup = legacy_ms / engine_ms if engine_ms else float("inf")
+        print(f"{count:>12} {legacy_ms:>10.3f} {engine_ms:>10.3f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
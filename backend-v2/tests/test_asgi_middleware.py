@@ -0,0 +1,202 @@
+"""
+Tests for the pure ASGI middleware stack: header injection, request body
+replay across layers and rejections answered without BaseHTTPMiddleware.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from middleware import MFAEnforcementMiddleware, RequestValidationMiddleware, SecurityHeadersMiddleware
+from middleware.asgi import BODY_SCOPE_KEY, read_body
+from middleware.cache_middleware import SmartCacheMiddleware
+from middleware.enhanced_security import WebhookSecurityMiddleware
+from middleware.mfa_enforcement import MFASessionManager
+from middleware.multi_tenancy import MultiTenancyMiddleware
+
+
+class BodyPeekMiddleware:
+    """Second layer that reads the body, like FinancialSecurityMiddleware"""
+
+    def __init__(self, app, seen):
+        self.app = app
+        self.seen = seen
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            body, receive = await read_body(scope, receive)
+            self.seen.append(body)
+        await self.app(scope, receive, send)
+
+
+class FakeUserMiddleware:
+    """Stands in for authentication by putting a user on request.state"""
+
+    def __init__(self, app, user):
+        self.app = app
+        self.user = user
+
+    async def __call__(self, scope, receive, send):
+        scope.setdefault("state", {})["user"] = self.user
+        await self.app(scope, receive, send)
+
+
+def _app():
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"body": (await request.body()).decode(), "json": getattr(request.state, "json_data", None)}
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    return app
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestRequestBody:
+    """The body is read from the client once and replayed to every layer"""
+
+    @pytest.mark.asyncio
+    async def test_body_reaches_inner_layer_and_endpoint(self):
+        seen = []
+        app = _app()
+        app.add_middleware(BodyPeekMiddleware, seen=seen)
+        app.add_middleware(RequestValidationMiddleware)
+
+        async with _client(app) as client:
+            response = await client.post("/echo", content=b'{"a":1}', headers={"content-type": "application/json"})
+
+        assert response.status_code == 200
+        assert response.json() == {"body": '{"a":1}', "json": {"a": 1}}
+        assert seen == [b'{"a":1}']
+
+    @pytest.mark.asyncio
+    async def test_read_body_reuses_the_buffered_copy(self):
+        messages = [
+            {"type": "http.request", "body": b"ab", "more_body": True},
+            {"type": "http.request", "body": b"c", "more_body": False},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        scope = {"type": "http"}
+        body, replay = await read_body(scope, receive)
+        again, same = await read_body(scope, replay)
+
+        assert body == again == scope[BODY_SCOPE_KEY] == b"abc"
+        assert same is replay
+        assert await replay() == {"type": "http.request", "body": b"abc", "more_body": False}
+
+    @pytest.mark.asyncio
+    async def test_invalid_and_oversized_bodies_are_rejected(self):
+        app = _app()
+        app.add_middleware(RequestValidationMiddleware, max_body_size=10)
+
+        async with _client(app) as client:
+            too_large = await client.post("/echo", json={"padding": "x" * 20})
+            invalid = await client.post("/echo", content=b"{", headers={"content-type": "application/json"})
+
+        assert too_large.status_code == 413
+        assert invalid.status_code == 400
+        assert invalid.json() == {"error": "Invalid JSON"}
+
+
+class TestResponseHeaders:
+    """Headers are edited on the way out without buffering the response"""
+
+    @pytest.mark.asyncio
+    async def test_security_headers_are_added(self):
+        app = _app()
+        app.add_middleware(SecurityHeadersMiddleware)
+
+        async with _client(app) as client:
+            response = await client.get("/plain")
+
+        assert response.json() == {"ok": True}
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "x-security-scan" in response.headers
+        assert "server" not in response.headers
+
+
+class TestRejections:
+    """Rejections become JSON responses instead of exceptions escaping a middleware"""
+
+    @pytest.mark.asyncio
+    async def test_location_access_denied_is_403(self):
+        user = type("User", (), {"id": 1, "email": "b@example.com", "role": "barber", "location_id": None})()
+        app = _app()
+        app.add_middleware(MultiTenancyMiddleware)
+        app.add_middleware(FakeUserMiddleware, user=user)
+
+        async with _client(app) as client:
+            response = await client.get("/plain")
+
+        assert response.status_code == 403
+        assert response.json() == {"detail": "User not assigned to any location"}
+
+    @pytest.mark.asyncio
+    async def test_unsigned_webhook_is_401(self):
+        app = FastAPI()
+
+        @app.post("/api/v1/webhooks/generic")
+        async def hook(request: Request):
+            return {"body": (await request.body()).decode()}
+
+        app.add_middleware(WebhookSecurityMiddleware, webhook_secrets={})
+
+        async with _client(app) as client:
+            response = await client.post("/api/v1/webhooks/generic", content=b"{}")
+
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Invalid webhook signature"}
+
+
+class TestCacheInvalidation:
+    """Writes still invalidate cache tags using the downstream status"""
+
+    @pytest.mark.asyncio
+    async def test_only_successful_writes_invalidate(self):
+        app = FastAPI()
+
+        @app.post("/api/v2/services")
+        async def create():
+            return {"id": 1}
+
+        @app.put("/api/v2/services/{service_id}")
+        async def update(service_id: int):
+            return {"id": service_id}
+
+        app.add_middleware(SmartCacheMiddleware, enable_cache=True, api_prefix="/api/v2")
+        cache = AsyncMock()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(app) as client:
+                created = await client.post("/api/v2/services")
+                rejected = await client.put("/api/v2/services/not-a-number")
+
+        assert created.status_code == 200 and rejected.status_code == 422
+        cache.invalidate_tags.assert_awaited_once_with(["services"])
+
+
+class TestMFASessions:
+    """Sessions created through app.state.mfa_middleware are seen by the installed instance"""
+
+    def test_sessions_are_shared_between_instances(self):
+        session_holder = MFAEnforcementMiddleware(app=None)
+        installed = MFAEnforcementMiddleware(app=None)
+
+        token = MFASessionManager(session_holder).create_session(7, "10.0.0.1")
+        try:
+            assert MFASessionManager(installed).is_session_valid(7, token)
+        finally:
+            session_holder.revoke_mfa_session(7)
+        assert not MFASessionManager(installed).is_session_valid(7, token)
@@ -0,0 +1,289 @@
+"""
+Tests for the per-barber-day availability bitmap store.
+"""
+
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+import pytz
+
+from models import Appointment, BarberSpecialAvailability, BarberTimeOff, BookingSettings
+from services import slot_engine
+from services.availability_bitmap import (
+    AvailabilityBitmapStore,
+    LocalBitmapBackend,
+    QUANTUM_MINUTES,
+    appointment_bit_ranges,
+    bitmap_key,
+    bitmap_to_intervals,
+    empty_bitmap,
+    set_bits,
+)
+from services.booking_service import get_available_slots_with_barber_availability
+
+BUSINESS_TZ = pytz.timezone("America/New_York")
+
+
+def _appointment(target: date, local_start: time, duration: int, barber_id: int = 7, before: int = 0, after: int = 0):
+    start_utc = BUSINESS_TZ.localize(datetime.combine(target, local_start)).astimezone(pytz.UTC)
+    return SimpleNamespace(
+        id=1,
+        barber_id=barber_id,
+        status="scheduled",
+        start_time=start_utc.replace(tzinfo=None),
+        duration_minutes=duration,
+        buffer_time_before=before,
+        buffer_time_after=after,
+    )
+
+
+class TestBitmapEncoding:
+    """Bit layout and appointment-to-bit conversion"""
+
+    def test_set_bits_round_trips_to_intervals(self):
+        bitmap = empty_bitmap()
+        set_bits(bitmap, 108, 114)  # 09:00-09:30
+        set_bits(bitmap, 114, 120)  # touching run merges
+        set_bits(bitmap, 150, 151)
+
+        assert bitmap_to_intervals(bytes(bitmap)) == [(540, 600), (750, 755)]
+
+    def test_appointment_bits_include_buffers_and_round_outwards(self):
+        target = date(2030, 6, 12)
+        appointment = _appointment(target, time(10, 2), 30, before=10, after=5)
+
+        ranges = appointment_bit_ranges(appointment, BUSINESS_TZ)
+
+        # 09:52 -> 10:37 rounded outwards to 09:50 -> 10:40
+        assert ranges == {target: (590 // QUANTUM_MINUTES, 640 // QUANTUM_MINUTES)}
+
+    def test_appointment_spanning_midnight_touches_both_days(self):
+        target = date(2030, 6, 12)
+        appointment = _appointment(target, time(23, 30), 60)
+
+        ranges = appointment_bit_ranges(appointment, BUSINESS_TZ)
+
+        # Each day covers 25 hours, so the previous day keeps the overflow too
+        assert ranges[target] == (282, 294)
+        assert ranges[target + timedelta(days=1)] == (0, 6)
+
+
+class TestAvailabilityBitmapStore:
+    """Read-through rebuilds and write-path maintenance"""
+
+    @staticmethod
+    def _store():
+        return AvailabilityBitmapStore(backend=LocalBitmapBackend())
+
+    def test_missing_bitmaps_are_built_in_one_pass_then_served_from_store(self):
+        target = date(2030, 6, 12)
+        anchor_utc = slot_engine.day_anchor(target, BUSINESS_TZ)
+        store = self._store()
+
+        with patch.object(store, "_build", wraps=lambda db, ids, days, tz: {
+            (barber_id, target): empty_bitmap() for barber_id in ids
+        }) as build:
+            first = store.get_busy_intervals(Mock(), [1, 2, 3], target, BUSINESS_TZ, anchor_utc)
+            second = store.get_busy_intervals(Mock(), [1, 2, 3], target, BUSINESS_TZ, anchor_utc)
+
+        assert build.call_count == 1
+        assert sorted(first) == sorted(second) == [1, 2, 3]
+        assert store.get_stats()["hits"] == 3
+        assert store.get_stats()["misses"] == 3
+
+    def test_record_appointment_updates_existing_bitmap_in_place(self):
+        target = date(2030, 6, 12)
+        anchor_utc = slot_engine.day_anchor(target, BUSINESS_TZ)
+        store = self._store()
+        store._backend().set_many({bitmap_key(7, target): bytes(empty_bitmap())})
+
+        with patch("services.availability_bitmap.settings.availability_bitmap_enabled", True):
+            store.record_appointment(_appointment(target, time(9, 0), 30), "America/New_York")
+        busy = store.get_busy_intervals(Mock(), [7], target, BUSINESS_TZ, anchor_utc)[7]
+
+        assert busy.overlaps(540, 570)
+        assert not busy.overlaps(570, 600)
+        assert store.get_stats()["bit_updates"] == 1
+
+    def test_record_appointment_skips_days_without_bitmap(self):
+        target = date(2030, 6, 12)
+        store = self._store()
+
+        with patch("services.availability_bitmap.settings.availability_bitmap_enabled", True):
+            store.record_appointment(_appointment(target, time(9, 0), 30), "America/New_York")
+
+        assert store._backend().get_many([bitmap_key(7, target)]) == [None]
+
+    def test_invalidate_drops_bitmaps(self):
+        target = date(2030, 6, 12)
+        store = self._store()
+        store._backend().set_many({bitmap_key(7, target): bytes(empty_bitmap())})
+
+        store.invalidate(7, [target])
+
+        assert store._backend().get_many([bitmap_key(7, target)]) == [None]
+
+
+class TestBookingServiceBitmapReads:
+    """Whole-shop slot reads served from bitmaps"""
+
+    def test_shop_slots_use_bitmaps_without_appointment_query(self):
+        target = date.today() + timedelta(days=14)
+        barbers = [SimpleNamespace(id=1, name="A"), SimpleNamespace(id=2, name="B")]
+        schedule = {
+            "availability": {
+                b.id: [SimpleNamespace(day_of_week=target.weekday(), start_time=time(9, 0), end_time=time(10, 0))]
+                for b in barbers
+            },
+            "time_off": {},
+            "special": {},
+            "appointments": {},
+        }
+        anchor_utc = slot_engine.day_anchor(target, BUSINESS_TZ)
+        busy = {
+            1: slot_engine.BusyIntervals(anchor_utc, [(540, 600)]),
+            2: slot_engine.BusyIntervals(anchor_utc, [(540, 570)]),
+        }
+        booking_settings = BookingSettings(
+            business_timezone="America/New_York",
+            min_lead_time_minutes=15,
+            max_advance_days=30,
+            business_start_time=time(9, 0),
+            business_end_time=time(12, 0),
+            slot_duration_minutes=30,
+            show_soonest_available=True,
+        )
+
+        with patch("services.booking_service.get_booking_settings", return_value=booking_settings), \
+             patch("services.availability_bitmap.settings.availability_bitmap_enabled", True), \
+             patch("services.booking_service.barber_availability_service.get_active_barbers", return_value=barbers), \
+             patch("services.booking_service.barber_availability_service.get_schedule_window", return_value=schedule) as window, \
+             patch("services.booking_service.availability_bitmap_store.get_busy_intervals", return_value=busy) as bitmaps:
+            result = get_available_slots_with_barber_availability(Mock(), target)
+
+        assert window.call_args.kwargs["include_appointments"] is False
+        assert bitmaps.call_count == 1
+        slots = {b["barber_id"]: [slot["available"] for slot in b["slots"]] for b in result["available_barbers"]}
+        assert slots == {1: [False, False], 2: [False, True]}
+        assert result["next_available"]["barber_id"] == 2
+        assert result["next_available"]["time"] == "09:30"
+
+
+class TestSessionInvalidation:
+    """Committed writes from any code path drop the barber-days they touch"""
+
+    @pytest.fixture
+    def store(self):
+        store = AvailabilityBitmapStore(backend=LocalBitmapBackend())
+        with patch("services.availability_bitmap.availability_bitmap_store", store):
+            yield store
+
+    @staticmethod
+    def _warm(store, barber_id, days):
+        store._backend().set_many({bitmap_key(barber_id, day): bytes(empty_bitmap()) for day in days})
+
+    @staticmethod
+    def _cached(store, barber_id, days):
+        return [day for day, value in zip(days, store._backend().get_many([bitmap_key(barber_id, d) for d in days])) if value]
+
+    def test_cancellation_outside_booking_service_drops_the_day(self, db, store):
+        appointment = Appointment(
+            user_id=1, barber_id=7, start_time=datetime(2030, 6, 12, 14, 0), duration_minutes=30, price=30, status="confirmed"
+        )
+        db.add(appointment)
+        db.commit()
+        days = [date(2030, 6, 10) + timedelta(days=n) for n in range(5)]
+        self._warm(store, 7, days)
+        self._warm(store, 8, days)
+
+        appointment.notes = "Running late"
+        db.commit()
+        assert self._cached(store, 7, days) == days
+
+        appointment.status = "cancelled"
+        db.commit()
+
+        # The UTC start day plus one day either side
+        assert self._cached(store, 7, days) == [date(2030, 6, 10), date(2030, 6, 14)]
+        assert self._cached(store, 8, days) == days
+
+    def test_reschedule_drops_old_and_new_days_and_rollback_drops_nothing(self, db, store):
+        appointment = Appointment(
+            user_id=1, barber_id=7, start_time=datetime(2030, 6, 12, 14, 0), duration_minutes=30, price=30, status="confirmed"
+        )
+        db.add(appointment)
+        db.commit()
+        days = [date(2030, 6, 10) + timedelta(days=n) for n in range(12)]
+        self._warm(store, 7, days)
+
+        appointment.start_time = datetime(2030, 6, 19, 14, 0)
+        db.flush()
+        db.rollback()
+        assert self._cached(store, 7, days) == days
+
+        appointment.start_time = datetime(2030, 6, 19, 14, 0)
+        db.commit()
+
+        dropped = {date(2030, 6, 11), date(2030, 6, 12), date(2030, 6, 13), date(2030, 6, 18), date(2030, 6, 19), date(2030, 6, 20)}
+        assert self._cached(store, 7, days) == [day for day in days if day not in dropped]
+
+    def test_time_off_and_special_availability_edits(self, db, store):
+        time_off = BarberTimeOff(barber_id=7, start_date=date(2030, 6, 10), end_date=date(2030, 6, 11))
+        special = BarberSpecialAvailability(
+            barber_id=7, date=date(2030, 6, 20), start_time=time(9, 0), end_time=time(12, 0), availability_type="unavailable"
+        )
+        db.add_all([time_off, special])
+        db.commit()
+        days = [date(2030, 6, 10) + timedelta(days=n) for n in range(12)]
+        self._warm(store, 7, days)
+
+        time_off.start_date, time_off.end_date = date(2030, 6, 14), date(2030, 6, 15)
+        db.delete(special)
+        db.commit()
+
+        assert self._cached(store, 7, days) == [
+            date(2030, 6, 12), date(2030, 6, 13), date(2030, 6, 16), date(2030, 6, 17),
+            date(2030, 6, 18), date(2030, 6, 19), date(2030, 6, 21)
+        ]
+
+    def test_new_booking_sets_its_bits_in_place(self, db, store):
+        days = [date(2030, 6, 11), date(2030, 6, 12), date(2030, 6, 13)]
+        self._warm(store, 7, days)
+        snapshot = SimpleNamespace(business_timezone="America/New_York")
+
+        with patch("services.availability_bitmap.booking_settings_cache", SimpleNamespace(snapshot=snapshot)):
+            db.add(Appointment(
+                user_id=1, barber_id=7, start_time=datetime(2030, 6, 12, 14, 0), duration_minutes=30, price=30, status="confirmed"
+            ))
+            db.commit()
+
+        assert self._cached(store, 7, days) == days
+        # 14:00 UTC is 10:00 in New York
+        assert bitmap_to_intervals(store._backend().get_many([bitmap_key(7, date(2030, 6, 12))])[0]) == [(600, 630)]
+        assert store.get_stats()["bit_updates"] == 1
+
+    def test_new_booking_without_settings_snapshot_drops_the_days(self, db, store):
+        days = [date(2030, 6, 10) + timedelta(days=n) for n in range(5)]
+        self._warm(store, 7, days)
+
+        with patch("services.availability_bitmap.booking_settings_cache", SimpleNamespace(snapshot=None)):
+            db.add(Appointment(
+                user_id=1, barber_id=7, start_time=datetime(2030, 6, 12, 14, 0), duration_minutes=30, price=30, status="confirmed"
+            ))
+            db.commit()
+
+        assert self._cached(store, 7, days) == [date(2030, 6, 10), date(2030, 6, 14)]
+
+    def test_commits_invalidate_cached_slot_responses(self, db, store):
+        with patch("services.availability_bitmap.cache_service") as cache:
+            appointment = Appointment(
+                user_id=1, barber_id=7, start_time=datetime(2030, 6, 12, 14, 0), duration_minutes=30, price=30, status="confirmed"
+            )
+            db.add(appointment)
+            db.commit()
+            appointment.notes = "Running late"
+            db.commit()
+
+        cache.invalidate_tags_sync.assert_called_once_with(["slots", "barber:7"])
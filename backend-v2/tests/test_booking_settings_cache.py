@@ -0,0 +1,140 @@
+"""
+Tests for the shared booking settings snapshot.
+"""
+
+from datetime import time
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from models import BookingSettings
+from services import booking_service
+from services.booking_settings_cache import BookingSettingsCache, VERSION_KEY
+
+
+def _row(**overrides):
+    values = dict(
+        id=1,
+        business_id=1,
+        business_name="Shop",
+        business_timezone="America/New_York",
+        min_lead_time_minutes=15,
+        max_advance_days=30,
+        business_start_time=time(9, 0),
+        business_end_time=time(17, 0),
+        slot_duration_minutes=30,
+        allowed_timezones=["America/New_York"],
+    )
+    values.update(overrides)
+    return BookingSettings(**values)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+
+class TestBookingSettingsSnapshot:
+    """Snapshot immutability and reuse"""
+
+    def test_snapshot_is_read_only_and_keeps_model_helpers(self):
+        cache = BookingSettingsCache(redis_client_factory=lambda: None)
+        snapshot = cache.get(lambda: _row())
+
+        assert snapshot.slot_duration_minutes == 30
+        assert snapshot.allowed_timezones == ("America/New_York",)
+        assert snapshot.get_min_booking_time().tzinfo is not None
+        with pytest.raises(AttributeError):
+            snapshot.slot_duration_minutes = 15
+
+    def test_repeated_reads_hit_the_snapshot(self):
+        cache = BookingSettingsCache(redis_client_factory=lambda: None)
+        loader = Mock(return_value=_row())
+
+        for _ in range(10):
+            cache.get(loader)
+
+        assert loader.call_count == 1
+        stats = cache.get_stats()
+        assert stats["hits"] == 9
+        assert stats["reloads"] == 1
+
+    def test_snapshot_reloads_after_max_age_without_redis(self):
+        cache = BookingSettingsCache(version_check_seconds=0, max_age_seconds=60, redis_client_factory=lambda: None)
+        loader = Mock(return_value=_row())
+
+        with patch("services.booking_settings_cache.time_module.monotonic", side_effect=[0, 0, 30, 61, 61]):
+            cache.get(loader)
+            cache.get(loader)
+            cache.get(loader)
+
+        assert loader.call_count == 2
+
+
+class TestSharedVersion:
+    """Cross-worker change notification through the Redis version counter"""
+
+    def test_publish_on_one_worker_reloads_the_other(self):
+        redis = FakeRedis()
+        writer = BookingSettingsCache(version_check_seconds=0, redis_client_factory=lambda: redis)
+        reader = BookingSettingsCache(version_check_seconds=0, redis_client_factory=lambda: redis)
+        reader_loader = Mock(return_value=_row())
+
+        first = reader.get(reader_loader)
+        assert reader.get(reader_loader) is first
+
+        published = writer.publish(_row(slot_duration_minutes=15))
+        reader_loader.return_value = _row(slot_duration_minutes=15)
+        refreshed = reader.get(reader_loader)
+
+        assert redis.values[VERSION_KEY] == 1
+        assert published.version == refreshed.version == 1
+        assert refreshed.slot_duration_minutes == 15
+        assert reader_loader.call_count == 2
+
+
+class TestUpdateBookingSettings:
+    """booking_service.update_booking_settings publishes the change"""
+
+    def test_update_parses_times_and_publishes_snapshot(self):
+        row = _row()
+        db = Mock()
+        cache = BookingSettingsCache(redis_client_factory=lambda: None)
+
+        with patch.object(booking_service, "booking_settings_cache", cache), \
+             patch.object(booking_service, "get_booking_settings_row", return_value=row):
+            booking_service.get_booking_settings(db)
+            snapshot = booking_service.update_booking_settings(
+                db, {"business_start_time": "08:30", "slot_duration_minutes": 15}
+            )
+            current = booking_service.get_booking_settings(db)
+
+        assert db.commit.call_count == 1
+        assert current is snapshot
+        assert snapshot.business_start_time == time(8, 30)
+        assert snapshot.slot_duration_minutes == 15
+        assert snapshot.version == 2
+
+    def test_update_rejects_bad_time_format(self):
+        with patch.object(booking_service, "get_booking_settings_row", return_value=_row()):
+            with pytest.raises(ValueError, match="HH:MM"):
+                booking_service.update_booking_settings(Mock(), {"business_end_time": "5pm"})
+
+    def test_settings_endpoint_reports_bad_time_format_as_400(self):
+        from routers.appointments import update_appointment_settings
+
+        admin = Mock(role="admin")
+        with patch.object(booking_service, "get_booking_settings_row", return_value=_row()):
+            with pytest.raises(HTTPException) as exc_info:
+                update_appointment_settings({"business_end_time": "5pm"}, current_user=admin, db=Mock())
+
+        assert exc_info.value.status_code == 400
+        assert "HH:MM" in exc_info.value.detail
@@ -0,0 +1,310 @@
+"""
+Tests for SmartCacheMiddleware: single-flight coalescing,
+stale-while-revalidate, slot cache keys and the raw-bytes response cache
+format, exercised through the real /api/v2 appointments router.
+"""
+
+import asyncio
+import time as time_module
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from database import get_db
+from middleware.cache_middleware import CachedResponse, SmartCacheMiddleware
+from routers import appointments
+from utils.auth import get_current_user_optional
+from utils.rate_limit import limiter
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+NEXT_DAY = (date.today() + timedelta(days=2)).isoformat()
+SLOTS = f"/api/v2/appointments/slots?appointment_date={DAY}"
+
+
+class MemoryCache:
+    """Async stand-in for services.redis_cache.cache_service"""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get_raw(self, key):
+        return self.entries.get(key)
+
+    async def set_raw(self, key, value, ttl=None, tags=None):
+        assert isinstance(value, bytes)
+        self.entries[key] = value
+        return True
+
+    def age_entries(self, seconds):
+        for key, data in self.entries.items():
+            entry = CachedResponse.decode(data)
+            entry.cached_at -= seconds
+            self.entries[key] = entry.encode()
+
+    async def invalidate_tags(self, tags):
+        return 0
+
+
+@pytest.fixture
+def slot_engine(monkeypatch):
+    """Stub booking_service slot functions behind the real router.
+
+    Each call is recorded as (date or range, timezone) and numbered in the
+    response's ``slot_duration_minutes`` so tests can tell which call
+    produced a (possibly cached) body.
+    """
+    stub = SimpleNamespace(calls=[], delay=0.05, slot_count=1)
+
+    def slots_for_day(db, day, barber_id=None, service_id=None, user_timezone=None):
+        stub.calls.append((day.isoformat(), user_timezone))
+        time_module.sleep(stub.delay)
+        slots = [{"time": f"{9 + n // 60:02d}:{n % 60:02d}", "available": True} for n in range(stub.slot_count)]
+        return {
+            "available_barbers": [{"slots": slots}],
+            "business_hours": {"start": "09:00", "end": "17:00"},
+            "slot_duration_minutes": len(stub.calls),
+        }
+
+    def slots_for_range(db, start_date, end_date, barber_id=None, user_timezone=None):
+        stub.calls.append((f"{start_date}..{end_date}", user_timezone))
+        return {
+            "start_date": start_date.isoformat(), "end_date": end_date.isoformat(), "days": [],
+            "business_hours": {"start": "09:00", "end": "17:00"}, "slot_duration_minutes": len(stub.calls),
+        }
+
+    service = appointments.booking_service
+    monkeypatch.setattr(service, "get_booking_settings", lambda db: SimpleNamespace(max_advance_days=30))
+    monkeypatch.setattr(service, "get_available_slots_with_barber_availability", slots_for_day)
+    monkeypatch.setattr(service, "get_available_slots_range", slots_for_range)
+    monkeypatch.setattr(limiter, "enabled", False)
+    return stub
+
+
+def _app():
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(appointments.router, prefix="/api/v2")
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_current_user_optional] = lambda: None
+    app.add_middleware(SmartCacheMiddleware, enable_cache=True, api_prefix="/api/v2")
+    return app
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def _call(response):
+    return response.json()["slot_duration_minutes"]
+
+
+def _request(url, authorization=None):
+    path, _, query = url.partition("?")
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": headers})
+
+
+class TestSingleFlight:
+    """Concurrent misses for one key run the handler once"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_are_coalesced(self, slot_engine):
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(_app()) as client:
+                responses = await asyncio.gather(*[client.get(SLOTS) for _ in range(10)])
+
+        assert slot_engine.calls == [(DAY, None)]
+        assert {_call(r) for r in responses} == {1}
+        statuses = sorted(r.headers["X-Cache-Status"] for r in responses)
+        assert statuses == ["COALESCED"] * 9 + ["MISS"]
+        assert len(cache.entries) == 1
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self, slot_engine):
+        with patch("middleware.cache_middleware.cache_service", MemoryCache()):
+            async with _client(_app()) as client:
+                await asyncio.gather(
+                    client.get(SLOTS),
+                    client.get(f"/api/v2/appointments/slots?appointment_date={NEXT_DAY}"),
+                )
+
+        assert sorted(slot_engine.calls) == [(DAY, None), (NEXT_DAY, None)]
+
+
+class TestSlotCacheKeys:
+    """Slot responses are keyed by path and every query parameter"""
+
+    @pytest.mark.asyncio
+    async def test_paths_and_parameters_get_distinct_keys(self):
+        middleware = SmartCacheMiddleware(_app(), enable_cache=True, api_prefix="/api/v2")
+        urls = [
+            f"/api/v2/appointments/slots?appointment_date={DAY}&barber_id=2",
+            f"/api/v2/appointments/slots?appointment_date={NEXT_DAY}&barber_id=2",
+            f"/api/v2/appointments/slots?appointment_date={DAY}&barber_id=2&timezone=America/New_York",
+            f"/api/v2/appointments/slots?appointment_date={DAY}&barber_id=2&timezone=Europe/London",
+            f"/api/v2/appointments/slots?appointment_date={DAY}&barber_id=2&service_id=1",
+            f"/api/v2/appointments/slots?appointment_date={DAY}&barber_id=2&service_id=2",
+            f"/api/v2/appointments/slots/range?start_date={DAY}&end_date={DAY}&barber_id=2",
+            f"/api/v2/appointments/slots/range?start_date={DAY}&end_date={NEXT_DAY}&barber_id=2",
+            "/api/v2/appointments/slots/next-available?barber_id=2",
+            f"/api/v2/bookings/slots?booking_date={DAY}&barber_id=2",
+        ]
+
+        keys = [
+            await middleware._generate_cache_key(_request(url), middleware._get_cache_config(_request(url)))
+            for url in urls
+        ]
+
+        assert len(set(keys)) == len(urls)
+        assert all(":slots:" in key for key in keys)
+
+    def test_parameter_order_and_callers(self):
+        middleware = SmartCacheMiddleware(_app(), enable_cache=True, api_prefix="/api/v2")
+        key = lambda url, auth=None: middleware._generate_slots_cache_key(_request(url, auth))
+
+        assert key(f"{SLOTS}&barber_id=2&timezone=UTC") == key(f"/api/v2/appointments/slots?timezone=UTC&barber_id=2&appointment_date={DAY}")
+        assert key(SLOTS, "Bearer a") != key(SLOTS, "Bearer b")
+
+    @pytest.mark.asyncio
+    async def test_timezones_and_ranges_reach_the_handler_separately(self, slot_engine):
+        with patch("middleware.cache_middleware.cache_service", MemoryCache()):
+            async with _client(_app()) as client:
+                for _ in range(2):
+                    await client.get(f"{SLOTS}&timezone=America/New_York")
+                    await client.get(f"{SLOTS}&timezone=Europe/London")
+                    await client.get(f"/api/v2/appointments/slots/range?start_date={DAY}&end_date={NEXT_DAY}")
+
+        assert slot_engine.calls == [
+            (DAY, "America/New_York"), (DAY, "Europe/London"), (f"{DAY}..{NEXT_DAY}", None)
+        ]
+
+
+class TestCallerScopedRoutes:
+    """Routes that vary on Authorization are never served from cache to anonymous callers"""
+
+    @pytest.mark.asyncio
+    async def test_requests_without_credentials_reach_the_app(self):
+        app = FastAPI()
+        callers = []
+
+        @app.get("/api/v2/services")
+        async def list_services(request: Request):
+            callers.append(request.headers.get("authorization"))
+            return [{"id": 1}]
+
+        app.add_middleware(SmartCacheMiddleware, enable_cache=True, api_prefix="/api/v2")
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(app) as client:
+                first = await client.get("/api/v2/services", headers={"Authorization": "Bearer a"})
+                hit = await client.get("/api/v2/services", headers={"Authorization": "Bearer a"})
+                anonymous = await client.get("/api/v2/services")
+                other = await client.get("/api/v2/services", headers={"Authorization": "Bearer b"})
+
+        assert callers == ["Bearer a", None, "Bearer b"]
+        assert [r.headers.get("X-Cache-Status") for r in (first, hit, anonymous, other)] == ["MISS", "HIT", None, "MISS"]
+        assert len(cache.entries) == 2
+
+
+class TestStaleWhileRevalidate:
+    """Expired-but-recent entries are served while one refresh runs"""
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_and_refreshed_once(self, slot_engine):
+        slot_engine.delay = 0.01
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(_app()) as client:
+                first = await client.get(SLOTS)
+                assert first.headers["X-Cache-Status"] == "MISS"
+
+                # Age the entry past the 300s TTL but inside the 60s stale window
+                cache.age_entries(330)
+
+                stale = await asyncio.gather(*[client.get(SLOTS) for _ in range(5)])
+                assert {r.headers["X-Cache-Status"] for r in stale} == {"STALE"}
+                assert {_call(r) for r in stale} == {1}
+
+                await asyncio.sleep(0.1)  # let the background refresh finish
+                fresh = await client.get(SLOTS)
+
+        assert len(slot_engine.calls) == 2
+        assert fresh.headers["X-Cache-Status"] == "HIT"
+        assert _call(fresh) == 2
+
+    @pytest.mark.asyncio
+    async def test_entry_past_stale_window_is_a_miss(self, slot_engine):
+        slot_engine.delay = 0
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(_app()) as client:
+                await client.get(SLOTS)
+                cache.age_entries(400)
+                response = await client.get(SLOTS)
+
+        assert response.headers["X-Cache-Status"] == "MISS"
+        assert len(slot_engine.calls) == 2
+
+
+class TestRawBytesEntries:
+    """Hits are served from stored bytes with ETag and gzip support"""
+
+    def test_entry_round_trip_and_compression(self):
+        body = b'{"slots": "' + b"x" * 4000 + b'"}'
+        entry = CachedResponse.from_response(200, [("content-type", "application/json")], body)
+
+        decoded = CachedResponse.decode(entry.encode())
+
+        assert decoded.compressed is True
+        assert len(decoded.body) < len(body)
+        assert decoded.plain_body() == body
+        assert decoded.etag == entry.etag
+        assert decoded.headers == [("content-type", "application/json")]
+        assert CachedResponse.decode(b'{"legacy": "json"}') is None
+
+    @pytest.mark.asyncio
+    async def test_hit_serves_identical_bytes_and_honours_if_none_match(self, slot_engine):
+        slot_engine.delay = 0
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(_app()) as client:
+                miss = await client.get(SLOTS)
+                hit = await client.get(SLOTS)
+                not_modified = await client.get(SLOTS, headers={"If-None-Match": hit.headers["ETag"]})
+
+        assert len(slot_engine.calls) == 1
+        assert hit.headers["X-Cache-Status"] == "HIT"
+        assert hit.content == miss.content
+        assert hit.headers["content-type"] == "application/json"
+        assert hit.headers["ETag"] == miss.headers["ETag"]
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+    @pytest.mark.asyncio
+    async def test_large_bodies_are_sent_gzip_encoded_to_capable_clients(self, slot_engine):
+        slot_engine.delay = 0
+        slot_engine.slot_count = 120
+        cache = MemoryCache()
+
+        with patch("middleware.cache_middleware.cache_service", cache):
+            async with _client(_app()) as client:
+                await client.get(SLOTS)
+                gzipped = await client.get(SLOTS, headers={"Accept-Encoding": "gzip"})
+                plain = await client.get(SLOTS, headers={"Accept-Encoding": "identity"})
+
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert int(gzipped.headers["content-length"]) < len(plain.content)
+        assert len(gzipped.json()["slots"]) == 120  # httpx decodes transparently
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == gzipped.json()
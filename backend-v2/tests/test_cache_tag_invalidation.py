@@ -0,0 +1,186 @@
+"""
+Tests for tag-set cache invalidation in services/redis_cache.py and
+SmartCacheMiddleware.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from middleware.cache_middleware import SmartCacheMiddleware
+from services.redis_cache import EnhancedCacheService
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.redis.store.__setitem__(key, value))
+
+    def sadd(self, key, *members):
+        self.commands.append(lambda: self.redis.sets.setdefault(key, set()).update(members))
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: self.redis.expiries.__setitem__(key, seconds))
+
+    def smembers(self, key):
+        self.commands.append(lambda: set(self.redis.sets.get(key, set())))
+
+    def unlink(self, *keys):
+        self.commands.append(lambda: self.redis.remove(keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.sets = {}
+        self.expiries = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def scan_iter(self, match=None, count=None):
+        raise AssertionError("tag invalidation must not scan the keyspace")
+        yield  # pragma: no cover
+
+    def remove(self, keys):
+        return sum(
+            1 for key in keys
+            if self.store.pop(key, None) is not None or self.sets.pop(key, None) is not None
+        )
+
+
+class SyncFakePipeline(FakePipeline):
+    def execute(self):
+        self.redis.round_trips += 1
+        return [command() for command in self.commands]
+
+
+class SyncFakeRedis(FakeRedis):
+    def pipeline(self, transaction=True):
+        return SyncFakePipeline(self)
+
+
+def _service():
+    service = EnhancedCacheService()
+    service.redis_manager.redis = FakeRedis()
+    service.redis_manager._connected = True
+    return service
+
+
+class TestTagInvalidation:
+    """EnhancedCacheService tag sets"""
+
+    @pytest.mark.asyncio
+    async def test_set_registers_tags_in_one_round_trip(self):
+        service = _service()
+        redis = service.redis_manager.redis
+
+        await service.set("k1", {"a": 1}, ttl=60, tags=["barber:5", "date:2030-01-01"])
+
+        assert redis.round_trips == 1
+        assert redis.sets[service.tag_key("barber:5")] == {"k1"}
+        assert redis.expiries[service.tag_key("barber:5")] == EnhancedCacheService.TAG_TTL_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_unlinks_members_and_tag_sets(self):
+        service = _service()
+        redis = service.redis_manager.redis
+        await service.set("k1", 1, tags=["barber:5"])
+        await service.set("k2", 2, tags=["barber:5", "date:2030-01-01"])
+        await service.set("k3", 3, tags=["barber:6"])
+        redis.round_trips = 0
+
+        deleted = await service.invalidate_tags(["barber:5", "date:2030-01-01"])
+
+        assert deleted == 2
+        assert set(redis.store) == {"k3"}
+        assert set(redis.sets) == {service.tag_key("barber:6")}
+        # One SMEMBERS pipeline plus one UNLINK pipeline
+        assert redis.round_trips == 2
+
+    @pytest.mark.asyncio
+    async def test_large_invalidations_are_batched(self):
+        service = _service()
+        redis = service.redis_manager.redis
+        for i in range(1200):
+            await service.set(f"k{i}", i, tags=["slots"])
+
+        pipeline = FakePipeline(redis)
+        with patch.object(redis, "pipeline", side_effect=[FakePipeline(redis), pipeline]):
+            deleted = await service.invalidate_tags(["slots"])
+
+        assert deleted == 1200
+        # 3 member batches of <= 500 plus the tag set itself
+        assert len(pipeline.commands) == 4
+
+
+    @pytest.mark.asyncio
+    async def test_blocking_invalidation_shares_the_tag_sets(self):
+        service = _service()
+        await service.set("k1", 1, tags=["slots"])
+        await service.set("k2", 2, tags=["barber:5"])
+        sync_redis = SyncFakeRedis()
+        sync_redis.store, sync_redis.sets = service.redis_manager.redis.store, service.redis_manager.redis.sets
+        service.redis_manager._sync_client = sync_redis
+
+        deleted = service.invalidate_tags_sync(["slots", "barber:9"])
+
+        assert deleted == 1
+        assert set(sync_redis.store) == {"k2"}
+        assert sync_redis.round_trips == 2
+
+    def test_blocking_invalidation_is_a_no_op_until_connected(self):
+        service = EnhancedCacheService()
+
+        assert service.redis_manager.sync_client() is None
+        assert service.invalidate_tags_sync(["slots"]) == 0
+
+
+class TestMiddlewareInvalidation:
+    """SmartCacheMiddleware registers and resolves tags"""
+
+    @staticmethod
+    def _request(path, method="GET", query=None):
+        return SimpleNamespace(
+            url=SimpleNamespace(path=path),
+            method=method,
+            query_params=query or {},
+            headers={}
+        )
+
+    def test_cached_slots_are_tagged_with_route_and_entities(self):
+        middleware = SmartCacheMiddleware(app=None, api_prefix="/api/v2")
+        request = self._request("/api/v2/appointments/slots", query={"barber_id": "5", "appointment_date": "2030-01-01"})
+
+        tags = middleware._cache_tags(request, middleware._get_cache_config(request))
+
+        assert tags == ["slots", "appointments", "barber:5", "date:2030-01-01"]
+
+    def test_route_tables_follow_the_api_prefix(self):
+        legacy = SmartCacheMiddleware(app=None)
+        mounted = SmartCacheMiddleware(app=None, api_prefix="/api/v2")
+
+        assert legacy._get_cache_config(self._request("/api/v2/appointments/slots")) is None
+        assert mounted._get_cache_config(self._request("/api/v2/appointments/slots")).ttl == 300
+        assert mounted._get_cache_config(self._request("/api/v2/services")).vary_headers == ["Authorization"]
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_tags_without_scanning(self):
+        middleware = SmartCacheMiddleware(app=None, api_prefix="/api/v2")
+        request = self._request("/api/v2/barber-availability/time-off/7", method="POST")
+
+        with patch("middleware.cache_middleware.cache_service") as cache:
+            cache.invalidate_tags = AsyncMock(return_value=3)
+            await middleware._handle_cache_invalidation(request, SimpleNamespace(status_code=201))
+
+        cache.invalidate_tags.assert_awaited_once_with(["slots", "barber:7"])
+        cache.clear_pattern.assert_not_called()
@@ -0,0 +1,129 @@
+"""
+Tests for services/calendar_service.py: memoized holidays, the blackout
+interval index and its per-session cache.
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+
+from models import BlackoutDate, User
+from services.blackout_service import BlackoutDateService
+from services.calendar_service import SESSION_KEY, BlackoutIndex, HolidayCalendar, blackout_calendar
+
+
+@pytest.fixture
+def barber(db):
+    user = User(id=2, email="barber@example.com", name="Barber", hashed_password="x", role="barber")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _blackout(db, first, last=None, **fields):
+    fields.setdefault("reason", "vacation")
+    blackout = BlackoutDate(barber_id=2, blackout_date=first, end_date=last, created_by_id=2, **fields)
+    db.add(blackout)
+    db.commit()
+    return blackout
+
+
+def _blackout_selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "blackout_dates" in s]
+
+
+class TestHolidayCalendar:
+    """Each (country, year) is built once"""
+
+    def test_years_are_memoized(self):
+        calls = []
+
+        def loader(country_code, year):
+            calls.append((country_code, year))
+            return [date(year, 1, 1), date(year, 12, 25)]
+
+        calendar = HolidayCalendar(loader=loader)
+
+        assert all(calendar.is_holiday(date(2030, 1, 1)) for _ in range(100))
+        assert not calendar.is_holiday(date(2030, 1, 2))
+        assert calendar.between(date(2030, 12, 1), date(2031, 1, 31)) == {date(2030, 12, 25), date(2031, 1, 1)}
+        assert calls == [("US", 2030), ("US", 2031)]
+
+    def test_failed_load_is_cached_as_no_holidays(self):
+        calls = []
+
+        def loader(country_code, year):
+            calls.append(country_code)
+            raise KeyError(country_code)
+
+        calendar = HolidayCalendar(loader=loader)
+
+        assert not calendar.is_holiday(date(2030, 1, 1), "XX")
+        assert not calendar.is_holiday(date(2030, 7, 4), "XX")
+        assert calls == ["XX"]
+
+
+class TestBlackoutIndex:
+    """Date lookups over overlapping ranges"""
+
+    def test_covering_overlapping_ranges(self):
+        vacation = BlackoutDate(id=1, blackout_date=date(2030, 1, 6), end_date=date(2030, 1, 10), reason="vacation")
+        training = BlackoutDate(id=2, blackout_date=date(2030, 1, 8), reason="training")
+        index = BlackoutIndex([vacation, training])
+
+        assert index.covering(date(2030, 1, 5)) == ()
+        assert index.covering(date(2030, 1, 6)) == (vacation,)
+        assert index.covering(date(2030, 1, 8)) == (vacation, training)
+        assert index.covering(date(2030, 1, 10)) == (vacation,)
+        assert index.covering(date(2030, 1, 11)) == ()
+
+    def test_partial_day_blocks_overlapping_slots_only(self):
+        lunch = BlackoutDate(
+            id=1, blackout_date=date(2030, 1, 7), reason="training", blackout_type="partial_day",
+            start_time=time(12, 0), end_time=time(13, 0)
+        )
+        index = BlackoutIndex([lunch])
+
+        assert index.is_blocked(date(2030, 1, 7), time(12, 0))[0]
+        assert not index.is_blocked(date(2030, 1, 7), time(13, 0))[0]
+        assert index.is_blocked(date(2030, 1, 7), time(11, 30), duration_minutes=45)[0]
+        assert not index.is_blocked(date(2030, 1, 7), time(11, 0), duration_minutes=60)[0]
+        assert not index.is_blocked(date(2030, 1, 7))[0]
+        assert index.is_blocked(date(2030, 1, 7), time(12, 30))[2].startswith("Partial day blackout")
+
+
+@pytest.mark.usefixtures("barber")
+class TestBlackoutCalendar:
+    """One blackout query per session, dropped when blackouts change"""
+
+    def test_date_by_date_checks_share_one_load(self, db, sql_statements):
+        _blackout(db, date(2030, 1, 9), date(2030, 1, 10))
+        sql_statements.clear()
+
+        blocked = [
+            day for day in (date(2030, 1, 7) + timedelta(days=n) for n in range(14))
+            if BlackoutDateService.is_date_time_blocked(db, day, time(10, 0), barber_id=2, duration_minutes=30)[0]
+        ]
+
+        assert blocked == [date(2030, 1, 9), date(2030, 1, 10)]
+        assert len(_blackout_selects(sql_statements)) == 1
+
+    def test_blackout_changes_refresh_the_index(self, db):
+        assert not BlackoutDateService.is_date_time_blocked(db, date(2030, 1, 7), barber_id=2)[0]
+
+        blackout = _blackout(db, date(2030, 1, 7))
+        assert SESSION_KEY not in db.info
+        assert BlackoutDateService.is_date_time_blocked(db, date(2030, 1, 7), barber_id=2)[0]
+
+        assert BlackoutDateService.delete_blackout_date(db, blackout.id, user_id=2)
+        assert not BlackoutDateService.is_date_time_blocked(db, date(2030, 1, 7), barber_id=2)[0]
+
+    def test_recurring_blackout_keeps_its_weekday(self, db):
+        _blackout(db, date(2030, 1, 7), is_recurring=True, recurrence_pattern="weekly", reason="team meeting")
+
+        blocked = [
+            day for day in (date(2030, 3, 1) + timedelta(days=n) for n in range(14))
+            if blackout_calendar.is_blocked(db, day, barber_id=2)[0]
+        ]
+
+        assert blocked == [date(2030, 3, 4), date(2030, 3, 11)]
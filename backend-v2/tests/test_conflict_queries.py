@@ -0,0 +1,61 @@
+"""
+Tests for services/conflict_queries.py: half-open day ranges and the
+covering-index lookup used by conflict detection.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from models import Appointment
+from services.conflict_queries import active_appointments, day_bounds
+
+
+def _book(db, start, barber_id=2, status="confirmed"):
+    appointment = Appointment(
+        user_id=1, barber_id=barber_id, start_time=start, duration_minutes=30, price=30, status=status
+    )
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+
+class TestDayBounds:
+    """Days become [midnight, next midnight) ranges"""
+
+    def test_single_day(self):
+        assert day_bounds(date(2030, 1, 7)) == (datetime(2030, 1, 7), datetime(2030, 1, 8))
+
+    def test_range_includes_last_day(self):
+        assert day_bounds(date(2030, 1, 31), date(2030, 2, 2)) == (datetime(2030, 1, 31), datetime(2030, 2, 3))
+
+
+class TestActiveAppointments:
+    """Only active appointments starting on the requested days are returned"""
+
+    def test_boundaries_status_and_exclusion(self, db):
+        midnight = _book(db, datetime(2030, 1, 7, 0, 0))
+        late = _book(db, datetime(2030, 1, 7, 23, 59, 59))
+        _book(db, datetime(2030, 1, 8, 0, 0))
+        _book(db, datetime(2030, 1, 6, 23, 30))
+        _book(db, datetime(2030, 1, 7, 12, 0), status="cancelled")
+        _book(db, datetime(2030, 1, 7, 12, 0), barber_id=3)
+
+        found = active_appointments(db, date(2030, 1, 7), barber_id=2).all()
+        excluded = active_appointments(db, date(2030, 1, 7), barber_id=2, exclude_appointment_id=midnight.id).all()
+
+        assert {a.id for a in found} == {midnight.id, late.id}
+        assert [a.id for a in excluded] == [late.id]
+        assert active_appointments(db, date(2030, 1, 6), date(2030, 1, 8), barber_id=2).count() == 4
+
+    def test_column_lookup_is_an_index_range_scan(self, db):
+        query = active_appointments(
+            db, date(2030, 1, 7), barber_id=2,
+            columns=(Appointment.id, Appointment.start_time, Appointment.duration_minutes)
+        )
+        statement = query.statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+
+        plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+        assert "COVERING INDEX idx_appointments_conflict_covering" in plan
+        assert "start_time>" in plan and "start_time<" in plan
@@ -0,0 +1,154 @@
+"""
+Tests for blocking-key duplicate detection in utils/parsers/duplicate_index.py
+and its use by the import parsers and ImportService previews.
+"""
+
+import random
+from datetime import date
+
+import pytest
+
+from models import Client
+from services.import_service import ImportService
+from utils.parsers.acuity_parser import AcuityParser
+from utils.parsers.base_parser import ParsedClient
+from utils.parsers.duplicate_index import DuplicateIndex, client_similarity, soundex
+
+
+def _pairwise(parser, clients):
+    """The original O(n²) scan"""
+    found = []
+    for i, client1 in enumerate(clients):
+        for j in range(i + 1, len(clients)):
+            similarity = parser.calculate_similarity(client1, clients[j])
+            if similarity >= parser.duplicate_threshold:
+                found.append((i, j, similarity))
+    return found
+
+
+def _random_clients(count, seed):
+    rng = random.Random(seed)
+    # Empty parts stand in for single-word names (e.g. Booksy/Square "Cher")
+    firsts = ["Ann", "Bob", "Cara", "Dan", "Jon", "John", ""]
+    lasts = ["Smith", "Smyth", "Lee", "Ng", ""]
+    clients = []
+    for _ in range(count):
+        clients.append(ParsedClient(
+            first_name=rng.choice(firsts),
+            last_name=rng.choice(lasts),
+            email=rng.choice([None, f"u{rng.randint(0, 30)}@example.com"]),
+            phone=rng.choice([None, f"+1555000{rng.randint(0, 30):04d}"]),
+            date_of_birth=rng.choice([None, "1990-01-01", "1985-05-05"])
+        ))
+    return clients
+
+
+class TestSoundex:
+    """Phonetic signatures"""
+
+    @pytest.mark.parametrize("name,code", [
+        ("Robert", "R163"), ("Rupert", "R163"), ("Ashcraft", "A261"),
+        ("Tymczak", "T522"), ("Pfister", "P236"), ("Lee", "L000"),
+    ])
+    def test_codes(self, name, code):
+        assert soundex(name) == code
+
+    def test_no_letters(self):
+        assert soundex("123") is None
+        assert soundex(None) is None
+
+
+class TestDetectDuplicates:
+    """Blocking results match the pairwise scan"""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3, 4, 5])
+    def test_same_pairs_as_pairwise_scan(self, seed):
+        parser = AcuityParser()
+        clients = _random_clients(300, seed)
+
+        found = parser.detect_duplicates(clients)
+
+        assert [
+            (d["client1_index"], d["client2_index"], d["similarity"]) for d in found
+        ] == _pairwise(parser, clients)
+
+    def test_unrelated_clients_are_never_compared(self):
+        clients = [
+            ParsedClient(first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com")
+            for i in range(2000)
+        ]
+        index = DuplicateIndex(client_similarity, 0.8)
+
+        for position, client in enumerate(clients):
+            assert index.matches(client) == []
+            index.add(client, position)
+
+        # Only shared phonetic signatures are scored, not ~2M pairs
+        assert index.comparisons < 50000
+
+    @pytest.mark.parametrize("earlier,later", [
+        (ParsedClient(first_name="Cher", last_name=""), ParsedClient(first_name="Cher", last_name="")),
+        (ParsedClient(first_name="John", last_name="", date_of_birth="1990-01-01"),
+         ParsedClient(first_name="John", last_name="Smith", date_of_birth="1990-01-01")),
+        (ParsedClient(first_name="John", last_name="Smith"), ParsedClient(first_name="", last_name="Smith")),
+        (ParsedClient(first_name="", last_name="Smith", date_of_birth="1990-01-01"),
+         ParsedClient(first_name="Ann", last_name="", date_of_birth="1990-01-01")),
+    ])
+    def test_partial_names_are_matched(self, earlier, later):
+        index = DuplicateIndex(client_similarity, 0.8)
+        index.add(earlier, "a")
+
+        assert index.matches(later) == [("a", 1.0)]
+
+    def test_phonetic_block_reaches_near_miss_names(self):
+        index = DuplicateIndex(lambda a, b: 1.0, 0.5)
+        index.add(ParsedClient(first_name="John", last_name="Smith"), "a")
+
+        assert index.matches(ParsedClient(first_name="Jon", last_name="Smyth")) == [("a", 1.0)]
+
+    def test_oversized_phonetic_blocks_are_dropped(self):
+        index = DuplicateIndex(lambda a, b: 1.0, 0.5, max_fuzzy_block=3)
+        for i in range(4):
+            index.add(ParsedClient(first_name=f"J{i}", last_name="Smith"), i)
+
+        assert index.matches(ParsedClient(first_name="Jx", last_name="Smith")) == []
+
+
+class TestImportServiceDuplicates:
+    """File-level and database duplicate checks"""
+
+    @pytest.fixture
+    def existing(self, db):
+        db.add(Client(
+            first_name="Existing", last_name="Person", email="existing@example.com",
+            phone="555-000-1111", date_of_birth=date(1990, 1, 2)
+        ))
+        db.commit()
+
+    def test_file_duplicates_use_similarity_weights(self):
+        records = [
+            {"First": "Ann", "Last": "Lee", "Mail": "ann@example.com", "Tel": "(555) 123-4567"},
+            {"First": "Ann", "Last": "Lee", "Mail": "", "Tel": "555.123.4567"},
+            {"First": "Bob", "Last": "Ng", "Mail": "ANN@example.com", "Tel": "555 999 0000"},
+        ]
+        mapping = {"First": "first_name", "Last": "last_name", "Mail": "email", "Tel": "phone"}
+
+        duplicates = ImportService()._find_potential_duplicates(records, "clients", mapping)
+
+        # Same name and phone digits; the third shares only email (40/100)
+        assert duplicates == [records[1]]
+
+    @pytest.mark.usefixtures("existing")
+    def test_existing_clients_are_flagged(self, db):
+        service = ImportService()
+        content = "\n".join([
+            "first_name,last_name,email,phone,date_of_birth",
+            "Someone,Else,EXISTING@example.com,,",
+            "Another,One,,+1 (555) 000-1111,",
+            "existing,person,,,1990-01-02",
+            "New,Client,new@example.com,555-222-3333,1990-01-02",
+        ])
+
+        preview = service.generate_preview(content, "csv", "clients", None, db=db)
+
+        assert [record["is_duplicate"] for record in preview["sample_records"]] == [True, True, True, False]
@@ -0,0 +1,183 @@
+"""
+Tests for background export jobs in services/export_job_service.py and the
+job endpoints in routers/exports.py.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from openpyxl import load_workbook
+
+from models import Appointment, Client, User
+from routers import exports as exports_router
+from services.export_job_service import ExportJobManager, parse_byte_range
+
+
+@pytest.fixture
+def seeded(db):
+    barber = User(email="barber@example.com", name="Barber", hashed_password="x", role="barber")
+    db.add(barber)
+    db.flush()
+    for i in range(25):
+        client = Client(
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            email=f"client{i}@example.com",
+            customer_type="vip" if i % 5 == 0 else "new",
+            total_visits=i % 4,
+            total_spent=float(i),
+            no_show_count=i % 2,
+            created_at=datetime(2030, 1, 1) + timedelta(days=i)
+        )
+        db.add(client)
+        db.flush()
+        db.add(Appointment(
+            user_id=barber.id,
+            barber_id=barber.id,
+            client_id=client.id,
+            service_name="Haircut",
+            start_time=datetime(2030, 2, 1) + timedelta(days=i),
+            duration_minutes=30,
+            price=30.0,
+            status="completed" if i % 3 else "cancelled",
+            created_at=datetime(2030, 1, 1)
+        ))
+    db.commit()
+
+
+@pytest.fixture
+def manager(tmp_path, session_factory, seeded):
+    manager = ExportJobManager(artifact_dir=str(tmp_path), session_factory=session_factory)
+    yield manager
+    manager._executor.shutdown(wait=True)
+
+
+def _finish(manager):
+    manager._executor.shutdown(wait=True)
+
+
+class TestParseByteRange:
+    """Range header parsing"""
+
+    def test_ranges(self):
+        assert parse_byte_range(None, 100) is None
+        assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+        assert parse_byte_range("bytes=90-", 100) == (90, 99)
+        assert parse_byte_range("bytes=-10", 100) == (90, 99)
+        assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+        assert parse_byte_range("bytes=0-1,5-6", 100) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=100-", 100)
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=9-3", 100)
+
+
+class TestExportJobManager:
+    """Job execution, write-only workbooks and deduplication"""
+
+    def test_client_workbook_is_written_with_summary(self, manager):
+        job, deduplicated = manager.submit("clients", "excel", {"filters": {"customer_type": "vip"}}, user_id=1)
+        _finish(manager)
+
+        assert not deduplicated
+        assert job.status == "completed"
+        assert job.progress_percent == 100
+        workbook = load_workbook(job.path, read_only=True)
+        rows = list(workbook["Clients"].values)
+        assert rows[0][0] == "id"
+        assert [row[0] for row in rows[1:]] == [21, 16, 11, 6, 1]
+        summary = {row[0]: row[1] for row in workbook["Summary"].iter_rows(min_row=3, values_only=True)}
+        assert summary["Total Clients"] == 5
+
+    def test_appointment_workbook_has_status_summary(self, manager):
+        job, _ = manager.submit("appointments", "excel", {"filters": {}})
+        _finish(manager)
+
+        workbook = load_workbook(job.path)
+        assert workbook["Appointments"].max_row == 26
+        summary = {row[0]: row[1] for row in workbook["Summary"].iter_rows(min_row=4, values_only=True)}
+        assert summary == {"cancelled": 9, "completed": 16}
+
+    def test_identical_filter_sets_share_one_job(self, manager):
+        first, _ = manager.submit("clients", "csv", {"filters": {"min_visits": 2, "tags": None}}, user_id=1)
+        second, deduplicated = manager.submit("clients", "csv", {"filters": {"min_visits": 2}}, user_id=2)
+        _finish(manager)
+
+        assert deduplicated
+        assert second is first
+        assert first.owner_ids == {1, 2}
+        assert manager.stats["submitted"] == 1
+
+    def test_completed_artifacts_survive_restart(self, manager, tmp_path, session_factory):
+        job, _ = manager.submit("clients", "ndjson", {"filters": {}})
+        _finish(manager)
+
+        restarted = ExportJobManager(artifact_dir=str(tmp_path), session_factory=session_factory)
+        with patch("services.export_job_service.export_service.write_export_file") as write:
+            reused, deduplicated = restarted.submit("clients", "ndjson", {"filters": {}})
+
+        write.assert_not_called()
+        assert deduplicated
+        assert reused.status == "completed"
+        assert reused.path == job.path
+        restarted._executor.shutdown(wait=True)
+
+    def test_failures_are_reported_without_details(self, manager):
+        with patch(
+            "services.export_job_service.export_service.write_export_file",
+            side_effect=RuntimeError("boom")
+        ):
+            job, _ = manager.submit("clients", "excel", {})
+            manager._executor.shutdown(wait=True)
+
+        assert job.status == "failed"
+        assert "boom" not in job.message
+        assert manager.stats["failed"] == 1
+
+    def test_invalid_requests(self, manager):
+        with pytest.raises(ValueError):
+            manager.submit("analytics", "csv", {})
+        with pytest.raises(ValueError):
+            manager.submit("payments", "excel", {})
+
+
+class TestExportJobRoutes:
+    """Download endpoint with range requests"""
+
+    @staticmethod
+    async def _body(response):
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    @pytest.mark.asyncio
+    async def test_download_supports_ranges_and_ownership(self, manager):
+        job, _ = manager.submit("clients", "csv", {"filters": {}}, user_id=7)
+        _finish(manager)
+        with open(job.path, "rb") as artifact:
+            content = artifact.read()
+        owner = SimpleNamespace(id=7, role="barber")
+
+        with patch.object(exports_router, "export_job_manager", manager):
+            full = await exports_router.download_export(job.id, SimpleNamespace(headers={}), owner)
+            partial = await exports_router.download_export(
+                job.id, SimpleNamespace(headers={"range": "bytes=10-19"}), owner
+            )
+            invalid = await exports_router.download_export(
+                job.id, SimpleNamespace(headers={"range": f"bytes={len(content)}-"}), owner
+            )
+            with pytest.raises(HTTPException) as exc_info:
+                await exports_router.download_export(
+                    job.id, SimpleNamespace(headers={}), SimpleNamespace(id=8, role="barber")
+                )
+
+        assert full.status_code == 200
+        assert await self._body(full) == content
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 10-19/{len(content)}"
+        assert await self._body(partial) == content[10:20]
+        assert invalid.status_code == 416
+        assert exc_info.value.status_code == 404
@@ -0,0 +1,139 @@
+"""
+Tests for the streaming export mode in services/export_service.py.
+"""
+
+import base64
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Appointment, Client, User
+from services.export_service import ExportService
+
+
+def _seed(factory, clients=10):
+    db = factory()
+    owner = User(email="owner@example.com", name="Owner", hashed_password="x", role="admin")
+    barber = User(email="barber@example.com", name="Barber Bob", hashed_password="x", role="barber")
+    db.add_all([owner, barber])
+    db.flush()
+    created = datetime(2030, 1, 1)
+    for i in range(clients):
+        client = Client(
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            email=f"client{i}@example.com",
+            customer_type="vip" if i % 2 else "new",
+            total_visits=i,
+            total_spent=float(i * 10),
+            created_at=created + timedelta(days=i)
+        )
+        db.add(client)
+        db.flush()
+        db.add(Appointment(
+            user_id=owner.id if i % 2 else barber.id,
+            barber_id=barber.id,
+            client_id=client.id,
+            service_name="Haircut",
+            start_time=created + timedelta(days=i, hours=10),
+            duration_minutes=30,
+            price=30.0,
+            status="completed",
+            created_at=created
+        ))
+    db.commit()
+    ids = (owner.id, barber.id)
+    db.close()
+    return ids
+
+
+def _read_csv(chunks):
+    return list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+
+
+class TestStreamingClients:
+    """stream_clients keyset pagination and encoders"""
+
+    def test_csv_stream_pages_through_every_row_once(self, session_factory, sql_statements):
+        _seed(session_factory, clients=10)
+        sql_statements.clear()
+
+        rows = _read_csv(ExportService().stream_clients(session_factory=session_factory, batch_size=3))
+
+        assert [int(row["id"]) for row in rows] == list(range(10, 0, -1))
+        assert rows[0]["first_name"] == "REDACTED"
+        # 4 pages of at most 3 rows, each bounded by LIMIT
+        selects = [s for s in sql_statements if s.lstrip().upper().startswith("SELECT")]
+        assert len(selects) == 4
+        assert all("LIMIT" in s.upper() for s in selects)
+
+    def test_filters_and_pii_apply_to_stream(self, session_factory):
+        _seed(session_factory, clients=6)
+
+        rows = _read_csv(ExportService().stream_clients(
+            filters={"customer_type": "vip", "min_visits": 2},
+            include_pii=True,
+            session_factory=session_factory
+        ))
+
+        assert [row["email"] for row in rows] == ["client5@example.com", "client3@example.com"]
+
+    def test_ndjson_and_gzip_round_trip(self, session_factory):
+        _seed(session_factory, clients=5)
+        service = ExportService()
+        service.stream_batch_size = 2
+
+        plain = b"".join(service.stream_clients(format="ndjson", session_factory=session_factory))
+        compressed = b"".join(service.stream_clients(
+            format="ndjson", compress=True, session_factory=session_factory
+        ))
+
+        assert gzip.decompress(compressed) == plain
+        records = [json.loads(line) for line in plain.decode().splitlines()]
+        assert [record["id"] for record in records] == [5, 4, 3, 2, 1]
+
+    def test_empty_export_yields_nothing(self, session_factory):
+        assert b"".join(ExportService().stream_clients(session_factory=session_factory)) == b""
+
+    def test_unsupported_format_fails_before_streaming(self):
+        with pytest.raises(ValueError):
+            ExportService().stream_clients(format="pdf")
+
+    def test_file_info(self):
+        service = ExportService()
+        filename, media_type = service.stream_file_info("clients", "ndjson", compress=True)
+
+        assert filename.startswith("clients_export_") and filename.endswith(".ndjson.gz")
+        assert media_type == "application/gzip"
+
+
+class TestStreamingAppointments:
+    """stream_appointments joins and access filters"""
+
+    def test_user_filter_and_barber_name(self, session_factory):
+        owner_id, _ = _seed(session_factory, clients=4)
+
+        rows = _read_csv(ExportService().stream_appointments(
+            filters={"user_id": owner_id},
+            session_factory=session_factory,
+            batch_size=1
+        ))
+
+        assert [row["client_name"] for row in rows] == ["First3 Last3", "First1 Last1"]
+        assert {row["user_name"] for row in rows} == {"Owner"}
+        assert {row["barber_name"] for row in rows} == {"Barber Bob"}
+
+    @pytest.mark.asyncio
+    async def test_buffered_export_uses_same_rows(self, session_factory):
+        _seed(session_factory, clients=3)
+        db = session_factory()
+
+        result = await ExportService().export_appointments(db, format="json")
+
+        records = json.loads(base64.b64decode(result["content"]))
+        assert [record["barber_name"] for record in records] == ["Barber Bob"] * 3
+        db.close()
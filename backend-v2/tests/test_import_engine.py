@@ -0,0 +1,148 @@
+"""
+Tests for the bulk import engine in services/import_service.py.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from models import Appointment, AppointmentReminder, Client, Service, User
+from services.import_service import ImportIndex, ImportService
+
+CLIENT_MAPPING = {field: field for field in ("first_name", "last_name", "email", "phone", "date_of_birth", "notes")}
+
+
+@pytest.fixture(autouse=True)
+def existing_client(db):
+    db.add(Client(first_name="Existing", last_name="Client", email="taken@example.com", phone="555-000-1111"))
+    db.commit()
+
+
+def _csv(rows):
+    header = "first_name,last_name,email,phone,date_of_birth,notes"
+    return "\n".join([header] + [",".join(row) for row in rows])
+
+
+def _run(db, content, import_type="clients", mapping=None, progress=None, **options):
+    options.setdefault("batch_size", 100)
+    return ImportService().execute_import(
+        content=content,
+        source_type="csv",
+        import_type=import_type,
+        field_mapping=mapping or CLIENT_MAPPING,
+        options=options,
+        progress_callback=progress or (lambda update: None),
+        db=db,
+        user_id=None
+    )
+
+
+class TestClientImport:
+    """Classification and bulk writes"""
+
+    def test_batches_are_classified_and_written_in_bulk(self, db, sql_statements):
+        content = _csv([
+            ("Ann", "A", "ann@example.com", "", "1990-01-02", ""),
+            ("Taken", "Email", "TAKEN@example.com", "", "", ""),
+            ("Taken", "Phone", "", "(555) 000-1111", "", ""),
+            ("Ann", "Again", "ann@example.com", "", "", ""),
+            ("Bob", "B", "bob@example.com", "555 222 3333", "03/04/1985", "vip"),
+        ])
+        sql_statements.clear()
+
+        result = _run(db, content)
+
+        assert result["success"]
+        assert result["summary"]["inserted"] == 2
+        assert result["summary"]["skipped"] == 3
+        assert result["successful_imports"] == 5
+        assert len([s for s in sql_statements if s.startswith("INSERT")]) == 1
+        imported = db.query(Client).filter(Client.id.in_(result["imported_record_ids"])).order_by(Client.id).all()
+        assert [client.email for client in imported] == ["ann@example.com", "bob@example.com"]
+        assert imported[0].date_of_birth == date(1990, 1, 2)
+        assert imported[1].date_of_birth == date(1985, 3, 4)
+        assert imported[0].customer_type == "new"
+
+    def test_later_batches_see_earlier_inserts(self, db):
+        content = _csv([
+            ("Ann", "A", "ann@example.com", "", "", ""),
+            ("Ann", "Dup", "ann@example.com", "", "", ""),
+        ])
+
+        result = _run(db, content, batch_size=1)
+
+        assert result["summary"]["inserted"] == 1
+        assert result["summary"]["skipped"] == 1
+
+    def test_update_handling_updates_existing_in_bulk(self, db):
+        content = _csv([("Renamed", "Client", "taken@example.com", "", "1980-05-06", "")])
+
+        result = _run(db, content, duplicate_handling="update")
+
+        db.expire_all()
+        client = db.query(Client).filter_by(first_name="Renamed").one()
+        assert client.date_of_birth == date(1980, 5, 6)
+        assert result["summary"]["updated"] == 1
+        # Updated clients are not part of the rollback set
+        assert result["imported_record_ids"] == []
+
+    def test_error_threshold_rolls_back_inserted_rows(self, db):
+        content = _csv([("Ann", "A", "ann@example.com", "", "", "")])
+        service = ImportService()
+        original = service._plan_clients
+
+        def failing_plan(*args, **kwargs):
+            plan = original(*args, **kwargs)
+            plan["errors"].append("Record 2: boom")
+            return plan
+        service._plan_clients = failing_plan
+
+        result = service.execute_import(
+            content=content, source_type="csv", import_type="clients", field_mapping=CLIENT_MAPPING,
+            options={"error_threshold": 1}, progress_callback=lambda update: None, db=db, user_id=None
+        )
+
+        assert not result["success"]
+        assert db.query(Client).count() == 1
+
+    def test_progress_is_reported_per_batch(self, db):
+        content = _csv([(f"C{i}", "X", f"c{i}@example.com", "", "", "") for i in range(5)])
+        updates = []
+
+        _run(db, content, progress=updates.append, batch_size=2)
+
+        assert [update["processed"] for update in updates] == [2, 4, 5]
+        assert updates[-1]["percentage"] == 100
+
+
+class TestImportIndex:
+    """Index built from stored search hashes"""
+
+    def test_index_reads_hashes_without_decrypting(self, db):
+        index = ImportIndex.load(db, "clients")
+
+        assert index.find_client("Taken@Example.com") is not None
+        assert index.find_client(None, "5550001111") is not None
+        assert index.find_client("nobody@example.com") is None
+
+
+class TestAppointmentImport:
+    """Appointments resolve clients through the index"""
+
+    def test_appointments_link_to_existing_clients(self, db):
+        content = "\n".join([
+            "client_email,service_name,start_time,duration_minutes,price",
+            "taken@example.com,Cut,2030-01-01T10:00:00,45,40",
+            "missing@example.com,Cut,2030-01-01T11:00:00,30,30",
+        ])
+        mapping = {field: field for field in ("client_email", "service_name", "start_time", "duration_minutes", "price")}
+
+        result = _run(db, content, import_type="appointments", mapping=mapping, error_threshold=5)
+
+        appointment = db.query(Appointment).one()
+        assert appointment.client_id == db.query(Client.id).scalar()
+        assert appointment.start_time == datetime(2030, 1, 1, 10, 0)
+        assert result["failed_imports"] == 1
+        assert result["errors"] == ["Client not found: missing@example.com"]
+        # Bulk-inserted appointments still get their reminders materialized
+        assert sorted(r.hours_before for r in db.query(AppointmentReminder).filter_by(appointment_id=appointment.id)) == [2, 24]
@@ -0,0 +1,129 @@
+"""
+Tests for streaming import parsing: ImportService.iter_record_batches and
+execute_import reading from a file, and BaseBookingParser.iter_csv_batches.
+"""
+
+import io
+import json
+import tempfile
+
+import pytest
+
+import services.import_service as import_service_module
+from models import Client
+from services.import_service import ImportService
+from utils.parsers.booksy_parser import BooksyParser
+
+
+def _spooled(text):
+    upload = tempfile.SpooledTemporaryFile(max_size=64)
+    upload.write(text.encode("utf-8"))
+    upload.seek(0)
+    return upload
+
+
+class TestIterRecordBatches:
+    """Batches read incrementally from a binary file"""
+
+    def test_csv_batches_apply_platform_transforms(self):
+        rows = ["Customer Name,Customer Email"] + [f"Client {i},c{i}@example.com" for i in range(5)]
+        upload = _spooled("\ufeff" + "\n".join(rows))
+
+        batches = list(ImportService().iter_record_batches(upload, "booksy", "clients", batch_size=2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert batches[0][0]["first_name"] == "Client"
+        assert batches[2][0]["email"] == "c4@example.com"
+        # The caller's file stays usable
+        assert not upload.closed
+
+    def test_json_array_is_decoded_element_by_element(self, monkeypatch):
+        monkeypatch.setattr(import_service_module, "STREAM_CHUNK_SIZE", 7)
+        records = [{"first_name": f"N{i}", "note": "x" * i, "nested": {"list": [i, "]"]}} for i in range(20)]
+        upload = _spooled(json.dumps(records, indent=1))
+
+        batches = list(ImportService().iter_record_batches(upload, "json", "clients", batch_size=8))
+
+        assert [len(batch) for batch in batches] == [8, 8, 4]
+        assert [record for batch in batches for record in batch] == records
+
+    def test_wrapped_json_documents(self):
+        upload = _spooled(json.dumps({"clients": [{"first_name": "A"}, {"first_name": "B"}]}))
+
+        batches = list(ImportService().iter_record_batches(upload, "json", "clients"))
+
+        assert batches == [[{"first_name": "A"}, {"first_name": "B"}]]
+
+    def test_truncated_json_array_fails(self, monkeypatch):
+        monkeypatch.setattr(import_service_module, "STREAM_CHUNK_SIZE", 4)
+        upload = _spooled('[{"first_name": "A"}, {"first_name": ')
+
+        with pytest.raises(ValueError):
+            list(ImportService().iter_record_batches(upload, "json", "clients"))
+
+
+class TestExecuteImportFromFile:
+    """The import engine consumes batches as they are read"""
+
+    def test_import_reads_spooled_upload(self, db):
+        rows = ["first_name,last_name,email"] + [f"F{i},L{i},c{i}@example.com" for i in range(7)]
+        upload = _spooled("\n".join(rows))
+        updates = []
+
+        result = ImportService().execute_import(
+            content=None,
+            file=upload,
+            source_type="csv",
+            import_type="clients",
+            field_mapping={"first_name": "first_name", "last_name": "last_name", "email": "email"},
+            options={"batch_size": 3},
+            progress_callback=updates.append,
+            db=db,
+            user_id=None
+        )
+
+        assert result["success"]
+        assert result["processed_records"] == 7
+        assert db.query(Client).count() == 7
+        assert [update["processed"] for update in updates] == [3, 6, 7]
+        assert updates[-1]["percentage"] == 100
+
+    def test_empty_file_is_reported(self):
+        result = ImportService().execute_import(
+            content=None, file=io.BytesIO(b"first_name,last_name\n"), source_type="csv",
+            import_type="clients", field_mapping={}, options={}, progress_callback=lambda update: None,
+            db=None, user_id=None
+        )
+
+        assert not result["success"]
+
+
+class TestParserCsvBatches:
+    """Platform parsers stream CSV exports batch by batch"""
+
+    def test_rows_and_duplicates_span_batches(self, tmp_path):
+        path = tmp_path / "booksy.csv"
+        path.write_text("\n".join([
+            "customer_id,first_name,last_name,email,phone",
+            "1,Ann,Lee,ann@example.com,5551234567",
+            "2,Bob,Ng,bob@example.com,5559876543",
+            "3,,Missing,missing@example.com,",
+            "4,Ann,Lee,ANN@example.com,555-123-4567",
+        ]))
+
+        results = list(BooksyParser().iter_csv_batches(str(path), batch_size=2))
+
+        assert [result.valid_records for result in results] == [2, 1]
+        assert results[1].errors == ["Row 3: First name is required"]
+        duplicate = results[1].duplicates_found[0]
+        assert (duplicate["client1_index"], duplicate["client2_index"]) == (0, 2)
+        assert duplicate["client1"].raw_data is None
+
+    def test_file_objects_and_header_check(self):
+        upload = _spooled("name,email\nAnn Lee,ann@example.com\n")
+
+        results = list(BooksyParser().iter_csv_batches(upload))
+
+        assert not results[0].success
+        assert "Booksy" in results[0].errors[0]
+        assert not upload.closed
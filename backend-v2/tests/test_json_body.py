@@ -0,0 +1,157 @@
+"""
+Tests for single-pass JSON body parsing: utils/json_body.py, the
+RequestValidationMiddleware stage and route reuse of the decoded body.
+"""
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from middleware import RequestValidationMiddleware
+from middleware.financial_security import FinancialSecurityMiddleware
+from middleware.request_validation import install_parsed_body_routes
+from utils import json_body
+from utils.input_validation import ValidationError, validate_json_depth
+
+
+def _nested(levels, leaf=1):
+    value = leaf
+    for _ in range(levels):
+        value = {"k": value}
+    return value
+
+
+class TestParseJson:
+    """The pre-decode depth check agrees with validate_json_depth"""
+
+    @pytest.mark.parametrize("value", [
+        _nested(5), _nested(6), _nested(7), _nested(6, leaf={}), _nested(6, leaf=[]),
+        [[[[[[]]]]]], [[[[[[1]]]]]], [[[[[[[]]]]]]], {"a": "[[[[[[[[[[", "b": [1, {"c": "\\\"{{{{{{{{"}]}, 3, "x"
+    ])
+    def test_same_verdict_as_validate_json_depth(self, value):
+        try:
+            validate_json_depth(value)
+            expected = value
+        except ValidationError:
+            expected = ValidationError
+
+        try:
+            result = json_body.parse_json(json.dumps(value).encode())
+        except ValidationError:
+            result = ValidationError
+
+        assert result == expected
+
+    def test_brackets_in_strings_are_ignored(self):
+        assert json_body.container_depth(b'{"a": "[[[{{{\\"]]]", "b": [1]}') == 2
+
+    def test_invalid_json_is_a_value_error(self):
+        with pytest.raises(ValueError):
+            json_body.parse_json(b'{"a": ')
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def _counting_loads():
+    calls = []
+    original = json_body.loads
+
+    def loads(raw):
+        calls.append(raw)
+        return original(raw)
+
+    return calls, patch.object(json_body, "loads", loads)
+
+
+class TestSinglePass:
+    """Middleware and route body models share one decode"""
+
+    @pytest.mark.asyncio
+    async def test_route_body_model_reuses_decoded_body(self):
+        app = FastAPI()
+
+        @app.post("/api/v1/orders")
+        async def create(payload: dict, request: Request):
+            return {"payload": payload, "state": request.state.json_data}
+
+        app.add_middleware(RequestValidationMiddleware)
+        app.add_middleware(FinancialSecurityMiddleware)
+        install_parsed_body_routes(app)
+
+        calls, counting = _counting_loads()
+        with counting, patch("starlette.requests.json") as starlette_json:
+            async with _client(app) as client:
+                response = await client.post(
+                    "/api/v1/orders", json={"amount": 10},
+                    headers={"content-type": "application/json; charset=utf-8"}
+                )
+
+        assert response.status_code == 200
+        assert response.json() == {"payload": {"amount": 10}, "state": {"amount": 10}}
+        assert len(calls) == 1
+        starlette_json.loads.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_too_deep_body_is_rejected_before_decoding(self):
+        app = FastAPI()
+
+        @app.post("/echo")
+        async def echo(payload: dict):
+            return payload
+
+        app.add_middleware(RequestValidationMiddleware)
+
+        calls, counting = _counting_loads()
+        with counting:
+            async with _client(app) as client:
+                response = await client.post("/echo", json=_nested(50))
+
+        assert response.status_code == 400
+        assert calls == []
+
+
+class TestRawBodies:
+    """Webhooks and uploads are streamed, not decoded or buffered"""
+
+    @pytest.mark.asyncio
+    async def test_webhook_body_is_passed_through(self):
+        app = FastAPI()
+
+        @app.post("/api/v2/webhooks/stripe")
+        async def hook(request: Request):
+            return {"body": (await request.body()).decode()}
+
+        app.add_middleware(RequestValidationMiddleware)
+
+        async with _client(app) as client:
+            response = await client.post(
+                "/api/v2/webhooks/stripe", content=b"not json", headers={"content-type": "application/json"}
+            )
+
+        assert response.json() == {"body": "not json"}
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_over_limit_is_413(self):
+        app = FastAPI()
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            return {"size": len(await request.body())}
+
+        app.add_middleware(RequestValidationMiddleware, max_body_size=100)
+
+        async def chunks(count):
+            for _ in range(count):
+                yield b"x" * 40
+
+        async with _client(app) as client:
+            small = await client.post("/upload", content=chunks(2))
+            large = await client.post("/upload", content=chunks(3))
+
+        assert small.json() == {"size": 80}
+        assert large.status_code == 413
@@ -0,0 +1,130 @@
+"""
+Tests for batched notification dispatch in services/notification_dispatch.py.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from config import settings
+from models import NotificationQueue, NotificationStatus
+from services.notification_dispatch import FakeNotificationProvider, NotificationDispatcher
+
+
+def _queue(factory, rows):
+    db = factory()
+    due = datetime.utcnow() - timedelta(minutes=1)
+    for index, row in enumerate(rows):
+        db.add(NotificationQueue(
+            user_id=1,
+            notification_type=row.get("type", "email"),
+            template_name="marketing",
+            recipient=row["recipient"],
+            subject=row.get("subject", "Hello"),
+            body=row.get("body", "<p>Same body</p>"),
+            status=NotificationStatus.PENDING,
+            scheduled_for=row.get("scheduled_for", due + timedelta(seconds=index)),
+            attempts=row.get("attempts", 0)
+        ))
+    db.commit()
+    db.close()
+
+
+class TestClaim:
+    """Leases keep concurrent workers on disjoint rows"""
+
+    def test_claimed_rows_are_skipped_until_lease_expires(self, session_factory):
+        _queue(session_factory, [{"recipient": f"u{i}@example.com"} for i in range(5)])
+        dispatcher = NotificationDispatcher(FakeNotificationProvider(0), lease_seconds=60)
+
+        first = dispatcher.claim(session_factory(), 3, owner="a")
+        second = dispatcher.claim(session_factory(), 3, owner="b")
+        third = dispatcher.claim(session_factory(), 3, owner="c")
+
+        assert len(first) == 3 and len(second) == 2 and third == []
+        assert not {n.id for n in first} & {n.id for n in second}
+
+        db = session_factory()
+        db.query(NotificationQueue).filter(NotificationQueue.lease_owner == "a").update(
+            {NotificationQueue.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+        reclaimed = dispatcher.claim(session_factory(), 10, owner="d")
+        assert sorted(n.id for n in reclaimed) == sorted(n.id for n in first)
+
+    def test_future_and_exhausted_rows_are_not_claimed(self, session_factory):
+        _queue(session_factory, [
+            {"recipient": "later@example.com", "scheduled_for": datetime.utcnow() + timedelta(hours=1)},
+            {"recipient": "done@example.com", "attempts": settings.notification_retry_attempts},
+        ])
+
+        assert NotificationDispatcher(FakeNotificationProvider(0)).claim(session_factory(), 10, "a") == []
+
+
+class TestDispatch:
+    """Batching, concurrency and bulk status updates"""
+
+    def test_identical_emails_share_one_request(self, session_factory):
+        rows = [{"recipient": f"u{i}@example.com"} for i in range(6)]
+        rows += [{"recipient": "other@example.com", "body": "<p>Different</p>"}]
+        rows += [{"recipient": "+15551234567", "type": "sms", "body": "Text"}]
+        _queue(session_factory, rows)
+        provider = FakeNotificationProvider(0)
+
+        result = NotificationDispatcher(provider).dispatch(session_factory(), batch_size=50)
+
+        assert result == {"processed": 8, "successful": 8, "failed": 0}
+        # One personalization batch, one single email, one SMS
+        assert provider.requests == 3
+        db = session_factory()
+        sent = db.query(NotificationQueue).filter(NotificationQueue.status == NotificationStatus.SENT).all()
+        assert len(sent) == 8
+        assert all(n.sent_at is not None and n.lease_owner is None for n in sent)
+
+    def test_status_updates_are_written_in_bulk(self, session_factory, engine):
+        _queue(session_factory, [{"recipient": f"u{i}@example.com", "body": str(i)} for i in range(20)])
+        statements = []
+        event.listen(
+            engine, "before_cursor_execute",
+            lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, executemany))
+        )
+
+        NotificationDispatcher(FakeNotificationProvider(0), max_workers=4, flush_size=10).dispatch(session_factory())
+
+        updates = [s for s in statements if s[0].startswith("UPDATE")]
+        # The lease claim, then two flushes of ten rows each
+        assert len(updates) == 3
+        assert [executemany for _, executemany in updates] == [False, True, True]
+
+    def test_failures_retry_with_backoff_then_fail(self, session_factory):
+        _queue(session_factory, [
+            {"recipient": "flaky@example.com", "body": "a"},
+            {"recipient": "dead@example.com", "body": "b", "attempts": settings.notification_retry_attempts - 1},
+        ])
+        provider = FakeNotificationProvider(0, fail_recipients={"flaky@example.com", "dead@example.com"})
+
+        result = NotificationDispatcher(provider).dispatch(session_factory())
+
+        db = session_factory()
+        flaky = db.query(NotificationQueue).filter_by(recipient="flaky@example.com").one()
+        dead = db.query(NotificationQueue).filter_by(recipient="dead@example.com").one()
+        assert flaky.status == NotificationStatus.PENDING
+        assert flaky.attempts == 1
+        assert flaky.scheduled_for > datetime.utcnow()
+        assert dead.status == NotificationStatus.FAILED
+        assert result["failed"] == 1
+
+    def test_provider_exceptions_are_recorded(self, session_factory):
+        _queue(session_factory, [{"recipient": "boom@example.com"}])
+
+        class ExplodingProvider:
+            def send_email(self, *args, **kwargs):
+                raise RuntimeError("socket closed")
+
+        NotificationDispatcher(ExplodingProvider()).dispatch(session_factory())
+
+        row = session_factory().query(NotificationQueue).one()
+        assert row.attempts == 1
+        assert row.status == NotificationStatus.PENDING
+        assert "socket closed" in row.error_message
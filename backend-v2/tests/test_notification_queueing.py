@@ -0,0 +1,140 @@
+"""
+Tests for batched lookups in NotificationService.queue_notification and
+bulk_queue_notifications.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import (
+    NotificationPreferences, NotificationQueue, NotificationStatus, NotificationTemplate, User
+)
+from services.notification_service import NotificationService
+
+
+@pytest.fixture(autouse=True)
+def templates(db):
+    db.add_all([
+        NotificationTemplate(
+            name="marketing_campaign", template_type="email",
+            subject="Hi {{ name }}", body="<p>{{ name }}</p>", is_active=True
+        ),
+        NotificationTemplate(
+            name="marketing_campaign", template_type="sms", body="Hi {{ name }}", is_active=True
+        ),
+    ])
+    db.commit()
+
+
+def _users(db, count, start=0):
+    users = [
+        User(email=f"u{i}@example.com", name=f"User {i}", hashed_password="x", phone=f"+1555000{i:04d}")
+        for i in range(start, start + count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _campaign(users):
+    return [
+        {"user": user, "template_name": "marketing_campaign", "context": {"name": user.name}}
+        for user in users
+    ]
+
+
+class TestBulkQueue:
+    """Lookups are batched across recipients"""
+
+    def test_query_count_does_not_grow_with_recipients(self, db, sql_statements):
+        service = NotificationService()
+        small, large = _users(db, 5), _users(db, 50, start=5)
+        for user in small + large:
+            db.add(NotificationPreferences(user_id=user.id, email_marketing=True, sms_marketing=True))
+        db.commit()
+
+        counts = []
+        for users in (small, large):
+            # Load the recipients up front, as the campaign worker does
+            db.query(User).all()
+            sql_statements.clear()
+            queued = service.bulk_queue_notifications(db, _campaign(users))
+            counts.append(sum(1 for s in sql_statements if s.startswith("SELECT")))
+            assert len(queued) == 2 * len(users)
+
+        assert counts[0] == counts[1]
+        assert db.query(NotificationQueue).count() == 110
+        email = db.query(NotificationQueue).filter_by(recipient="u7@example.com").one()
+        assert (email.subject, email.body) == ("Hi User 7", "<p>User 7</p>")
+
+    def test_default_preferences_are_created_in_one_flush(self, db):
+        users = _users(db, 10)
+        flushes = []
+        event.listen(db, "after_flush", lambda session, context: flushes.append(len(session.new)))
+
+        NotificationService().bulk_queue_notifications(db, _campaign(users))
+
+        # All ten defaults go out in a single flush before the final commit
+        assert flushes[0] == 10
+        preferences = db.query(NotificationPreferences).all()
+        assert len(preferences) == 10
+        assert all(p.email_frequency == "immediate" and not p.marketing_consent for p in preferences)
+        # Marketing is opt-in, so nothing is queued for the new defaults
+        assert db.query(NotificationQueue).count() == 0
+
+    def test_templates_are_compiled_once_per_revision(self, db, monkeypatch):
+        import services.notification_service as module
+        compiled = []
+        original = module.Template
+        monkeypatch.setattr(module, "Template", lambda source: compiled.append(source) or original(source))
+        users = _users(db, 20)
+        for user in users:
+            db.add(NotificationPreferences(user_id=user.id, email_marketing=True, sms_marketing=True))
+        db.commit()
+        service = NotificationService()
+
+        service.bulk_queue_notifications(db, _campaign(users))
+        assert sorted(compiled) == sorted(["Hi {{ name }}", "<p>{{ name }}</p>", "Hi {{ name }}"])
+
+        template = db.query(NotificationTemplate).filter_by(template_type="sms").one()
+        template.body = "Hello {{ name }}"
+        template.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db.commit()
+        service.bulk_queue_notifications(db, _campaign(users[:1]))
+        assert compiled[-1] == "Hello {{ name }}"
+
+
+class TestFrequencyLimits:
+    """Recent sends are looked up once and honoured per channel"""
+
+    def test_daily_and_never_frequencies(self, db):
+        daily, never, fresh = _users(db, 3)
+        for user, frequency in ((daily, "daily"), (never, "never"), (fresh, "daily")):
+            db.add(NotificationPreferences(
+                user_id=user.id, email_marketing=True, sms_marketing=True,
+                email_frequency=frequency, sms_frequency="immediate"
+            ))
+        db.add(NotificationQueue(
+            user_id=daily.id, notification_type="email", template_name="marketing_campaign",
+            recipient=daily.email, body="earlier", status=NotificationStatus.SENT,
+            scheduled_for=datetime.utcnow(), sent_at=datetime.utcnow() - timedelta(hours=2)
+        ))
+        db.commit()
+
+        queued = NotificationService().bulk_queue_notifications(db, _campaign([daily, never, fresh]))
+
+        assert sorted((n.user_id, n.notification_type) for n in queued) == sorted([
+            (daily.id, "sms"), (never.id, "sms"), (fresh.id, "email"), (fresh.id, "sms")
+        ])
+
+    def test_single_notification_uses_the_same_path(self, db):
+        user, = _users(db, 1)
+        db.add(NotificationPreferences(user_id=user.id, email_marketing=True, sms_marketing=False))
+        db.commit()
+
+        queued = NotificationService().queue_notification(db, user, "marketing_campaign", {"name": "Ann"})
+
+        assert [(n.notification_type, n.body) for n in queued] == [("email", "<p>Ann</p>")]
+        assert NotificationService().queue_notification(db, user, "missing_template", {}) == []
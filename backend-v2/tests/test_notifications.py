@@ -11,7 +11,7 @@ import json
 
 from models import (
     User, NotificationTemplate, NotificationPreference, 
-    NotificationQueue, NotificationStatus, Appointment, Client
+    NotificationQueue, NotificationStatus, Appointment, Client, AppointmentReminder
 )
 from services.notification_service import NotificationService
 from utils.auth import create_access_token
@@ -193,12 +193,13 @@ class TestNotificationService:
         service = NotificationService()
         service.schedule_appointment_reminders(db, appointment)
         
-        # Check that reminders were scheduled
-        reminders = db.query(NotificationQueue).filter(
-            NotificationQueue.appointment_id == appointment.id
+        # Check that reminder times were materialized for the worker
+        reminders = db.query(AppointmentReminder).filter(
+            AppointmentReminder.appointment_id == appointment.id,
+            AppointmentReminder.status == "pending"
         ).all()
         
-        assert len(reminders) > 0
+        assert sorted(r.hours_before for r in reminders) == [2, 24]
     
     def test_cancel_appointment_notifications(self, db: Session, test_user: User):
         """Test cancelling appointment notifications"""
@@ -0,0 +1,211 @@
+"""
+Tests for the authenticated principal cache in services/principal_cache.py.
+"""
+
+import pytest
+
+from models import User
+from services import principal_cache as principal_cache_module
+from services.principal_cache import PrincipalCache, VERSION_KEY_PREFIX, principal_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.keys = []
+
+    def incr(self, key):
+        self.keys.append(key)
+
+    def execute(self):
+        return [self.redis.incr(key) for key in self.keys]
+
+
+@pytest.fixture(autouse=True)
+def barber(db):
+    db.add(User(email="barber@example.com", name="Barber", hashed_password="x", role="barber", location_id=3))
+    db.commit()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """The global cache (the one the session listeners invalidate) without Redis"""
+    monkeypatch.setattr(principal_cache, "_redis_client_factory", lambda: None)
+    monkeypatch.setattr(principal_cache, "stats", dict.fromkeys(principal_cache.stats, 0))
+    principal_cache.clear()
+    yield principal_cache
+    principal_cache.clear()
+
+
+class TestLookups:
+    """Hits rebuild the user without touching the database"""
+
+    def test_second_lookup_issues_no_sql(self, session_factory, cache, sql_statements):
+        db = session_factory()
+        first = cache.get_user(db, "barber@example.com")
+        db.close()
+
+        sql_statements.clear()
+        db = session_factory()
+        second = cache.get_user(db, "barber@example.com")
+
+        assert sql_statements == []
+        assert (second.id, second.role, second.location_id) == (first.id, "barber", 3)
+        assert second in db
+        assert cache.get_stats()["hit_rate"] == 50.0
+        db.close()
+
+    def test_columns_outside_the_snapshot_load_on_access(self, session_factory, cache, sql_statements):
+        db = session_factory()
+        cache.get_user(db, "barber@example.com")
+        db.close()
+
+        db = session_factory()
+        user = cache.get_user(db, "barber@example.com")
+        sql_statements.clear()
+
+        assert user.hashed_password == "x"
+        assert len(sql_statements) == 1
+        db.close()
+
+    def test_unknown_subject_is_none(self, session_factory, cache):
+        db = session_factory()
+        assert cache.get_user(db, "nobody@example.com") is None
+        db.close()
+
+
+class TestInvalidation:
+    """Committed changes drop the cached principal; rolled back ones do not"""
+
+    def test_committed_role_change_is_seen_next_request(self, session_factory, cache):
+        db = session_factory()
+        user = cache.get_user(db, "barber@example.com")
+        user.role = "admin"
+        user.is_active = False
+        db.commit()
+        db.close()
+
+        db = session_factory()
+        reloaded = cache.get_user(db, "barber@example.com")
+        assert (reloaded.role, reloaded.is_active) == ("admin", False)
+        assert cache.stats["invalidations"] == 1
+        db.close()
+
+    def test_password_change_invalidates(self, session_factory, cache):
+        db = session_factory()
+        user = cache.get_user(db, "barber@example.com")
+        user.hashed_password = "y"
+        db.commit()
+        db.close()
+
+        assert cache.get_stats()["entries"] == 0
+
+    def test_untracked_change_keeps_the_entry(self, session_factory, cache):
+        db = session_factory()
+        user = cache.get_user(db, "barber@example.com")
+        user.phone = "555-0100"
+        db.commit()
+        db.close()
+
+        assert cache.get_stats()["entries"] == 1
+        assert cache.stats["invalidations"] == 0
+
+    def test_rollback_does_not_invalidate(self, session_factory, cache):
+        db = session_factory()
+        user = cache.get_user(db, "barber@example.com")
+        user.role = "admin"
+        db.flush()
+        db.rollback()
+        db.close()
+
+        assert cache.stats["invalidations"] == 0
+        db = session_factory()
+        assert cache.get_user(db, "barber@example.com").role == "barber"
+        db.close()
+
+    def test_created_user_replaces_a_stale_snapshot(self, session_factory, cache):
+        # e.g. an account deleted and signed up again under the same email
+        cache.get("new@example.com", lambda: User(id=99, email="new@example.com", role="admin"))
+
+        db = session_factory()
+        db.add(User(email="new@example.com", name="New", hashed_password="x", role="user"))
+        db.commit()
+        db.close()
+
+        db = session_factory()
+        assert cache.get_user(db, "new@example.com").role == "user"
+        db.close()
+
+
+class TestBounds:
+    """Size, age and cross-worker versions"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PrincipalCache(max_entries=2, redis_client_factory=lambda: None)
+        users = {email: User(id=i, email=email) for i, email in enumerate(["a", "b", "c"])}
+
+        cache.get("a", lambda: users["a"])
+        cache.get("b", lambda: users["b"])
+        cache.get("a", lambda: users["a"])
+        cache.get("c", lambda: users["c"])
+
+        assert list(cache._entries) == ["a", "c"]
+        assert cache.stats["evictions"] == 1
+
+    def test_entry_expires_after_ttl(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(principal_cache_module.time_module, "monotonic", lambda: now[0])
+        cache = PrincipalCache(ttl_seconds=60, redis_client_factory=lambda: None)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return User(id=1, email="a")
+
+        cache.get("a", loader)
+        now[0] += 59
+        cache.get("a", loader)
+        now[0] += 1
+        cache.get("a", loader)
+
+        assert len(loads) == 2
+
+    def test_shared_version_bump_reaches_other_workers(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(principal_cache_module.time_module, "monotonic", lambda: now[0])
+        redis = FakeRedis()
+        worker = PrincipalCache(version_check_seconds=5, redis_client_factory=lambda: redis)
+        other_worker = PrincipalCache(redis_client_factory=lambda: redis)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return User(id=1, email="a")
+
+        worker.get("a", loader)
+        other_worker.invalidate(["a"])
+        assert redis.values[VERSION_KEY_PREFIX + "a"] == 1
+
+        # Served until the next version check, then reloaded
+        now[0] += 1
+        worker.get("a", loader)
+        now[0] += 5
+        worker.get("a", loader)
+
+        assert len(loads) == 2
+        assert worker.stats["version_checks"] == 1
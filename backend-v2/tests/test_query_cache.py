@@ -0,0 +1,187 @@
+"""
+Tests for the bounded query cache in utils/query_cache.py.
+"""
+
+import threading
+from datetime import date
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from models import Service, ServiceCategoryEnum, User, barber_services
+from utils import query_cache as query_cache_module
+from utils.query_cache import QueryCache, cached_query
+
+
+class TestQueryCacheBounds:
+    """LRU eviction, TTL and byte accounting"""
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = QueryCache(max_entries=3, shard_count=1)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        cache.get("a")  # a becomes most recent
+        cache.set("d", 4)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get_stats()["evictions"] == 1
+        assert len(cache) == 3
+
+    def test_byte_budget_is_enforced(self):
+        cache = QueryCache(max_bytes=4000, shard_count=1)
+        for i in range(20):
+            cache.set(f"key{i}", "x" * 500)
+
+        stats = cache.get_stats()
+        assert stats["approx_bytes"] <= 4000
+        assert stats["cache_size"] < 20
+        assert cache.get("key19") == "x" * 500
+
+    def test_oversized_values_are_not_cached(self):
+        cache = QueryCache(max_bytes=1000, shard_count=1)
+        cache.set("big", "x" * 5000)
+        assert cache.get("big") is None
+
+    def test_expired_entries_are_dropped_with_their_tags(self):
+        cache = QueryCache()
+        with patch("utils.query_cache.time.time", return_value=1000):
+            cache.set("a", 1, ttl=10, tags=["barber_1"])
+        with patch("utils.query_cache.time.time", return_value=1011):
+            cache.cleanup_expired()
+
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 0
+        assert stats["tags"] == 0
+        assert stats["expirations"] == 1
+
+
+class TestQueryCacheTags:
+    """Tag index invalidation"""
+
+    def test_invalidate_tag_only_touches_tagged_entries(self):
+        cache = QueryCache()
+        cache.set("a", 1, tags=["barber_1", "2030-01-01"])
+        cache.set("b", 2, tags=["barber_2"])
+        cache.set("c", 3, tags=["barber_1"])
+
+        assert cache.invalidate_tag("barber_1") == 2
+        assert cache.get("a") is None
+        assert cache.get("c") is None
+        assert cache.get("b") == 2
+        # "a" was also removed from its date tag
+        assert cache.invalidate_tag("2030-01-01") == 0
+
+    def test_overwrite_replaces_tags(self):
+        cache = QueryCache()
+        cache.set("a", 1, tags=["barber_1"])
+        cache.set("a", 2, tags=["barber_2"])
+
+        assert cache.invalidate_tag("barber_1") == 0
+        assert cache.invalidate_tag("barber_2") == 1
+
+    def test_invalidate_pattern_keeps_substring_matching(self):
+        cache = QueryCache()
+        cache.set("a", 1, tags=["barber_1"])
+        cache.set("b", 2, tags=["barber_2", "2030-01-01"])
+        cache.set("services_c", 3, tags=["services"])
+
+        with pytest.warns(DeprecationWarning):
+            cache.invalidate_pattern("barber")
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.get("services_c") == 3
+        assert cache.invalidate_tag("2030-01-01") == 0
+
+        with pytest.warns(DeprecationWarning):
+            cache.invalidate_pattern("services_")
+        assert len(cache) == 0
+
+    def test_concurrent_sets_and_invalidations_keep_index_consistent(self):
+        cache = QueryCache(max_entries=200, shard_count=4)
+
+        def writer(offset):
+            for i in range(500):
+                cache.set(f"k{(i + offset) % 300}", i, tags=[f"barber_{i % 5}"])
+                if i % 50 == 0:
+                    cache.invalidate_tag(f"barber_{i % 5}")
+
+        threads = [threading.Thread(target=writer, args=(n * 7,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for n in range(5):
+            cache.invalidate_tag(f"barber_{n}")
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 0
+        assert stats["approx_bytes"] == 0
+
+
+class TestCachedQueryDecorator:
+    """cached_query keys and derived tags"""
+
+    def test_sessions_do_not_break_cache_keys_and_ids_become_tags(self):
+        cache = QueryCache()
+        calls = []
+
+        @cached_query(ttl=60, key_prefix="barber_services")
+        def lookup(db, barber_id: int, day: date):
+            calls.append(barber_id)
+            return None
+
+        with patch.object(query_cache_module, "query_cache", cache):
+            lookup(Mock(spec=Session), 5, date(2030, 1, 1))
+            lookup(Mock(spec=Session), 5, date(2030, 1, 1))
+            assert calls == [5]  # None results are cached too
+
+            query_cache_module.invalidate_cache_for_barber(5)
+            lookup(Mock(spec=Session), 5, date(2030, 1, 1))
+            assert calls == [5, 5]
+
+            query_cache_module.invalidate_cache_for_date("2030-01-01")
+            lookup(Mock(spec=Session), 5, date(2030, 1, 1))
+            assert calls == [5, 5, 5]
+
+            cache.invalidate_tag("barber_services")
+            assert len(cache) == 0
+
+    def test_orm_instances_are_returned_but_not_cached(self):
+        cache = QueryCache()
+        calls = []
+
+        @cached_query(ttl=60)
+        def lookup(db, barber_id: int):
+            calls.append(barber_id)
+            return [User(id=barber_id, email="b@example.com", name="Barber", hashed_password="x")]
+
+        with patch.object(query_cache_module, "query_cache", cache):
+            assert lookup(Mock(spec=Session), 5)[0].id == 5
+            lookup(Mock(spec=Session), 5)
+
+        assert calls == [5, 5]
+        assert len(cache) == 0
+
+    def test_barber_services_are_cached_as_column_values(self, db, session_factory):
+        barber = User(email="barber@example.com", name="Barber", hashed_password="x", role="barber")
+        service = Service(name="Cut", category=ServiceCategoryEnum.HAIRCUT, base_price=30, duration_minutes=30)
+        db.add_all([barber, service])
+        db.flush()
+        db.execute(barber_services.insert().values(barber_id=barber.id, service_id=service.id, is_available=True))
+        db.commit()
+        barber_id, service_id = barber.id, service.id
+
+        with patch.object(query_cache_module, "query_cache", QueryCache()):
+            first = query_cache_module.get_barber_services_cached(db, barber_id)
+            db.close()
+            other = session_factory()
+            second = query_cache_module.get_barber_services_cached(other, barber_id)
+            other.close()
+
+        # The second session gets the first result: plain values, no instance state
+        assert second is first
+        assert [(row["id"], row["name"], row["base_price"]) for row in second] == [(service_id, "Cut", 30)]
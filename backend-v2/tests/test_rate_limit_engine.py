@@ -0,0 +1,217 @@
+"""
+Tests for services/rate_limit_engine.py and its use by RedisRateLimiter.
+
+ScriptedRedis runs GCRA_SCRIPT's arithmetic in Python (no Lua interpreter is
+available to the tests), so key/argument encoding and reply decoding are
+exercised end to end.
+"""
+
+import fnmatch
+import math
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from services.rate_limit_engine import LocalTokenBuckets, RateLimitEngine, RateWindow
+from services.redis_rate_limiter import RedisRateLimiter
+
+MINUTE = [RateWindow("minute", 3, 60)]
+TWO_WINDOWS = [RateWindow("minute", 3, 60), RateWindow("hour", 5, 3600)]
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedRedis:
+    """Redis stand-in whose registered script is GCRA_SCRIPT ported to Python"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.store = {}
+        self.round_trips = 0
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.round_trips += 1
+            return self._gcra(keys, args)
+        return run
+
+    def scan_iter(self, match):
+        return [key for key in self.store if fnmatch.fnmatchcase(key, match)]
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def _gcra(self, keys, args):
+        now = self.clock() * 1000
+        count = args[0]
+        windows = []
+        retry_after, exceeded = 0, 0
+        for i, key in enumerate(keys, start=1):
+            period = args[2 * i - 1]
+            interval = period / args[2 * i]
+            tat = max(float(self.store.get(key, now)), now)
+            wait = tat + interval * count - period - now
+            if wait > retry_after:
+                retry_after, exceeded = wait, i
+            windows.append((key, tat, interval, period))
+        allowed = 1 if exceeded == 0 else 0
+        result = [allowed, math.ceil(retry_after), exceeded]
+        for key, tat, interval, period in windows:
+            if allowed and count > 0:
+                tat += interval * count
+                self.store[key] = "%.3f" % tat
+            result.append(math.floor((period - (tat - now)) / interval + 1e-6))
+        return result
+
+
+@pytest.fixture(params=["redis", "local"])
+def engine(request):
+    clock = Clock()
+    if request.param == "redis":
+        redis = ScriptedRedis(clock)
+        engine = RateLimitEngine(redis_client_factory=lambda: redis, local=LocalTokenBuckets(clock=clock))
+        engine.redis = redis
+    else:
+        engine = RateLimitEngine(redis_client_factory=lambda: None, local=LocalTokenBuckets(clock=clock))
+    engine.clock = clock
+    return engine
+
+
+class TestAdmission:
+    """Redis script and local buckets apply the same rule"""
+
+    def test_burst_then_steady_refill(self, engine):
+        results = [engine.check("ip:1", MINUTE) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining["minute"] for r in results[:3]] == [2, 1, 0]
+        assert results[3].exceeded == "minute"
+        assert results[3].retry_after == pytest.approx(20, abs=0.01)
+
+        engine.clock.now += 20
+        assert engine.check("ip:1", MINUTE).allowed
+        assert not engine.check("ip:1", MINUTE).allowed
+
+    def test_no_double_burst_across_a_minute_boundary(self, engine):
+        engine.clock.now = 1019.9
+        first = sum(engine.check("ip:1", MINUTE).allowed for _ in range(6))
+        engine.clock.now = 1020.1
+        second = sum(engine.check("ip:1", MINUTE).allowed for _ in range(6))
+
+        assert (first, second) == (3, 0)
+
+    def test_rejected_request_consumes_no_window(self, engine):
+        for _ in range(3):
+            engine.check("ip:1", TWO_WINDOWS)
+        rejected = engine.check("ip:1", TWO_WINDOWS)
+        engine.clock.now += 60
+        after = engine.check("ip:1", TWO_WINDOWS, count=2)
+
+        assert not rejected.allowed
+        assert after.allowed
+        assert after.remaining == {"minute": 1, "hour": 0}
+
+    def test_tightest_window_is_reported(self, engine):
+        engine.check("ip:1", TWO_WINDOWS, count=3)
+        engine.clock.now += 60
+        engine.check("ip:1", TWO_WINDOWS, count=2)
+        engine.clock.now += 60
+        rejected = engine.check("ip:1", TWO_WINDOWS)
+
+        assert rejected.exceeded == "hour"
+        assert rejected.retry_after > 60
+
+    def test_zero_weight_check_does_not_consume(self, engine):
+        engine.check("ip:1", MINUTE)
+        peeks = [engine.check("ip:1", MINUTE, count=0).remaining["minute"] for _ in range(3)]
+
+        assert peeks == [2, 2, 2]
+
+    def test_reset_clears_matching_keys(self, engine):
+        for _ in range(3):
+            engine.check("booking:ip:1", MINUTE)
+            engine.check("booking:ip:2", MINUTE)
+
+        assert engine.reset("*:ip:1:*") >= 1
+        assert engine.check("booking:ip:1", MINUTE).allowed
+        assert not engine.check("booking:ip:2", MINUTE).allowed
+
+
+class TestBackends:
+    """One round-trip per check; local buckets when Redis fails"""
+
+    def test_all_windows_cost_one_round_trip(self):
+        clock = Clock()
+        redis = ScriptedRedis(clock)
+        engine = RateLimitEngine(redis_client_factory=lambda: redis)
+
+        engine.check("ip:1", TWO_WINDOWS + [RateWindow("day", 10, 86400)])
+
+        assert redis.round_trips == 1
+        assert sorted(redis.store) == ["rate:gcra:ip:1:day", "rate:gcra:ip:1:hour", "rate:gcra:ip:1:minute"]
+
+    def test_failing_redis_falls_back_to_local_buckets(self):
+        class BrokenRedis:
+            def register_script(self, script):
+                def run(keys, args):
+                    raise ConnectionError("down")
+                return run
+
+        engine = RateLimitEngine(redis_client_factory=BrokenRedis)
+        results = [engine.check("ip:1", MINUTE) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert {r.backend for r in results} == {"local"}
+        assert engine.stats["errors"] == 4
+
+    def test_local_buckets_are_bounded(self):
+        buckets = LocalTokenBuckets(max_keys=2)
+        for n in range(5):
+            buckets.acquire(f"ip:{n}", MINUTE)
+
+        assert list(buckets._buckets) == ["ip:3:minute", "ip:4:minute"]
+
+
+class TestRedisRateLimiter:
+    """check_rate_limit keeps its HTTP contract on top of the engine"""
+
+    def _request(self, ip="10.0.0.1"):
+        return SimpleNamespace(client=SimpleNamespace(host=ip), headers={}, state=SimpleNamespace())
+
+    @pytest.mark.asyncio
+    async def test_limit_exceeded_is_429_with_retry_after(self):
+        limiter = RedisRateLimiter()
+        limiter.engine = RateLimitEngine(redis_client_factory=lambda: None)
+        request = self._request()
+
+        with patch.object(limiter.config, "rate_limit_enabled", True):
+            remaining = [await limiter.check_rate_limit(request, resource="auth") for _ in range(5)]
+            with pytest.raises(HTTPException) as exc_info:
+                await limiter.check_rate_limit(request, resource="auth")
+
+        assert remaining[-1] == {"minute": 0, "hour": 15, "day": 95}
+        assert request.state.rate_limit_headers["X-RateLimit-Remaining-Minute"] == "0"
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "12"
+        assert exc_info.value.detail == "Rate limit exceeded. Maximum 5 requests per minute."
+
+    @pytest.mark.asyncio
+    async def test_resources_have_separate_buckets(self):
+        limiter = RedisRateLimiter()
+        limiter.engine = RateLimitEngine(redis_client_factory=lambda: None)
+        request = self._request()
+
+        with patch.object(limiter.config, "rate_limit_enabled", True):
+            for _ in range(5):
+                await limiter.check_rate_limit(request, resource="auth")
+            remaining = await limiter.check_rate_limit(request, resource="booking")
+
+        assert remaining["minute"] == 19
@@ -0,0 +1,141 @@
+"""
+Tests for bulk conflict checking in services/enhanced_recurring_service.py:
+ConflictIndex and the series generation built on it.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import Appointment, BlackoutDate, RecurringAppointmentPattern, User
+from services.enhanced_recurring_service import (
+    ConflictDetectionService, ConflictIndex, EnhancedRecurringService, HolidayService
+)
+
+
+@pytest.fixture(autouse=True)
+def users(db):
+    db.add_all([
+        User(id=1, email="client@example.com", name="Client", hashed_password="x"),
+        User(id=2, email="barber@example.com", name="Barber", hashed_password="x", role="barber"),
+    ])
+    db.commit()
+
+
+@pytest.fixture(autouse=True)
+def no_holidays(monkeypatch):
+    monkeypatch.setattr(HolidayService, "get_holidays_between", staticmethod(lambda start, end, country_code="US": set()))
+
+
+def _monday(weeks_ahead=1):
+    today = date.today()
+    return today + timedelta(days=7 * weeks_ahead - today.weekday())
+
+
+def _pattern(db, start_date, occurrences=52):
+    pattern = RecurringAppointmentPattern(
+        user_id=1, barber_id=2, pattern_type="weekly", days_of_week=[0], preferred_time=time(10, 0),
+        duration_minutes=30, start_date=start_date, occurrences=occurrences, reschedule_on_conflict=True
+    )
+    db.add(pattern)
+    db.commit()
+    return pattern
+
+
+def _book(db, start, duration=30, barber_id=2, status="confirmed"):
+    db.add(Appointment(user_id=1, barber_id=barber_id, start_time=start, duration_minutes=duration, price=30, status=status))
+    db.commit()
+
+
+class TestConflictIndex:
+    """In-memory checks match the per-slot rules"""
+
+    def test_overlap_uses_each_appointments_own_end(self):
+        day = date(2030, 1, 7)
+        index = ConflictIndex(
+            [(1, datetime(2030, 1, 7, 8, 0), 180), (2, datetime(2030, 1, 7, 9, 30), 15), (3, datetime(2030, 1, 7, 11, 0), 30)],
+            [], set()
+        )
+
+        ids = lambda t: [c.details["existing_appointment_id"] for c in index.conflicts(day, t, 60)]
+
+        assert ids(time(9, 0)) == [1, 2]
+        assert ids(time(10, 30)) == [1, 3]
+        assert ids(time(11, 30)) == []
+
+    def test_multi_day_and_partial_blackouts(self):
+        vacation = BlackoutDate(id=1, blackout_date=date(2030, 1, 6), end_date=date(2030, 1, 8), reason="vacation")
+        training = BlackoutDate(
+            id=2, blackout_date=date(2030, 1, 14), reason="training", blackout_type="partial_day",
+            start_time=time(9, 0), end_time=time(12, 0)
+        )
+        index = ConflictIndex([], [vacation, training], {date(2030, 1, 21)})
+
+        kinds = lambda d, t: [c.conflict_type for c in index.conflicts(d, t, 30)]
+
+        assert kinds(date(2030, 1, 7), time(15, 0)) == ["blackout_date"]
+        assert kinds(date(2030, 1, 14), time(10, 0)) == ["blackout_date"]
+        assert kinds(date(2030, 1, 14), time(13, 0)) == []
+        assert kinds(date(2030, 1, 21), time(10, 0)) == ["holiday"]
+
+    def test_single_slot_detection_reads_the_database(self, db):
+        start = datetime.combine(_monday(), time(10, 0))
+        _book(db, start)
+        _book(db, start, status="cancelled")
+        _book(db, start, barber_id=1)
+
+        conflicts = ConflictDetectionService.detect_appointment_conflicts(
+            db, start.date(), time(10, 15), 30, barber_id=2
+        )
+
+        assert [c.conflict_type for c in conflicts] == ["double_booking"]
+
+
+class TestSeriesGeneration:
+    """A series is planned against one load and written in one batch"""
+
+    def test_fifty_two_weeks_cost_a_constant_number_of_statements(self, db, sql_statements):
+        first = _monday()
+        pattern = _pattern(db, first)
+        for week in range(0, 52, 4):
+            _book(db, datetime.combine(first + timedelta(weeks=week), time(10, 0)))
+        db.add(BlackoutDate(
+            barber_id=2, blackout_date=first + timedelta(weeks=10), end_date=first + timedelta(weeks=10, days=2),
+            reason="vacation", created_by_id=2
+        ))
+        db.commit()
+        pattern_id = pattern.id
+        sql_statements.clear()
+        flushes = []
+        event.listen(db, "after_flush", lambda session, context: flushes.append(len(session.new)))
+
+        result = EnhancedRecurringService.generate_appointment_series(db, pattern_id, user_id=1, max_appointments=52)
+
+        selects = [s for s in sql_statements if s.lstrip().upper().startswith("SELECT")]
+        # Three to plan the series, two for the client's reminder preferences
+        # when the series commits
+        assert len(selects) == 5
+        # All appointments go out in one flush; PostgreSQL sends them as one
+        # multi-row INSERT, SQLite row by row to return ordered ids
+        assert flushes[0] == 51
+        assert result.total_generated == 51
+        assert result.skipped_dates == [first + timedelta(weeks=10)]
+
+        # Booked weeks moved to the first free alternative (08:00 is before opening)
+        moved = [a["start_time"] for a in result.successful_appointments if a["start_time"].time() != time(10, 0)]
+        assert len(moved) == 13
+        assert {start.time() for start in moved} == {time(9, 0)}
+        assert all(a["appointment_id"] for a in result.successful_appointments)
+        assert db.query(Appointment).filter(Appointment.recurring_pattern_id == pattern_id).count() == 51
+
+    def test_preview_writes_nothing(self, db, sql_statements):
+        pattern_id = _pattern(db, _monday(), occurrences=4).id
+        sql_statements.clear()
+
+        result = EnhancedRecurringService.generate_appointment_series(
+            db, pattern_id, user_id=1, preview_only=True, max_appointments=4
+        )
+
+        assert result.total_generated == 4
+        assert not [s for s in sql_statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
@@ -0,0 +1,236 @@
+"""
+Tests for materialized appointment reminders in services/reminder_scheduler.py
+and NotificationService.queue_due_reminders.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from models import (
+    Appointment, AppointmentReminder, NotificationPreference, NotificationQueue, NotificationTemplate, User
+)
+from services.notification_service import NotificationService
+from services.reminder_scheduler import ReminderScheduler
+
+
+@pytest.fixture(autouse=True)
+def reminder_template(db):
+    db.add(NotificationTemplate(
+        name="appointment_reminder", template_type="email",
+        subject="Reminder", body="{{ service_name }} in {{ hours_until }}h", is_active=True
+    ))
+    db.commit()
+
+
+def _reminders(db, appointment):
+    return sorted(
+        (r.hours_before, r.due_at, r.status)
+        for r in db.query(AppointmentReminder).filter_by(appointment_id=appointment.id)
+    )
+
+
+def _appointments(db, starts, status="confirmed"):
+    user = User(email=f"client{db.query(User).count()}@example.com", name="Client", hashed_password="x")
+    db.add(user)
+    db.flush()
+    appointments = [
+        Appointment(user_id=user.id, service_name="Haircut", start_time=start, duration_minutes=30, price=30, status=status)
+        for start in starts
+    ]
+    db.add_all(appointments)
+    db.commit()
+    return appointments
+
+
+class TestSchedule:
+    """Reminder times are materialized per appointment"""
+
+    def test_future_offsets_only(self, session_factory):
+        db = session_factory()
+        now = datetime(2026, 1, 1, 12, 0)
+        appointment, = _appointments(db, [now + timedelta(hours=5)])
+
+        reminders = ReminderScheduler().schedule(db, appointment, [24, 2, 2], now=now)
+
+        assert [(r.hours_before, r.due_at) for r in reminders] == [(2, now + timedelta(hours=3))]
+
+    def test_rescheduling_replaces_pending_and_keeps_queued(self, session_factory):
+        db = session_factory()
+        scheduler = ReminderScheduler()
+        # In the future, so the commit-time refresh materializes every offset too
+        now = datetime(2030, 1, 1, 12, 0)
+        appointment, = _appointments(db, [now + timedelta(hours=30)])
+        scheduler.schedule(db, appointment, [24, 2], now=now)
+        db.commit()
+
+        # The 24h reminder goes out, then the same start time is scheduled again
+        assert scheduler.pop_due(db, now=now + timedelta(hours=7)) == [(appointment.id, 24)]
+        db.commit()
+        scheduler.schedule(db, appointment, [24, 2], now=now + timedelta(hours=7))
+        db.commit()
+        assert sorted(
+            (r.hours_before, r.status) for r in db.query(AppointmentReminder)
+        ) == [(2, "pending"), (24, "queued")]
+
+        # Moving the appointment re-materializes both offsets
+        appointment.start_time = now + timedelta(hours=60)
+        scheduler.schedule(db, appointment, [24, 2], now=now + timedelta(hours=7))
+        db.commit()
+        pending = db.query(AppointmentReminder).filter_by(status="pending").order_by(AppointmentReminder.due_at).all()
+        assert [(r.hours_before, r.due_at) for r in pending] == [
+            (24, now + timedelta(hours=36)), (2, now + timedelta(hours=58))
+        ]
+
+
+class TestSessionListeners:
+    """Committed appointment changes refresh reminders from any code path"""
+
+    def test_booking_materializes_preferred_offsets(self, db):
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=3)
+        appointment, = _appointments(db, [start])
+        guest = Appointment(user_id=None, service_name="Haircut", start_time=start, duration_minutes=30, price=30, status="scheduled")
+        db.add(guest)
+        db.commit()
+
+        assert _reminders(db, appointment) == [
+            (2, start - timedelta(hours=2), "pending"), (24, start - timedelta(hours=24), "pending")
+        ]
+        assert _reminders(db, guest) == []
+
+        db.add(NotificationPreference(user_id=appointment.user_id, reminder_hours=[48]))
+        appointment.start_time = start + timedelta(days=1)
+        db.commit()
+
+        assert _reminders(db, appointment) == [(48, start - timedelta(hours=24), "pending")]
+
+    def test_cancel_restore_and_rollback(self, db):
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=3)
+        appointment, = _appointments(db, [start])
+
+        appointment.start_time = start + timedelta(hours=1)
+        db.flush()
+        db.rollback()
+        assert {due_at for _, due_at, _ in _reminders(db, appointment)} == {
+            start - timedelta(hours=24), start - timedelta(hours=2)
+        }
+
+        appointment.status = "cancelled"
+        db.commit()
+        assert {status for _, _, status in _reminders(db, appointment)} == {"cancelled"}
+
+        appointment.status = "confirmed"
+        db.commit()
+        assert {status for _, _, status in _reminders(db, appointment)} == {"pending"}
+        assert len(_reminders(db, appointment)) == 2
+
+
+class TestBackfill:
+    """Upcoming appointments without reminder rows are caught up"""
+
+    def test_bulk_inserted_appointments_inside_the_horizon(self, db):
+        now = datetime.utcnow().replace(microsecond=0)
+        user = User(email="bulk@example.com", name="Bulk", hashed_password="x")
+        db.add(user)
+        db.commit()
+        starts = [now + timedelta(days=2), now + timedelta(hours=1), now + timedelta(days=20), now - timedelta(days=1)]
+        ids = [row[0] for row in db.execute(
+            insert(Appointment).returning(Appointment.id),
+            [dict(user_id=user.id, start_time=start, duration_minutes=30, price=30, status="confirmed") for start in starts]
+        )]
+        db.commit()
+        scheduler = ReminderScheduler()
+
+        assert scheduler.backfill(db, horizon=timedelta(days=8), batch_size=1, now=now) == 2
+        db.commit()
+        assert scheduler.backfill(db, horizon=timedelta(days=8), now=now) == 0
+
+        assert {appointment_id for appointment_id, in db.query(AppointmentReminder.appointment_id)} == {ids[0]}
+        assert scheduler.backfill(db, now=now) == 2
+
+    def test_worker_run_does_not_scan_for_missing_reminders(self, db):
+        user = User(email="late@example.com", name="Late", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.execute(insert(Appointment), [dict(
+            user_id=user.id, service_name="Haircut", start_time=datetime.utcnow() + timedelta(days=3),
+            duration_minutes=30, price=30, status="confirmed"
+        )])
+        db.commit()
+
+        assert NotificationService().queue_due_reminders(db) == 0
+        assert db.query(AppointmentReminder).count() == 0
+
+
+class TestPopDue:
+    """Only due rows are claimed, each exactly once"""
+
+    def test_claims_are_disjoint(self, session_factory):
+        now = datetime(2026, 1, 1, 12, 0)
+        db = session_factory()
+        scheduler = ReminderScheduler()
+        for appointment in _appointments(db, [now + timedelta(minutes=m) for m in (60, 90, 120, 1800)]):
+            scheduler.schedule(db, appointment, [2], now=now - timedelta(hours=2))
+        db.commit()
+
+        first, second = session_factory(), session_factory()
+        claimed_first = scheduler.pop_due(first, limit=2, now=now)
+        first.commit()
+        claimed_second = scheduler.pop_due(second, limit=10, now=now)
+        second.commit()
+
+        assert len(claimed_first) == 2 and len(claimed_second) == 1
+        assert not set(claimed_first) & set(claimed_second)
+        assert scheduler.pop_due(session_factory(), now=now) == []
+
+    def test_due_query_uses_the_index(self, session_factory, engine):
+        statements = []
+        event.listen(
+            engine, "before_cursor_execute",
+            lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters))
+        )
+        ReminderScheduler().pop_due(session_factory())
+
+        statement, parameters = statements[0]
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        assert "idx_appointment_reminders_due" in " ".join(row[-1] for row in plan)
+
+
+class TestQueueDueReminders:
+    """The worker queues due reminders in bulk"""
+
+    def test_due_reminders_are_queued_once(self, session_factory):
+        db = session_factory()
+        service = NotificationService()
+        now = datetime.utcnow()
+        active = _appointments(db, [now + timedelta(hours=1, minutes=m) for m in range(5)])
+        cancelled, = _appointments(db, [now + timedelta(hours=1)], status="cancelled")
+        later, = _appointments(db, [now + timedelta(hours=30)])
+        for appointment in active + [cancelled, later]:
+            ReminderScheduler().schedule(db, appointment, [2], now=now - timedelta(hours=3))
+        db.commit()
+
+        assert service.queue_due_reminders(db, batch_size=2) == 5
+        assert service.queue_due_reminders(db) == 0
+
+        queued = db.query(NotificationQueue).all()
+        assert sorted(n.appointment_id for n in queued) == sorted(a.id for a in active)
+        assert queued[0].body == "Haircut in 2h"
+        statuses = dict(db.query(AppointmentReminder.appointment_id, AppointmentReminder.status))
+        assert statuses[cancelled.id] == "queued" and statuses[later.id] == "pending"
+
+    def test_failed_queueing_leaves_reminders_pending(self, session_factory, monkeypatch):
+        db = session_factory()
+        service = NotificationService()
+        appointment, = _appointments(db, [datetime.utcnow() + timedelta(hours=1)])
+        ReminderScheduler().schedule(db, appointment, [2], now=datetime.utcnow() - timedelta(hours=3))
+        db.commit()
+        monkeypatch.setattr(service, "bulk_queue_notifications", lambda db, notifications: 1 / 0)
+
+        with pytest.raises(ZeroDivisionError):
+            service.queue_due_reminders(db)
+        db.rollback()
+
+        assert db.query(AppointmentReminder).one().status == "pending"
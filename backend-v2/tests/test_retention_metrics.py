@@ -0,0 +1,177 @@
+"""
+Tests for the aggregated client retention metrics and the per-barber
+retention summary table.
+"""
+
+from datetime import datetime, timedelta
+
+from models import Appointment, BarberClientRetention, Client, User
+from schemas import DateRange
+from services.analytics_service import AnalyticsService
+from services.retention_summary_service import (
+    get_barber_retention_summary,
+    rebuild_barber_retention,
+    record_appointment_completion
+)
+
+NOW = datetime.utcnow()
+
+
+def _client(db, n, last_visit_days, visits, spent, customer_type):
+    client = Client(
+        first_name=f"Client{n}",
+        last_name="Test",
+        email=f"client{n}@example.com",
+        total_visits=visits,
+        total_spent=spent,
+        customer_type=customer_type,
+        last_visit_date=NOW - timedelta(days=last_visit_days) if last_visit_days is not None else None
+    )
+    db.add(client)
+    db.flush()
+    return client
+
+
+def _appointment(db, client, user_id, days_ago, status="completed", price=50.0, barber_id=None):
+    appointment = Appointment(
+        user_id=user_id,
+        barber_id=barber_id,
+        client_id=client.id,
+        service_name="Haircut",
+        start_time=NOW - timedelta(days=days_ago),
+        duration_minutes=30,
+        price=price,
+        status=status
+    )
+    db.add(appointment)
+    db.flush()
+    return appointment
+
+
+class TestClientRetentionMetrics:
+    """AnalyticsService.get_client_retention_metrics aggregation"""
+
+    def _seed(self, db):
+        active = _client(db, 1, 10, 3, 150.0, "returning")
+        at_risk = _client(db, 2, 45, 1, 40.0, "new")
+        lost = _client(db, 3, 120, 5, 400.0, "vip")
+        never = _client(db, 4, None, 0, 0.0, "new")
+        other_barber = _client(db, 5, 5, 2, 90.0, "returning")
+        # Two appointments for one client must not count it twice
+        _appointment(db, active, 1, 10)
+        _appointment(db, active, 1, 40)
+        _appointment(db, at_risk, 1, 45)
+        _appointment(db, lost, 1, 120)
+        _appointment(db, never, 1, -3, status="pending")
+        _appointment(db, other_barber, 2, 5)
+        db.commit()
+
+    def test_buckets_match_previous_python_counts(self, db):
+        self._seed(db)
+
+        metrics = AnalyticsService(db).get_client_retention_metrics(user_id=1)
+
+        assert metrics["summary"] == {
+            "total_clients": 4,
+            "active_clients": 1,
+            "new_clients": 1,
+            "returning_clients": 2,
+            "at_risk_clients": 1,
+            "lost_clients": 1,
+            "retention_rate": 50.0,
+            "average_lifetime_value": 147.5
+        }
+        assert metrics["segments"] == {"vip": 1, "regular": 1, "new": 2, "at_risk": 0}
+        assert metrics["trends"]["active_percentage"] == 25.0
+
+    def test_date_range_limits_clients_in_scope(self, db):
+        self._seed(db)
+        date_range = DateRange(start_date=NOW - timedelta(days=50), end_date=NOW)
+
+        summary = AnalyticsService(db).get_client_retention_metrics(1, date_range)["summary"]
+
+        # Only clients 1 and 2 had appointments in the window
+        assert summary["total_clients"] == 2
+        assert summary["active_clients"] == 1
+        assert summary["at_risk_clients"] == 1
+        assert summary["lost_clients"] == 0
+
+    def test_empty_scope_returns_zeroes(self, db):
+        metrics = AnalyticsService(db).get_client_retention_metrics(user_id=99)
+
+        assert metrics["summary"]["total_clients"] == 0
+        assert metrics["summary"]["retention_rate"] == 0
+        assert metrics["segments"]["vip"] == 0
+
+
+class TestBarberRetentionSummary:
+    """Incremental per-barber summary rows"""
+
+    def test_completions_update_summary_incrementally(self, db):
+        barber = User(email="barber@example.com", name="Barber", hashed_password="x", role="barber")
+        db.add(barber)
+        db.flush()
+        regular = _client(db, 1, None, 0, 0.0, "new")
+        lapsed = _client(db, 2, None, 0, 0.0, "new")
+
+        for appointment in (
+            _appointment(db, regular, 1, 40, price=30.0, barber_id=barber.id),
+            _appointment(db, regular, 1, 3, price=45.0, barber_id=barber.id),
+            _appointment(db, lapsed, 1, 90, price=60.0, barber_id=barber.id)
+        ):
+            record_appointment_completion(db, appointment)
+        db.commit()
+
+        row = db.query(BarberClientRetention).filter_by(client_id=regular.id).one()
+        assert row.visit_count == 2
+        assert row.total_spent == 75.0
+        assert row.first_visit_at == NOW - timedelta(days=40)
+        assert row.last_visit_at == NOW - timedelta(days=3)
+
+        summary = get_barber_retention_summary(db, now=NOW)[barber.id]
+        assert summary["total_clients"] == 2
+        assert summary["active_clients"] == 1
+        assert summary["lost_clients"] == 1
+        assert summary["returning_clients"] == 1
+        assert summary["new_clients"] == 1
+        assert summary["total_visits"] == 3
+        assert summary["retention_rate"] == 50.0
+        assert summary["average_lifetime_value"] == 67.5
+
+    def test_rebuild_matches_incremental_rows(self, db):
+        client = _client(db, 1, None, 0, 0.0, "new")
+        completed = [_appointment(db, client, 7, days) for days in (5, 20, 35)]
+        _appointment(db, client, 7, 1, status="cancelled")
+        for appointment in completed:
+            record_appointment_completion(db, appointment)
+        db.commit()
+        incremental = get_barber_retention_summary(db, barber_ids=[7], now=NOW)
+
+        assert rebuild_barber_retention(db, 7) == 1
+        db.commit()
+
+        assert get_barber_retention_summary(db, barber_ids=[7], now=NOW) == incremental
+
+    def test_appointments_without_client_are_ignored(self, db):
+        appointment = Appointment(user_id=1, start_time=NOW, status="completed", price=10.0)
+
+        assert record_appointment_completion(db, appointment) is None
+
+    def test_analytics_service_exposes_one_barbers_summary(self, db):
+        client = _client(db, 1, None, 0, 0.0, "new")
+        for days in (5, 20):
+            record_appointment_completion(db, _appointment(db, client, 7, days))
+        record_appointment_completion(db, _appointment(db, client, 8, 5))
+        db.commit()
+
+        result = AnalyticsService(db).get_barber_retention_summary(7)
+
+        assert result["barber_id"] == 7
+        assert result["summary"]["total_visits"] == 2
+        assert result["summary"]["returning_clients"] == 1
+
+    def test_analytics_service_summary_defaults_to_zero(self, db):
+        result = AnalyticsService(db).get_barber_retention_summary(42)
+
+        assert result["summary"]["total_clients"] == 0
+        assert result["summary"]["retention_rate"] == 0
@@ -0,0 +1,370 @@
+"""
+Tests for the interval-index slot engine used by booking availability.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+import pytz
+
+from config import settings as app_settings
+from models import BookingSettings
+from services import barber_availability_service, slot_engine
+from services.booking_service import (
+    get_available_slots,
+    get_available_slots_range,
+    get_available_slots_with_barber_availability,
+    get_next_available_slot,
+)
+
+
+def _appointment(start: datetime, duration: int, before: int = 0, after: int = 0):
+    return SimpleNamespace(
+        start_time=start,
+        duration_minutes=duration,
+        buffer_time_before=before,
+        buffer_time_after=after,
+    )
+
+
+def _legacy_mask(slot_starts, duration, appointments):
+    """Reference implementation: the original nested slot x appointment loop."""
+    mask = []
+    for slot_start in slot_starts:
+        slot_end = slot_start + timedelta(minutes=duration)
+        is_available = True
+        for appointment in appointments:
+            appointment_start = pytz.UTC.localize(appointment.start_time)
+            appointment_end = appointment_start + timedelta(minutes=appointment.duration_minutes)
+            appointment_start -= timedelta(minutes=appointment.buffer_time_before or 0)
+            appointment_end += timedelta(minutes=appointment.buffer_time_after or 0)
+            if not (slot_end <= appointment_start or slot_start >= appointment_end):
+                is_available = False
+                break
+        mask.append(is_available)
+    return mask
+
+
+class TestBusyIntervals:
+    """Interval index construction and queries"""
+
+    def test_merges_overlapping_and_touching_intervals(self):
+        anchor = datetime(2030, 1, 1, tzinfo=pytz.UTC)
+        busy = slot_engine.BusyIntervals(anchor, [(60, 90), (0, 30), (30, 45), (80, 120), (200, 200)])
+
+        assert busy.starts == [0, 60]
+        assert busy.ends == [45, 120]
+
+    def test_overlaps_uses_half_open_intervals(self):
+        anchor = datetime(2030, 1, 1, tzinfo=pytz.UTC)
+        busy = slot_engine.BusyIntervals(anchor, [(60, 90)])
+
+        assert busy.overlaps(30, 60) is False
+        assert busy.overlaps(90, 120) is False
+        assert busy.overlaps(59, 61) is True
+        assert busy.overlaps(89, 95) is True
+        assert busy.overlaps(0, 500) is True
+
+    def test_buffers_extend_busy_interval(self):
+        anchor = datetime(2030, 1, 1, tzinfo=pytz.UTC)
+        appointment = _appointment(datetime(2030, 1, 1, 10, 0), 30, before=15, after=10)
+        busy = slot_engine.BusyIntervals.from_appointments([appointment], anchor)
+
+        assert busy.starts == [585]
+        assert busy.ends == [640]
+
+        without_buffers = slot_engine.BusyIntervals.from_appointments(
+            [appointment], anchor, include_buffers=False
+        )
+        assert without_buffers.starts == [600]
+        assert without_buffers.ends == [630]
+
+    def test_add_keeps_index_merged(self):
+        anchor = datetime(2030, 1, 1, tzinfo=pytz.UTC)
+        busy = slot_engine.BusyIntervals(anchor, [(0, 30), (60, 90)])
+        busy.add(25, 65)
+
+        assert busy.starts == [0]
+        assert busy.ends == [90]
+
+    def test_free_mask_matches_legacy_loop(self):
+        rng = random.Random(42)
+        anchor = datetime(2030, 3, 4, 5, 0, tzinfo=pytz.UTC)
+
+        for _ in range(50):
+            duration = rng.choice([15, 20, 30, 45])
+            slot_offsets = list(range(rng.randint(0, 120), 1440, duration))
+            appointments = [
+                _appointment(
+                    anchor.replace(tzinfo=None) + timedelta(minutes=rng.randint(-60, 1440)),
+                    rng.choice([15, 30, 45, 60, 90]),
+                    before=rng.choice([0, 0, 5, 15]),
+                    after=rng.choice([0, 0, 10, 15]),
+                )
+                for _ in range(rng.randint(0, 25))
+            ]
+
+            busy = slot_engine.BusyIntervals.from_appointments(appointments, anchor)
+            slot_starts = [anchor + timedelta(minutes=offset) for offset in slot_offsets]
+
+            assert busy.free_mask(slot_offsets, duration) == _legacy_mask(slot_starts, duration, appointments)
+
+
+class TestSlotGridAndFormatter:
+    """Slot generation and display formatting"""
+
+    def test_grid_labels_match_astimezone(self):
+        business_tz = pytz.timezone("America/New_York")
+        user_tz = pytz.timezone("Asia/Kolkata")
+        target = date(2030, 6, 10)
+        anchor = slot_engine.day_anchor(target, business_tz)
+
+        grid = slot_engine.SlotGrid.for_period(target, time(9, 0), time(17, 0), 30, business_tz, anchor)
+        formatter = slot_engine.SlotFormatter(anchor, user_tz, grid.offsets[0], grid.offsets[-1])
+
+        assert len(grid.offsets) == 16
+        for offset in grid.offsets:
+            expected = grid.instant(offset).astimezone(user_tz).strftime("%H:%M")
+            assert formatter.label(offset) == expected
+
+    def test_formatter_falls_back_on_dst_transition(self):
+        business_tz = pytz.timezone("America/New_York")
+        target = date(2030, 3, 10)  # US DST starts at 02:00
+        anchor = slot_engine.day_anchor(target, business_tz)
+
+        grid = slot_engine.SlotGrid.for_period(target, time(0, 0), time(6, 0), 60, business_tz, anchor)
+        formatter = slot_engine.SlotFormatter(anchor, business_tz, grid.offsets[0], grid.offsets[-1])
+
+        labels = [formatter.label(offset) for offset in grid.offsets]
+        assert labels[:2] == ["00:00", "01:00"]
+        assert labels[2] == "03:00"
+
+    def test_earliest_bookable_rounds_up_to_slot(self):
+        business_tz = pytz.timezone("America/New_York")
+        now = business_tz.localize(datetime(2030, 6, 10, 10, 7, 42))
+
+        earliest = slot_engine.earliest_bookable(now.date(), business_tz, 15, 30, now=now)
+        assert earliest.strftime("%H:%M") == "10:30"
+
+        assert slot_engine.earliest_bookable(date(2030, 6, 11), business_tz, 15, 30, now=now) is None
+
+
+class TestBookingServiceIntegration:
+    """booking_service availability paths backed by the slot engine"""
+
+    @pytest.fixture(autouse=True)
+    def _without_bitmaps(self, monkeypatch):
+        # Occupancy comes from the schedule rows here; bitmap reads are
+        # covered in test_availability_bitmap.py
+        monkeypatch.setattr(app_settings, "availability_bitmap_enabled", False)
+
+    @staticmethod
+    def _settings():
+        return BookingSettings(
+            business_timezone="America/New_York",
+            min_lead_time_minutes=15,
+            max_advance_days=30,
+            business_start_time=time(9, 0),
+            business_end_time=time(12, 0),
+            slot_duration_minutes=30,
+            show_soonest_available=True,
+        )
+
+    @staticmethod
+    def _db(appointments):
+        db = Mock()
+        db.query.return_value.filter.return_value.all.return_value = appointments
+        return db
+
+    def test_booked_slot_is_unavailable(self):
+        target = date.today() + timedelta(days=10)
+        business_tz = pytz.timezone("America/New_York")
+        start_utc = business_tz.localize(datetime.combine(target, time(9, 0))).astimezone(pytz.UTC)
+        db = self._db([_appointment(start_utc.replace(tzinfo=None), 30)])
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()):
+            result = get_available_slots(db, target)
+
+        assert [slot["time"] for slot in result["slots"]] == ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30"]
+        assert result["slots"][0]["available"] is False
+        assert result["slots"][1]["available"] is True
+        assert result["slots"][1]["is_next_available"] is True
+        assert result["next_available"]["time"] == "09:30"
+
+    def test_barber_slots_respect_buffers(self):
+        target = date.today() + timedelta(days=14)
+        business_tz = pytz.timezone("America/New_York")
+        start_utc = business_tz.localize(datetime.combine(target, time(10, 30))).astimezone(pytz.UTC)
+        db = Mock()
+        db.query.return_value.filter.return_value.first.return_value = SimpleNamespace(id=7, name="Barber")
+        schedule = {
+            "availability": {7: [SimpleNamespace(day_of_week=target.weekday(), start_time=time(9, 0), end_time=time(12, 0))]},
+            "time_off": {},
+            "special": {},
+            "appointments": {7: [_appointment(start_utc.replace(tzinfo=None), 30, before=30)]},
+        }
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()), \
+             patch("services.booking_service.barber_availability_service.get_schedule_window", return_value=schedule):
+            result = get_available_slots_with_barber_availability(db, target, barber_id=7)
+
+        unavailable = [slot["time"] for slot in result["slots"] if not slot["available"]]
+        assert unavailable == ["10:00", "10:30"]
+        assert result["next_available"]["time"] == "09:00"
+
+    def test_whole_shop_mode_is_set_based_for_any_shop_size(self):
+        target = date.today() + timedelta(days=14)
+        barbers = [SimpleNamespace(id=i, name=f"Barber {i}") for i in range(1, 121)]
+        schedule = {
+            "availability": {
+                b.id: [SimpleNamespace(day_of_week=target.weekday(), start_time=time(10, 0), end_time=time(11, 0))]
+                for b in barbers if b.id % 2 == 0
+            },
+            "time_off": {},
+            "special": {
+                120: [SimpleNamespace(date=target, start_time=time(9, 0), end_time=time(9, 30), availability_type="available")]
+            },
+            "appointments": {},
+        }
+        db = Mock()
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()), \
+             patch("services.booking_service.barber_availability_service.get_active_barbers", return_value=barbers) as active, \
+             patch("services.booking_service.barber_availability_service.get_schedule_window", return_value=schedule) as window:
+            result = get_available_slots_with_barber_availability(db, target)
+
+        assert active.call_count == 1
+        assert window.call_count == 1
+        assert db.query.call_count == 0
+        assert len(result["available_barbers"]) == 60
+        assert result["next_available"]["barber_id"] == 120
+        assert result["next_available"]["time"] == "09:00"
+
+
+class TestAvailableSlotsRange:
+    """Multi-day range availability resolved from bulk-loaded rows"""
+
+    _settings = staticmethod(TestBookingServiceIntegration._settings)
+
+    def test_shop_range_finds_first_open_day_with_one_query(self):
+        start = date.today() + timedelta(days=5)
+        business_tz = pytz.timezone("America/New_York")
+        # Fully book the first day
+        booked = [
+            _appointment(
+                business_tz.localize(datetime.combine(start, time(9, 0))).astimezone(pytz.UTC).replace(tzinfo=None),
+                180,
+            )
+        ]
+        db = TestBookingServiceIntegration._db(booked)
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()):
+            result = get_available_slots_range(db, start, start + timedelta(days=2))
+
+        assert db.query.call_count == 1
+        assert [day["date"] for day in result["days"]] == [
+            (start + timedelta(days=i)).isoformat() for i in range(3)
+        ]
+        assert not any(slot["available"] for slot in result["days"][0]["slots"])
+        assert result["days"][1]["slots"][0]["is_next_available"] is True
+        assert result["next_available"]["date"] == (start + timedelta(days=1)).isoformat()
+        assert result["next_available"]["time"] == "09:00"
+
+    def test_next_available_slot_uses_single_range_pass(self):
+        start = date.today() + timedelta(days=5)
+        db = TestBookingServiceIntegration._db([])
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()) as settings:
+            next_slot = get_next_available_slot(db, start)
+
+        assert settings.call_count == 1
+        assert db.query.call_count == 1
+        assert next_slot.date() == start
+        assert next_slot.strftime("%H:%M") == "09:00"
+
+    def test_barber_range_applies_time_off_and_special_availability(self):
+        start = date.today() + timedelta(days=7)
+        second = start + timedelta(days=1)
+        db = Mock()
+        db.query.return_value.filter.return_value.first.return_value = SimpleNamespace(id=7, name="Barber")
+        schedule = {
+            "availability": {7: [
+                SimpleNamespace(day_of_week=start.weekday(), start_time=time(9, 0), end_time=time(11, 0)),
+                SimpleNamespace(day_of_week=second.weekday(), start_time=time(9, 0), end_time=time(11, 0)),
+            ]},
+            "time_off": {7: [
+                SimpleNamespace(start_date=start, end_date=start, start_time=None, end_time=None),
+            ]},
+            "special": {7: [
+                SimpleNamespace(date=second, start_time=time(9, 30), end_time=time(10, 0), availability_type="unavailable"),
+                SimpleNamespace(date=second, start_time=time(13, 0), end_time=time(14, 0), availability_type="available"),
+            ]},
+            "appointments": {},
+        }
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()), \
+             patch("services.booking_service.barber_availability_service.get_schedule_window", return_value=schedule) as window:
+            result = get_available_slots_range(db, start, second, barber_id=7)
+
+        assert window.call_count == 1
+        assert result["days"][0]["slots"] == []
+        second_day = {slot["time"]: slot["available"] for slot in result["days"][1]["slots"]}
+        assert second_day == {
+            "09:00": True, "09:30": False, "10:00": True, "10:30": True, "13:00": True, "13:30": True
+        }
+
+    def test_special_availability_overlapping_weekly_hours_is_merged(self):
+        day = date.today() + timedelta(days=7)
+        db = Mock()
+        db.query.return_value.filter.return_value.first.return_value = SimpleNamespace(id=7, name="Barber")
+        schedule = {
+            "availability": {7: [
+                SimpleNamespace(day_of_week=day.weekday(), start_time=time(9, 0), end_time=time(11, 0)),
+            ]},
+            "time_off": {},
+            "special": {7: [
+                SimpleNamespace(date=day, start_time=time(10, 0), end_time=time(12, 0), availability_type="available"),
+                SimpleNamespace(date=day, start_time=time(8, 0), end_time=time(9, 0), availability_type="available"),
+            ]},
+            "appointments": {},
+        }
+
+        with patch("services.booking_service.get_booking_settings", return_value=self._settings()), \
+             patch("services.booking_service.barber_availability_service.get_schedule_window", return_value=schedule):
+            result = get_available_slots_range(db, day, day, barber_id=7)
+
+        times = [slot["time"] for slot in result["days"][0]["slots"]]
+        assert times == ["08:00", "08:30", "09:00", "09:30", "10:00", "10:30", "11:00", "11:30"]
+
+
+class TestAvailableBarbersForSlot:
+    """Set-based barber lookup for a single slot"""
+
+    def test_checks_every_barber_with_constant_queries(self):
+        check_date = date.today() + timedelta(days=3)
+        barbers = [SimpleNamespace(id=i, name=f"Barber {i}") for i in range(1, 76)]
+        weekly = [SimpleNamespace(day_of_week=check_date.weekday(), start_time=time(9, 0), end_time=time(17, 0))]
+        schedule = {
+            "availability": {b.id: weekly for b in barbers},
+            "time_off": {2: [SimpleNamespace(start_date=check_date, end_date=check_date, start_time=time(9, 0), end_time=time(12, 0))]},
+            "special": {3: [SimpleNamespace(date=check_date, start_time=time(8, 0), end_time=time(18, 0), availability_type="unavailable")]},
+            "appointments": {
+                4: [SimpleNamespace(start_time=datetime.combine(check_date, time(9, 45)), duration_minutes=30, status="confirmed")],
+                5: [SimpleNamespace(start_time=datetime.combine(check_date, time(9, 45)), duration_minutes=30, status="cancelled")],
+            },
+        }
+
+        with patch("services.barber_availability_service.get_active_barbers", return_value=barbers), \
+             patch("services.barber_availability_service.get_schedule_window", return_value=schedule) as window:
+            available = barber_availability_service.get_available_barbers_for_slot(
+                Mock(), check_date, time(10, 0), time(10, 30)
+            )
+
+        assert window.call_count == 1
+        available_ids = {barber.id for barber in available}
+        assert len(available_ids) == 72
+        assert {2, 3, 4}.isdisjoint(available_ids)
+        assert 5 in available_ids
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from config import settings
 from models import User
+from services.principal_cache import principal_cache
 
 # Security settings
 SECRET_KEY = settings.secret_key
@@ -88,8 +89,8 @@ async def get_current_user(
     
     # Add timeout protection and error handling for database query
     try:
-        # Query user with error handling
-        user = db.query(User).filter(User.email == email).first()
+        # Cached principal; queries only on a miss or after invalidation
+        user = principal_cache.get_user(db, email)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -134,8 +135,7 @@ async def get_current_user_optional(
         if email is None:
             return None
             
-        user = db.query(User).filter(User.email == email).first()
-        return user
+        return principal_cache.get_user(db, email)
     except (JWTError, HTTPException):
         return None
 
@@ -0,0 +1,65 @@
+"""
+JSON request body parsing with a nesting limit.
+
+The limit is enforced before decoding: string literals are blanked out with
+one regex pass and the remaining brackets are counted with ``bytes.translate``,
+so a hostile body is rejected without building its object tree and an
+ordinary body is never walked value by value.  Only a body that reaches the
+limit exactly is checked against the parsed data, which keeps the semantics
+of ``validate_json_depth``.
+
+orjson is used for decoding when it is installed.
+"""
+
+import json
+import re
+from itertools import accumulate
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from utils.input_validation import MAX_JSON_DEPTH, ValidationError, validate_json_depth
+
+# A JSON string literal, escapes included
+_STRING_LITERAL = re.compile(rb'"(?:[^"\\]+|\\.)*"')
+
+# Opening brackets map to 1 and closing ones to 255 (-1 as a signed byte)
+_BRACKET_STEPS = bytes.maketrans(b"[{]}", b"\x01\x01\xff\xff")
+_NOT_BRACKETS = bytes(b for b in range(256) if b not in b"[]{}")
+
+
+def loads(raw: bytes) -> Any:
+    """Decode JSON bytes; raises ValueError (or a subclass) on invalid input"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def container_depth(raw: bytes) -> int:
+    """Deepest nesting of arrays/objects in ``raw``, ignoring brackets inside strings"""
+    brackets = _STRING_LITERAL.sub(b'""', raw).translate(None, _NOT_BRACKETS)
+    if not brackets:
+        return 0
+    return max(accumulate(memoryview(brackets.translate(_BRACKET_STEPS)).cast("b")))
+
+
+def parse_json(raw: bytes, max_depth: int = MAX_JSON_DEPTH) -> Any:
+    """Decode a JSON body, rejecting values nested deeper than ``max_depth``
+    
+    Raises ValidationError for excessive nesting and ValueError for invalid JSON.
+    """
+    # validate_json_depth counts the top-level value as depth 0, so values
+    # inside max_depth + 1 containers are the first ones over the limit
+    depth = container_depth(raw)
+    if depth > max_depth + 1:
+        raise ValidationError(f"JSON object exceeds maximum depth of {max_depth}")
+    
+    data = loads(raw)
+    if depth == max_depth + 1:
+        # Innermost containers sit at the limit; only their contents can exceed it
+        validate_json_depth(data, max_depth)
+    return data
@@ -21,11 +21,11 @@ Common Acuity field mappings:
 
 import csv
 import json
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime
 import logging
 
-from .base_parser import BaseBookingParser, ParseResult, ParsedClient
+from .base_parser import BaseBookingParser, ParseResult, ParsedClient, ParseProgress
 
 logger = logging.getLogger(__name__)
 
@@ -170,6 +170,9 @@ class AcuityParser(BaseBookingParser):
         
         return len(errors) == 0, errors
     
+    def is_platform_csv(self, header_line: str) -> bool:
+        return self._is_acuity_csv(header_line)
+    
     def _is_acuity_csv(self, header_line: str) -> bool:
         """Check if CSV appears to be from Acuity"""
         header_lower = header_line.lower()
@@ -208,7 +211,7 @@ class AcuityParser(BaseBookingParser):
         
         return False
     
-    def clean_and_validate_data(self, raw_clients: List[Dict]) -> ParseResult:
+    def clean_and_validate_data(self, raw_clients: List[Dict], progress: Optional[ParseProgress] = None) -> ParseResult:
         """Override to handle Acuity-specific data cleaning"""
         # Pre-process Acuity-specific formats
         for client in raw_clients:
@@ -303,7 +306,7 @@ class AcuityParser(BaseBookingParser):
                     client['notes'] = custom_notes
         
         # Call parent method for standard processing
-        return super().clean_and_validate_data(raw_clients)
+        return super().clean_and_validate_data(raw_clients, progress)
     
     def get_acuity_specific_fields(self) -> List[Dict[str, str]]:
         """Get Acuity-specific field information"""
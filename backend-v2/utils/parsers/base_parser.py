@@ -6,13 +6,17 @@ defining the common interface and validation logic.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple, Union, BinaryIO, Iterator
+from dataclasses import dataclass, replace
 from datetime import datetime
+import csv
+import io
 import re
 import hashlib
 import logging
 
+from .duplicate_index import DuplicateIndex, client_similarity
+
 logger = logging.getLogger(__name__)
 
 
@@ -64,6 +68,14 @@ class ParseResult:
         logger.warning(f"Parser warning: {warning}")
 
 
+@dataclass
+class ParseProgress:
+    """Running position across the batches of a streamed parse"""
+    rows_seen: int = 0
+    clients_seen: int = 0
+    duplicate_index: Optional[DuplicateIndex] = None
+
+
 class BaseBookingParser(ABC):
     """Abstract base class for all booking application parsers"""
     
@@ -94,6 +106,56 @@ class BaseBookingParser(ABC):
         """Validate platform-specific data requirements"""
         pass
     
+    def is_platform_csv(self, header_line: str) -> bool:
+        """Check whether a CSV header line looks like this platform's export"""
+        return True
+    
+    def iter_csv_batches(self, source: Union[str, BinaryIO], batch_size: int = 1000) -> Iterator[ParseResult]:
+        """Parse a CSV export incrementally, yielding one ParseResult per batch of rows
+        
+        ``source`` is a file path or a binary file object such as a spooled
+        upload, which is left open.  Row numbers in errors and duplicate
+        indexes count from the start of the file, and duplicates are found
+        across batches; only identifying fields of earlier clients are kept.
+        """
+        if isinstance(source, str):
+            file = open(source, 'r', encoding='utf-8-sig', newline='')
+        else:
+            file = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        
+        try:
+            first_line = file.readline()
+            file.seek(0)
+            if not self.is_platform_csv(first_line):
+                yield ParseResult(
+                    success=False,
+                    clients=[],
+                    errors=[f"File does not appear to be a CSV export from {self.PLATFORM_NAME}"],
+                    warnings=[],
+                    duplicates_found=[],
+                    total_processed=0,
+                    valid_records=0,
+                    skipped_records=0
+                )
+                return
+            
+            progress = ParseProgress(
+                duplicate_index=DuplicateIndex(self.calculate_similarity, self.duplicate_threshold)
+            )
+            batch = []
+            for row in csv.DictReader(file):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield self.clean_and_validate_data(batch, progress)
+                    batch = []
+            if batch:
+                yield self.clean_and_validate_data(batch, progress)
+        finally:
+            if isinstance(source, str):
+                file.close()
+            else:
+                file.detach()
+    
     def standardize_phone(self, phone: Optional[str]) -> Optional[str]:
         """Standardize phone number format"""
         if not phone:
@@ -171,62 +233,39 @@ class BaseBookingParser(ABC):
     
     def calculate_similarity(self, client1: ParsedClient, client2: ParsedClient) -> float:
         """Calculate similarity score between two clients for duplicate detection"""
-        score = 0.0
-        total_weight = 0.0
-        
-        # Email match (high weight)
-        if client1.email and client2.email:
-            if client1.email.lower() == client2.email.lower():
-                score += 40
-            total_weight += 40
-        
-        # Phone match (high weight)
-        if client1.phone and client2.phone:
-            if client1.phone == client2.phone:
-                score += 35
-            total_weight += 35
-        
-        # Name similarity (medium weight)
-        if client1.first_name and client2.first_name:
-            if client1.first_name.lower() == client2.first_name.lower():
-                score += 15
-            total_weight += 15
-                
-        if client1.last_name and client2.last_name:
-            if client1.last_name.lower() == client2.last_name.lower():
-                score += 15
-            total_weight += 15
-        
-        # Date of birth match (medium weight)
-        if client1.date_of_birth and client2.date_of_birth:
-            if client1.date_of_birth == client2.date_of_birth:
-                score += 10
-            total_weight += 10
-        
-        # Calculate final similarity as percentage
-        if total_weight > 0:
-            return score / total_weight
-        else:
-            return 0.0
+        return client_similarity(client1, client2)
     
-    def detect_duplicates(self, clients: List[ParsedClient]) -> List[Dict]:
-        """Detect potential duplicates in the client list"""
+    def detect_duplicates(self, clients: List[ParsedClient], index: Optional[DuplicateIndex] = None,
+                          start_index: int = 0) -> List[Dict]:
+        """Detect potential duplicates in the client list
+        
+        Only clients sharing a blocking key (email, phone, name, phonetic
+        name signature, or a single field when a name part is missing) are
+        scored; see utils.parsers.duplicate_index.  Pass
+        a shared ``index`` and the number of clients already added to it to
+        also match against earlier batches.
+        """
         duplicates = []
+        streaming = index is not None
+        if index is None:
+            index = DuplicateIndex(self.calculate_similarity, self.duplicate_threshold)
         
-        for i, client1 in enumerate(clients):
-            for j, client2 in enumerate(clients[i+1:], i+1):
-                similarity = self.calculate_similarity(client1, client2)
-                
-                if similarity >= self.duplicate_threshold:
-                    duplicates.append({
-                        'client1_index': i,
-                        'client2_index': j,
-                        'similarity': similarity,
-                        'client1': client1,
-                        'client2': client2,
-                        'suggested_action': 'merge' if similarity > 0.9 else 'review'
-                    })
+        for offset, client2 in enumerate(clients):
+            j = start_index + offset
+            for (i, client1), similarity in index.matches(client2):
+                duplicates.append({
+                    'client1_index': i,
+                    'client2_index': j,
+                    'similarity': similarity,
+                    'client1': client1,
+                    'client2': client2,
+                    'suggested_action': 'merge' if similarity > 0.9 else 'review'
+                })
+            # Streams outlive each batch, so drop the raw row they carry
+            kept = replace(client2, raw_data=None) if streaming else client2
+            index.add(kept, (j, kept))
         
+        duplicates.sort(key=lambda duplicate: (duplicate['client1_index'], duplicate['client2_index']))
         return duplicates
     
     def validate_client_data(self, client: ParsedClient) -> Tuple[bool, List[str]]:
@@ -261,8 +300,13 @@ class BaseBookingParser(ABC):
         
         return len(errors) == 0, errors
     
-    def clean_and_validate_data(self, raw_clients: List[Dict]) -> ParseResult:
-        """Clean, validate, and process raw client data"""
+    def clean_and_validate_data(self, raw_clients: List[Dict], progress: Optional[ParseProgress] = None) -> ParseResult:
+        """Clean, validate, and process raw client data
+        
+        ``progress`` carries row numbering and duplicate state between the
+        batches of ``iter_csv_batches``.
+        """
+        row_offset = progress.rows_seen if progress else 0
         result = ParseResult(
             success=True,
             clients=[],
@@ -276,7 +320,7 @@ class BaseBookingParser(ABC):
         
         field_mapping = self.get_field_mapping()
         
-        for i, raw_client in enumerate(raw_clients):
+        for i, raw_client in enumerate(raw_clients, row_offset):
             try:
                 # Validate platform-specific data
                 is_valid, platform_errors = self.validate_platform_data(raw_client)
@@ -322,10 +366,19 @@ class BaseBookingParser(ABC):
         
         # Detect duplicates
         if result.clients:
-            result.duplicates_found = self.detect_duplicates(result.clients)
+            if progress:
+                result.duplicates_found = self.detect_duplicates(
+                    result.clients, progress.duplicate_index, progress.clients_seen
+                )
+            else:
+                result.duplicates_found = self.detect_duplicates(result.clients)
             if result.duplicates_found:
                 result.add_warning(f"Found {len(result.duplicates_found)} potential duplicate(s)")
         
+        if progress:
+            progress.rows_seen += len(raw_clients)
+            progress.clients_seen += len(result.clients)
+        
         # Set overall success status
         result.success = result.valid_records > 0
         
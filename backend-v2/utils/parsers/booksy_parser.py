@@ -22,11 +22,11 @@ Common Booksy field mappings:
 
 import csv
 import json
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime
 import logging
 
-from .base_parser import BaseBookingParser, ParseResult, ParsedClient
+from .base_parser import BaseBookingParser, ParseResult, ParsedClient, ParseProgress
 
 logger = logging.getLogger(__name__)
 
@@ -173,6 +173,9 @@ class BooksyParser(BaseBookingParser):
         
         return len(errors) == 0, errors
     
+    def is_platform_csv(self, header_line: str) -> bool:
+        return self._is_booksy_csv(header_line)
+    
     def _is_booksy_csv(self, header_line: str) -> bool:
         """Check if CSV appears to be from Booksy"""
         header_lower = header_line.lower()
@@ -191,7 +194,7 @@ class BooksyParser(BaseBookingParser):
         # Check if any Booksy-specific headers are present
         return any(header in header_lower for header in booksy_headers)
     
-    def clean_and_validate_data(self, raw_clients: List[Dict]) -> ParseResult:
+    def clean_and_validate_data(self, raw_clients: List[Dict], progress: Optional[ParseProgress] = None) -> ParseResult:
         """Override to handle Booksy-specific data cleaning"""
         # Pre-process Booksy-specific formats
         for client in raw_clients:
@@ -241,7 +244,7 @@ class BooksyParser(BaseBookingParser):
                 client['customer_type'] = segment_mapping.get(client['customer_segment'].lower(), 'new')
         
         # Call parent method for standard processing
-        return super().clean_and_validate_data(raw_clients)
+        return super().clean_and_validate_data(raw_clients, progress)
     
     def get_booksy_specific_fields(self) -> List[Dict[str, str]]:
         """Get Booksy-specific field information"""
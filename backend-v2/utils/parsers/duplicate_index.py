@@ -0,0 +1,186 @@
+"""
+Blocking-key index for client duplicate detection
+
+Scoring every pair of clients is O(n²).  Instead each client is filed under
+a few blocking keys, and only clients sharing a key are scored:
+
+- email, lowercased
+- phone, as standardized by the parser
+- full name (first|last, lowercased), which also covers name + date of birth
+- phonetic signature: Soundex of the last name plus the first initial
+
+With the ``client_similarity`` weights a pair of clients that both have a
+first and last name but share none of email, phone or full name scores at
+most 25/40 (one name plus date of birth).  Clients missing a name part are
+different: "Cher" and "Cher" score 15/15, and "John" vs "John Smith" with
+the same date of birth 25/25.  So every client is also filed under its
+single fields (first name, last name, date of birth); a partial-name client
+is compared with every client sharing one of them, and a full-name client
+with the earlier partial-name clients sharing one.  Together these find, for
+any threshold above 0.625, every pair a full pairwise scan would.
+
+The phonetic key brings near-miss names (Jon/John Smith) into reach for
+parsers that override the scorer with looser name comparison; phonetic
+blocks that grow past ``max_fuzzy_block`` are dropped, since a signature
+shared by that many clients says little.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(name: Optional[str]) -> Optional[str]:
+    """American Soundex code (e.g. Robert -> R163), or None for no letters"""
+    letters = [c for c in (name or "").lower() if c.isascii() and c.isalpha()]
+    if not letters:
+        return None
+
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def client_similarity(client1: Any, client2: Any) -> float:
+    """Weighted share of the fields present on both clients that match"""
+    score = 0.0
+    total_weight = 0.0
+
+    # Email match (high weight)
+    if client1.email and client2.email:
+        if client1.email.lower() == client2.email.lower():
+            score += 40
+        total_weight += 40
+
+    # Phone match (high weight)
+    if client1.phone and client2.phone:
+        if client1.phone == client2.phone:
+            score += 35
+        total_weight += 35
+
+    # Name similarity (medium weight)
+    if client1.first_name and client2.first_name:
+        if client1.first_name.lower() == client2.first_name.lower():
+            score += 15
+        total_weight += 15
+
+    if client1.last_name and client2.last_name:
+        if client1.last_name.lower() == client2.last_name.lower():
+            score += 15
+        total_weight += 15
+
+    # Date of birth match (medium weight)
+    if client1.date_of_birth and client2.date_of_birth:
+        if client1.date_of_birth == client2.date_of_birth:
+            score += 10
+        total_weight += 10
+
+    return score / total_weight if total_weight > 0 else 0.0
+
+
+def blocking_keys(client: Any) -> Tuple[List[Tuple[str, str]], Optional[Tuple[str, str]]]:
+    """Exact keys and the phonetic key for a ParsedClient-like object"""
+    keys = []
+    if client.email:
+        keys.append(("email", client.email.lower()))
+    if client.phone:
+        keys.append(("phone", client.phone))
+    first = (client.first_name or "").lower()
+    last = (client.last_name or "").lower()
+    if first and last:
+        keys.append(("name", f"{first}|{last}"))
+
+    fuzzy = None
+    last_code = soundex(last)
+    if last_code and first:
+        fuzzy = ("sound", f"{last_code}{first[0]}")
+    return keys, fuzzy
+
+
+def field_keys(client: Any) -> Tuple[List[Tuple[str, str]], bool]:
+    """Single-field keys and whether the client is missing a name part"""
+    first = (client.first_name or "").lower()
+    last = (client.last_name or "").lower()
+    keys = []
+    if first:
+        keys.append(("first", first))
+    if last:
+        keys.append(("last", last))
+    if client.date_of_birth:
+        keys.append(("dob", str(client.date_of_birth)))
+    return keys, not (first and last)
+
+
+class DuplicateIndex:
+    """Incremental blocking index; ``matches`` scores only block candidates"""
+
+    def __init__(self, score: Callable[[Any, Any], float], threshold: float, max_fuzzy_block: int = 50):
+        self.score = score
+        self.threshold = threshold
+        self.max_fuzzy_block = max_fuzzy_block
+        self._records: List[Tuple[Any, Any]] = []
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}
+        self._oversized: Set[Tuple[str, str]] = set()
+        # Single-field blocks: every client, and partial-name clients only
+        self._fields: Dict[Tuple[str, str], List[int]] = {}
+        self._partial_fields: Dict[Tuple[str, str], List[int]] = {}
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, client: Any, ref: Any) -> None:
+        position = len(self._records)
+        self._records.append((client, ref))
+        keys, fuzzy = blocking_keys(client)
+        for key in keys:
+            self._blocks.setdefault(key, []).append(position)
+        if fuzzy and fuzzy not in self._oversized:
+            block = self._blocks.setdefault(fuzzy, [])
+            block.append(position)
+            if len(block) > self.max_fuzzy_block:
+                self._oversized.add(fuzzy)
+                del self._blocks[fuzzy]
+        fields, partial = field_keys(client)
+        for key in fields:
+            self._fields.setdefault(key, []).append(position)
+            if partial:
+                self._partial_fields.setdefault(key, []).append(position)
+
+    def matches(self, client: Any) -> List[Tuple[Any, float]]:
+        """(ref, similarity) for indexed clients at or above the threshold, in insertion order"""
+        keys, fuzzy = blocking_keys(client)
+        if fuzzy:
+            keys.append(fuzzy)
+        candidates: Set[int] = set()
+        for key in keys:
+            candidates.update(self._blocks.get(key, ()))
+        fields, partial = field_keys(client)
+        field_blocks = self._fields if partial else self._partial_fields
+        for key in fields:
+            candidates.update(field_blocks.get(key, ()))
+
+        found = []
+        for position in sorted(candidates):
+            other, ref = self._records[position]
+            self.comparisons += 1
+            similarity = self.score(other, client)
+            if similarity >= self.threshold:
+                found.append((ref, similarity))
+        return found
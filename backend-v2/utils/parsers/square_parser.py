@@ -20,11 +20,11 @@ Common Square field mappings:
 
 import csv
 import json
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime
 import logging
 
-from .base_parser import BaseBookingParser, ParseResult, ParsedClient
+from .base_parser import BaseBookingParser, ParseResult, ParsedClient, ParseProgress
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +166,9 @@ class SquareParser(BaseBookingParser):
         
         return len(errors) == 0, errors
     
+    def is_platform_csv(self, header_line: str) -> bool:
+        return self._is_square_csv(header_line)
+    
     def _is_square_csv(self, header_line: str) -> bool:
         """Check if CSV appears to be from Square"""
         header_lower = header_line.lower()
@@ -203,7 +206,7 @@ class SquareParser(BaseBookingParser):
         
         return False
     
-    def clean_and_validate_data(self, raw_clients: List[Dict]) -> ParseResult:
+    def clean_and_validate_data(self, raw_clients: List[Dict], progress: Optional[ParseProgress] = None) -> ParseResult:
         """Override to handle Square-specific data cleaning"""
         # Pre-process Square-specific formats
         for client in raw_clients:
@@ -290,7 +293,7 @@ class SquareParser(BaseBookingParser):
                     client['phone'] = str(phone)
         
         # Call parent method for standard processing
-        return super().clean_and_validate_data(raw_clients)
+        return super().clean_and_validate_data(raw_clients, progress)
     
     def get_square_specific_fields(self) -> List[Dict[str, str]]:
         """Get Square-specific field information"""
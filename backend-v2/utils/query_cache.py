@@ -1,33 +1,132 @@
-"""Simple in-memory cache for database queries to reduce load."""
+"""Bounded in-memory cache for database queries to reduce load.
+
+Entries are spread over a fixed number of shards, each an LRU-ordered dict
+with its own lock, entry limit and approximate byte budget, so the cache
+cannot grow without bound and concurrent requests rarely contend on the same
+lock.  Every entry is also registered under a set of tags (``barber_5``,
+``appointment_12``, ``2025-07-01``, the key prefix, ...) and invalidation by
+tag only touches the entries carrying that tag.
+"""
 
 import time
 import hashlib
+import inspect
 import json
-from typing import Any, Dict, Optional, Callable, TypeVar
+import sys
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Set, TypeVar
 from functools import wraps
 import threading
+import warnings
 import logging
 
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+_MISSING = object()
+
+
+def approximate_size(value: Any, depth: int = 3) -> int:
+    """Rough memory footprint of a cached value in bytes.
+    
+    Follows containers and plain objects a few levels deep; SQLAlchemy
+    instance state is skipped because it is shared with the session.
+    """
+    size = sys.getsizeof(value, 64)
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    
+    if isinstance(value, dict):
+        return size + sum(
+            approximate_size(k, depth - 1) + approximate_size(v, depth - 1)
+            for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item, depth - 1) for item in value)
+    
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        return size + sum(
+            approximate_size(v, depth - 1)
+            for k, v in attributes.items()
+            if k != "_sa_instance_state"
+        )
+    return size
+
+
+def column_values(instance: Any) -> Dict[str, Any]:
+    """Column attributes of an ORM instance as a plain dict.
+    
+    Cached values are shared by every request and thread, so they must not
+    be live instances tied to the session that loaded them.
+    """
+    return {attr.key: getattr(instance, attr.key) for attr in sa_inspect(instance).mapper.column_attrs}
+
+
+def _holds_instances(value: Any) -> bool:
+    """True for an ORM instance or a list/tuple containing one"""
+    if isinstance(value, (list, tuple)):
+        return any(hasattr(item, "_sa_instance_state") for item in value)
+    return hasattr(value, "_sa_instance_state")
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "created_at", "size", "tags")
+    
+    def __init__(self, value: Any, expires_at: float, created_at: float, size: int, tags: frozenset):
+        self.value = value
+        self.expires_at = expires_at
+        self.created_at = created_at
+        self.size = size
+        self.tags = tags
+
+
+class _Shard:
+    """One LRU partition of the cache with its own lock and budget."""
+    
+    __slots__ = ("entries", "lock", "bytes", "stats")
+    
+    def __init__(self):
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+
+
 class QueryCache:
-    """Simple in-memory cache with TTL support for database queries."""
+    """Bounded LRU cache with TTL, byte accounting, sharded locks and tags."""
     
-    def __init__(self, default_ttl: int = 300):  # 5 minutes default
-        self.cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        default_ttl: int = 300,  # 5 minutes default
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        shard_count: int = 16
+    ):
         self.default_ttl = default_ttl
-        self.lock = threading.RLock()
-        self.stats = {
-            'hits': 0,
-            'misses': 0,
-            'sets': 0,
-            'evictions': 0
-        }
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._shard_max_entries = max(1, max_entries // shard_count)
+        self._shard_max_bytes = max(1, max_bytes // shard_count)
+        
+        # Secondary index: tag -> keys; guarded by its own lock, always taken
+        # after a shard lock (never the other way round)
+        self._tags: Dict[str, Set[str]] = {}
+        self._tag_lock = threading.Lock()
     
     def _generate_key(self, func_name: str, *args, **kwargs) -> str:
         """Generate a cache key from function name and arguments."""
+        # Sessions are per-request; including their repr would make every
+        # request miss
+        args = tuple(arg for arg in args if not isinstance(arg, Session))
+        kwargs = {k: v for k, v in kwargs.items() if not isinstance(v, Session)}
+        
         # Create a hashable representation of the arguments
         key_data = {
             'func': func_name,
@@ -37,111 +136,232 @@ class QueryCache:
         key_string = json.dumps(key_data, sort_keys=True)
         return hashlib.md5(key_string.encode()).hexdigest()
     
-    def get(self, key: str) -> Optional[Any]:
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+    
+    def get(self, key: str, default: Any = None) -> Any:
         """Get a value from cache if it exists and hasn't expired."""
-        with self.lock:
-            if key in self.cache:
-                entry = self.cache[key]
-                if time.time() < entry['expires_at']:
-                    self.stats['hits'] += 1
-                    return entry['value']
-                else:
-                    # Expired, remove it
-                    del self.cache[key]
-                    self.stats['evictions'] += 1
-            
-            self.stats['misses'] += 1
-            return None
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                if time.time() < entry.expires_at:
+                    shard.entries.move_to_end(key)
+                    shard.stats['hits'] += 1
+                    return entry.value
+                # Expired, remove it
+                self._remove_locked(shard, key)
+                shard.stats['expirations'] += 1
+            shard.stats['misses'] += 1
+        return default
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set a value in cache with optional TTL."""
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        """Set a value in cache with optional TTL and invalidation tags."""
         if ttl is None:
             ttl = self.default_ttl
         
-        with self.lock:
-            self.cache[key] = {
-                'value': value,
-                'expires_at': time.time() + ttl,
-                'created_at': time.time()
-            }
-            self.stats['sets'] += 1
+        now = time.time()
+        entry = _Entry(value, now + ttl, now, approximate_size(value), frozenset(tags))
+        if entry.size > self._shard_max_bytes:
+            logger.debug(f"Not caching {key}: {entry.size} bytes exceeds shard budget")
+            return
+        
+        shard = self._shard(key)
+        with shard.lock:
+            self._remove_locked(shard, key)
+            shard.entries[key] = entry
+            shard.bytes += entry.size
+            shard.stats['sets'] += 1
+            
+            if entry.tags:
+                with self._tag_lock:
+                    for tag in entry.tags:
+                        self._tags.setdefault(tag, set()).add(key)
+            
+            # Evict least recently used entries until the shard fits again
+            while (len(shard.entries) > self._shard_max_entries or
+                   shard.bytes > self._shard_max_bytes):
+                self._remove_locked(shard, next(iter(shard.entries)))
+                shard.stats['evictions'] += 1
     
     def delete(self, key: str) -> None:
         """Delete a key from cache."""
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
+        shard = self._shard(key)
+        with shard.lock:
+            self._remove_locked(shard, key)
     
     def clear(self) -> None:
         """Clear all cache entries."""
-        with self.lock:
-            self.cache.clear()
-            self.stats = {
-                'hits': 0,
-                'misses': 0,
-                'sets': 0,
-                'evictions': 0
-            }
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes = 0
+                shard.stats = {key: 0 for key in shard.stats}
+        with self._tag_lock:
+            self._tags.clear()
     
     def cleanup_expired(self) -> None:
         """Remove expired entries from cache."""
         current_time = time.time()
-        with self.lock:
-            expired_keys = [
-                key for key, entry in self.cache.items()
-                if current_time >= entry['expires_at']
-            ]
-            for key in expired_keys:
-                del self.cache[key]
-                self.stats['evictions'] += 1
+        for shard in self._shards:
+            with shard.lock:
+                expired_keys = [
+                    key for key, entry in shard.entries.items()
+                    if current_time >= entry.expires_at
+                ]
+                for key in expired_keys:
+                    self._remove_locked(shard, key)
+                    shard.stats['expirations'] += 1
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        with self.lock:
-            total_requests = self.stats['hits'] + self.stats['misses']
-            hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
-            
-            return {
-                'cache_size': len(self.cache),
-                'hit_rate': f"{hit_rate:.1f}%",
-                'total_requests': total_requests,
-                **self.stats
-            }
+        totals = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+        size = 0
+        total_bytes = 0
+        for shard in self._shards:
+            with shard.lock:
+                size += len(shard.entries)
+                total_bytes += shard.bytes
+                for key, value in shard.stats.items():
+                    totals[key] += value
+        with self._tag_lock:
+            tag_count = len(self._tags)
+        
+        total_requests = totals['hits'] + totals['misses']
+        hit_rate = (totals['hits'] / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'cache_size': size,
+            'approx_bytes': total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'tags': tag_count,
+            'hit_rate': f"{hit_rate:.1f}%",
+            'total_requests': total_requests,
+            **totals
+        }
+    
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry registered under ``tag``; returns how many were removed."""
+        with self._tag_lock:
+            keys = self._tags.pop(tag, None)
+        if not keys:
+            return 0
+        
+        removed = 0
+        for key in keys:
+            shard = self._shard(key)
+            with shard.lock:
+                if self._remove_locked(shard, key) is not None:
+                    removed += 1
+        return removed
     
     def invalidate_pattern(self, pattern: str) -> None:
-        """Invalidate cache entries matching a pattern."""
-        with self.lock:
-            keys_to_delete = [
-                key for key in self.cache.keys()
-                if pattern in key
-            ]
-            for key in keys_to_delete:
-                del self.cache[key]
+        """Invalidate cache entries whose key or any tag contains ``pattern``.
+        
+        Deprecated: this scans every entry; use ``invalidate_tag`` with an
+        exact tag (``barber_5``, ``appointment_12``, an ISO date or a
+        ``cached_query`` key prefix) instead.
+        """
+        warnings.warn(
+            "QueryCache.invalidate_pattern is deprecated; use invalidate_tag",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        for shard in self._shards:
+            with shard.lock:
+                keys_to_delete = [
+                    key for key, entry in shard.entries.items()
+                    if pattern in key or any(pattern in tag for tag in entry.tags)
+                ]
+                for key in keys_to_delete:
+                    self._remove_locked(shard, key)
+    
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+    
+    # Internals
+    
+    def _remove_locked(self, shard: _Shard, key: str) -> Optional[_Entry]:
+        """Remove ``key`` from ``shard`` (whose lock is held) and from the tag index."""
+        entry = shard.entries.pop(key, None)
+        if entry is None:
+            return None
+        shard.bytes -= entry.size
+        if entry.tags:
+            with self._tag_lock:
+                self._untag_locked(key, entry.tags)
+        return entry
+    
+    def _untag_locked(self, key: str, tags: Iterable[str]) -> None:
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
 
 # Global cache instance
 query_cache = QueryCache()
 
-def cached_query(ttl: int = 300, key_prefix: str = ""):
-    """Decorator to cache database query results."""
+
+def _argument_tags(signature: inspect.Signature, args: tuple, kwargs: dict) -> Set[str]:
+    """Tags derived from call arguments: ``<name>_<value>`` for ``*_id``
+    parameters and the ISO date of any date/datetime argument."""
+    try:
+        bound = signature.bind_partial(*args, **kwargs)
+    except TypeError:
+        return set()
+    
+    tags = set()
+    for name, value in bound.arguments.items():
+        if isinstance(value, (date, datetime)):
+            tags.add(value.isoformat()[:10])
+        elif name.endswith("_id") and isinstance(value, (int, str)):
+            tags.add(f"{name[:-3]}_{value}")
+    return tags
+
+
+def cached_query(
+    ttl: int = 300,
+    key_prefix: str = "",
+    tags: Optional[Callable[..., Iterable[str]]] = None
+):
+    """Decorator to cache database query results.
+    
+    Results are tagged with the key prefix (or function name) and with tags
+    derived from the arguments (``barber_id=5`` -> ``barber_5``, dates ->
+    ``YYYY-MM-DD``); ``tags`` may add more from the call arguments.
+    
+    The session argument is not part of the key, so results are shared
+    across sessions: return plain values (see ``column_values``), not ORM
+    instances.  Results holding instances are returned but not cached.
+    """
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        name = f"{key_prefix}:{func.__name__}" if key_prefix else func.__name__
+        signature = inspect.signature(func)
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> T:
             # Generate cache key
-            cache_key = query_cache._generate_key(
-                f"{key_prefix}:{func.__name__}" if key_prefix else func.__name__,
-                *args, **kwargs
-            )
+            cache_key = query_cache._generate_key(name, *args, **kwargs)
             
             # Try to get from cache
-            cached_result = query_cache.get(cache_key)
-            if cached_result is not None:
+            cached_result = query_cache.get(cache_key, _MISSING)
+            if cached_result is not _MISSING:
                 logger.debug(f"Cache hit for {func.__name__}")
                 return cached_result
             
             # Execute function and cache result
             try:
                 result = func(*args, **kwargs)
-                query_cache.set(cache_key, result, ttl)
+                if _holds_instances(result):
+                    logger.warning(f"Not caching {func.__name__}: result holds ORM instances")
+                    return result
+                entry_tags = {key_prefix or func.__name__} | _argument_tags(signature, args, kwargs)
+                if tags is not None:
+                    entry_tags.update(tags(*args, **kwargs))
+                query_cache.set(cache_key, result, ttl, tags=entry_tags)
                 logger.debug(f"Cache set for {func.__name__}")
                 return result
             except Exception as e:
@@ -153,15 +373,15 @@ def cached_query(ttl: int = 300, key_prefix: str = ""):
 
 def invalidate_cache_for_barber(barber_id: int):
     """Invalidate cache entries for a specific barber."""
-    query_cache.invalidate_pattern(f"barber_{barber_id}")
+    query_cache.invalidate_tag(f"barber_{barber_id}")
 
 def invalidate_cache_for_appointment(appointment_id: int):
     """Invalidate cache entries for a specific appointment."""
-    query_cache.invalidate_pattern(f"appointment_{appointment_id}")
+    query_cache.invalidate_tag(f"appointment_{appointment_id}")
 
 def invalidate_cache_for_date(date_str: str):
     """Invalidate cache entries for a specific date."""
-    query_cache.invalidate_pattern(date_str)
+    query_cache.invalidate_tag(date_str)
 
 # Cache-aware query functions
 @cached_query(ttl=600, key_prefix="barber_availability")  # 10 minutes
@@ -180,25 +400,27 @@ def get_barber_regular_availability_cached(db, barber_id: int, day_of_week: int)
 
 @cached_query(ttl=300, key_prefix="business_settings")  # 5 minutes
 def get_business_settings_cached(db, business_id: int):
-    """Cached version of business settings lookup."""
+    """Cached version of business settings lookup (column values as a dict)."""
     try:
         import models
-        return db.query(models.BusinessSettings).filter(
+        settings = db.query(models.BusinessSettings).filter(
             models.BusinessSettings.business_id == business_id
         ).first()
+        return column_values(settings) if settings else None
     except Exception:
         # Fallback if BusinessSettings model doesn't exist
         return None
 
 @cached_query(ttl=180, key_prefix="barber_services")  # 3 minutes
 def get_barber_services_cached(db, barber_id: int):
-    """Cached version of barber services lookup."""
+    """Cached version of barber services lookup (one dict of column values per service)."""
     try:
         import models
-        return db.query(models.Service).join(models.barber_services).filter(
+        services = db.query(models.Service).join(models.barber_services).filter(
             models.barber_services.c.barber_id == barber_id,
             models.barber_services.c.is_available == True
         ).all()
+        return [column_values(service) for service in services]
     except Exception:
         # Fallback if service tables don't exist
         return []
@@ -230,4 +452,4 @@ class CacheMiddleware:
         
         # Process request
         response = call_next(request)
-        return response
\ No newline at end of file
+        return response
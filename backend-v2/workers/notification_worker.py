@@ -175,82 +175,14 @@ def send_immediate_notification(self, user_id, template_name, context, notificat
 @celery_app.task(bind=True)
 def send_appointment_reminders(self):
     """
-    Send appointment reminders for upcoming appointments
+    Send appointment reminders that have fallen due
+    
+    Reminder times are materialized when appointments are booked or
+    rescheduled, so this only pops due rows from the reminder index.
     """
     try:
-        from models import Appointment, User, NotificationPreference
-        from sqlalchemy import and_
-        
         with get_db_session() as db:
-            # Get appointments that need reminders
-            now = datetime.utcnow()
-            
-            # Look for appointments in the next 25 hours (to catch 24h reminders)
-            # and next 3 hours (to catch 2h reminders)
-            upcoming_appointments = db.query(Appointment).filter(
-                and_(
-                    Appointment.start_time > now,
-                    Appointment.start_time <= now + timedelta(hours=25),
-                    Appointment.status.in_(['confirmed', 'pending'])
-                )
-            ).all()
-            
-            reminders_sent = 0
-            
-            for appointment in upcoming_appointments:
-                try:
-                    # Get user preferences
-                    preferences = db.query(NotificationPreference).filter(
-                        NotificationPreference.user_id == appointment.user_id
-                    ).first()
-                    
-                    reminder_hours = preferences.reminder_hours if preferences else [24, 2]
-                    
-                    # Check if we need to send any reminders
-                    time_until = appointment.start_time - now
-                    hours_until = time_until.total_seconds() / 3600
-                    
-                    for reminder_hour in reminder_hours:
-                        # Send reminder if we're within the reminder window (±15 minutes)
-                        if abs(hours_until - reminder_hour) <= 0.25:  # 15 minutes tolerance
-                            
-                            # Check if reminder already sent
-                            from models import NotificationQueue
-                            existing_reminder = db.query(NotificationQueue).filter(
-                                and_(
-                                    NotificationQueue.appointment_id == appointment.id,
-                                    NotificationQueue.template_name == "appointment_reminder",
-                                    NotificationQueue.status.in_(['sent', 'pending'])
-                                )
-                            ).first()
-                            
-                            if not existing_reminder:
-                                # Create reminder context
-                                context = {
-                                    "client_name": appointment.user.name,
-                                    "service_name": appointment.service_name,
-                                    "appointment_date": appointment.start_time.strftime("%B %d, %Y"),
-                                    "appointment_time": appointment.start_time.strftime("%I:%M %p"),
-                                    "duration": appointment.duration_minutes,
-                                    "hours_until": int(hours_until),
-                                    "business_name": settings.app_name
-                                }
-                                
-                                # Queue reminder
-                                notification_service.queue_notification(
-                                    db=db,
-                                    user=appointment.user,
-                                    template_name="appointment_reminder",
-                                    context=context,
-                                    appointment_id=appointment.id
-                                )
-                                
-                                reminders_sent += 1
-                                logger.info(f"Queued reminder for appointment {appointment.id}")
-                                
-                except Exception as e:
-                    logger.error(f"Error processing reminder for appointment {appointment.id}: {e}")
-                    continue
+            reminders_sent = notification_service.queue_due_reminders(db)
             
             # Process the queued reminders
             if reminders_sent > 0:
@@ -97,97 +97,11 @@ class NotificationProcessor:
             logger.error(f"Error processing notifications: {e}")
             
     def _send_appointment_reminders(self):
-        """Send appointment reminders for upcoming appointments"""
+        """Queue appointment reminders that have fallen due"""
         try:
-            from models import Appointment, User, NotificationPreference, NotificationQueue
-            from sqlalchemy import and_
-            
             db = SessionLocal()
             try:
-                # Get appointments that need reminders
-                now = datetime.utcnow()
-                
-                # Look for appointments in the next 25 hours
-                upcoming_appointments = db.query(Appointment).filter(
-                    and_(
-                        Appointment.start_time > now,
-                        Appointment.start_time <= now + timedelta(hours=25),
-                        Appointment.status.in_(['confirmed', 'pending', 'scheduled'])
-                    )
-                ).all()
-                
-                reminders_sent = 0
-                
-                for appointment in upcoming_appointments:
-                    try:
-                        # Get user preferences for reminder timing
-                        preferences = db.query(NotificationPreference).filter(
-                            NotificationPreference.user_id == appointment.user_id
-                        ).first()
-                        
-                        reminder_hours = preferences.reminder_hours if preferences else [24, 2]
-                        
-                        # Check if we need to send any reminders
-                        time_until = appointment.start_time - now
-                        hours_until = time_until.total_seconds() / 3600
-                        
-                        for reminder_hour in reminder_hours:
-                            # Send reminder if we're within the reminder window (±15 minutes)
-                            if abs(hours_until - reminder_hour) <= 0.25:  # 15 minutes tolerance
-                                
-                                # Check if reminder already sent for this reminder hour
-                                existing_reminder = db.query(NotificationQueue).filter(
-                                    and_(
-                                        NotificationQueue.appointment_id == appointment.id,
-                                        NotificationQueue.template_name == "appointment_reminder",
-                                        NotificationQueue.status.in_(['sent', 'pending']),
-                                        # Check if scheduled within ±1 hour of expected reminder time
-                                        NotificationQueue.scheduled_for >= now - timedelta(hours=1),
-                                        NotificationQueue.scheduled_for <= now + timedelta(hours=1)
-                                    )
-                                ).first()
-                                
-                                if not existing_reminder:
-                                    # Get client and barber information
-                                    from models import Client
-                                    client = None
-                                    if appointment.client_id:
-                                        client = db.query(Client).filter(Client.id == appointment.client_id).first()
-                                    
-                                    barber = db.query(User).filter(User.id == appointment.barber_id).first()
-                                    
-                                    # Create reminder context
-                                    context = {
-                                        "client_name": f"{client.first_name} {client.last_name}" if client else appointment.user.name,
-                                        "service_name": appointment.service_name,
-                                        "appointment_date": appointment.start_time.strftime("%B %d, %Y"),
-                                        "appointment_time": appointment.start_time.strftime("%I:%M %p"),
-                                        "duration": appointment.duration_minutes,
-                                        "barber_name": barber.name if barber else None,
-                                        "business_name": getattr(settings, 'business_name', getattr(settings, 'app_name', 'BookedBarber')),
-                                        "business_address": getattr(settings, 'business_address', None),
-                                        "business_phone": getattr(settings, 'business_phone', '(555) 123-4567'),
-                                        "hours_until": int(hours_until),
-                                        "current_year": datetime.now().year,
-                                        "appointment_id": appointment.id
-                                    }
-                                    
-                                    # Queue reminder
-                                    notifications = notification_service.queue_notification(
-                                        db=db,
-                                        user=appointment.user,
-                                        template_name="appointment_reminder",
-                                        context=context,
-                                        appointment_id=appointment.id
-                                    )
-                                    
-                                    if notifications:
-                                        reminders_sent += 1
-                                        logger.info(f"Queued {reminder_hour}h reminder for appointment {appointment.id}")
-                                    
-                    except Exception as e:
-                        logger.error(f"Error processing reminder for appointment {appointment.id}: {e}")
-                        continue
+                reminders_sent = notification_service.queue_due_reminders(db)
                 
                 if reminders_sent > 0:
                     logger.info(f"Queued {reminders_sent} appointment reminders")